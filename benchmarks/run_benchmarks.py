@@ -0,0 +1,334 @@
+import os
+import sys
+import argparse
+import contextlib
+import json
+import platform
+import shutil
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from validation_engine.config import COLUMNS_TO_CHECK, DATASETS_PATH, STABILITY_SAMPLE_SIZE, STABILITY_SAMPLE_STRATA
+from benchmarks.synthetic import SIZES, parse_size, write_dataset, write_datasets
+from quality_rules.schema_validation import SCHEMA_REGISTRY, ARROW_STRING_DTYPE, ingest_schema, validate_schema
+from quality_rules.missing_handle import handle_missing_values, compile_imputation_plan
+from quality_rules.missing_values import null_profile
+from quality_rules.regression_tests import compare_datasets
+from quality_rules import stability_tests
+from quality_rules.uniqueness import find_duplicate_keys
+from validation_engine import polars_backend
+from validation_engine.typed_ingest import ingest_options, storage_schema
+
+try:
+    import pyarrow
+except ImportError:  # The string storage benchmarks need pyarrow
+    pyarrow = None
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SENTINEL = ["-m", "validation_engine.cli"]
+
+
+def measure(function, repeat: int) -> dict:
+    """
+    Time a function (best of `repeat` runs) and measure its peak traced memory in one more run.
+    Output printed by the rules is discarded.
+
+    :return: Dictionary with the best and all wall times (seconds), CPU time of the best run and peak memory (bytes).
+    """
+    times, cpu_times = [], []
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(repeat):
+            start, cpu_start = time.perf_counter(), time.process_time()
+            function()
+            times.append(time.perf_counter() - start)
+            cpu_times.append(time.process_time() - cpu_start)
+        tracemalloc.start()
+        try:
+            function()
+            peak_memory = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    best = int(np.argmin(times))
+    return {'seconds': times[best], 'seconds_all': times, 'cpu_seconds': cpu_times[best],
+            'peak_memory_bytes': peak_memory, 'memory': 'tracemalloc'}
+
+
+def run_script(arguments: list, cwd: str) -> dict:
+    """
+    Run a Python script in its own process (with the repository importable) and measure its wall time and peak resident memory.
+    """
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join(filter(None, [REPOSITORY, os.environ.get('PYTHONPATH')]))}
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable] + arguments, cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    _, status, usage = os.wait4(process.pid, 0)
+    seconds = time.perf_counter() - start
+    stderr = process.stderr.read().decode(errors='replace')
+    process.stderr.close()
+    if status != 0:
+        raise RuntimeError(f"{' '.join(arguments)} failed: {stderr.strip()}")
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    peak_memory = usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+    return {'seconds': seconds, 'cpu_seconds': usage.ru_utime + usage.ru_stime, 'peak_memory_bytes': peak_memory, 'memory': 'max_rss'}
+
+
+def dataset_paths(dataset_key: str, rows: int, workdir: str, args) -> list:
+    """
+    Return the paths of the v1 and v2 synthetic versions of a dataset, generated on first use.
+    """
+    paths = []
+    for version, drift in (("v1", 0.0), ("v2", args.drift)):
+        path = os.path.join(workdir, f"{dataset_key}_{rows}_{args.seed}_{args.null_rate}_{drift}_{version}.csv")
+        if not os.path.exists(path):
+            write_dataset(path, dataset_key, rows, args.seed, args.null_rate, drift)
+        paths.append(path)
+    return paths
+
+
+def benchmark_rules(dataset_key: str, rows: int, workdir: str, args) -> list:
+    """
+    Benchmark every quality rule on one synthetic dataset pair loaded in memory.
+    """
+    paths = dataset_paths(dataset_key, rows, workdir, args)
+    results = []
+    def record(benchmark: str, function, **extra):
+        result = {'benchmark': benchmark, 'dataset': dataset_key, 'rows': rows, 'mode': 'in-memory', **extra}
+        result.update(measure(function, args.repeat))
+        results.append(result)
+        print(f"{benchmark:<38} {dataset_key:<17} {rows:>11} rows {result['seconds']:9.3f} s {result['peak_memory_bytes'] / 2**20:9.1f} MiB")
+
+    record("load_dataset", lambda: pd.read_csv(paths[0]))
+    dataset_v1, dataset_v2 = pd.read_csv(paths[0]), pd.read_csv(paths[1])
+    dataset_name = f"{dataset_key}_v2"
+
+    record("validate_schema", lambda: validate_schema(dataset_v2, SCHEMA_REGISTRY[dataset_key]))
+    record("handle_missing_values", lambda: handle_missing_values(dataset_v2, dataset_name))
+    cleaned_dataset = handle_missing_values(dataset_v2, dataset_name)
+    # Both raw versions have the same missing values, so the comparison runs the full keyed row diff
+    record("compare_datasets", lambda: compare_datasets(dataset_v1, dataset_v2))
+    columns = [column for column in COLUMNS_TO_CHECK if column in dataset_v1.columns]
+    for column in columns:
+        record("test_statistical_stability", lambda: stability_tests.test_statistical_stability(dataset_v1, cleaned_dataset, column), column=column)
+    if columns:
+        record("test_statistical_stability_batch", lambda: stability_tests.test_statistical_stability_batch(dataset_v1, cleaned_dataset, columns))
+        record("test_statistical_stability_sequential", lambda: stability_tests.test_statistical_stability_sequential(
+            dataset_v1, cleaned_dataset, columns, sample_size=STABILITY_SAMPLE_SIZE, strata=STABILITY_SAMPLE_STRATA.get(dataset_key)))
+    return results
+
+
+def benchmark_string_storage(dataset_key: str, rows: int, workdir: str, args) -> list:
+    """
+    Compare the two storages of the text columns under typed ingest: Python objects and string[pyarrow]
+    (ARROW_STRINGS). Both versions are loaded with each storage, and the rules that walk the text columns
+    (null counting, imputation fills, the keyed comparison, key uniqueness) timed on them. tracemalloc does not
+    see Arrow's buffers, so the memory compared is the loaded dataset's (memory_usage(deep=True), in 'dataset_bytes').
+    """
+    schema = ingest_schema(dataset_key)
+    if pyarrow is None or 'object' not in schema.values():
+        return []
+    paths = dataset_paths(dataset_key, rows, workdir, args)
+    dataset_name = f"{dataset_key}_v2"
+
+    results = []
+    for mode, arrow_strings in (("object", False), (ARROW_STRING_DTYPE, True)):
+        dtypes = ingest_schema(dataset_key, arrow_strings)
+        dates = [column for column, dtype in dtypes.items() if dtype.startswith('datetime64')]
+        read_options = {'dtype': {column: dtype for column, dtype in dtypes.items() if column not in dates}, 'parse_dates': dates or False}
+        dataset_v1, dataset_v2 = pd.read_csv(paths[0], **read_options), pd.read_csv(paths[1], **read_options)
+        dataset_bytes = int(dataset_v2.memory_usage(deep=True).sum())
+
+        def record(benchmark: str, function):
+            result = {'benchmark': benchmark, 'dataset': dataset_key, 'rows': rows, 'mode': mode, 'dataset_bytes': dataset_bytes}
+            result.update(measure(function, args.repeat))
+            results.append(result)
+            print(f"{benchmark:<38} {mode:<17} {rows:>11} rows {result['seconds']:9.3f} s {dataset_bytes / 2**20:9.1f} MiB loaded")
+
+        record("load_dataset (typed)", lambda: pd.read_csv(paths[0], **read_options))
+        record("null_profile", lambda: null_profile(dataset_v2).counts)
+        record("handle_missing_values (typed)", lambda: handle_missing_values(dataset_v2, dataset_name, dtypes))
+        record("compare_datasets (typed)", lambda: compare_datasets(dataset_v1, dataset_v2))
+        record("find_duplicate_keys", lambda: find_duplicate_keys(dataset_v2))
+    return results
+
+
+def benchmark_backends(dataset_key: str, rows: int, workdir: str, args) -> list:
+    """
+    Compare the pandas and Polars backends on the stages the Polars backend runs as queries: loading both versions
+    (typed, the new one cleaned by its imputation plan), schema validation, null counts and the keyed comparison.
+    tracemalloc does not see Polars' buffers, so only the times compare; 'threads' is the size of Polars' thread pool.
+    """
+    if polars_backend.pl is None:
+        return []
+    paths = dataset_paths(dataset_key, rows, workdir, args)
+    dataset_name, dataset_v1_name = f"{dataset_key}_v2", f"{dataset_key}_v1"
+    schema = storage_schema(dataset_key)
+    plan = compile_imputation_plan(dataset_name, schema)
+    read_options = ingest_options(dataset_name)
+
+    def load_pandas():
+        return pd.read_csv(paths[0], **read_options), handle_missing_values(pd.read_csv(paths[1], **read_options), dataset_name, schema)
+
+    def load_polars():
+        return polars_backend.load_versions(plan, dataset_name, paths[1], dataset_v1_name, paths[0])
+
+    results = []
+    for mode, load, load_raw, rules in (
+            ("pandas", load_pandas, lambda path: pd.read_csv(path, **read_options),
+             (validate_schema, lambda frame: null_profile(frame).counts, compare_datasets)),
+            ("polars", load_polars, lambda path: polars_backend.scan_dataset(dataset_name, path).collect(),
+             (polars_backend.validate_schema, polars_backend.null_counts, polars_backend.compare_datasets))):
+        def record(benchmark: str, function):
+            result = {'benchmark': benchmark, 'dataset': dataset_key, 'rows': rows, 'mode': mode, 'threads': polars_backend.pl.thread_pool_size()}
+            result.update(measure(function, args.repeat))
+            results.append(result)
+            print(f"{benchmark:<38} {mode:<17} {rows:>11} rows {result['seconds']:9.3f} s")
+
+        check_schema, count_nulls, compare = rules
+        record("load and clean (both versions)", load)
+        dataset_v1, cleaned_dataset = load()
+        record("validate_schema (backend)", lambda: check_schema(cleaned_dataset, schema))
+        record("null counts (backend)", lambda: count_nulls(cleaned_dataset))
+        # Both raw versions have the same missing values, so the comparison runs the full keyed row diff
+        dataset_v2 = load_raw(paths[1])
+        record("compare_datasets (backend)", lambda: compare(dataset_v1, dataset_v2))
+    return results
+
+
+def benchmark_report(rows: int, workdir: str, args) -> list:
+    """
+    Benchmark generate_report end to end (validation engine process) on synthetic versions of every
+    configured dataset. The first run accepts the baselines (builds the stored profiles); the following
+    runs are the steady state.
+    """
+    root = os.path.join(workdir, f"report_{rows}_{args.seed}_{args.null_rate}_{args.drift}")
+    if not all(os.path.exists(os.path.join(root, path)) for path in DATASETS_PATH.values()):
+        write_datasets(root, rows, args.seed, args.null_rate, args.drift)
+    for directory in ("logs", "reports"):
+        os.makedirs(os.path.join(root, directory), exist_ok=True)
+
+    modes = [("streaming", ["--chunksize", str(args.chunksize)])]
+    if rows <= args.max_in_memory_rows:
+        modes.insert(0, ("in-memory", ["--chunksize", "0"]))
+
+    results = []
+    for mode, options in modes:
+        shutil.rmtree(os.path.join(root, "profiles"), ignore_errors=True)
+        shutil.rmtree(os.path.join(root, "cache"), ignore_errors=True)
+        # Without the result cache, so every run validates the datasets again
+        runs = [run_script(SENTINEL + ["run"] + options + ["--no-cache"], root) for _ in range(args.repeat + 1)]
+        for benchmark, mode_runs in (("generate_report (accept baselines)", runs[:1]), ("generate_report", runs[1:])):
+            best = min(mode_runs, key=lambda run: run['seconds'])
+            result = {'benchmark': benchmark, 'dataset': "all", 'rows': rows, 'mode': mode, **best,
+                      'seconds_all': [run['seconds'] for run in mode_runs]}
+            results.append(result)
+            print(f"{benchmark:<38} {mode:<17} {rows:>11} rows {result['seconds']:9.3f} s {result['peak_memory_bytes'] / 2**20:9.1f} MiB")
+    return results
+
+
+def benchmark_cli_start(workdir: str, args) -> list:
+    """
+    Benchmark the cold start of the sentinel command: --help and a header-only schema check of every
+    configured dataset (10K-row synthetic versions), each in a new process.
+    """
+    root = os.path.join(workdir, f"report_{SIZES['10K']}_{args.seed}_{args.null_rate}_{args.drift}")
+    if not all(os.path.exists(os.path.join(root, path)) for path in DATASETS_PATH.values()):
+        write_datasets(root, SIZES['10K'], args.seed, args.null_rate, args.drift)
+
+    results = []
+    for benchmark, arguments in (("sentinel --help", ["--help"]), ("sentinel check-schema", ["check-schema"])):
+        runs = [run_script(SENTINEL + arguments, root) for _ in range(args.repeat)]
+        best = min(runs, key=lambda run: run['seconds'])
+        result = {'benchmark': benchmark, 'dataset': "all", 'rows': SIZES['10K'], 'mode': "cold start", **best,
+                  'seconds_all': [run['seconds'] for run in runs]}
+        results.append(result)
+        print(f"{benchmark:<38} {'cold start':<17} {result['rows']:>11} rows {result['seconds']:9.3f} s {result['peak_memory_bytes'] / 2**20:9.1f} MiB")
+    return results
+
+
+def _result_key(result: dict) -> tuple:
+    return result['benchmark'], result['dataset'], result['rows'], result['mode'], result.get('column')
+
+
+def compare_results(results: list, baseline_path: str, tolerance: float) -> list:
+    """
+    Compare benchmark results with the results of a previous run.
+
+    :param results: Results of this run.
+    :param baseline_path: JSON file written by a previous run.
+    :param tolerance: Ratio of the baseline time above which a benchmark is reported as a regression.
+    :return: List of the regressed results.
+    """
+    with open(baseline_path) as baseline_file:
+        baseline = {_result_key(result): result for result in json.load(baseline_file)['results']}
+    regressions = []
+    for result in results:
+        previous = baseline.get(_result_key(result))
+        if previous is None:
+            continue
+        ratio = result['seconds'] / previous['seconds'] if previous['seconds'] else float('inf')
+        if ratio > tolerance:
+            regressions.append(result)
+            print(f"REGRESSION {' / '.join(str(part) for part in _result_key(result) if part is not None)}: "
+                  f"{previous['seconds']:.3f} s -> {result['seconds']:.3f} s ({ratio:.2f}x)")
+    return regressions
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPOSITORY, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the quality rules and the validation engine on synthetic data.")
+    parser.add_argument("--sizes", default="10K,1M", help=f"Comma-separated dataset sizes ({', '.join(SIZES)} or numbers).")
+    parser.add_argument("--datasets", default=",".join(SCHEMA_REGISTRY), help="Comma-separated schema keys for the rule benchmarks.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--null-rate", type=float, default=0.05, help="Fraction of missing values in the nullable columns.")
+    parser.add_argument("--drift", type=float, default=0.1, help="Shift of the v2 drift columns, in standard deviations.")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per benchmark (the best one is reported).")
+    parser.add_argument("--max-in-memory-rows", type=int, default=SIZES['1M'],
+                        help="Larger sizes are only benchmarked end to end in streaming mode.")
+    parser.add_argument("--chunksize", type=int, default=100000, help="Chunk size of the streaming end-to-end runs.")
+    parser.add_argument("--no-report", action="store_true", help="Skip the end-to-end generate_report benchmarks.")
+    parser.add_argument("--workdir", default="cache/benchmarks", help="Directory of the generated datasets (reused between runs).")
+    parser.add_argument("--output", default="reports/benchmark_results.json", help="JSON file to write the results to.")
+    parser.add_argument("--baseline", help="JSON results of a previous run to compare with.")
+    parser.add_argument("--tolerance", type=float, default=1.25, help="Slowdown ratio reported as a regression.")
+    args = parser.parse_args()
+
+    workdir = os.path.abspath(args.workdir)
+    results = benchmark_cli_start(workdir, args)
+    for size in args.sizes.split(","):
+        rows = parse_size(size)
+        if rows <= args.max_in_memory_rows:
+            for dataset_key in args.datasets.split(","):
+                results.extend(benchmark_rules(dataset_key, rows, workdir, args))
+                results.extend(benchmark_string_storage(dataset_key, rows, workdir, args))
+                results.extend(benchmark_backends(dataset_key, rows, workdir, args))
+        if not args.no_report:
+            results.extend(benchmark_report(rows, workdir, args))
+
+    output = {
+        'created': datetime.now(timezone.utc).isoformat(),
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'parameters': {'seed': args.seed, 'null_rate': args.null_rate, 'drift': args.drift, 'repeat': args.repeat,
+                       'chunksize': args.chunksize, 'max_in_memory_rows': args.max_in_memory_rows},
+        'results': results
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as output_file:
+        json.dump(output, output_file, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline and compare_results(results, args.baseline, args.tolerance):
+        sys.exit(1)
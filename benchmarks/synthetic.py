@@ -0,0 +1,185 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from validation_engine.config import DATASETS_PATH
+from quality_rules.schema_validation import schema_key
+
+# Rows generated per block: every block has its own seeded generator, so datasets of any size are
+# generated (and written) in bounded memory, and the same seed always gives the same rows
+BLOCK_ROWS = 1_000_000
+
+# Benchmark sizes
+SIZES = {
+    '10K': 10_000,
+    '1M': 1_000_000,
+    '10M': 10_000_000,
+    '100M': 100_000_000
+}
+
+# Columns that get missing values (at the null rate) in the generated datasets
+NULLABLE_COLUMNS = {
+    'netflix_movies': ['director', 'cast', 'country', 'date_added', 'rating', 'duration', 'genres', 'description'],
+    'netflix_tv_shows': ['director', 'cast', 'country', 'date_added', 'rating', 'duration', 'genres', 'description'],
+    'nyc_taxi': ['VendorID', 'store_and_fwd_flag', 'RatecodeID', 'passenger_count', 'payment_type', 'trip_type',
+                 'congestion_surcharge']
+}
+
+# Columns shifted by the drift (in standard deviations of the column) in the second version
+DRIFT_COLUMNS = {
+    'netflix_movies': ['release_year', 'vote_average', 'popularity'],
+    'netflix_tv_shows': ['release_year', 'vote_average', 'popularity'],
+    'nyc_taxi': ['trip_distance', 'fare_amount', 'total_amount']
+}
+
+_NAMES = np.array([f"Person {i}" for i in range(500)], dtype=object)
+_COUNTRIES = np.array(['United States', 'India', 'United Kingdom', 'Japan', 'France', 'Spain', 'Canada', 'Brazil'], dtype=object)
+_RATINGS = np.array(['G', 'PG', 'PG-13', 'R', 'TV-MA', 'TV-14', 'TV-PG'], dtype=object)
+_GENRES = np.array(['Drama', 'Comedy', 'Action', 'Documentary', 'Horror', 'Romance', 'Thriller'], dtype=object)
+_LANGUAGES = np.array(['en', 'hi', 'ja', 'es', 'fr', 'ko'], dtype=object)
+
+
+def parse_size(size: str) -> int:
+    """
+    Return the number of rows of a benchmark size ("10K", "1M", ... or a plain number).
+    """
+    return SIZES[size] if size in SIZES else int(size)
+
+
+def _strings(prefix: str, numbers: np.ndarray) -> np.ndarray:
+    return (prefix + pd.Series(numbers).astype(str)).to_numpy(dtype=object)
+
+
+def _netflix_block(rng, start: int, rows: int, tv_shows: bool) -> pd.DataFrame:
+    block = pd.DataFrame({
+        'show_id': _strings('s', np.arange(start, start + rows)),
+        'type': 'TV Show' if tv_shows else 'Movie',
+        'title': _strings('Title ', rng.integers(0, max(rows // 2, 1), rows)),
+        'director': rng.choice(_NAMES, rows),
+        'cast': rng.choice(_NAMES, rows),
+        'country': rng.choice(_COUNTRIES, rows),
+        'date_added': (pd.Timestamp('2015-01-01') + pd.to_timedelta(rng.integers(0, 3650, rows), unit='D')).strftime('%Y-%m-%d').to_numpy(dtype=object),
+        'release_year': rng.integers(1950, 2025, rows),
+        'rating': rng.choice(_RATINGS, rows),
+        'duration': _strings('Season ' if tv_shows else '', rng.integers(1, 10, rows) if tv_shows else rng.integers(60, 180, rows)),
+        'genres': rng.choice(_GENRES, rows),
+        'language': rng.choice(_LANGUAGES, rows),
+        'description': _strings('Description ', rng.integers(0, 1000, rows)),
+        'popularity': rng.gamma(2.0, 10.0, rows),
+        'vote_count': rng.integers(0, 20000, rows),
+        'vote_average': np.round(rng.normal(6.5, 1.2, rows).clip(0, 10), 1)
+    })
+    if not tv_shows:
+        block['duration'] = block['duration'] + ' min'
+        block['budget'] = rng.integers(0, 200_000_000, rows)
+        block['revenue'] = rng.integers(0, 1_000_000_000, rows)
+    return block
+
+
+def _taxi_block(rng, start: int, rows: int) -> pd.DataFrame:
+    pickup = pd.Timestamp('2021-01-01') + pd.to_timedelta(rng.integers(0, 31 * 24 * 3600, rows), unit='s')
+    dropoff = pickup + pd.to_timedelta(rng.integers(60, 3600, rows), unit='s')
+    trip_distance = np.round(rng.gamma(2.0, 1.5, rows), 2)
+    fare_amount = np.round(2.5 + trip_distance * 2.5, 2)
+    tip_amount = np.round(rng.exponential(1.5, rows), 2)
+    return pd.DataFrame({
+        'VendorID': rng.integers(1, 3, rows).astype('float64'),
+        'lpep_pickup_datetime': pickup.strftime('%Y-%m-%d %H:%M:%S').to_numpy(dtype=object),
+        'lpep_dropoff_datetime': dropoff.strftime('%Y-%m-%d %H:%M:%S').to_numpy(dtype=object),
+        'store_and_fwd_flag': rng.choice(np.array(['N', 'Y'], dtype=object), rows, p=[0.99, 0.01]),
+        'RatecodeID': rng.integers(1, 6, rows).astype('float64'),
+        'PULocationID': rng.integers(1, 266, rows),
+        'DOLocationID': rng.integers(1, 266, rows),
+        'passenger_count': rng.integers(1, 6, rows).astype('float64'),
+        'trip_distance': trip_distance,
+        'fare_amount': fare_amount,
+        'extra': rng.choice([0.0, 0.5, 1.0], rows),
+        'mta_tax': 0.5,
+        'tip_amount': tip_amount,
+        'tolls_amount': 0.0,
+        'improvement_surcharge': 0.3,
+        'total_amount': np.round(fare_amount + tip_amount + 0.8, 2),
+        'payment_type': rng.integers(1, 5, rows).astype('float64'),
+        'trip_type': rng.integers(1, 3, rows).astype('float64'),
+        'congestion_surcharge': rng.choice([0.0, 2.75], rows)
+    })
+
+
+def generate_block(dataset_key: str, start: int, rows: int, seed: int = 0, null_rate: float = 0.05, drift: float = 0.0) -> pd.DataFrame:
+    """
+    Generate `rows` rows of a synthetic dataset, starting at row `start`.
+
+    :param dataset_key: Schema registry key ("netflix_movies", "netflix_tv_shows" or "nyc_taxi").
+    :param start: Index of the first row.
+    :param rows: Number of rows.
+    :param seed: Seed of the dataset. Two versions generated with the same seed have the same rows
+                 and missing values, up to the drift.
+    :param null_rate: Fraction of missing values in the nullable columns.
+    :param drift: Shift of the drift columns in the second version, in standard deviations.
+    :return: DataFrame with the columns of the dataset schema.
+    """
+    rng = np.random.default_rng([seed, start])
+    if dataset_key == 'nyc_taxi':
+        block = _taxi_block(rng, start, rows)
+    else:
+        block = _netflix_block(rng, start, rows, dataset_key == 'netflix_tv_shows')
+    block.index = pd.RangeIndex(start, start + rows)
+
+    for column in NULLABLE_COLUMNS[dataset_key]:
+        block.loc[rng.random(rows) < null_rate, column] = np.nan
+    if drift:
+        for column in DRIFT_COLUMNS[dataset_key]:
+            shifted = block[column] + drift * block[column].std()
+            block[column] = shifted.round().astype(block[column].dtype) if pd.api.types.is_integer_dtype(block[column].dtype) else shifted
+    return block
+
+
+def generate_chunks(dataset_key: str, rows: int, seed: int = 0, null_rate: float = 0.05, drift: float = 0.0):
+    """
+    Generate a synthetic dataset block by block (see generate_block).
+
+    :return: Generator of DataFrame blocks of at most BLOCK_ROWS rows.
+    """
+    for start in range(0, rows, BLOCK_ROWS):
+        yield generate_block(dataset_key, start, min(BLOCK_ROWS, rows - start), seed, null_rate, drift)
+
+
+def generate_dataset(dataset_key: str, rows: int, seed: int = 0, null_rate: float = 0.05, drift: float = 0.0) -> pd.DataFrame:
+    """
+    Generate a synthetic dataset in memory (see generate_block).
+    """
+    return pd.concat(generate_chunks(dataset_key, rows, seed, null_rate, drift))
+
+
+def write_dataset(path: str, dataset_key: str, rows: int, seed: int = 0, null_rate: float = 0.05, drift: float = 0.0):
+    """
+    Write a synthetic dataset to a CSV file, block by block.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    for i, block in enumerate(generate_chunks(dataset_key, rows, seed, null_rate, drift)):
+        block.to_csv(tmp_path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+    os.replace(tmp_path, path)
+
+
+def write_datasets(root: str, rows: int, seed: int = 0, null_rate: float = 0.05, drift: float = 0.0):
+    """
+    Write every dataset of DATASETS_PATH under `root` (v1 versions without drift, v2 versions with it),
+    so the validation engine can run on them from that directory.
+    """
+    for dataset_name, dataset_path in DATASETS_PATH.items():
+        version_drift = drift if dataset_name.endswith("v2") else 0.0
+        write_dataset(os.path.join(root, dataset_path), schema_key(dataset_name), rows, seed, null_rate, version_drift)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write synthetic versions of the configured datasets.")
+    parser.add_argument("root", help="Directory to write the datasets to (with the DATASETS_PATH layout).")
+    parser.add_argument("--rows", default="10K", help=f"Rows per dataset: {', '.join(SIZES)} or a number.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--null-rate", type=float, default=0.05)
+    parser.add_argument("--drift", type=float, default=0.0, help="Shift of the v2 drift columns, in standard deviations.")
+    args = parser.parse_args()
+    write_datasets(args.root, parse_size(args.rows), args.seed, args.null_rate, args.drift)
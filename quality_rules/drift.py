@@ -0,0 +1,231 @@
+import numpy as np
+import pandas as pd
+from scipy.special import rel_entr
+from scipy.stats import chi2_contingency, wasserstein_distance
+
+from validation_engine.config import COLUMNS_TO_CHECK, DRIFT_COLUMNS, DRIFT_CATEGORICAL, DRIFT_BINS, DRIFT_PSI_THRESHOLD
+from quality_rules.profiles import DatasetProfile
+from quality_rules.sampling import StratifiedSample
+from quality_rules.schema_validation import SCHEMA_REGISTRY
+from quality_rules.sketches import KLLSketch
+from validation_engine.spans import traced
+
+# Share given to empty bins by the PSI, so its logarithms stay finite
+PSI_EPSILON = 1e-4
+
+
+def drift_columns(dataset_key: str) -> dict:
+    """
+    Return the columns monitored for drift in a dataset (DRIFT_COLUMNS, else COLUMNS_TO_CHECK) that its schema
+    has, with their kind: "numeric" for numeric schema dtypes, "categorical" for the others and DRIFT_CATEGORICAL.
+    Datasets without a registered schema monitor COLUMNS_TO_CHECK as numeric columns.
+
+    :param dataset_key: Schema registry key of the dataset (e.g. "nyc_taxi").
+    :return: Dictionary of column name -> kind, in DRIFT_COLUMNS order.
+    """
+    columns = DRIFT_COLUMNS.get(dataset_key, COLUMNS_TO_CHECK)
+    schema = SCHEMA_REGISTRY.get(dataset_key)
+    if schema is None:
+        return {column: "numeric" for column in columns}
+    kinds = {}
+    for column in columns:
+        if column in schema:
+            numeric = pd.api.types.is_numeric_dtype(pd.api.types.pandas_dtype(schema[column])) and column not in DRIFT_CATEGORICAL
+            kinds[column] = "numeric" if numeric else "categorical"
+    return kinds
+
+
+def stability_columns(dataset_key: str) -> list:
+    """
+    Return the numeric drift columns of a dataset: the columns of its KS stability tests (and whose values
+    baseline profiles keep).
+    """
+    return [column for column, kind in drift_columns(dataset_key).items() if kind == "numeric"]
+
+
+def _values(source, column: str) -> np.ndarray:
+    # Non-null values of a numeric column, or None if the source only has a sketch of it
+    if isinstance(source, DatasetProfile):
+        return source.values(column) if source.exact and column in source.value_columns else None
+    if isinstance(source, StratifiedSample):
+        return source.values(column)
+    if isinstance(source, dict):
+        values = source[column]
+        return values if isinstance(values, np.ndarray) else None
+    values = source[column].to_numpy(dtype='float64', na_value=np.nan)
+    return values[~np.isnan(values)]
+
+
+def _sketch(source, column: str) -> KLLSketch:
+    return source.sketches[column] if isinstance(source, DatasetProfile) else source[column]
+
+
+def _frequencies(source, column: str) -> pd.Series:
+    # Frequency table of a categorical column
+    if isinstance(source, DatasetProfile):
+        counts = source.value_counts[column]
+        # Profiles keep the most frequent values of each column: the rest is pooled in one category
+        other = source.rows - int(source.missing[column]) - int(counts.sum())
+        return pd.concat([counts, pd.Series({"(other)": other})]) if other > 0 else counts
+    if isinstance(source, dict):
+        return source[column]
+    return source[column].value_counts()
+
+
+def _bin(values: np.ndarray, weights: np.ndarray, edges: np.ndarray, rank_error: float = 0.0) -> dict:
+    # Bins are (edge_i-1, edge_i], as the CDF of a sketch counts values up to each edge
+    codes = np.searchsorted(edges, values, side='left')
+    counts = np.bincount(codes, weights, minlength=len(edges) + 1).astype('float64')
+    sums = np.bincount(codes, values if weights is None else values * weights, minlength=len(edges) + 1)
+    return {'kind': "numeric", 'counts': pd.Series(counts), 'sums': sums, 'edges': edges, 'rank_error': rank_error}
+
+
+def _histogram(source, column: str, kind: str, baseline: dict = None, bins: int = DRIFT_BINS) -> dict:
+    if kind == "categorical":
+        counts = _frequencies(source, column)
+        if baseline is not None and "(other)" in baseline['counts'].index:
+            # The baseline pooled its rare values: so are the values it did not keep
+            kept = counts.index.isin(baseline['counts'].index) & (counts.index != "(other)")
+            counts = pd.concat([counts[kept], pd.Series({"(other)": counts[~kept].sum()})])
+        counts = counts[counts > 0].astype('float64')
+        # Plain labels, so frequency tables of category and object columns align
+        counts.index = counts.index.astype(object)
+        return {'kind': kind, 'counts': counts, 'rank_error': 0.0}
+
+    if isinstance(source, dict) and isinstance(source[column], dict):
+        # Already binned at the baseline's edges (see update_histograms)
+        return source[column]
+    values = _values(source, column)
+    sketch = _sketch(source, column) if values is None else None
+    if baseline is not None:
+        edges = baseline['edges']
+    else:
+        # Bins cut at the quantiles of this version (the baseline)
+        quantiles = np.linspace(0, 1, bins + 1)[1:-1]
+        if values is not None:
+            edges = np.unique(np.quantile(values, quantiles)) if len(values) else np.array([])
+        else:
+            edges = np.unique(sketch.quantile(quantiles)) if sketch.n else np.array([])
+    if values is None:
+        # The sketch's retained items stand for the values, with their weights
+        values, weights = sketch.weighted_items()
+        return _bin(values.astype('float64'), weights.astype('float64'), edges, sketch.rank_error())
+    return _bin(values, None, edges)
+
+
+def build_histograms(source, columns: dict, baseline: dict = None, bins: int = DRIFT_BINS) -> dict:
+    """
+    Build the drift histograms of one dataset version, one vectorized pass per column: counts per bin for
+    numeric columns, a frequency table for categorical ones.
+
+    :param source: The dataset version: a DataFrame, its DatasetProfile, a StratifiedSample of its numeric
+                   columns, or a dictionary of column -> non-null values (numpy array), KLLSketch, frequency table
+                   or histogram already binned at the baseline's edges (see update_histograms).
+    :param columns: Column name -> kind, as returned by drift_columns.
+    :param baseline: Histograms of the baseline, whose bin edges (and pooled rare categories) are reused;
+                     None cuts the bins at this version's quantiles.
+    :param bins: Number of quantile bins when the edges are cut.
+    :return: Dictionary of column name -> histogram (kind, counts, rank_error (normalized rank error of the counts when
+             they come from a quantile sketch, else 0) and, for numeric columns, edges and the sum of each bin's values).
+    """
+    return {column: _histogram(source, column, kind, baseline[column] if baseline else None, bins) for column, kind in columns.items()}
+
+
+def update_histograms(histograms: dict, chunk: pd.DataFrame, baseline: dict):
+    """
+    Add one chunk to the numeric histograms of a dataset version (created on first use), binned at the edges of the
+    baseline's histograms: a streamed version then needs only its bin counts, which are those build_histograms
+    gives on the whole version.
+
+    :param histograms: Column name -> histogram, updated in place.
+    :param chunk: DataFrame chunk of the version.
+    :param baseline: Histograms of the baseline (see build_histograms); only its numeric columns are binned.
+    """
+    for column, histogram in baseline.items():
+        if histogram['kind'] == "numeric" and column in chunk.columns:
+            values = chunk[column].to_numpy(dtype='float64', na_value=np.nan)
+            part = _bin(values[~np.isnan(values)], None, histogram['edges'])
+            if column in histograms:
+                part['counts'] += histograms[column]['counts']
+                part['sums'] += histograms[column]['sums']
+            histograms[column] = part
+
+
+def _wasserstein(histogram_v1: dict, histogram_v2: dict) -> float:
+    # Each bin's count sits at the mean of its values: the distance between these two weighted sets of points
+    atoms = []
+    for histogram in (histogram_v1, histogram_v2):
+        counts, sums = histogram['counts'].to_numpy(), histogram['sums']
+        filled = counts > 0
+        atoms.append((sums[filled] / counts[filled], counts[filled]))
+    return float(wasserstein_distance(atoms[0][0], atoms[1][0], atoms[0][1], atoms[1][1]))
+
+
+def drift_metrics(histogram_v1: dict, histogram_v2: dict) -> dict:
+    """
+    Compute every drift metric of a column from the histograms of its two versions.
+
+    :return: Dictionary with n_v1, n_v2, psi (population stability index), js (Jensen-Shannon divergence, base 2,
+             between 0 and 1), wasserstein (Wasserstein-1 distance in the column's unit, numeric columns only;
+             NaN for categorical ones), chi2 and chi2_p_value (chi-square test of homogeneity of the counts), and
+             rank_error (the larger rank error of the two histograms: 0 unless one was binned from a quantile sketch,
+             whose metrics are then approximate).
+    """
+    counts_v1, counts_v2 = histogram_v1['counts'], histogram_v2['counts']
+    if histogram_v1['kind'] == "categorical":
+        counts_v1, counts_v2 = counts_v1.align(counts_v2, fill_value=0)
+    counts_v1, counts_v2 = counts_v1.to_numpy(dtype='float64'), counts_v2.to_numpy(dtype='float64')
+    n_v1, n_v2 = counts_v1.sum(), counts_v2.sum()
+    metrics = {'n_v1': int(round(n_v1)), 'n_v2': int(round(n_v2)), 'psi': np.nan, 'js': np.nan, 'wasserstein': np.nan,
+               'chi2': np.nan, 'chi2_p_value': np.nan, 'rank_error': max(histogram_v1['rank_error'], histogram_v2['rank_error'])}
+    if n_v1 == 0 or n_v2 == 0:
+        return metrics
+
+    p, q = counts_v1 / n_v1, counts_v2 / n_v2
+    floored_p, floored_q = np.maximum(p, PSI_EPSILON), np.maximum(q, PSI_EPSILON)
+    metrics['psi'] = float(np.sum((floored_q - floored_p) * np.log(floored_q / floored_p)))
+    m = (p + q) / 2
+    metrics['js'] = float((rel_entr(p, m).sum() + rel_entr(q, m).sum()) / 2 / np.log(2))
+    if histogram_v1['kind'] == "numeric":
+        metrics['wasserstein'] = _wasserstein(histogram_v1, histogram_v2)
+
+    # Chi-square test on the 2 x bins table of counts, without the bins empty in both versions
+    table = np.vstack([counts_v1, counts_v2])
+    table = table[:, table.sum(axis=0) > 0]
+    if table.shape[1] > 1:
+        chi2, p_value, _, _ = chi2_contingency(table, correction=False)
+        metrics['chi2'], metrics['chi2_p_value'] = float(chi2), float(p_value)
+    else:
+        metrics['chi2'], metrics['chi2_p_value'] = 0.0, 1.0
+    return metrics
+
+
+@traced
+def test_drift(dataset_v1, dataset_v2, columns: dict, psi_threshold: float = DRIFT_PSI_THRESHOLD, bins: int = DRIFT_BINS) -> pd.DataFrame:
+    """
+    Drift test of several columns between two dataset versions. The histograms of each version are built once
+    (numeric bins cut at the old version's quantiles, so each bin starts with the same share of it) and every
+    metric is computed from them. A column drifts when its PSI reaches `psi_threshold`
+    (0.1 is usually read as a moderate shift, 0.2 as a significant one).
+
+    :param dataset_v1: The old version (see build_histograms for the accepted sources).
+    :param dataset_v2: The new version.
+    :param columns: Column name -> kind ("numeric" or "categorical"), e.g. drift_columns(dataset_key).
+    :param psi_threshold: PSI from which a column is reported as drifted.
+    :param bins: Number of quantile bins of the numeric columns.
+    :return: DataFrame indexed by column with kind, the drift_metrics and passed.
+    """
+    histograms_v1 = build_histograms(dataset_v1, columns, bins=bins)
+    histograms_v2 = build_histograms(dataset_v2, columns, histograms_v1, bins)
+    results = pd.DataFrame([{'kind': kind, **drift_metrics(histograms_v1[column], histograms_v2[column])} for column, kind in columns.items()],
+                           index=pd.Index(list(columns), name='column'))
+    # Ensure that there are enough data points in both datasets
+    results['passed'] = (results['n_v1'] >= 10) & (results['n_v2'] >= 10) & (results['psi'] < psi_threshold)
+
+    for row in results.itertuples():
+        if row.n_v1 < 10 or row.n_v2 < 10:
+            print(f"Warning: Insufficient data for the column '{row.Index}' to measure drift.")
+        else:
+            print(f"Drift for column '{row.Index}': PSI {row.psi:.4f}, Jensen-Shannon {row.js:.4f}, "
+                  f"Wasserstein-1 {row.wasserstein:.4g}, chi-square p-value {row.chi2_p_value:.3g}")
+    return results
@@ -1,107 +1,197 @@
 import pandas as pd
+from validation_engine.config import MISSING_THRESHOLD
+from quality_rules.missing_values import NullProfile, null_profile
+from quality_rules.schema_validation import SCHEMA_REGISTRY, schema_key
+from validation_engine.spans import traced
 
-def detect_missing_values(dataset: pd.DataFrame) -> pd.DataFrame:
+# Imputation policy per dataset key (dataset name without the _v1/_v2 suffix, as in SCHEMA_REGISTRY):
+# - fill: value imputed for the missing values of a column
+# - cast: columns cast to their schema dtype once filled (e.g. float IDs back to nullable ints)
+# - drop_columns: columns dropped before anything else (e.g. entirely missing)
+# - missing_threshold: rows with a larger fraction of missing values are dropped (default: MISSING_THRESHOLD)
+IMPUTATION_POLICIES = {
+    'netflix_movies': {
+        'fill': {'duration': 'Unknown', 'director': 'Unknown', 'cast': 'Unknown', 'country': 'Unknown',
+                 'description': 'Unknown', 'genres': 'Unknown'}
+    },
+    'netflix_tv_shows': {
+        'fill': {'duration': 'Unknown', 'director': 'Unknown', 'cast': 'Unknown', 'country': 'Unknown',
+                 'description': 'Unknown', 'genres': 'Unknown'}
+    },
+    'nyc_taxi': {
+        'fill': {'VendorID': -1, 'RatecodeID': -1, 'PULocationID': -1, 'DOLocationID': -1, 'passenger_count': 0,
+                 'store_and_fwd_flag': 'Unknown', 'congestion_surcharge': 0},
+        'cast': ['VendorID', 'RatecodeID', 'PULocationID', 'DOLocationID', 'passenger_count'],
+        'drop_columns': ['ehail_fee']
+    }
+}
+
+# Display names used by the scripts -> dataset key
+POLICY_ALIASES = {
+    'nyc_taxi_trip_data': 'nyc_taxi'
+}
+
+def policy_key(dataset_name: str) -> str:
     """
-    Detect missing values in the dataset and return a summary report.
+    Return the imputation policy key of a dataset name
+    (e.g. "netflix_movies_v2" or "Netflix Movies" -> "netflix_movies", "NYC Taxi Trip Data" -> "nyc_taxi").
+    """
+    key = schema_key(dataset_name.strip().lower().replace(" ", "_"))
+    return POLICY_ALIASES.get(key, key)
 
-    :param dataset: DataFrame representing the dataset.
-    :return: DataFrame containing the count and percentage of missing values per column.
+class ImputationPlan:
     """
-    # Calculate the number of missing values for each column
-    missing_data = dataset.isnull().sum()
-    
-    # Calculate the percentage of missing values for each column
-    missing_percentage = (missing_data / len(dataset)) * 100
-    
-    # Create a summary DataFrame containing missing count and percentage
-    missing_summary = pd.DataFrame({'missing_count': missing_data, 'missing_percentage': missing_percentage})
-    
-    # Return the summary
-    return missing_summary
+    Imputation policy of one dataset compiled against its schema. apply() runs the whole policy as a
+    handful of vectorized steps: one threshold row drop from the dataset's NullProfile, one fillna per
+    column with missing values and one dtype cast, and never assigns into the input frame. apply_profiled() also
+    returns the NullProfile of the cleaned dataset, derived from the input's one, so its nulls are not counted again. The
+    plan runs with copy-on-write enabled, whatever the caller's setting, so the columns it does not change are shared
+    with the input instead of copied.
+    """
+
+    def __init__(self, fill: dict, casts: dict, drop_columns: list, missing_threshold: float):
+        """
+        :param fill: Column -> imputed value.
+        :param casts: Column -> dtype the column is cast to once filled.
+        :param drop_columns: Columns dropped before anything else.
+        :param missing_threshold: Rows with a larger fraction of missing values are dropped.
+        """
+        self.fill = fill
+        self.casts = casts
+        self.drop_columns = drop_columns
+        self.missing_threshold = missing_threshold
+
+    def apply(self, dataset: pd.DataFrame, changes: dict = None) -> pd.DataFrame:
+        """
+        Apply the plan to a dataset (or to a chunk of it: every step works row by row).
+
+        :param dataset: DataFrame representing the dataset.
+        :param changes: If given, the number of cells each rule changed is added to it (rule -> cells),
+                        so the counts add up over the chunks of a dataset.
+        :return: Cleaned DataFrame with missing values handled.
+        """
+        return self.apply_profiled(dataset, changes)[0]
+
+    def apply_profiled(self, dataset: pd.DataFrame, changes: dict = None, nulls: NullProfile = None) -> tuple:
+        """
+        Apply the plan to a dataset, see apply().
+
+        :param dataset: DataFrame representing the dataset.
+        :param changes: If given, the number of cells each rule changed is added to it (rule -> cells).
+        :param nulls: NullProfile of the dataset, if already counted (default: counted here).
+        :return: Tuple (cleaned DataFrame, NullProfile of the cleaned DataFrame).
+        """
+        with pd.option_context("mode.copy_on_write", True):
+            return self._apply_profiled(dataset, {} if changes is None else changes, nulls)
+
+    def _apply_profiled(self, dataset: pd.DataFrame, changes: dict, nulls: NullProfile) -> tuple:
+        # Every null count below is derived from the dataset's NullProfile, nothing is counted twice
+        nulls = null_profile(dataset) if nulls is None else nulls
+        drop_columns = [column for column in self.drop_columns if column in dataset.columns]
+        if drop_columns:
+            dataset = dataset.drop(columns=drop_columns)
+            nulls = nulls.select(columns=dataset.columns)
+        for column in drop_columns:
+            _count(changes, f"drop column {column}", len(dataset))
+
+        # Drop the rows with too many missing values
+        dropped = nulls.row_null_counts() > self.missing_threshold * len(dataset.columns)
+        if dropped.any():
+            dataset = dataset[~dropped]
+            nulls = nulls.select(~dropped)
+        _count(changes, f"drop rows over {self.missing_threshold:.0%} missing", int(dropped.sum()) * len(dataset.columns))
+
+        # Fill the imputed columns that have missing values in one fillna mapping, except string[pyarrow] columns:
+        # a DataFrame.fillna mapping goes through a masked replace for them, several times slower than Series.fillna
+        fill = {column: value for column, value in self.fill.items() if column in dataset.columns}
+        filled = nulls.counts[list(fill)]
+        for column, value in fill.items():
+            # Categorical columns need the imputed value as a category (in every chunk, so their dtypes merge)
+            if isinstance(dataset[column].dtype, pd.CategoricalDtype) and value not in dataset[column].cat.categories:
+                dataset = dataset.assign(**{column: dataset[column].cat.add_categories([value])})
+            _count(changes, f"fill {column} with {value!r}", int(filled[column]))
+        if filled.any():
+            fills = {column: value for column, value in fill.items() if filled[column]}
+            arrow_strings = [column for column in fills if _arrow_string(dataset[column].dtype)]
+            if len(arrow_strings) < len(fills):
+                dataset = dataset.fillna({column: value for column, value in fills.items() if column not in arrow_strings})
+            if arrow_strings:
+                dataset = dataset.assign(**{column: dataset[column].fillna(fills[column]) for column in arrow_strings})
+            nulls = nulls.select(filled=list(fill))
+
+        # Cast the filled columns to their schema dtype in one astype
+        casts = {column: dtype for column, dtype in self.casts.items()
+                 if column in dataset.columns and not pd.api.types.is_dtype_equal(dataset[column].dtype, dtype)}
+        if casts:
+            dataset = dataset.astype(casts)
+        for column, dtype in casts.items():
+            _count(changes, f"cast {column} to {dtype}", len(dataset))
 
-def handle_missing_values(dataset: pd.DataFrame, dataset_name: str) -> pd.DataFrame:
+        # Casts keep missing values missing: the derived profile is the profile of the cleaned dataset
+        return dataset, nulls
+
+def _arrow_string(dtype) -> bool:
+    # string[pyarrow] columns (typed ingest) and other Arrow-backed strings
+    return (isinstance(dtype, pd.StringDtype) and dtype.storage == "pyarrow") or (isinstance(dtype, pd.ArrowDtype) and pd.api.types.is_string_dtype(dtype))
+
+def _count(changes: dict, rule: str, cells: int):
+    changes[rule] = changes.get(rule, 0) + cells
+
+def compile_imputation_plan(dataset_name: str, schema: dict = None) -> ImputationPlan:
+    """
+    Compile the imputation policy of a dataset (see IMPUTATION_POLICIES) into an ImputationPlan.
+    Datasets without a policy only get the threshold row drop.
+
+    :param dataset_name: Name of the dataset (e.g., "netflix_movies_v2", "Netflix Movies").
+    :param schema: Expected schema the cast columns are cast to (default: the schema registry entry
+                   of the dataset; with typed ingest, pass its ingest schema).
+    :return: ImputationPlan of the dataset.
     """
-    This function handles missing values in the dataset by:
-    - Filling or removing values based on the dataset.
-    - Dropping rows that contain missing values.
+    key = policy_key(dataset_name)
+    policy = IMPUTATION_POLICIES.get(key, {})
+    schema = SCHEMA_REGISTRY.get(key, {}) if schema is None else schema
+    casts = {column: schema[column] for column in policy.get('cast', []) if column in schema}
+    return ImputationPlan(dict(policy.get('fill', {})), casts, list(policy.get('drop_columns', [])),
+                          policy.get('missing_threshold', MISSING_THRESHOLD))
+
+@traced
+def handle_missing_values(dataset: pd.DataFrame, dataset_name: str, schema: dict = None, changes: dict = None) -> pd.DataFrame:
+    """
+    This function handles missing values in the dataset by applying its imputation policy:
+    - Dropping the columns the policy drops.
+    - Dropping rows with more than MISSING_THRESHOLD of their values missing.
+    - Filling the remaining missing values of the imputed columns, and casting them to their schema dtype.
     
     :param dataset: DataFrame representing the dataset.
-    :param dataset_name: Name of the dataset (e.g., "Netflix Movies", "NYC Taxi").
+    :param dataset_name: Name of the dataset (e.g., "Netflix Movies", "NYC Taxi", "netflix_movies_v2").
+    :param schema: Expected schema the cast columns are cast to (see compile_imputation_plan).
+    :param changes: If given, the number of cells each rule changed is added to it.
     :return: Cleaned DataFrame with missing values handled.
     """
-    # Remove rows with any missing values (this will drop rows with NaN in any column)
-    dataset = dataset.dropna(how='any')  # 'how' can be 'any' or 'all'
-
-    # Drop 'ehail_fee' column since it has 100% missing values
-    if 'ehail_fee' in dataset.columns:
-        dataset = dataset.drop(columns=['ehail_fee'])
-
-    # Handle missing values for Netflix Movies and TV Shows datasets
-    if dataset_name == "Netflix Movies" or dataset_name == "Netflix TV Shows":
-        if 'duration' in dataset.columns:
-            dataset['duration'] = dataset['duration'].fillna('Unknown')  # Impute missing duration with 'Unknown'
-        if 'director' in dataset.columns:
-            dataset['director'] = dataset['director'].fillna('Unknown')  # Impute missing director with 'Unknown'
-        if 'cast' in dataset.columns:
-            dataset['cast'] = dataset['cast'].fillna('Unknown')  # Impute missing cast with 'Unknown'
-        if 'country' in dataset.columns:
-            dataset['country'] = dataset['country'].fillna('Unknown')  # Impute missing country with 'Unknown'
-        if 'description' in dataset.columns:
-            dataset['description'] = dataset['description'].fillna('Unknown')  # Impute missing description with 'Unknown'
-        if 'genres' in dataset.columns:
-            dataset['genres'] = dataset['genres'].fillna('Unknown')  # Impute missing genres with 'Unknown'
-
-    # Handle missing values for NYC Taxi dataset
-    if dataset_name == "NYC Taxi":
-        if 'VendorID' in dataset.columns:
-            dataset['VendorID'] = dataset['VendorID'].fillna(-1).astype('Int64')  # Fill missing VendorID with -1 (nullable int)
-        if 'RatecodeID' in dataset.columns:
-            dataset['RatecodeID'] = dataset['RatecodeID'].fillna(-1).astype('Int64')  # Fill missing RatecodeID with -1 (nullable int)
-        if 'PULocationID' in dataset.columns:
-            dataset['PULocationID'] = dataset['PULocationID'].fillna(-1).astype('Int64')  # Fill missing PULocationID with -1 (nullable int)
-        if 'DOLocationID' in dataset.columns:
-            dataset['DOLocationID'] = dataset['DOLocationID'].fillna(-1).astype('Int64')  # Fill missing DOLocationID with -1 (nullable int)
-        if 'passenger_count' in dataset.columns:
-            dataset['passenger_count'] = dataset['passenger_count'].fillna(0).astype('int64')  # Fill missing passenger_count with 0
-        if 'store_and_fwd_flag' in dataset.columns:
-            dataset['store_and_fwd_flag'] = dataset['store_and_fwd_flag'].fillna('Unknown')  # Fill missing flag with 'Unknown'
-        if 'congestion_surcharge' in dataset.columns:
-            dataset['congestion_surcharge'] = dataset['congestion_surcharge'].fillna(0)  # Fill missing congestion_surcharge with 0
-
-    return dataset
-
-if __name__ == "__main__":
-    # Define the paths to the datasets
-    datasets = {
-        "Netflix Movies": 'data/netflix_movies_detailed_up_to_2025.csv',
-        "Netflix TV Shows": 'data/netflix_tv_shows_detailed_up_to_2025.csv',
-        "NYC Taxi Trip Data": 'data/taxi_tripdata.csv'
-    }
+    return compile_imputation_plan(dataset_name, schema).apply(dataset, changes)
 
-    # Loop through each dataset and handle missing values
-    for dataset_name, dataset_path in datasets.items():
-        print(f"\nHandling missing values in {dataset_name} dataset...\n")
-        
-        try:
-            # Load the dataset
-            dataset = pd.read_csv(dataset_path)
-            
-            # Detect and print missing values before handling
-            print(f"Missing values summary before handling for {dataset_name} dataset:")
-            print(detect_missing_values(dataset))
-            
-            # Handle missing values
-            cleaned_dataset = handle_missing_values(dataset, dataset_name)
-            
-            # Save cleaned data (optional, if you want to save it for later use)
-            cleaned_dataset.to_csv(f'data/{dataset_name.replace(" ", "_").lower()}_cleaned.csv', index=False)
-
-            # Print summary after handling missing values
-            print(f"Missing values summary after handling for {dataset_name} dataset:")
-            print(detect_missing_values(cleaned_dataset))
-
-            print(f"Missing values handled and cleaned data saved for {dataset_name}.")
-        except FileNotFoundError:
-            print(f"Error: The file '{dataset_path}' was not found. Please check the path.")
-        except Exception as e:
-            print(f"An error occurred while processing {dataset_name}: {e}")
+def handle_missing_values_chunked(chunks, dataset_name: str, schema: dict = None, changes: dict = None):
+    """
+    Handle missing values chunk by chunk. Every step of the imputation plan works row by row,
+    so cleaning each chunk independently gives the same rows as cleaning the full dataset.
+
+    :param chunks: Iterable of DataFrame chunks of the same dataset.
+    :param dataset_name: Name of the dataset (e.g., "Netflix Movies", "NYC Taxi").
+    :param schema: Expected schema the cast columns are cast to (see compile_imputation_plan).
+    :param changes: If given, the number of cells each rule changed is added to it (summed over the chunks).
+    :return: Generator of cleaned DataFrame chunks.
+    """
+    plan = compile_imputation_plan(dataset_name, schema)
+    for chunk in chunks:
+        yield plan.apply(chunk, changes)
+
+def handle_missing_values_profiled(chunks, dataset_name: str, schema: dict = None, changes: dict = None):
+    """
+    Handle missing values chunk by chunk, as handle_missing_values_chunked, along with the NullProfile of
+    each cleaned chunk (derived from the one the plan counts, see ImputationPlan.apply_profiled).
+
+    :return: Generator of (cleaned DataFrame chunk, NullProfile of the cleaned chunk) pairs.
+    """
+    plan = compile_imputation_plan(dataset_name, schema)
+    for chunk in chunks:
+        yield plan.apply_profiled(chunk, changes)
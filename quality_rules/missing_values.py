@@ -1,5 +1,171 @@
+import numpy as np
 import pandas as pd
+from validation_engine.spans import traced
 
+class NullProfile:
+    """
+    Null counts of a dataset, computed once in a single pass over its columns and shared by every
+    missing value consumer (see null_profile). Besides the per-column counts, the profile keeps one null
+    bitmap (1 bit per row) per column that has nulls, from which the per-row null fractions and the
+    co-missingness of the columns are derived without going back to the data.
+
+    Profiles are built chunk by chunk with update() and can be merged, like the other streaming states.
+    """
+
+    def __init__(self, keep_rows: bool = True):
+        """
+        :param keep_rows: Keep the null bitmaps (row fractions and co-missingness). Without them only the
+                          per-column counts are kept, so memory does not grow with the number of rows.
+        """
+        self.keep_rows = keep_rows
+        self.rows = 0
+        self.columns = None
+        self._counts = None
+        self._lengths = []
+        self._bitmaps = {}
+
+    def update(self, chunk: pd.DataFrame) -> "NullProfile":
+        """
+        Add the next chunk of the dataset to the profile (one isna() per column, no boolean frame).
+        """
+        if self.columns is None:
+            self.columns = chunk.columns
+            self._counts = np.zeros(len(chunk.columns), dtype='int64')
+        part = len(self._lengths)
+        for i in range(len(chunk.columns)):
+            mask = chunk.iloc[:, i].isna().to_numpy()
+            count = int(np.count_nonzero(mask))
+            self._counts[i] += count
+            if count and self.keep_rows:
+                self._bitmaps.setdefault(i, {})[part] = np.packbits(mask)
+        self._lengths.append(len(chunk))
+        self.rows += len(chunk)
+        return self
+
+    def merge(self, other: "NullProfile") -> "NullProfile":
+        """
+        Merge the profile of the following rows of the same dataset (e.g. the next shard) into this one.
+        """
+        if self.columns is None:
+            self.columns = other.columns
+            self._counts = np.zeros(len(other.columns), dtype='int64')
+        self._counts += other._counts
+        offset = len(self._lengths)
+        for i, parts in other._bitmaps.items():
+            self._bitmaps.setdefault(i, {}).update({offset + part: bits for part, bits in parts.items()})
+        self._lengths.extend(other._lengths)
+        self.rows += other.rows
+        self.keep_rows = self.keep_rows and other.keep_rows
+        return self
+
+    @property
+    def counts(self) -> pd.Series:
+        """
+        Number of missing values per column (same as dataset.isnull().sum()).
+        """
+        return pd.Series(self._counts, index=self.columns, dtype='int64')
+
+    def summary(self) -> pd.DataFrame:
+        """
+        :return: DataFrame containing the count and percentage of missing values per column.
+        """
+        missing_data = self.counts
+        missing_percentage = (missing_data / self.rows) * 100
+        return pd.DataFrame({'missing_count': missing_data, 'missing_percentage': missing_percentage})
+
+    def _mask(self, i: int) -> np.ndarray:
+        if not self.keep_rows:
+            raise ValueError("Null bitmaps are not kept by this profile (keep_rows=False)")
+        parts = self._bitmaps.get(i, {})
+        return np.concatenate([np.unpackbits(parts[part], count=length).view(bool) if part in parts else np.zeros(length, dtype=bool)
+                               for part, length in enumerate(self._lengths)]) if self._lengths else np.zeros(0, dtype=bool)
+
+    def null_mask(self, column) -> np.ndarray:
+        """
+        :return: Boolean array, True for the rows where the column is missing.
+        """
+        return self._mask(self.columns.get_loc(column))
+
+    def row_null_counts(self) -> np.ndarray:
+        """
+        :return: Number of missing values of every row.
+        """
+        row_counts = np.zeros(self.rows, dtype='int32')
+        for i in self._bitmaps:
+            row_counts += self._mask(i)
+        return row_counts
+
+    def row_null_fractions(self) -> np.ndarray:
+        """
+        :return: Fraction of missing values of every row.
+        """
+        return self.row_null_counts() / max(len(self.columns), 1)
+
+    def co_missing(self) -> pd.DataFrame:
+        """
+        Co-missingness of the columns that have missing values: entry (a, b) is the number of rows where
+        both a and b are missing (the diagonal holds the null counts).
+        """
+        columns = sorted(self._bitmaps)
+        co_missing = np.zeros((len(columns), len(columns)), dtype='int64')
+        # Blocks of rows, so at most a block of the (rows x columns) mask is materialized at once
+        block_rows = 1 << 20
+        for part, length in enumerate(self._lengths):
+            for start in range(0, length, block_rows):
+                rows = min(block_rows, length - start)
+                block = np.zeros((rows, len(columns)), dtype='float64')
+                for j, i in enumerate(columns):
+                    if part in self._bitmaps[i]:
+                        block[:, j] = np.unpackbits(self._bitmaps[i][part][start // 8:(start + rows + 7) // 8], count=rows)
+                co_missing += (block.T @ block).astype('int64')
+        labels = self.columns[columns]
+        return pd.DataFrame(co_missing, index=labels, columns=labels)
+
+    def select(self, rows: np.ndarray = None, columns=None, filled=()) -> "NullProfile":
+        """
+        Derive the profile of a subset of the dataset without counting again: the rows kept by a boolean
+        mask, the given columns, and the `filled` columns with their missing values imputed.
+
+        :param rows: Boolean array over the rows of the dataset (None keeps every row).
+        :param columns: Columns to keep (None keeps every column).
+        :param filled: Columns whose missing values were all filled.
+        :return: NullProfile of the subset.
+        """
+        columns = self.columns if columns is None else pd.Index(columns)
+        selected = NullProfile(self.keep_rows)
+        selected.columns = columns
+        selected._counts = np.zeros(len(columns), dtype='int64')
+        selected.rows = self.rows if rows is None else int(np.count_nonzero(rows))
+        selected._lengths = [selected.rows]
+        for j, column in enumerate(columns):
+            i = self.columns.get_loc(column)
+            if column in filled or not self._counts[i]:
+                continue
+            if rows is None and len(self._lengths) == 1:
+                selected._counts[j] = self._counts[i]
+                if i in self._bitmaps:
+                    selected._bitmaps[j] = {0: self._bitmaps[i][0]}
+                continue
+            mask = self._mask(i)
+            if rows is not None:
+                mask = mask[rows]
+            selected._counts[j] = np.count_nonzero(mask)
+            if selected._counts[j]:
+                selected._bitmaps[j] = {0: np.packbits(mask)}
+        return selected
+
+def null_profile(dataset: pd.DataFrame) -> NullProfile:
+    """
+    Count the nulls of a dataset into a NullProfile. The profile is not cached on the frame: a rule that needs
+    the profile of a frame it derived (e.g. the cleaned dataset, see ImputationPlan.apply_profiled) gets it
+    passed along instead of counting again.
+
+    :param dataset: DataFrame representing the dataset.
+    :return: NullProfile of the dataset.
+    """
+    return NullProfile().update(dataset)
+
+@traced
 def detect_missing_values(dataset: pd.DataFrame) -> pd.DataFrame:
     """
     Detect missing values in the dataset and return a summary report.
@@ -7,44 +173,18 @@ def detect_missing_values(dataset: pd.DataFrame) -> pd.DataFrame:
     :param dataset: DataFrame representing the dataset.
     :return: DataFrame containing the count and percentage of missing values per column.
     """
-    # Calculate the number of missing values for each column
-    missing_data = dataset.isnull().sum()
-    
-    # Calculate the percentage of missing values for each column
-    missing_percentage = (missing_data / len(dataset)) * 100
-    
-    # Create a summary DataFrame containing missing count and percentage
-    missing_summary = pd.DataFrame({'missing_count': missing_data, 'missing_percentage': missing_percentage})
-    
-    # Return the summary
-    return missing_summary
-
-if __name__ == "__main__":
-    # Define the paths to the datasets
-    datasets = {
-        "Netflix Movies": 'data/netflix_movies_detailed_up_to_2025.csv',
-        "Netflix TV Shows": 'data/netflix_tv_shows_detailed_up_to_2025.csv',
-        "NYC Taxi Trip Data": 'data/taxi_tripdata.csv',
-        "Netflix Movies Cleaned": 'data/netflix_movies_cleaned.csv',
-        "Netflix TV Shows Cleaned": 'data/netflix_tv_shows_cleaned.csv',
-        "NYC Taxi Trip Data Cleaned": 'data/nyc_taxi_trip_data_cleaned.csv'
-    }
-
-    # Loop through each dataset and detect missing values
-    for dataset_name, dataset_path in datasets.items():
-        print(f"\nDetecting missing values in {dataset_name} dataset...\n")
-        
-        try:
-            # Load the dataset
-            dataset = pd.read_csv(dataset_path)
-            
-            # Detect missing values and get the summary
-            missing_summary = detect_missing_values(dataset)
-            
-            # Print the summary of missing values
-            print(f"Missing values summary for {dataset_name} dataset:")
-            print(missing_summary)
-        except FileNotFoundError:
-            print(f"Error: The file '{dataset_path}' was not found. Please check the path.")
-        except Exception as e:
-            print(f"An error occurred while processing {dataset_name}: {e}")
+    return null_profile(dataset).summary()
+
+@traced
+def detect_missing_values_chunked(chunks) -> pd.DataFrame:
+    """
+    Detect missing values over a dataset read in chunks (e.g. pd.read_csv(..., chunksize=N)).
+    Only the per-column counts are kept between chunks, so memory is bounded by the chunk size.
+
+    :param chunks: Iterable of DataFrame chunks of the same dataset.
+    :return: Same summary as detect_missing_values on the full dataset.
+    """
+    profile = NullProfile(keep_rows=False)
+    for chunk in chunks:
+        profile.update(chunk)
+    return profile.summary()
@@ -0,0 +1,271 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from quality_rules.missing_values import NullProfile, null_profile
+from quality_rules.row_diff import RECORD_DTYPE, compared_columns, hash_rows, records_digest, row_key, row_records
+from quality_rules.schema_validation import empty_frame, merge_dtypes
+from quality_rules.sketches import KLLSketch, update_column_sketches
+
+
+def _dtype_name(dtype) -> str:
+    # str() drops the storage of string dtypes (string[pyarrow] -> "string", read back as string[python])
+    return f"string[{dtype.storage}]" if isinstance(dtype, pd.StringDtype) else str(dtype)
+
+
+def _json_value(value):
+    # numpy scalars and timestamps as plain JSON values
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class DatasetProfile:
+    """
+    Compact profile of an accepted dataset version, used in place of the full data as the baseline of the
+    regression and stability checks, so the baseline file never has to be read again.
+
+    The profile keeps, per column, the null count, dtype, min/max, the most frequent values and a quantile
+    sketch (numeric columns); for the whole dataset the row count, an order-independent row-hash digest
+    and a digest of its keyed row diff records (see quality_rules.row_diff.records_digest), so its size does
+    not grow with the rows: the regression check compares the digests, the stability tests the sketches.
+
+    Exact profiles (exact=True, for baselines small enough) also keep the row diff records (24 bytes per row),
+    so the regression check counts the added, removed and changed rows, and the sorted values of the
+    `value_columns` (the monitored columns), so the exact KS stability test gives the same result on the
+    profile as on the data.
+
+    Profiles are built chunk by chunk with update() and can be merged (e.g. per-shard profiles).
+    """
+
+    def __init__(self, value_columns: list = None, sketch_k: int = 400, top_k: int = 10, top_k_capacity: int = 100,
+                 exact: bool = False):
+        """
+        :param value_columns: Columns whose sorted values are kept exactly by an exact profile (e.g. COLUMNS_TO_CHECK).
+        :param sketch_k: Size of the quantile sketches of the numeric columns.
+        :param top_k: Number of most frequent values reported per column.
+        :param top_k_capacity: Number of value counts kept per column while profiling (top-k values of
+                               high-cardinality columns are approximate once this is exceeded).
+        :param exact: Keep the row diff records and the sorted values of the value columns.
+        """
+        self.value_columns = list(value_columns or [])
+        self.sketch_k = sketch_k
+        self.top_k = top_k
+        self.top_k_capacity = top_k_capacity
+        self.exact = exact
+        self.rows = 0
+        self.columns = None
+        self.dtypes = None
+        self.missing = None
+        self.minimum = {}
+        self.maximum = {}
+        self.value_counts = {}
+        self.sketches = {}
+        self.row_hash_sum = 0
+        self.record_hash_sum = 0
+        self.key_columns = None
+        self.compared_columns = None
+        self._records = []
+        self._values = {}
+        self._sorted = set()
+
+    def update(self, chunk: pd.DataFrame, nulls: NullProfile = None):
+        """
+        Add the next chunk of the dataset to the profile.
+
+        :param chunk: Next DataFrame chunk of the dataset.
+        :param nulls: NullProfile of the chunk, if already counted (e.g. by ImputationPlan.apply_profiled).
+        """
+        if self.columns is None:
+            self.columns = list(chunk.columns)
+            self.key_columns = row_key(chunk.columns)
+            self.compared_columns = compared_columns(chunk.columns, self.key_columns)
+
+        chunk_missing = (null_profile(chunk) if nulls is None else nulls).counts
+        self.missing = chunk_missing if self.missing is None else self.missing + chunk_missing
+        self.dtypes = merge_dtypes(self.dtypes, chunk)
+        records = row_records(chunk, self.key_columns, self.compared_columns, self.rows)
+        self.record_hash_sum = (self.record_hash_sum + records_digest(records)) % (1 << 64)
+        if self.exact:
+            self._records.append(records)
+        self.rows += len(chunk)
+        # Sum of the full-row hashes (mod 2^64): equal for two versions with the same rows in any order
+        self.row_hash_sum = (self.row_hash_sum + int(hash_rows(chunk).sum(dtype='uint64'))) % (1 << 64)
+
+        for column in chunk.columns:
+            series = chunk[column]
+            counts = series.value_counts()
+            self._merge_value_counts(column, counts)
+            if len(counts) and (pd.api.types.is_numeric_dtype(series.dtype) or pd.api.types.is_datetime64_any_dtype(series.dtype)) \
+                    and not isinstance(series.dtype, pd.CategoricalDtype):
+                self._merge_min_max(column, series.min(), series.max())
+        numeric_columns = [column for column in chunk.columns if pd.api.types.is_numeric_dtype(chunk[column].dtype)
+                           and not isinstance(chunk[column].dtype, pd.CategoricalDtype)]
+        update_column_sketches(self.sketches, chunk, numeric_columns, self.sketch_k)
+        for column in self.value_columns if self.exact else []:
+            if column in chunk.columns:
+                values = chunk[column].to_numpy(dtype='float64', na_value=np.nan)
+                self._values.setdefault(column, []).append(values[~np.isnan(values)])
+                self._sorted.discard(column)
+        return self
+
+    def _merge_value_counts(self, column: str, counts: pd.Series):
+        if column in self.value_counts:
+            counts = self.value_counts[column].add(counts, fill_value=0).astype('int64')
+        self.value_counts[column] = counts.nlargest(self.top_k_capacity) if len(counts) > self.top_k_capacity else counts
+
+    def _merge_min_max(self, column: str, minimum, maximum):
+        self.minimum[column] = minimum if column not in self.minimum else min(self.minimum[column], minimum)
+        self.maximum[column] = maximum if column not in self.maximum else max(self.maximum[column], maximum)
+
+    def merge(self, other: "DatasetProfile") -> "DatasetProfile":
+        """
+        Merge the profile of the following rows of the same dataset (e.g. the next shard) into this one.
+        Both profiles must be exact or not, and profiles without key columns merge only if exact (their rows are
+        matched by position, and the records digest of the following rows cannot be shifted after these ones).
+        """
+        if other.exact != self.exact:
+            raise ValueError("Cannot merge an exact profile with a profile that is not")
+        if self.columns is None:
+            self.columns, self.key_columns, self.compared_columns = other.columns, other.key_columns, other.compared_columns
+        self.missing = other.missing if self.missing is None else self.missing.add(other.missing, fill_value=0).astype('int64')
+        self.dtypes = other.dtypes if self.dtypes is None else merge_dtypes(self.dtypes, empty_frame(other.dtypes))
+        if self.key_columns:
+            self.record_hash_sum = (self.record_hash_sum + other.record_hash_sum) % (1 << 64)
+        elif not self.exact:
+            raise ValueError("Profiles without key columns merge only if exact (rows are matched by position)")
+        for records in other._records:
+            records = records.copy()
+            # Rows matched by position continue after the rows of this profile
+            if not self.key_columns:
+                records['key'] += self.rows
+                self.record_hash_sum = (self.record_hash_sum + records_digest(records)) % (1 << 64)
+            self._records.append(records)
+        self.rows += other.rows
+        self.row_hash_sum = (self.row_hash_sum + other.row_hash_sum) % (1 << 64)
+        for column, counts in other.value_counts.items():
+            self._merge_value_counts(column, counts)
+        for column in other.minimum:
+            self._merge_min_max(column, other.minimum[column], other.maximum[column])
+        for column, sketch in other.sketches.items():
+            if column in self.sketches:
+                self.sketches[column].merge(sketch)
+            else:
+                self.sketches[column] = sketch
+        for column, values in other._values.items():
+            self._values.setdefault(column, []).extend(values)
+            self._sorted.discard(column)
+        return self
+
+    @property
+    def digest(self) -> str:
+        """
+        Row-hash digest of the dataset: row count and order-independent sum of the row hashes.
+        """
+        return f"{self.rows}-{self.row_hash_sum:016x}"
+
+    def records(self) -> np.ndarray:
+        """
+        :return: Row diff records (key hash, compared values hash, row id) of every row (exact profiles only).
+        """
+        if not self.exact:
+            raise ValueError("The profile keeps no row diff records (built with exact=False)")
+        if len(self._records) != 1:
+            self._records = [np.concatenate(self._records) if self._records else np.empty(0, dtype=RECORD_DTYPE)]
+        return self._records[0]
+
+    def values(self, column: str) -> np.ndarray:
+        """
+        :return: Sorted non-null values of one of the value columns (KeyError for other columns; exact profiles only).
+        """
+        if not self.exact:
+            raise ValueError("The profile keeps no column values (built with exact=False)")
+        if column not in self.value_columns:
+            raise KeyError(column)
+        if column not in self._sorted:
+            parts = self._values.get(column, [])
+            self._values[column] = [np.sort(np.concatenate(parts)) if parts else np.empty(0)]
+            self._sorted.add(column)
+        return self._values[column][0]
+
+    def top_values(self, column: str) -> pd.Series:
+        """
+        :return: Counts of the most frequent values of a column.
+        """
+        return self.value_counts[column].nlargest(self.top_k)
+
+    def save(self, path: str):
+        """
+        Save the profile to a directory: profile.json (column statistics and sketches) and, for an exact
+        profile, records.npy (row diff records) and one values_<i>.npy file per value column.
+        """
+        os.makedirs(path, exist_ok=True)
+        if self.exact:
+            np.save(os.path.join(path, "records.npy"), self.records())
+            for i, column in enumerate(self.value_columns):
+                np.save(os.path.join(path, f"values_{i}.npy"), self.values(column))
+
+        state = {
+            'rows': self.rows, 'columns': self.columns, 'value_columns': self.value_columns,
+            'sketch_k': self.sketch_k, 'top_k': self.top_k, 'top_k_capacity': self.top_k_capacity, 'exact': self.exact,
+            'dtypes': {column: _dtype_name(dtype) for column, dtype in self.dtypes.items()},
+            'missing': {column: int(count) for column, count in self.missing.items()},
+            'minimum': {column: _json_value(value) for column, value in self.minimum.items()},
+            'maximum': {column: _json_value(value) for column, value in self.maximum.items()},
+            'value_counts': {column: [[_json_value(value), int(count)] for value, count in counts.items()]
+                             for column, counts in self.value_counts.items()},
+            'sketches': {column: sketch.to_dict() for column, sketch in self.sketches.items()},
+            'row_hash_sum': self.row_hash_sum, 'record_hash_sum': self.record_hash_sum, 'key_columns': self.key_columns, 'compared_columns': self.compared_columns,
+        }
+        tmp_path = os.path.join(path, f"profile.json.{os.getpid()}.tmp")
+        with open(tmp_path, 'w') as profile_file:
+            json.dump(state, profile_file)
+        # profile.json is written last, so a profile directory without it is incomplete
+        os.replace(tmp_path, os.path.join(path, "profile.json"))
+
+    @classmethod
+    def load(cls, path: str) -> "DatasetProfile":
+        """
+        Load a profile saved with save(). The records and values are memory-mapped.
+        """
+        with open(os.path.join(path, "profile.json")) as profile_file:
+            state = json.load(profile_file)
+        profile = cls(state['value_columns'], state['sketch_k'], state['top_k'], state['top_k_capacity'], state['exact'])
+        profile.rows, profile.columns = state['rows'], state['columns']
+        profile.dtypes = pd.Series(state['dtypes'], dtype=object)
+        profile.missing = pd.Series(state['missing'], dtype='int64')
+        datetime_columns = [column for column, dtype in state['dtypes'].items() if dtype.startswith('datetime64')]
+        for name in ('minimum', 'maximum'):
+            getattr(profile, name).update({column: pd.Timestamp(value) if column in datetime_columns else value
+                                           for column, value in state[name].items()})
+        profile.value_counts = {column: pd.Series(dict((value, count) for value, count in pairs), dtype='int64')
+                                for column, pairs in state['value_counts'].items()}
+        profile.sketches = {column: KLLSketch.from_dict(sketch) for column, sketch in state['sketches'].items()}
+        profile.row_hash_sum, profile.record_hash_sum = state['row_hash_sum'], state['record_hash_sum']
+        profile.key_columns, profile.compared_columns = state['key_columns'], state['compared_columns']
+        if profile.exact:
+            profile._records = [np.load(os.path.join(path, "records.npy"), mmap_mode='r')]
+            profile._values = {column: [np.load(os.path.join(path, f"values_{i}.npy"), mmap_mode='r')]
+                               for i, column in enumerate(profile.value_columns)}
+            profile._sorted = set(profile.value_columns)
+        return profile
+
+
+def build_profile(chunks, value_columns: list = None, sketch_k: int = 400, exact: bool = False) -> DatasetProfile:
+    """
+    Profile a dataset in a single pass over its chunks (a list with one DataFrame for in-memory data).
+
+    :param chunks: Iterable of DataFrame chunks.
+    :param value_columns: Columns whose sorted values are kept exactly by an exact profile (e.g. COLUMNS_TO_CHECK).
+    :param sketch_k: Size of the quantile sketches of the numeric columns.
+    :param exact: Keep the row diff records and the sorted values of the value columns (see DatasetProfile).
+    :return: DatasetProfile of the dataset.
+    """
+    profile = DatasetProfile(value_columns, sketch_k, exact=exact)
+    for chunk in chunks:
+        profile.update(chunk)
+    return profile
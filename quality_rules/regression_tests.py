@@ -1,22 +1,40 @@
+from itertools import zip_longest
+
 import pandas as pd
+from quality_rules.missing_values import NullProfile, null_profile
+from quality_rules.profiles import DatasetProfile
+from quality_rules.row_diff import RowDiff, compared_columns, print_row_diff, records_digest, row_key, row_records
+from validation_engine.spans import traced
 
-def compare_datasets(dataset_v1: pd.DataFrame, dataset_v2: pd.DataFrame) -> bool:
+@traced
+def compare_datasets(dataset_v1, dataset_v2: pd.DataFrame, spill_dir: str = None, nulls_v2: NullProfile = None,
+                     nulls_v1: NullProfile = None) -> bool:
     """
     Compare two versions of the dataset to ensure there are no regressions in the data.
     This is a simple comparison for missing values, schema, and key data columns.
+    Rows are matched on their registered key (see quality_rules.row_diff.ROW_KEYS), so a reordering is not
+    a regression; added, removed and changed rows are counted and a few of them are printed.
 
-    :param dataset_v1: The first version of the dataset (older version).
+    :param dataset_v1: The first version of the dataset (older version), as a DataFrame or as its
+                       DatasetProfile (then the sample rows of version 1 are reported by row id; a profile
+                       that is not exact only tells whether the rows differ, see _digest_passed).
     :param dataset_v2: The second version of the dataset (newer version).
+    :param spill_dir: Directory the row diff may spill to (None keeps it in memory).
+    :param nulls_v2: NullProfile of dataset_v2, if already counted (e.g. by ImputationPlan.apply_profiled).
+    :param nulls_v1: NullProfile of a dataset_v1 DataFrame, if already counted (e.g. by the dataset cache).
     :return: True if no regression is detected, False otherwise.
     """
     # Check schema consistency
-    if not all(dataset_v1.columns == dataset_v2.columns):
+    if list(dataset_v1.columns) != list(dataset_v2.columns):
         print("Schema mismatch detected between dataset versions.")
         return False
 
     # Check for missing values consistency
-    missing_v1 = dataset_v1.isnull().sum()
-    missing_v2 = dataset_v2.isnull().sum()
+    if isinstance(dataset_v1, DatasetProfile):
+        missing_v1 = dataset_v1.missing
+    else:
+        missing_v1 = (null_profile(dataset_v1) if nulls_v1 is None else nulls_v1).counts
+    missing_v2 = (null_profile(dataset_v2) if nulls_v2 is None else nulls_v2).counts
     
     print("Missing values in version 1:")
     print(missing_v1)
@@ -27,42 +45,173 @@ def compare_datasets(dataset_v1: pd.DataFrame, dataset_v2: pd.DataFrame) -> bool
         print("Missing value regression detected between dataset versions.")
         return False
 
-    # Check for basic data consistency in key columns (e.g., 'show_id', 'rating')
-    key_columns = ['show_id', 'title', 'rating', 'release_year']
+    # Check for data consistency in key columns (e.g., 'title', 'rating') of rows with the same key
+    key_columns = row_key(dataset_v1.columns)
+    value_columns = compared_columns(dataset_v1.columns, key_columns)
+    if isinstance(dataset_v1, DatasetProfile) and not dataset_v1.exact:
+        digest_v2 = records_digest(row_records(dataset_v2, key_columns, value_columns))
+        return _digest_passed(dataset_v1.record_hash_sum, digest_v2, value_columns)
+    row_diff = RowDiff(key_columns, value_columns, spill_dir)
+    if isinstance(dataset_v1, DatasetProfile):
+        row_diff.add_records(0, dataset_v1.records())
+    else:
+        row_diff.update(0, dataset_v1)
+    row_diff.update(1, dataset_v2)
+    if row_diff.differences():
+        if not isinstance(dataset_v1, DatasetProfile):
+            row_diff.collect_samples(0, [dataset_v1])
+        row_diff.collect_samples(1, [dataset_v2])
+    return _row_diff_passed(row_diff)
 
-    for column in key_columns:
-        if column in dataset_v1.columns and column in dataset_v2.columns:
-            if not dataset_v1[column].equals(dataset_v2[column]):
-                print(f"Data regression detected in column: {column}")
-                return False
+def _digest_passed(digest_v1: int, digest_v2: int, value_columns: list) -> bool:
+    # Against a profile without row records, the rows are compared by the digests of their records only
+    if digest_v1 != digest_v2:
+        print(f"Data regression detected: rows differ in columns {', '.join(value_columns)} "
+              f"(the baseline profile is not exact, so they are not counted)")
+        return False
+    print("No regressions detected between dataset versions.")
+    return True
+
+def _row_diff_passed(row_diff: RowDiff) -> bool:
+    print_row_diff(row_diff)
+    if row_diff.differences():
+        result = row_diff.result()
+        print(f"Data regression detected: {result['added']} rows added, {result['removed']} removed, "
+              f"{result['changed']} changed in columns {', '.join(row_diff.value_columns)}")
+        return False
 
     print("No regressions detected between dataset versions.")
     return True
 
-if __name__ == "__main__":
-    # Define the paths to the dataset versions
-    datasets = {
-        "Netflix Movies": ['data/netflix_movies_detailed_up_to_2025.csv', 'data/netflix_movies_cleaned.csv'],
-        "Netflix TV Shows": ['data/netflix_tv_shows_detailed_up_to_2025.csv', 'data/netflix_tv_shows_cleaned.csv'],
-        "NYC Taxi Trip Data": ['data/taxi_tripdata.csv', 'data/nyc_taxi_trip_data_cleaned.csv']
-    }
-
-    # Loop through each dataset pair and compare versions
-    for dataset_name, dataset_paths in datasets.items():
-        print(f"\nComparing {dataset_name} dataset...\n")
-        
-        try:
-            # Load old (v1) and new (v2) dataset versions
-            dataset_v1 = pd.read_csv(dataset_paths[0])
-            dataset_v2 = pd.read_csv(dataset_paths[1])
-
-            # Compare datasets
-            if compare_datasets(dataset_v1, dataset_v2):
-                print(f"Regression test passed for {dataset_name}.")
-            else:
-                print(f"Regression test failed for {dataset_name}.")
-        
-        except FileNotFoundError as e:
-            print(f"Error: The file '{e.filename}' was not found. Please check the path.")
-        except Exception as e:
-            print(f"An error occurred while processing {dataset_name}: {e}")
+class ChunkedComparison:
+    """
+    Streaming version of compare_datasets. Chunks of both versions are fed with update(); only column
+    names, null counts and the row diff records are kept, and the row diff spills to disk if a spill
+    directory is given, so memory stays bounded whatever the size of the two versions. Once a profile
+    that is not exact is used, only the digests of the records are kept.
+    """
+
+    def __init__(self, spill_dir: str = None):
+        self.columns = [None, None]
+        self.missing = [None, None]
+        self.spill_dir = spill_dir
+        self.row_diff = None
+        self.rows = [0, 0]
+        self.digests = [0, 0]
+        self.exact = True
+
+    def update(self, version: int, chunk: pd.DataFrame, nulls: NullProfile = None):
+        """
+        :param version: 0 for the older version of the dataset, 1 for the newer one.
+        :param chunk: Next DataFrame chunk of that version.
+        :param nulls: NullProfile of the chunk, if already counted (e.g. by ImputationPlan.apply_profiled).
+        """
+        if self.columns[version] is None:
+            self.columns[version] = chunk.columns
+        chunk_missing = (null_profile(chunk) if nulls is None else nulls).counts
+        self.missing[version] = chunk_missing if self.missing[version] is None else self.missing[version] + chunk_missing
+
+        if self.row_diff is None:
+            key_columns = row_key(chunk.columns)
+            self.row_diff = RowDiff(key_columns, compared_columns(chunk.columns, key_columns), self.spill_dir)
+        # With different schemas the comparison fails on the schema check, the rows are not needed
+        if set(self.row_diff.key_columns + self.row_diff.value_columns).issubset(chunk.columns):
+            self._add_records(version, row_records(chunk, self.row_diff.key_columns, self.row_diff.value_columns, self.rows[version]))
+
+    def _add_records(self, version: int, records):
+        self.rows[version] += len(records)
+        self.digests[version] = (self.digests[version] + records_digest(records)) % (1 << 64)
+        if self.exact:
+            self.row_diff.add_records(version, records)
+
+    def use_baseline(self, profile: DatasetProfile):
+        """
+        Use the profile of the first version (older version) instead of its chunks.
+        """
+        self.use_profile(0, profile)
+
+    def use_profile(self, version: int, profile: DatasetProfile):
+        """
+        Use the profile of a version (e.g. merged from per-shard profiles) instead of its chunks.
+        Sample rows of that version are then reported by row id only.
+        """
+        self.columns[version] = pd.Index(profile.columns)
+        self.missing[version] = profile.missing
+        if self.row_diff is None:
+            self.row_diff = RowDiff(profile.key_columns, profile.compared_columns, self.spill_dir)
+        self.rows[version] += profile.rows
+        self.digests[version] = (self.digests[version] + profile.record_hash_sum) % (1 << 64)
+        if not profile.exact:
+            self.exact = False
+        elif self.exact:
+            self.row_diff.add_records(version, profile.records())
+
+    def _reaches_row_diff(self) -> bool:
+        columns_v1, columns_v2 = self.columns
+        return list(columns_v1) == list(columns_v2) and self.missing[0].equals(self.missing[1])
+
+    def collect_samples(self, chunks_v1, chunks_v2):
+        """
+        Read the sample rows of the row diff back from a second pass over both versions, if the row diff
+        is reached and found differences. The pass stops at the last sample row.
+
+        :param chunks_v1: Iterable of DataFrame chunks of the first version, as passed to update()
+                          (None with a baseline profile).
+        :param chunks_v2: Iterable of DataFrame chunks of the second version, as passed to update()
+                          (None with a profile).
+        """
+        if self.exact and self._reaches_row_diff() and self.row_diff.differences():
+            if chunks_v1 is not None:
+                self.row_diff.collect_samples(0, chunks_v1)
+            if chunks_v2 is not None:
+                self.row_diff.collect_samples(1, chunks_v2)
+
+    def result(self) -> bool:
+        """
+        :return: True if no regression is detected, False otherwise (same checks and output as compare_datasets).
+        """
+        columns_v1, columns_v2 = self.columns
+
+        # Check schema consistency
+        if list(columns_v1) != list(columns_v2):
+            print("Schema mismatch detected between dataset versions.")
+            self.row_diff.close()
+            return False
+
+        # Check for missing values consistency
+        missing_v1, missing_v2 = self.missing
+
+        print("Missing values in version 1:")
+        print(missing_v1)
+        print("\nMissing values in version 2:")
+        print(missing_v2)
+
+        if not missing_v1.equals(missing_v2):
+            print("Missing value regression detected between dataset versions.")
+            self.row_diff.close()
+            return False
+
+        # Check for data consistency in key columns of rows with the same key
+        if not self.exact:
+            self.row_diff.close()
+            return _digest_passed(*self.digests, self.row_diff.value_columns)
+        return _row_diff_passed(self.row_diff)
+
+@traced
+def compare_datasets_chunked(chunks_v1, chunks_v2, spill_dir: str = None) -> bool:
+    """
+    Compare two versions of a dataset read in chunks (see compare_datasets). Sample rows of the
+    differences are not printed, as that would need a second pass over the chunks.
+
+    :param chunks_v1: Iterable of DataFrame chunks of the first version of the dataset (older version).
+    :param chunks_v2: Iterable of DataFrame chunks of the second version of the dataset (newer version).
+    :param spill_dir: Directory the row diff spills to (None keeps it in memory).
+    :return: True if no regression is detected, False otherwise.
+    """
+    comparison = ChunkedComparison(spill_dir)
+    for chunk_v1, chunk_v2 in zip_longest(chunks_v1, chunks_v2):
+        if chunk_v1 is not None:
+            comparison.update(0, chunk_v1)
+        if chunk_v2 is not None:
+            comparison.update(1, chunk_v2)
+    return comparison.result()
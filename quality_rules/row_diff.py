@@ -0,0 +1,327 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # pyarrow is optional: it only backs the string[pyarrow] columns of the Arrow string mode
+    pa = pc = None
+
+# Columns identifying a row, per dataset (schema registry key). The taxi data has no id column,
+# so a trip is identified by its vendor, timestamps and locations.
+ROW_KEYS = {
+    'netflix_movies': ['show_id'],
+    'netflix_tv_shows': ['show_id'],
+    'nyc_taxi': ['VendorID', 'lpep_pickup_datetime', 'lpep_dropoff_datetime', 'PULocationID', 'DOLocationID'],
+}
+
+# Key data columns compared between dataset versions
+KEY_COLUMNS = ['show_id', 'title', 'rating', 'release_year']
+
+# Per-row record kept by the diff: key hash, hash of the compared values and row id (index label)
+RECORD_DTYPE = np.dtype([('key', '<u8'), ('row', '<u8'), ('id', '<i8')])
+
+
+def row_key(columns) -> list:
+    """
+    Return the registered row key whose columns are all present (None if there is none).
+    """
+    for key_columns in ROW_KEYS.values():
+        if all(column in columns for column in key_columns):
+            return key_columns
+    return None
+
+
+def compared_columns(columns, key_columns: list) -> list:
+    """
+    Columns compared between rows with the same key: the key data columns (KEY_COLUMNS) the dataset has,
+    or every column if it has none of them.
+    """
+    key_columns = key_columns or []
+    value_columns = [column for column in KEY_COLUMNS if column in columns and column not in key_columns]
+    return value_columns or [column for column in columns if column not in key_columns]
+
+
+def is_arrow_string(dtype) -> bool:
+    """
+    Whether a dtype is an Arrow-backed string dtype (string[pyarrow]).
+    """
+    return isinstance(dtype, pd.StringDtype) and dtype.storage in ("pyarrow", "pyarrow_numpy")
+
+
+def _dictionary_encode(series: pd.Series) -> pd.Series:
+    # Categorical version of a string[pyarrow] column, dictionary-encoded by Arrow, so only its distinct values
+    # are hashed (it hashes exactly like the object column). None if most values are distinct: pandas' own
+    # hashing is then cheaper than building the categorical.
+    encoded = pc.dictionary_encode(pa.array(series.array))
+    if isinstance(encoded, pa.ChunkedArray):
+        encoded = encoded.combine_chunks()
+    if len(encoded.dictionary) > len(series) // 2:
+        return None
+    codes = encoded.indices.fill_null(-1).to_numpy(zero_copy_only=False)
+    return pd.Series(pd.Categorical.from_codes(codes, encoded.dictionary.to_numpy(zero_copy_only=False)), index=series.index)
+
+
+def hash_rows(frame: pd.DataFrame) -> np.ndarray:
+    """
+    Hash every row of a frame into a uint64 (pd.util.hash_pandas_object, index excluded).
+    Numeric columns are hashed as float64, so a column inferred as int64 in one chunk and float64 in
+    another (or stored as a nullable int) gives the same hash for the same value. Arrow string columns
+    with repeated values are dictionary-encoded first: same hashes as the object column, from its distinct values.
+    """
+    columns = {}
+    for column in frame.columns:
+        series = frame[column]
+        if pd.api.types.is_numeric_dtype(series.dtype) and not isinstance(series.dtype, pd.CategoricalDtype):
+            series = pd.Series(series.to_numpy(dtype='float64', na_value=np.nan), index=frame.index)
+        elif is_arrow_string(series.dtype):
+            encoded = _dictionary_encode(series)
+            series = series if encoded is None else encoded
+        columns[column] = series
+    return pd.util.hash_pandas_object(pd.DataFrame(columns, index=frame.index), index=False).to_numpy()
+
+
+def row_records(chunk: pd.DataFrame, key_columns: list, value_columns: list, offset: int = 0) -> np.ndarray:
+    """
+    Build the diff records of a chunk: key hash (the row position if there are no key columns), hash of the
+    compared values and row id. Row ids are the index labels (the line number in the file for read_csv
+    chunks, even after rows were dropped), so sample rows can be read back later.
+
+    :param offset: Number of rows of the same version before this chunk.
+    """
+    records = np.empty(len(chunk), dtype=RECORD_DTYPE)
+    positions = offset + np.arange(len(chunk))
+    records['key'] = hash_rows(chunk[key_columns]) if key_columns else positions
+    records['row'] = hash_rows(chunk[value_columns])
+    records['id'] = chunk.index.to_numpy() if pd.api.types.is_integer_dtype(chunk.index.dtype) else positions
+    return records
+
+
+def _mix64(values: np.ndarray) -> np.ndarray:
+    # splitmix64 finalizer: every input bit affects every output bit (uint64 arithmetic wraps around)
+    values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+def records_digest(records: np.ndarray) -> int:
+    """
+    Order-independent digest of diff records: the sum (mod 2^64) of a mix of each key hash with its value hash.
+    Two versions with the same records have the same digest, and a RowDiff of them finds no differences.
+    """
+    return int(_mix64(records['key'] ^ _mix64(records['row'])).sum(dtype='uint64'))
+
+
+def _summarize(records: np.ndarray):
+    # One entry per distinct key: row count, order-independent sum of the row hashes, smallest row id
+    if len(records) == 0:
+        return records['key'], np.empty(0, dtype='int64'), records['row'], records['id']
+    records = records[np.argsort(records['key'], kind='stable')]
+    keys = records['key']
+    starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]]))
+    counts = np.diff(np.append(starts, len(keys)))
+    return keys[starts], counts, np.add.reduceat(records['row'], starts), np.minimum.reduceat(records['id'], starts)
+
+
+class RowDiff:
+    """
+    Keyed diff of two versions of a dataset. Chunks of both versions are fed with update(); for every row
+    only a 24-byte record (key hash, value hash, row id) is kept. With a spill directory the records are
+    partitioned by key hash and appended to disk whenever `max_rows_in_memory` records are buffered, and
+    result() diffs one partition at a time, so two versions of any size are diffed in bounded memory.
+
+    Rows are matched on their key; rows sharing a key are compared as a group (their hashes are summed),
+    so the row order of either version does not matter. Without key columns rows are matched by position.
+    """
+
+    def __init__(self, key_columns: list = None, value_columns: list = None, spill_dir: str = None,
+                 partitions: int = 64, max_rows_in_memory: int = 1000000, sample_size: int = 5):
+        """
+        :param key_columns: Columns identifying a row (None matches rows by position).
+        :param value_columns: Columns compared between matching rows (None compares every non-key column).
+        :param spill_dir: Directory for the partition files (None keeps every record in memory).
+        :param partitions: Number of key hash partitions spilled to disk.
+        :param max_rows_in_memory: Number of buffered records before they are spilled.
+        :param sample_size: Number of sample rows reported per kind of difference.
+        """
+        self.key_columns = key_columns or []
+        self.value_columns = value_columns
+        self.spill_dir = spill_dir
+        self.partitions = partitions
+        self.max_rows_in_memory = max_rows_in_memory
+        self.sample_size = sample_size
+        self.rows = [0, 0]
+        self.buffers = [[], []]
+        self.buffered = 0
+        self.spill_path = None
+        self.sample_rows = [None, None]
+        self._result = None
+
+    def update(self, version: int, chunk: pd.DataFrame):
+        """
+        :param version: 0 for the older version of the dataset, 1 for the newer one.
+        :param chunk: Next DataFrame chunk of that version.
+        """
+        value_columns = self.value_columns
+        if value_columns is None:
+            value_columns = [column for column in chunk.columns if column not in self.key_columns]
+        self.add_records(version, row_records(chunk, self.key_columns, value_columns, self.rows[version]))
+
+    def add_records(self, version: int, records: np.ndarray):
+        """
+        Add precomputed records of one version (e.g. those stored in a baseline profile).
+        """
+        self.rows[version] += len(records)
+        # Large (e.g. memory-mapped) record arrays are buffered in slices, so spilling still bounds memory
+        for start in range(0, len(records), self.max_rows_in_memory):
+            part = records[start:start + self.max_rows_in_memory]
+            self.buffers[version].append(part)
+            self.buffered += len(part)
+            if self.spill_dir is not None and self.buffered >= self.max_rows_in_memory:
+                self._spill()
+
+    def _partition_buffer(self, version: int) -> list:
+        # Split the buffered records of one version by key hash
+        if not self.buffers[version]:
+            return [np.empty(0, dtype=RECORD_DTYPE)] * self.partitions
+        records = np.concatenate(self.buffers[version])
+        partition = records['key'] % self.partitions
+        order = np.argsort(partition, kind='stable')
+        records, partition = records[order], partition[order]
+        bounds = np.searchsorted(partition, np.arange(self.partitions + 1))
+        return [records[bounds[p]:bounds[p + 1]] for p in range(self.partitions)]
+
+    def _spill(self):
+        if self.spill_path is None:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            self.spill_path = tempfile.mkdtemp(prefix="row_diff-", dir=self.spill_dir)
+        for version in (0, 1):
+            for p, part in enumerate(self._partition_buffer(version)):
+                if len(part):
+                    with open(os.path.join(self.spill_path, f"v{version}-{p}.bin"), 'ab') as part_file:
+                        part.tofile(part_file)
+        self.buffers = [[], []]
+        self.buffered = 0
+
+    def _partitions(self):
+        if self.spill_path is None:
+            # Small partitions are also faster to diff in memory (their sorts stay in cache)
+            yield from zip(self._partition_buffer(0), self._partition_buffer(1))
+            return
+        self._spill()
+        for p in range(self.partitions):
+            paths = [os.path.join(self.spill_path, f"v{version}-{p}.bin") for version in (0, 1)]
+            yield tuple(np.fromfile(path, dtype=RECORD_DTYPE) if os.path.exists(path) else np.empty(0, dtype=RECORD_DTYPE) for path in paths)
+
+    def result(self) -> dict:
+        """
+        Diff the two versions (computed once; spilled partition files are removed afterwards).
+
+        :return: Dictionary with the added, removed, changed and unchanged row counts (by key), the number of
+                 duplicate keys per version, the row counts and the ids of sample added, removed and changed rows.
+        """
+        if self._result is not None:
+            return self._result
+
+        counts = {'added': 0, 'removed': 0, 'changed': 0, 'unchanged': 0}
+        duplicate_keys = [0, 0]
+        candidates = {'added': [], 'removed': [], 'changed_v1': [], 'changed_v2': []}
+        try:
+            for records_v1, records_v2 in self._partitions():
+                keys_v1, counts_v1, hashes_v1, ids_v1 = _summarize(records_v1)
+                keys_v2, counts_v2, hashes_v2, ids_v2 = _summarize(records_v2)
+                duplicate_keys[0] += int(np.count_nonzero(counts_v1 > 1))
+                duplicate_keys[1] += int(np.count_nonzero(counts_v2 > 1))
+
+                _, common_v1, common_v2 = np.intersect1d(keys_v1, keys_v2, assume_unique=True, return_indices=True)
+                removed = np.ones(len(keys_v1), dtype=bool)
+                removed[common_v1] = False
+                added = np.ones(len(keys_v2), dtype=bool)
+                added[common_v2] = False
+                changed = (hashes_v1[common_v1] != hashes_v2[common_v2]) | (counts_v1[common_v1] != counts_v2[common_v2])
+
+                counts['removed'] += int(np.count_nonzero(removed))
+                counts['added'] += int(np.count_nonzero(added))
+                counts['changed'] += int(np.count_nonzero(changed))
+                counts['unchanged'] += int(np.count_nonzero(~changed))
+
+                # Keep only the first rows (smallest ids) of each partition as sample candidates
+                candidates['removed'].append(np.sort(ids_v1[removed])[:self.sample_size])
+                candidates['added'].append(np.sort(ids_v2[added])[:self.sample_size])
+                changed_order = np.argsort(ids_v2[common_v2][changed])[:self.sample_size]
+                candidates['changed_v1'].append(ids_v1[common_v1][changed][changed_order])
+                candidates['changed_v2'].append(ids_v2[common_v2][changed][changed_order])
+        finally:
+            self.close()
+
+        samples = {kind: np.sort(np.concatenate(ids))[:self.sample_size] for kind, ids in candidates.items() if kind != 'changed_v2'}
+        changed_v1, changed_v2 = np.concatenate(candidates['changed_v1']), np.concatenate(candidates['changed_v2'])
+        changed_order = np.argsort(changed_v2)[:self.sample_size]
+        samples['changed_v1'], samples['changed_v2'] = changed_v1[changed_order], changed_v2[changed_order]
+
+        self._result = {**counts, 'duplicate_keys': tuple(duplicate_keys), 'rows': tuple(self.rows),
+                        'key': self.key_columns, 'samples': samples}
+        return self._result
+
+    def differences(self) -> int:
+        """
+        :return: Number of added, removed and changed rows.
+        """
+        result = self.result()
+        return result['added'] + result['removed'] + result['changed']
+
+    def collect_samples(self, version: int, chunks):
+        """
+        Read the sample rows of one version back from its chunks (call after result()). Sample rows are the
+        first differing rows, so the scan stops as soon as the last of them has been read.
+
+        :param version: 0 for the older version of the dataset, 1 for the newer one.
+        :param chunks: Iterable of DataFrame chunks of that version, with the index labels used by update().
+        """
+        samples = self.result()['samples']
+        kinds = ['removed', 'changed_v1'] if version == 0 else ['added', 'changed_v2']
+        wanted = np.concatenate([samples[kind] for kind in kinds])
+        if len(wanted) == 0:
+            return
+        found = []
+        for chunk in chunks:
+            found.append(chunk[chunk.index.isin(wanted)])
+            if len(chunk) and chunk.index.max() >= wanted.max():
+                break
+        self.sample_rows[version] = pd.concat(found)
+
+    def close(self):
+        """
+        Remove the spilled partition files.
+        """
+        if self.spill_path is not None:
+            shutil.rmtree(self.spill_path, ignore_errors=True)
+            self.spill_path = None
+
+
+def print_row_diff(row_diff: RowDiff):
+    """
+    Print the row counts of a diff and its sample rows (if they were collected).
+    """
+    result = row_diff.result()
+    key = ', '.join(result['key']) if result['key'] else 'row position'
+    print(f"Row diff by {key}: {result['added']} added, {result['removed']} removed, "
+          f"{result['changed']} changed, {result['unchanged']} unchanged")
+    if any(result['duplicate_keys']):
+        print(f"Duplicate keys: {result['duplicate_keys'][0]} in version 1, {result['duplicate_keys'][1]} in version 2")
+
+    samples = result['samples']
+    for kind, version in [('removed', 0), ('added', 1), ('changed_v1', 0), ('changed_v2', 1)]:
+        rows = row_diff.sample_rows[version]
+        if len(samples[kind]):
+            label = {'changed_v1': 'changed rows (version 1)', 'changed_v2': 'changed rows (version 2)'}.get(kind, f"{kind} rows")
+            if rows is None:
+                # The version was not read back (e.g. it is a baseline profile): only the row ids are known
+                print(f"Sample {label}: row ids {', '.join(str(row_id) for row_id in samples[kind])}")
+            else:
+                print(f"Sample {label}:")
+                print(rows.loc[rows.index.isin(samples[kind])].to_string())
@@ -0,0 +1,157 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+class StratifiedSample:
+    """
+    Mergeable stratified random sample of numeric columns, built while streaming.
+
+    Every row gets a uniform random priority and is kept while its priority is below the sampling rate;
+    the rate is halved whenever rate * rows exceeds 4 * size, so 2 to 4 times `size` rows are kept
+    whatever the number of rows (enough for every stratum to get its share). Row counts are kept per
+    stratum (e.g. per release year or pickup month, timestamps stored as text included), and the sample is
+    drawn from the kept rows in proportion to them. With more strata than `size`, it is drawn uniformly.
+    Samples built on different chunks or shards are combined with merge().
+    """
+
+    def __init__(self, columns: list, size: int, strata: str = None, seed: int = None):
+        self.columns = list(columns)
+        self.size = size
+        self.strata = strata
+        self.rows = 0
+        self.rate = 1.0
+        self.counts = np.zeros(len(self.columns), dtype='int64')
+        self.stratum_keys = {}
+        self.stratum_rows = np.zeros(0, dtype='int64')
+        self.priorities = np.empty(0)
+        self.stratum_codes = np.empty(0, dtype='int64')
+        self.values_block = np.empty((0, len(self.columns)))
+        self._rng = np.random.default_rng(seed)
+        self._order = None
+        self._text_timestamps = None
+
+    def _stratum_codes(self, chunk: pd.DataFrame) -> np.ndarray:
+        if self.strata is None or self.strata not in chunk.columns:
+            keys = np.zeros(len(chunk), dtype='int64')
+        else:
+            keys = chunk[self.strata]
+            if not pd.api.types.is_numeric_dtype(keys) and not pd.api.types.is_datetime64_any_dtype(keys):
+                keys = self._parse_timestamps(keys)
+            # Timestamps are stratified by month
+            if pd.api.types.is_datetime64_any_dtype(keys):
+                keys = keys.dt.year * 12 + keys.dt.month - 1
+            keys = keys.to_numpy(dtype='float64', na_value=np.nan) if pd.api.types.is_numeric_dtype(keys) else keys.to_numpy(dtype=object)
+        codes, uniques = pd.factorize(keys, use_na_sentinel=False)
+        # Missing strata (NaN, NA or NaT) are one stratum of their own
+        mapping = np.array([self.stratum_keys.setdefault(None if pd.isna(key) else key, len(self.stratum_keys)) for key in uniques], dtype='int64')
+        if len(self.stratum_keys) > len(self.stratum_rows):
+            self.stratum_rows = np.concatenate([self.stratum_rows, np.zeros(len(self.stratum_keys) - len(self.stratum_rows), dtype='int64')])
+        return mapping[codes] if len(codes) else np.zeros(0, dtype='int64')
+
+    def _parse_timestamps(self, keys: pd.Series) -> pd.Series:
+        # Text strata that all parse as timestamps (e.g. a raw read_csv frame) are timestamps: otherwise nearly every
+        # row would be its own stratum. Decided on the first chunk with values, so every chunk is keyed alike
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            if self._text_timestamps is None and keys.notna().any():
+                # The first values are tried first, so free text is not parsed in full
+                head = keys.dropna().head(100)
+                self._text_timestamps = bool(pd.to_datetime(head, errors='coerce').notna().all())
+            return pd.to_datetime(keys, errors='coerce') if self._text_timestamps else keys
+
+    def _keep(self, priorities: np.ndarray, codes: np.ndarray, values: np.ndarray):
+        # Lower the rate for the rows seen so far, then keep the new rows below it
+        while self.rate * self.rows > 4 * self.size:
+            self.rate /= 2
+        kept = self.priorities < self.rate
+        new = priorities < self.rate
+        self.priorities = np.concatenate([self.priorities[kept], priorities[new]])
+        self.stratum_codes = np.concatenate([self.stratum_codes[kept], codes[new]])
+        self.values_block = np.concatenate([self.values_block[kept], values[new]])
+        self._order = None
+
+    def update(self, chunk: pd.DataFrame):
+        """
+        Add a chunk of rows to the sample. Columns absent from the chunk count as missing.
+        """
+        codes = self._stratum_codes(chunk)
+        self.rows += len(chunk)
+        self.stratum_rows += np.bincount(codes, minlength=len(self.stratum_rows))
+        while self.rate * self.rows > 4 * self.size:
+            self.rate /= 2
+        # Only the rows below the rate are converted
+        priorities = self._rng.random(len(chunk))
+        kept = np.flatnonzero(priorities < self.rate)
+        values = np.full((len(kept), len(self.columns)), np.nan)
+        for i, column in enumerate(self.columns):
+            if column in chunk.columns:
+                self.counts[i] += chunk[column].notna().sum()
+                values[:, i] = chunk[column].take(kept).to_numpy(dtype='float64', na_value=np.nan)
+        self._keep(priorities[kept], codes[kept], values)
+
+    def merge(self, other: "StratifiedSample"):
+        """
+        Merge another sample of the same columns (e.g. built on another chunk or shard) into this one.
+        """
+        codes = np.array([self.stratum_keys.setdefault(key, len(self.stratum_keys)) for key in other.stratum_keys], dtype='int64')
+        stratum_rows = np.zeros(len(self.stratum_keys), dtype='int64')
+        stratum_rows[:len(self.stratum_rows)] = self.stratum_rows
+        np.add.at(stratum_rows, codes, other.stratum_rows)
+        self.stratum_rows = stratum_rows
+        self.rows += other.rows
+        self.counts += other.counts
+        # Both samples are kept at the lower of the two rates
+        self.rate = min(self.rate, other.rate)
+        self._keep(other.priorities, codes[other.stratum_codes], other.values_block)
+
+    def order(self) -> np.ndarray:
+        """
+        Positions of the sampled rows among the kept ones, in draw order: each stratum contributes its
+        lowest-priority rows in proportion to its row count, interleaved so that every prefix of the
+        order is itself a (smaller) proportional stratified sample.
+        """
+        if self._order is None and len(self.stratum_rows) > self.size:
+            # More strata than sampled rows: most allocations would round to 0, the lowest priorities are a uniform sample
+            self._order = np.argsort(self.priorities, kind='stable')[:self.size]
+        if self._order is None:
+            allocation = np.round(self.size * self.stratum_rows / max(self.rows, 1))
+            by_priority = np.lexsort((self.priorities, self.stratum_codes))
+            codes = self.stratum_codes[by_priority]
+            starts = np.searchsorted(codes, np.arange(len(self.stratum_rows)))
+            ranks = np.arange(len(codes)) - starts[codes]
+            allocated = allocation[codes]
+            selected = ranks < allocated
+            # Systematic interleaving: the j-th row of a stratum drawn at (j + 0.5) / allocation
+            keys = (ranks[selected] + 0.5) / allocated[selected]
+            self._order = by_priority[selected][np.argsort(keys, kind='stable')]
+        return self._order
+
+    def values(self, column: str) -> np.ndarray:
+        """
+        :return: Non-null sampled values of a column, in draw order.
+        """
+        values = self.values_block[self.order(), self.columns.index(column)]
+        return values[~np.isnan(values)]
+
+    def non_null_count(self, column: str) -> int:
+        """
+        :return: Number of non-null values of the column in the whole data the sample was drawn from.
+        """
+        return int(self.counts[self.columns.index(column)])
+
+def build_sample(chunks, columns: list, size: int, strata: str = None, seed: int = None) -> StratifiedSample:
+    """
+    Build a stratified sample of the columns in a single streaming pass over the chunks.
+
+    :param chunks: Iterable of DataFrame chunks.
+    :param columns: Numeric columns to sample.
+    :param size: Number of rows to sample.
+    :param strata: Column the sample is stratified by (timestamps by month), or None for a uniform sample.
+    :param seed: Seed of the random priorities.
+    :return: StratifiedSample of the data.
+    """
+    sample = StratifiedSample(columns, size, strata, seed)
+    for chunk in chunks:
+        sample.update(chunk)
+    return sample
@@ -1,131 +1,90 @@
+import numpy as np
 import pandas as pd
+from validation_engine.spans import traced
 
-def validate_schema(dataset: pd.DataFrame, expected_schema: dict) -> bool:
+from quality_rules.schemas import NETFLIX_MOVIES_SCHEMA, NETFLIX_TV_SHOWS_SCHEMA, TAXI_TRIPDATA_SCHEMA, SCHEMA_REGISTRY, \
+    INGEST_DTYPES, ARROW_STRING_DTYPE, schema_key, ingest_schema, schema_violation
+
+# The schema registry lives in quality_rules/schemas.py (no pandas); it is re-exported here for the existing importers
+__all__ = ['NETFLIX_MOVIES_SCHEMA', 'NETFLIX_TV_SHOWS_SCHEMA', 'TAXI_TRIPDATA_SCHEMA', 'SCHEMA_REGISTRY', 'INGEST_DTYPES',
+           'ARROW_STRING_DTYPE', 'schema_key', 'ingest_schema', 'schema_violation', 'schema_violations', 'validate_schema',
+           'merge_dtypes', 'validate_schema_chunked', 'empty_frame']
+
+def schema_violations(dataset: pd.DataFrame, expected_schema: dict) -> list:
     """
-    Validates the schema of the given dataset by comparing the columns and their data types to the expected schema.
+    Collects every schema violation of the dataset instead of stopping at the first one.
 
     :param dataset: DataFrame representing the dataset.
     :param expected_schema: Dictionary with column names as keys and expected data types as values.
-    :return: True if schema is valid, False otherwise.
+    :return: List of violations (see schema_violation), empty if the schema is valid.
     """
+    violations = []
     for column, expected_dtype in expected_schema.items():
         if column not in dataset.columns:
-            print(f"Error: Missing column '{column}'")
-            return False
-        if not pd.api.types.is_dtype_equal(dataset[column].dtype, expected_dtype):
-            print(f"Error: Column '{column}' has incorrect type. Expected {expected_dtype}, found {dataset[column].dtype}")
-            return False
-    return True
+            violations.append(schema_violation(column, "missing", expected_dtype, None, f"Missing column '{column}'"))
+        elif not pd.api.types.is_dtype_equal(dataset[column].dtype, expected_dtype):
+            found = str(dataset[column].dtype)
+            violations.append(schema_violation(column, "dtype", expected_dtype, found,
+                                               f"Column '{column}' has incorrect type. Expected {expected_dtype}, found {found}"))
+    return violations
 
-if __name__ == "__main__":
-    # Expected schema for Netflix movies dataset
-    netflix_movies_schema = {
-        'show_id': 'object',
-        'type': 'object',
-        'title': 'object',
-        'director': 'object',
-        'cast': 'object',
-        'country': 'object',
-        'date_added': 'object',
-        'release_year': 'int64',
-        'rating': 'object',
-        'duration': 'object',
-        'genres': 'object',
-        'language': 'object',
-        'description': 'object',
-        'popularity': 'float64',
-        'vote_count': 'int64',
-        'vote_average': 'float64',
-        'budget': 'int64',
-        'revenue': 'int64'
-    }
+@traced
+def validate_schema(dataset: pd.DataFrame, expected_schema: dict) -> bool:
+    """
+    Validates the schema of the given dataset by comparing the columns and their data types to the expected schema.
+    Every violation is printed, not only the first one.
 
-    # Expected schema for Netflix TV shows dataset
-    netflix_tv_shows_schema = {
-        'show_id': 'object',
-        'type': 'object',
-        'title': 'object',
-        'director': 'object',
-        'cast': 'object',
-        'country': 'object',
-        'date_added': 'object',
-        'release_year': 'int64',
-        'rating': 'object',
-        'duration': 'object',
-        'genres': 'object',
-        'language': 'object',
-        'description': 'object',
-        'popularity': 'float64',
-        'vote_count': 'int64',
-        'vote_average': 'float64'
-    }
+    :param dataset: DataFrame representing the dataset.
+    :param expected_schema: Dictionary with column names as keys and expected data types as values.
+    :return: True if schema is valid, False otherwise.
+    """
+    violations = schema_violations(dataset, expected_schema)
+    for violation in violations:
+        print(f"Error: {violation['message']}")
+    return not violations
 
-    # Expected schema for NYC Taxi trips dataset
-    taxi_tripdata_schema = {
-        'VendorID': 'Int64',  # Use 'Int64' to handle nullable integer type
-        'lpep_pickup_datetime': 'object',
-        'lpep_dropoff_datetime': 'object',
-        'store_and_fwd_flag': 'object',
-        'RatecodeID': 'Int64',  # Use 'Int64' for nullable integers, which handles NA values
-        'PULocationID': 'Int64',  # Use 'Int64' for nullable integers
-        'DOLocationID': 'Int64',  # Use 'Int64' for nullable integers
-        'passenger_count': 'Int64',  # Change to 'Int64' to handle missing values
-        'trip_distance': 'float64',
-        'fare_amount': 'float64',
-        'extra': 'float64',
-        'mta_tax': 'float64',
-        'tip_amount': 'float64',
-        'tolls_amount': 'float64',
-        'improvement_surcharge': 'float64',
-        'total_amount': 'float64',
-        'payment_type': 'float64',  # Use 'Int64' for nullable integers
-        'trip_type': 'float64',  # Use 'Int64' for nullable integers
-        'congestion_surcharge': 'float64'
-    }
+def merge_dtypes(dtypes: pd.Series, chunk: pd.DataFrame) -> pd.Series:
+    """
+    Merge the dtypes inferred for a new chunk into the dtypes seen so far, following the same
+    upcasting rules read_csv applies when it parses the whole file at once
+    (int + float -> float, categories -> union of categories, anything mixed with non-numeric data -> object).
 
-    # Load and validate Netflix movies dataset with proper types
-    try:
-        netflix_movies = pd.read_csv(
-            'data/netflix_movies_detailed_up_to_2025.csv', 
-            dtype={'show_id': 'object', 'rating': 'object', 'duration': 'object'},  # Ensure 'rating' and 'duration' are treated as 'object'
-            na_values={'rating': 'Unknown', 'duration': 'Unknown'}  # Handle missing values in 'rating' and 'duration' by filling with 'Unknown'
-        )
-        if validate_schema(netflix_movies, netflix_movies_schema):
-            print("Schema validation passed for Netflix movies dataset!")
+    :param dtypes: Series of dtypes merged so far (column name -> dtype), or None for the first chunk.
+    :param chunk: New DataFrame chunk.
+    :return: Series of merged dtypes.
+    """
+    if dtypes is None:
+        return chunk.dtypes
+    merged = {}
+    for column, dtype in dtypes.items():
+        chunk_dtype = chunk[column].dtype
+        if pd.api.types.is_dtype_equal(dtype, chunk_dtype):
+            merged[column] = dtype
+        elif isinstance(dtype, pd.CategoricalDtype) and isinstance(chunk_dtype, pd.CategoricalDtype):
+            # Each chunk only knows the categories it has seen: the full file has their union
+            merged[column] = pd.CategoricalDtype(dtype.categories.union(chunk_dtype.categories))
+        elif all(pd.api.types.is_numeric_dtype(d) and not pd.api.types.is_bool_dtype(d) for d in (dtype, chunk_dtype)):
+            merged[column] = np.result_type(dtype, chunk_dtype)
         else:
-            print("Schema validation failed for Netflix movies dataset.")
-    except Exception as e:
-        print(f"Error loading Netflix movies dataset: {e}")
+            merged[column] = np.dtype('object')
+    return pd.Series(merged, dtype='object')
 
-    # Load and validate Netflix TV shows dataset with proper types
-    try:
-        netflix_tv_shows = pd.read_csv(
-            'data/netflix_tv_shows_detailed_up_to_2025.csv', 
-            dtype={'show_id': 'object', 'rating': 'object', 'duration': 'object'},  # Ensure 'rating' and 'duration' are treated as 'object'
-            na_values={'rating': 'Unknown', 'duration': 'Unknown'}  # Handle missing values in 'rating' and 'duration' by filling with 'Unknown'
-        )
-        if validate_schema(netflix_tv_shows, netflix_tv_shows_schema):
-            print("Schema validation passed for Netflix TV shows dataset!")
-        else:
-            print("Schema validation failed for Netflix TV shows dataset.")
-    except Exception as e:
-        print(f"Error loading Netflix TV shows dataset: {e}")
+@traced
+def validate_schema_chunked(chunks, expected_schema: dict) -> bool:
+    """
+    Validates the schema of a dataset read in chunks. Only the merged dtypes are kept between chunks.
 
-    # Load and validate NYC Taxi trips dataset with proper types
-    try:
-        taxi_tripdata = pd.read_csv(
-            'data/taxi_tripdata.csv', 
-            dtype={
-                'VendorID': 'Int64', 'RatecodeID': 'Int64', 'PULocationID': 'Int64', 'DOLocationID': 'Int64', 
-                'passenger_count': 'Int64'  # Handle nullable integers
-            },  
-            na_values={
-                'VendorID': -1, 'RatecodeID': -1, 'PULocationID': -1, 'DOLocationID': -1, 'passenger_count': 0  # Handle missing values
-            }  
-        )
-        if validate_schema(taxi_tripdata, taxi_tripdata_schema):
-            print("Schema validation passed for NYC Taxi trips dataset!")
-        else:
-            print("Schema validation failed for NYC Taxi trips dataset.")
-    except Exception as e:
-        print(f"Error loading NYC Taxi trips dataset: {e}")
+    :param chunks: Iterable of DataFrame chunks of the same dataset.
+    :param expected_schema: Dictionary with column names as keys and expected data types as values.
+    :return: True if schema is valid, False otherwise.
+    """
+    dtypes = None
+    for chunk in chunks:
+        dtypes = merge_dtypes(dtypes, chunk)
+    return validate_schema(empty_frame(dtypes), expected_schema)
+
+def empty_frame(dtypes: pd.Series) -> pd.DataFrame:
+    """
+    Build an empty DataFrame with the given dtypes, so merged chunk schemas can be checked by validate_schema.
+    """
+    return pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in dtypes.items()})
@@ -0,0 +1,165 @@
+import csv
+
+# Schema registry and header checks in plain Python (no pandas): cheap commands such as `sentinel check-schema`
+# import this module instead of quality_rules/schema_validation.py
+
+# Expected schema for Netflix movies dataset
+NETFLIX_MOVIES_SCHEMA = {
+    'show_id': 'object',
+    'type': 'object',
+    'title': 'object',
+    'director': 'object',
+    'cast': 'object',
+    'country': 'object',
+    'date_added': 'object',
+    'release_year': 'int64',
+    'rating': 'object',
+    'duration': 'object',
+    'genres': 'object',
+    'language': 'object',
+    'description': 'object',
+    'popularity': 'float64',
+    'vote_count': 'int64',
+    'vote_average': 'float64',
+    'budget': 'int64',
+    'revenue': 'int64'
+}
+
+# Expected schema for Netflix TV shows dataset
+NETFLIX_TV_SHOWS_SCHEMA = {
+    'show_id': 'object',
+    'type': 'object',
+    'title': 'object',
+    'director': 'object',
+    'cast': 'object',
+    'country': 'object',
+    'date_added': 'object',
+    'release_year': 'int64',
+    'rating': 'object',
+    'duration': 'object',
+    'genres': 'object',
+    'language': 'object',
+    'description': 'object',
+    'popularity': 'float64',
+    'vote_count': 'int64',
+    'vote_average': 'float64'
+}
+
+# Expected schema for NYC Taxi trips dataset
+TAXI_TRIPDATA_SCHEMA = {
+    'VendorID': 'Int64',  # Use 'Int64' to handle nullable integer type
+    'lpep_pickup_datetime': 'object',
+    'lpep_dropoff_datetime': 'object',
+    'store_and_fwd_flag': 'object',
+    'RatecodeID': 'Int64',  # Use 'Int64' for nullable integers, which handles NA values
+    'PULocationID': 'Int64',  # Use 'Int64' for nullable integers
+    'DOLocationID': 'Int64',  # Use 'Int64' for nullable integers
+    'passenger_count': 'Int64',  # Change to 'Int64' to handle missing values
+    'trip_distance': 'float64',
+    'fare_amount': 'float64',
+    'extra': 'float64',
+    'mta_tax': 'float64',
+    'tip_amount': 'float64',
+    'tolls_amount': 'float64',
+    'improvement_surcharge': 'float64',
+    'total_amount': 'float64',
+    'payment_type': 'float64',  # Use 'Int64' for nullable integers
+    'trip_type': 'float64',  # Use 'Int64' for nullable integers
+    'congestion_surcharge': 'float64'
+}
+
+# Schema registry: dataset key (dataset name without the _v1/_v2 suffix) -> expected schema
+SCHEMA_REGISTRY = {
+    'netflix_movies': NETFLIX_MOVIES_SCHEMA,
+    'netflix_tv_shows': NETFLIX_TV_SHOWS_SCHEMA,
+    'nyc_taxi': TAXI_TRIPDATA_SCHEMA
+}
+
+# Storage dtypes used at ingest where they differ from the expected schema:
+# categories for low-cardinality text, compact nullable ints for IDs and counts, parsed timestamps
+INGEST_DTYPES = {
+    'netflix_movies': {
+        'type': 'category',
+        'rating': 'category',
+        'language': 'category',
+        'release_year': 'Int16',
+        'vote_count': 'Int32'
+    },
+    'netflix_tv_shows': {
+        'type': 'category',
+        'rating': 'category',
+        'language': 'category',
+        'release_year': 'Int16',
+        'vote_count': 'Int32'
+    },
+    'nyc_taxi': {
+        'VendorID': 'Int8',
+        'lpep_pickup_datetime': 'datetime64[ns]',
+        'lpep_dropoff_datetime': 'datetime64[ns]',
+        'store_and_fwd_flag': 'category',
+        'RatecodeID': 'Int8',
+        'PULocationID': 'Int16',
+        'DOLocationID': 'Int16',
+        'passenger_count': 'Int8',
+        'payment_type': 'Int8',
+        'trip_type': 'Int8'
+    }
+}
+
+# Storage dtype of the remaining text columns in Arrow string mode: one contiguous UTF-8 buffer per column
+# instead of a Python object per value
+ARROW_STRING_DTYPE = 'string[pyarrow]'
+
+def schema_key(dataset_name: str) -> str:
+    """
+    Return the schema registry key of a dataset (e.g. "netflix_movies_v2" -> "netflix_movies").
+    """
+    for suffix in ("_v1", "_v2"):
+        if dataset_name.endswith(suffix):
+            return dataset_name[:-len(suffix)]
+    return dataset_name
+
+def ingest_schema(dataset_key: str, arrow_strings: bool = False) -> dict:
+    """
+    Return the schema a dataset has once loaded with typed ingest (expected schema + storage dtypes).
+    With arrow_strings, the object columns left (free text, IDs) are stored as ARROW_STRING_DTYPE.
+    """
+    schema = {**SCHEMA_REGISTRY[dataset_key], **INGEST_DTYPES.get(dataset_key, {})}
+    if arrow_strings:
+        schema = {column: ARROW_STRING_DTYPE if dtype == 'object' else dtype for column, dtype in schema.items()}
+    return schema
+
+def schema_violation(column: str, check: str, expected, found, message: str) -> dict:
+    """
+    One schema violation as a structured record (check: "missing", "dtype", "order" or "parse").
+    """
+    return {'column': column, 'check': check, 'expected': expected, 'found': found, 'message': message}
+
+def read_header(path: str) -> list:
+    """
+    Return the column names of a CSV file (header line only) or of a Parquet file (schema metadata only).
+    """
+    if path.endswith(".parquet"):
+        # Imported here: pyarrow takes longer to import than a header takes to read
+        import pyarrow.parquet as pq
+        return pq.read_schema(path).names
+    with open(path, newline='', encoding='utf-8-sig') as csv_file:
+        return next(csv.reader(csv_file), [])
+
+def header_violations(columns: list, expected_schema: dict) -> list:
+    """
+    Collects the schema violations visible from a header alone: missing columns and columns out of order.
+    Columns outside the schema are allowed, as in validate_schema.
+
+    :param columns: Column names of the file, in file order.
+    :param expected_schema: Dictionary with column names as keys and expected data types as values.
+    :return: List of violations (see schema_violation), empty if the header is valid.
+    """
+    violations = [schema_violation(column, "missing", expected_dtype, None, f"Missing column '{column}'")
+                  for column, expected_dtype in expected_schema.items() if column not in columns]
+    expected_order = [column for column in expected_schema if column in columns]
+    found_order = [column for column in columns if column in expected_schema]
+    if found_order != expected_order:
+        violations.append(schema_violation(None, "order", expected_order, found_order,
+                                           f"Columns out of order. Expected {expected_order}, found {found_order}"))
+    return violations
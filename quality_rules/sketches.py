@@ -0,0 +1,166 @@
+import numpy as np
+from scipy.stats import kstwo
+
+# Smallest compactor capacity, as in the DataSketches KLL sketch the rank_error constants were fitted on
+MIN_CAPACITY = 8
+
+class KLLSketch:
+    """
+    Mergeable KLL quantile sketch of a numeric column.
+
+    Values are added in batches with update() (e.g. one call per chunk) and sketches built on
+    different chunks or shards are combined with merge(). The sketch keeps O(k log(n/k)) values,
+    a few KB for the default k, whatever the number of rows.
+    """
+
+    def __init__(self, k: int = 200, seed: int = None):
+        self.k = k
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        # Capacities shrink geometrically (factor 2/3) from the top level down
+        depth = len(self.levels) - level - 1
+        return max(MIN_CAPACITY, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            if len(self.levels[level]) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(self.levels[level])
+                # An odd item out stays at this level, so the total weight is preserved exactly
+                kept, items = items[len(items) - len(items) % 2:], items[:len(items) - len(items) % 2]
+                # Keep every other item (random offset), each with twice the weight
+                promoted = items[self._rng.integers(2)::2]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                self.levels[level] = kept
+            level += 1
+
+    def update(self, values):
+        """
+        Add a batch of values to the sketch. Missing values are ignored.
+        """
+        values = np.asarray(values, dtype='float64')
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        self.n += len(values)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other: "KLLSketch"):
+        """
+        Merge another sketch (e.g. built on another chunk or shard) into this one.
+        """
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def weighted_items(self):
+        """
+        :return: (sorted items, weights) of the values retained by the sketch.
+        """
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        return items[order], weights[order]
+
+    def cdf(self, points) -> np.ndarray:
+        """
+        Approximate empirical CDF of the sketched values at the given points.
+        """
+        items, weights = self.weighted_items()
+        cumulative = np.concatenate([[0.0], np.cumsum(weights)])
+        return cumulative[np.searchsorted(items, points, side='right')] / self.n
+
+    def quantile(self, q):
+        """
+        Approximate quantile(s) of the sketched values.
+        """
+        items, weights = self.weighted_items()
+        ranks = np.cumsum(weights) / self.n
+        return items[np.minimum(np.searchsorted(ranks, q, side='left'), len(items) - 1)]
+
+    def rank_error(self, all_ranks: bool = False) -> float:
+        """
+        Normalized rank error of the sketch, exceeded with probability about 1% (the empirical KLL error model of
+        DataSketches: 2.296 / k^0.9723 for one rank, 2.446 / k^0.9433 for the largest error over all ranks, e.g.
+        for a KS statistic). This is a probabilistic bound, not a guarantee. Values retained exactly (fewer than
+        k rows) have no error.
+        """
+        if len(self.levels) == 1:
+            return 0.0
+        return 2.446 / self.k ** 0.9433 if all_ranks else 2.296 / self.k ** 0.9723
+
+    def to_dict(self) -> dict:
+        """
+        :return: JSON-serializable state of the sketch (see from_dict).
+        """
+        return {'k': self.k, 'n': self.n, 'min': float(self.min), 'max': float(self.max),
+                'levels': [level.tolist() for level in self.levels]}
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "KLLSketch":
+        """
+        Restore a sketch saved with to_dict.
+        """
+        sketch = cls(state['k'])
+        sketch.n, sketch.min, sketch.max = state['n'], state['min'], state['max']
+        sketch.levels = [np.asarray(level, dtype='float64') for level in state['levels']]
+        return sketch
+
+def ks_from_sketches(sketch_v1: KLLSketch, sketch_v2: KLLSketch) -> dict:
+    """
+    Approximate two-sample Kolmogorov-Smirnov test computed from two quantile sketches.
+
+    The statistic is within `statistic_error` of the exact KS statistic with about 99% probability (sum of the
+    all-ranks errors of both sketches). The p-value uses the asymptotic KS distribution with the effective sample
+    size, as ks_2samp does for large samples (it is exact below 10,000 rows); `p_value_range` is the range of
+    p-values compatible with the statistic error.
+
+    :return: Dictionary with statistic, p_value, statistic_error and p_value_range.
+    """
+    points = np.union1d(*(sketch.weighted_items()[0] for sketch in (sketch_v1, sketch_v2)))
+    statistic = float(np.max(np.abs(sketch_v1.cdf(points) - sketch_v2.cdf(points))))
+    statistic_error = sketch_v1.rank_error(all_ranks=True) + sketch_v2.rank_error(all_ranks=True)
+
+    effective_n = np.round(sketch_v1.n * sketch_v2.n / (sketch_v1.n + sketch_v2.n))
+    p_value = float(np.clip(kstwo.sf(statistic, effective_n), 0, 1))
+    p_value_range = (float(np.clip(kstwo.sf(min(statistic + statistic_error, 1.0), effective_n), 0, 1)),
+                     float(np.clip(kstwo.sf(max(statistic - statistic_error, 0.0), effective_n), 0, 1)))
+    return {'statistic': statistic, 'p_value': p_value, 'statistic_error': statistic_error, 'p_value_range': p_value_range}
+
+def build_column_sketches(chunks, columns: list, k: int = 200) -> dict:
+    """
+    Build one sketch per numeric column in a single streaming pass over the chunks.
+
+    :param chunks: Iterable of DataFrame chunks.
+    :param columns: Columns to sketch (columns absent from the data are skipped).
+    :param k: Sketch size parameter (larger k, smaller error).
+    :return: Dictionary of column name -> KLLSketch.
+    """
+    sketches = {}
+    for chunk in chunks:
+        update_column_sketches(sketches, chunk, columns, k)
+    return sketches
+
+def update_column_sketches(sketches: dict, chunk, columns: list, k: int = 200):
+    """
+    Add one chunk to a dictionary of per-column sketches (created on first use).
+    """
+    for column in columns:
+        if column in chunk.columns:
+            sketches.setdefault(column, KLLSketch(k)).update(chunk[column].to_numpy(dtype='float64', na_value=np.nan))
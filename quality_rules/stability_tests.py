@@ -1,14 +1,31 @@
 import pandas as pd
 import numpy as np
-from scipy.stats import ks_2samp
+from scipy.stats import ks_2samp, kstwo
+from quality_rules.profiles import DatasetProfile
+from quality_rules.sampling import StratifiedSample, build_sample
+from quality_rules.sketches import KLLSketch, ks_from_sketches
+from validation_engine.spans import traced
 
-def test_statistical_stability(dataset_v1: pd.DataFrame, dataset_v2: pd.DataFrame, column: str) -> bool:
+def _non_null_values(dataset, column: str) -> pd.Series:
+    # A baseline profile keeps the sorted non-null values of its monitored columns
+    if isinstance(dataset, DatasetProfile):
+        return pd.Series(dataset.values(column))
+    return dataset[column].dropna()
+
+@traced
+def test_statistical_stability(dataset_v1, dataset_v2: pd.DataFrame, column: str, sample_size: int = None) -> bool:
     """
     Performs a Kolmogorov-Smirnov test to check if the distribution of a column is stable between two versions of the dataset.
+    The first (older) version can be given as a DataFrame or as its DatasetProfile.
+    With a sample_size, the test runs on samples of at most that many values, with early stopping
+    (see test_statistical_stability_sequential).
     """
+    if sample_size:
+        return bool(test_statistical_stability_sequential(dataset_v1, dataset_v2, [column], sample_size=sample_size)['passed'].iloc[0])
+
     # Drop missing values from the specified column
-    data_v1 = dataset_v1[column].dropna()
-    data_v2 = dataset_v2[column].dropna()
+    data_v1 = _non_null_values(dataset_v1, column)
+    data_v2 = _non_null_values(dataset_v2, column)
 
     # Print the number of non-null values for both datasets
     print(f"Non-null values for {column} in dataset_v1: {len(data_v1)}")
@@ -34,18 +51,234 @@ def test_statistical_stability(dataset_v1: pd.DataFrame, dataset_v2: pd.DataFram
         print(f"Column '{column}' is stable across versions. p-value: {p_value}")
         return True
 
-if __name__ == "__main__":
-    # Example dataset versions
-    dataset_v1 = pd.read_csv('data/netflix_movies_detailed_up_to_2025.csv')  # Older dataset
-    dataset_v2 = pd.read_csv('data/netflix_movies_cleaned.csv')  # Newer dataset
+def _float_block(dataset, columns: list) -> np.ndarray:
+    if isinstance(dataset, DatasetProfile):
+        # Profiles keep only the non-null values: pad with NaN, which sorts last like missing values
+        block = np.full((len(columns), dataset.rows), np.nan)
+        for i, column in enumerate(columns):
+            values = dataset.values(column)
+            block[i, :len(values)] = values
+        return block
+    # Filled column by column: converting a frame with nullable integer columns as a whole goes through object
+    block = np.empty((len(columns), len(dataset)))
+    for i, column in enumerate(columns):
+        block[i] = dataset[column].to_numpy(dtype='float64', na_value=np.nan)
+    return block
+
+def _complex_keys(rows: np.ndarray, values: np.ndarray) -> np.ndarray:
+    # (row, value) pairs as complex numbers, which numpy orders by real part, then imaginary part: the values
+    # of all the rows of a sorted block are then one ascending array for searchsorted
+    keys = np.empty(len(values), dtype='complex128')
+    keys.real, keys.imag = rows, values
+    return keys
+
+def _count_up_to(rows: np.ndarray, ends: np.ndarray, values: np.ndarray, query_rows: np.ndarray, points: np.ndarray) -> np.ndarray:
+    # Number of values up to each point (searchsorted side='right') in its row of a sorted block, given the block's
+    # distinct values (row, last position and value of each run of ties, in order), in one searchsorted for all rows
+    index = np.searchsorted(_complex_keys(rows, values), _complex_keys(query_rows, points), side='right') - 1
+    found = (index >= 0) & (rows[np.maximum(index, 0)] == query_rows)
+    return np.where(found, ends[np.maximum(index, 0)] + 1, 0)
+
+@traced
+def test_statistical_stability_batch(dataset_v1, dataset_v2: pd.DataFrame, columns: list, alpha: float = 0.05) -> pd.DataFrame:
+    """
+    Performs the Kolmogorov-Smirnov stability test on several columns at once.
+
+    Each version is extracted once as a 2-D float block (missing values as NaN) and sorted once, instead of a
+    dropna/astype/sort per column. The empirical CDFs of all columns are then compared at their distinct values
+    only, with one searchsorted per version on the already sorted blocks; the asymptotic p-values of all columns
+    are computed in one vectorized call and the exact ones (samples of up to 10000 rows, as ks_2samp) in one
+    ks_2samp call over the small columns. Statistics and p-values are identical to ks_2samp.
+
+    :param dataset_v1: The old version of the dataset (DataFrame or DatasetProfile).
+    :param dataset_v2: The new version of the dataset.
+    :param columns: Columns to test.
+    :param alpha: p-value below which a column is reported unstable.
+    :return: DataFrame indexed by column with n_v1, n_v2, statistic, p_value and passed.
+    """
+    # One float block per version (a row per column, so each column is contiguous), sorted once;
+    # missing values become NaN and sort to the end of each row
+    sorted_v1, sorted_v2 = _float_block(dataset_v1, columns), _float_block(dataset_v2, columns)
+    sorted_v1.sort(axis=1)
+    sorted_v2.sort(axis=1)
+    n_v1 = np.count_nonzero(~np.isnan(sorted_v1), axis=1)
+    n_v2 = np.count_nonzero(~np.isnan(sorted_v2), axis=1)
+
+    # Last position of every run of tied values: the empirical CDF of a sorted sample at its own values
+    run_end_v1 = np.ones(sorted_v1.shape, dtype=bool)
+    run_end_v1[:, :-1] = sorted_v1[:, :-1] != sorted_v1[:, 1:]
+    run_end_v2 = np.ones(sorted_v2.shape, dtype=bool)
+    run_end_v2[:, :-1] = sorted_v2[:, :-1] != sorted_v2[:, 1:]
+
+    testable = (n_v1 > 0) & (n_v2 > 0)
+    run_end_v1 &= (np.arange(sorted_v1.shape[1]) < n_v1[:, None]) & testable[:, None]
+    run_end_v2 &= (np.arange(sorted_v2.shape[1]) < n_v2[:, None]) & testable[:, None]
+
+    # F1 - F2 is largest at a value of v1 and smallest at a value of v2, so the CDF of the other version is
+    # only looked up (side='right' as ks_2samp) at those distinct values, for every column at once
+    statistics = np.zeros(len(columns))
+    rows_v1, ends_v1 = np.nonzero(run_end_v1)
+    rows_v2, ends_v2 = np.nonzero(run_end_v2)
+    values_v1, values_v2 = sorted_v1[rows_v1, ends_v1], sorted_v2[rows_v2, ends_v2]
+    above = (ends_v1 + 1) / n_v1[rows_v1] - _count_up_to(rows_v2, ends_v2, values_v2, rows_v1, values_v1) / n_v2[rows_v1]
+    below = (ends_v2 + 1) / n_v2[rows_v2] - _count_up_to(rows_v1, ends_v1, values_v1, rows_v2, values_v2) / n_v1[rows_v2]
+    np.maximum.at(statistics, rows_v1, above)
+    np.maximum.at(statistics, rows_v2, below)
+
+    # Asymptotic p-values (ks_2samp for samples over 10000 rows) for every column at once
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p_values = np.clip(kstwo.sf(statistics, np.round(n_v1 * n_v2 / (n_v1 + n_v2))), 0, 1)
+    p_values[~testable] = np.nan
+    small = testable & (np.maximum(n_v1, n_v2) <= 10000)
+    if small.any():
+        # Small samples: exact p-values, as ks_2samp computes them, in one call over those columns
+        p_values[small] = ks_2samp(sorted_v1[small], sorted_v2[small], axis=1, nan_policy='omit').pvalue
+
+    results = pd.DataFrame({'n_v1': n_v1, 'n_v2': n_v2, 'statistic': statistics, 'p_value': p_values}, index=pd.Index(columns, name='column'))
+    # Ensure that there are enough data points in both datasets
+    results['passed'] = (results['n_v1'] >= 10) & (results['n_v2'] >= 10) & (results['p_value'] >= alpha)
+
+    for row in results.itertuples():
+        print(f"Non-null values for {row.Index} in dataset_v1: {row.n_v1}")
+        print(f"Non-null values for {row.Index} in dataset_v2: {row.n_v2}")
+        if row.n_v1 < 10 or row.n_v2 < 10:
+            print(f"Warning: Insufficient data for the column '{row.Index}' to perform KS test.")
+        elif not row.passed:
+            print(f"Statistical instability detected for column '{row.Index}'. p-value: {row.p_value}")
+        else:
+            print(f"Column '{row.Index}' is stable across versions. p-value: {row.p_value}")
+    return results
+
+@traced
+def test_statistical_stability_sketch(sketch_v1: KLLSketch, sketch_v2: KLLSketch, column: str, alpha: float = 0.05) -> bool:
+    """
+    Approximate Kolmogorov-Smirnov stability test computed from per-column quantile sketches
+    (see quality_rules.sketches), so neither version has to be held in memory.
+
+    The column is reported unstable only if the difference is significant even at the most favourable
+    end of the sketch error. The sketch error is a probabilistic bound (about 99%) and the p-values are
+    asymptotic, so on rare occasions the sketch can report an instability the exact test would not,
+    most likely on small columns where ks_2samp computes exact p-values.
+    """
+    print(f"Non-null values for {column} in dataset_v1: {sketch_v1.n}")
+    print(f"Non-null values for {column} in dataset_v2: {sketch_v2.n}")
 
-    # List of columns to test for stability
-    columns_to_test = ['release_year', 'vote_average', 'popularity']  # You can add any columns you wish to compare
+    # Ensure that there are enough data points in both datasets
+    if sketch_v1.n < 10 or sketch_v2.n < 10:
+        print(f"Warning: Insufficient data for the column '{column}' to perform KS test.")
+        return False
+
+    result = ks_from_sketches(sketch_v1, sketch_v2)
+    p_value, p_value_max = result['p_value'], result['p_value_range'][1]
+    print(f"Approximate KS statistic for '{column}': {result['statistic']:.4f} +/- {result['statistic_error']:.4f}")
+
+    if p_value_max < alpha:
+        print(f"Statistical instability detected for column '{column}'. p-value: {p_value} (at most {p_value_max})")
+        return False
+    else:
+        print(f"Column '{column}' is stable across versions. p-value: {p_value} (at most {p_value_max})")
+        return True
+
+def _sampled_values(dataset, columns: list, size: int, strata: str, seed: int) -> dict:
+    """
+    Sample the non-null values of each column, in draw order: column -> (sampled values, non-null values in the data).
+    """
+    if isinstance(dataset, DatasetProfile):
+        # A profile keeps the values of each column, not the rows: a uniform sample per column
+        rng = np.random.default_rng(seed)
+        samples = {}
+        for column in columns:
+            values = dataset.values(column)
+            samples[column] = (values[rng.choice(len(values), min(size, len(values)), replace=False)], len(values))
+        return samples
+    if not isinstance(dataset, StratifiedSample):
+        dataset = build_sample([dataset], columns, size, strata, seed)
+    return {column: (dataset.values(column), dataset.non_null_count(column)) for column in columns}
+
+def _stable_confidence(statistic: float, sample_v1: int, sample_v2: int, tolerance: float, looks: int) -> float:
+    # DKW: each empirical CDF is within sqrt(ln(4 / delta) / (2 n)) of its true CDF with probability 1 - delta / 2,
+    # so the true KS distance is below `tolerance` with probability 1 - delta (union bound over the looks)
+    margin = tolerance - statistic
+    if margin <= 0:
+        return 0.0
+    delta = 4 * np.exp(-2 * (margin / (1 / np.sqrt(sample_v1) + 1 / np.sqrt(sample_v2))) ** 2)
+    return float(max(0.0, 1 - looks * delta))
+
+@traced
+def test_statistical_stability_sequential(dataset_v1, dataset_v2, columns: list, alpha: float = 0.05, sample_size: int = 50000,
+                                          min_sample_size: int = 2000, tolerance: float = 0.05, strata: str = None,
+                                          seed: int = 0) -> pd.DataFrame:
+    """
+    Sampled Kolmogorov-Smirnov stability test with sequential early stopping.
+
+    Each version is sampled once (stratified by the `strata` column for DataFrames and streamed samples,
+    uniformly for profiles), then tested on growing prefixes of the sample: min_sample_size rows, doubling
+    up to sample_size. The test stops at the first look where the decision is confident at `alpha`:
+    unstable when the KS p-value is significant at alpha / looks (Bonferroni over the looks), stable when
+    the KS distance is confidently below `tolerance` (DKW bound). A column still undecided at the last look
+    is inconclusive, and does not pass. A column whose values all fit in the sample is tested on all of them
+    in a single look, exactly as test_statistical_stability_batch.
+
+    :param dataset_v1: The old version of the dataset (DataFrame, DatasetProfile or StratifiedSample).
+    :param dataset_v2: The new version of the dataset (DataFrame or StratifiedSample).
+    :param columns: Columns to test.
+    :param alpha: Error probability of the decision.
+    :param sample_size: Largest number of values tested per version and column.
+    :param min_sample_size: Number of values tested at the first look.
+    :param tolerance: KS distance below which a column is stable.
+    :param strata: Column the DataFrame samples are stratified by.
+    :param seed: Seed of the samples.
+    :return: DataFrame indexed by column with n_v1, n_v2 (non-null values in the data), sample_v1, sample_v2
+             (values tested), looks, statistic, p_value, confidence (probability bound that the decision is
+             right), conclusive and passed.
+    """
+    samples_v1 = _sampled_values(dataset_v1, columns, sample_size, strata, seed)
+    samples_v2 = _sampled_values(dataset_v2, columns, sample_size, strata, seed + 1)
+
+    rows = []
+    for column in columns:
+        (values_v1, n_v1), (values_v2, n_v2) = samples_v1[column], samples_v2[column]
+        row = {'n_v1': n_v1, 'n_v2': n_v2, 'sample_v1': len(values_v1), 'sample_v2': len(values_v2), 'looks': 0,
+               'statistic': np.nan, 'p_value': np.nan, 'confidence': np.nan, 'conclusive': False, 'passed': False}
+        rows.append(row)
+        if len(values_v1) < 10 or len(values_v2) < 10:
+            continue
+
+        exact = len(values_v1) == n_v1 and len(values_v2) == n_v2
+        if exact:
+            # The whole columns fit in the sample: one exact test
+            sizes = [max(n_v1, n_v2)]
+        else:
+            sizes = [min_sample_size]
+            while sizes[-1] < sample_size:
+                sizes.append(min(2 * sizes[-1], sample_size))
+        looks = len(sizes)
+        for look, size in enumerate(sizes, start=1):
+            sample_v1, sample_v2 = values_v1[:size], values_v2[:size]
+            # Asymptotic p-values on samples (the exact ones cost more than the test itself)
+            statistic, p_value = ks_2samp(sample_v1, sample_v2, method='auto' if exact else 'asymp')
+            confidence = _stable_confidence(statistic, len(sample_v1), len(sample_v2), tolerance, looks)
+            row.update(sample_v1=len(sample_v1), sample_v2=len(sample_v2), looks=look, statistic=statistic, p_value=p_value)
+            if p_value * looks < alpha:
+                row.update(confidence=1 - p_value * looks, conclusive=True, passed=False)
+                break
+            row.update(confidence=confidence, conclusive=exact or confidence >= 1 - alpha, passed=True)
+            if row['conclusive']:
+                break
+        if not row['conclusive']:
+            # Neither significant nor confidently below the tolerance at the last look: not a pass
+            row['passed'] = False
 
-    # Test stability for each specified column
-    for column in columns_to_test:
-        print(f"\nTesting stability for column: {column}")
-        if test_statistical_stability(dataset_v1, dataset_v2, column):
-            print(f"The '{column}' column is stable over time.")
+    results = pd.DataFrame(rows, index=pd.Index(columns, name='column'))
+    for row in results.itertuples():
+        print(f"Non-null values for {row.Index} in dataset_v1: {row.n_v1} (sampled {row.sample_v1})")
+        print(f"Non-null values for {row.Index} in dataset_v2: {row.n_v2} (sampled {row.sample_v2})")
+        if row.looks == 0:
+            print(f"Warning: Insufficient data for the column '{row.Index}' to perform KS test.")
+        elif not row.conclusive:
+            print(f"Stability of column '{row.Index}' is inconclusive at {row.sample_v1}/{row.sample_v2} values. p-value: {row.p_value} (confidence {row.confidence:.3f})")
+        elif not row.passed:
+            print(f"Statistical instability detected for column '{row.Index}'. p-value: {row.p_value} (confidence {row.confidence:.3f})")
         else:
-            print(f"The '{column}' column shows instability over time.")
+            print(f"Column '{row.Index}' is stable across versions. p-value: {row.p_value} (confidence {row.confidence:.3f})")
+    return results
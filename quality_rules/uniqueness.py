@@ -0,0 +1,322 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+from quality_rules.profiles import DatasetProfile
+from quality_rules.row_diff import row_key, is_arrow_string
+from validation_engine.spans import traced
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # pyarrow is optional: without it text keys are hashed as fixed-width unicode
+    pa = pc = None
+
+# Per-row record kept by the uniqueness check: key hash and row id (index label)
+KEY_RECORD_DTYPE = np.dtype([('key', '<u8'), ('id', '<i8')])
+
+# Odd 64-bit constants of the splitmix64 finalizer, which spreads every input bit over the whole hash
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+_NULL_HASH = np.uint64(0x2545F4914F6CDD1D)  # Hash of a missing text or category value
+
+
+def _mix(hashes: np.ndarray) -> np.ndarray:
+    hashes = (hashes ^ (hashes >> np.uint64(30))) * _MIX_1
+    hashes = (hashes ^ (hashes >> np.uint64(27))) * _MIX_2
+    return hashes ^ (hashes >> np.uint64(31))
+
+
+def _hash_unicode(series: pd.Series) -> np.ndarray:
+    # Fixed-width UTF-32, hashed 8 bytes (two characters) at a time across every row at once
+    text = series.to_numpy(dtype=object).astype(str)
+    if text.dtype.itemsize % 8:
+        text = text.astype(f"U{text.dtype.itemsize // 4 + 1}")
+    words = text.view('uint64').reshape(len(text), -1)
+    hashes = np.full(len(text), _GOLDEN)
+    for word in range(words.shape[1]):
+        hashes = _mix(hashes ^ words[:, word])
+    return hashes
+
+
+def _hash_text(series: pd.Series) -> np.ndarray:
+    # UTF-8 bytes in an Arrow buffer, hashed 8 bytes at a time across every row at once; string[pyarrow]
+    # columns are hashed in place, object ones converted once (without pyarrow, see _hash_unicode)
+    if pa is None:
+        return _hash_unicode(series)
+    values = series.array if is_arrow_string(series.dtype) else series.to_numpy(dtype=object)
+    try:
+        text = pa.array(values, type=pa.large_string(), from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed objects (e.g. numbers among strings) are hashed as their text
+        text = pa.array(series.astype(str).to_numpy(dtype=object), type=pa.large_string())
+    if isinstance(text, pa.ChunkedArray):
+        text = text.combine_chunks()
+    nulls = text.is_null().to_numpy(zero_copy_only=False)
+    text = pc.fill_null(text, "")
+
+    _, offsets, data = text.buffers()
+    offsets = np.frombuffer(offsets, dtype='int64')[text.offset:text.offset + len(text) + 1]
+    starts, lengths = offsets[:-1], np.diff(offsets)
+    # Zero-padded copy of the bytes, read as a uint64 at every byte offset
+    size = data.size if data is not None else 0
+    padded = np.zeros(size + 8, dtype='uint8')
+    if size:
+        padded[:size] = np.frombuffer(data, dtype='uint8')
+    words = np.ndarray(shape=(size + 1,), dtype='<u8', buffer=padded, strides=(1,))
+
+    hashes = np.full(len(text), _GOLDEN) ^ lengths.astype('uint64')
+    for start in range(0, int(lengths.max(initial=0)), 8):
+        word = words[np.minimum(starts + start, size)]
+        # Bytes past the end of a string (the next strings' or padding) are masked out
+        remaining = np.clip(lengths - start, 0, 8).astype('uint64')
+        short = remaining < 8
+        word[short] &= (np.uint64(1) << (np.uint64(8) * remaining[short])) - np.uint64(1)
+        hashes = _mix(hashes ^ word)
+    hashes[nulls] = _NULL_HASH
+    return hashes
+
+
+def _hash_column(series: pd.Series) -> np.ndarray:
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Each distinct value is hashed once (as its own dtype), null codes (-1) take the last slot
+        hashes = np.append(_hash_column(pd.Series(series.cat.categories)), _NULL_HASH)
+        return hashes[series.cat.codes.to_numpy()]
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return _mix(series.to_numpy(dtype='datetime64[ns]').view('uint64'))
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        # As float64, so an int64 column and its nullable or float64 version hash alike (+ 0.0 turns -0.0 into 0.0)
+        return _mix((series.to_numpy(dtype='float64', na_value=np.nan) + 0.0).view('uint64'))
+    return _hash_text(series)
+
+
+def hash_keys(keys: pd.DataFrame) -> np.ndarray:
+    """
+    Hash the key of every row into a uint64, one vectorized pass per column. Much faster than
+    pd.util.hash_pandas_object on text keys, which hashes each string on its own; a text column hashes
+    alike whether it is stored as objects, categories or string[pyarrow].
+    """
+    hashes = np.zeros(len(keys), dtype='uint64')
+    for column in keys.columns:
+        hashes = _mix(hashes * _GOLDEN ^ _hash_column(keys[column]))
+    return hashes
+
+
+class KeyUniqueness:
+    """
+    Chunked duplicate key finder. Chunks are fed with update(); for every row only a 16-byte record
+    (uint64 hash of its key columns, row id) is kept. With a spill directory the records are partitioned
+    by key hash and appended to disk whenever `max_rows_in_memory` records are buffered, and result()
+    sorts one partition at a time, so datasets of any size are checked in bounded memory.
+
+    Rows with a null key column are not checked (as with a SQL UNIQUE constraint) but counted. Two distinct
+    keys collide with probability about rows^2 / 2^65 (under 0.03% at 100M rows), which would count a
+    duplicate; sample keys are read back from the rows, so they are always real duplicates.
+    """
+
+    def __init__(self, key_columns: list = None, spill_dir: str = None, partitions: int = 64,
+                 max_rows_in_memory: int = 1000000, sample_size: int = 5):
+        """
+        :param key_columns: Columns identifying a row (None: the registered key of the first chunk's columns,
+                            see quality_rules.row_diff.ROW_KEYS).
+        :param spill_dir: Directory for the partition files (None keeps every record in memory).
+        :param partitions: Number of key hash partitions spilled to disk.
+        :param max_rows_in_memory: Number of buffered records before they are spilled.
+        :param sample_size: Number of sample duplicate keys reported.
+        """
+        self.key_columns = key_columns
+        self.spill_dir = spill_dir
+        self.partitions = partitions
+        self.max_rows_in_memory = max_rows_in_memory
+        self.sample_size = sample_size
+        self.rows = 0
+        self.null_keys = 0
+        self.buffers = []
+        self.buffered = 0
+        self.spill_path = None
+        self.sample_keys = None
+        self._result = None
+
+    def update(self, chunk: pd.DataFrame):
+        """
+        Add the next chunk of the dataset.
+        """
+        if self.key_columns is None:
+            self.key_columns = row_key(chunk.columns) or []
+        if not self.key_columns:
+            self.rows += len(chunk)
+            return
+        keys = chunk[self.key_columns]
+        complete = keys.notna().all(axis=1).to_numpy()
+        records = np.empty(int(complete.sum()), dtype=KEY_RECORD_DTYPE)
+        records['key'] = hash_keys(keys[complete])
+        # Row ids are the index labels (the line number in the file for read_csv chunks), so sample keys can be read back
+        ids = chunk.index.to_numpy() if pd.api.types.is_integer_dtype(chunk.index.dtype) else self.rows + np.arange(len(chunk))
+        records['id'] = ids[complete]
+        self.rows += len(chunk)
+        self.null_keys += len(chunk) - len(records)
+        self._add(records)
+
+    def add_profile(self, profile: DatasetProfile):
+        """
+        Add the rows of a dataset profile, from the key hashes of its row diff records (hashed differently
+        from update(), so a finder takes either chunks or profiles; rows with a null key are not told apart,
+        so they are checked like the others).
+        """
+        if self.key_columns is None:
+            self.key_columns = profile.key_columns or []
+        self.rows += profile.rows
+        if self.key_columns:
+            records = profile.records()
+            self._add(np.rec.fromarrays([records['key'], records['id']], dtype=KEY_RECORD_DTYPE).view(np.ndarray))
+
+    def _add(self, records: np.ndarray):
+        # Large (e.g. memory-mapped) record arrays are buffered in slices, so spilling still bounds memory
+        for start in range(0, len(records), self.max_rows_in_memory):
+            part = records[start:start + self.max_rows_in_memory]
+            self.buffers.append(part)
+            self.buffered += len(part)
+            if self.spill_dir is not None and self.buffered >= self.max_rows_in_memory:
+                self._spill()
+
+    def _partition_buffer(self) -> list:
+        # Split the buffered records by key hash
+        if not self.buffers:
+            return [np.empty(0, dtype=KEY_RECORD_DTYPE)] * self.partitions
+        records = np.concatenate(self.buffers)
+        partition = records['key'] % self.partitions
+        order = np.argsort(partition, kind='stable')
+        records, partition = records[order], partition[order]
+        bounds = np.searchsorted(partition, np.arange(self.partitions + 1))
+        return [records[bounds[p]:bounds[p + 1]] for p in range(self.partitions)]
+
+    def _spill(self):
+        if self.spill_path is None:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            self.spill_path = tempfile.mkdtemp(prefix="uniqueness-", dir=self.spill_dir)
+        for p, part in enumerate(self._partition_buffer()):
+            if len(part):
+                with open(os.path.join(self.spill_path, f"{p}.bin"), 'ab') as part_file:
+                    part.tofile(part_file)
+        self.buffers = []
+        self.buffered = 0
+
+    def _partitions(self):
+        if self.spill_path is None:
+            yield from self._partition_buffer()
+            return
+        self._spill()
+        for p in range(self.partitions):
+            path = os.path.join(self.spill_path, f"{p}.bin")
+            yield np.fromfile(path, dtype=KEY_RECORD_DTYPE) if os.path.exists(path) else np.empty(0, dtype=KEY_RECORD_DTYPE)
+
+    def result(self) -> dict:
+        """
+        Find the duplicate keys (computed once; spilled partition files are removed afterwards).
+
+        :return: Dictionary with the key columns, the rows checked, the rows with a null key, the number of keys
+                 shared by several rows, the rows beyond the first of each such key, and the row id of the first
+                 row and the row count of sample duplicate keys (the first ones in row order).
+        """
+        if self._result is not None:
+            return self._result
+
+        duplicate_keys = duplicate_rows = 0
+        candidates, candidate_counts = [], []
+        try:
+            for records in self._partitions():
+                if len(records) == 0:
+                    continue
+                records = records[np.argsort(records['key'], kind='stable')]
+                keys = records['key']
+                starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]]))
+                counts = np.diff(np.append(starts, len(keys)))
+                duplicated = counts > 1
+                duplicate_keys += int(np.count_nonzero(duplicated))
+                duplicate_rows += int((counts[duplicated] - 1).sum())
+
+                # Keep only the first keys (smallest first row ids) of each partition as sample candidates
+                first_ids = np.minimum.reduceat(records['id'], starts)[duplicated]
+                order = np.argsort(first_ids)[:self.sample_size]
+                candidates.append(first_ids[order])
+                candidate_counts.append(counts[duplicated][order])
+        finally:
+            self.close()
+
+        ids = np.concatenate(candidates) if candidates else np.empty(0, dtype='int64')
+        counts = np.concatenate(candidate_counts) if candidate_counts else np.empty(0, dtype='int64')
+        order = np.argsort(ids)[:self.sample_size]
+        self._result = {'key': self.key_columns, 'rows': self.rows, 'null_keys': self.null_keys, 'duplicate_keys': duplicate_keys,
+                        'duplicate_rows': duplicate_rows, 'samples': ids[order], 'sample_counts': counts[order]}
+        return self._result
+
+    def collect_samples(self, chunks):
+        """
+        Read the key values of the sample duplicate keys back from the chunks (call after result()).
+        The scan stops as soon as the last sample row has been read.
+
+        :param chunks: Iterable of DataFrame chunks, with the index labels used by update().
+        """
+        result = self.result()
+        wanted = result['samples']
+        if len(wanted) == 0:
+            return
+        found = []
+        for chunk in chunks:
+            found.append(chunk.loc[chunk.index.isin(wanted), self.key_columns])
+            if len(chunk) and chunk.index.max() >= wanted.max():
+                break
+        sample_keys = pd.concat(found)
+        sample_keys = sample_keys[~sample_keys.index.duplicated()].reindex(wanted)
+        sample_keys['rows'] = result['sample_counts']
+        self.sample_keys = sample_keys
+
+    def close(self):
+        """
+        Remove the spilled partition files.
+        """
+        if self.spill_path is not None:
+            shutil.rmtree(self.spill_path, ignore_errors=True)
+            self.spill_path = None
+
+
+def print_key_uniqueness(uniqueness: KeyUniqueness):
+    """
+    Print the duplicate key counts and the sample duplicate keys (by row id if they were not read back).
+    """
+    result = uniqueness.result()
+    if not result['key']:
+        print("No registered key: key uniqueness not checked.")
+        return
+    print(f"Key uniqueness of {', '.join(result['key'])}: {result['duplicate_keys']} duplicate keys "
+          f"({result['duplicate_rows']} extra rows) in {result['rows']} rows, {result['null_keys']} rows with a null key")
+    if uniqueness.sample_keys is not None:
+        print("Sample duplicate keys:")
+        print(uniqueness.sample_keys.to_string())
+    elif len(result['samples']):
+        print(f"Sample duplicate keys: first at row ids {', '.join(str(row_id) for row_id in result['samples'])}")
+
+
+@traced
+def find_duplicate_keys(dataset, key_columns: list = None, spill_dir: str = None, sample_size: int = 5) -> dict:
+    """
+    Check that the key of a dataset is unique: its key columns are hashed to uint64 in one vectorized pass
+    and the hashes sorted, without comparing the (often object) key values themselves.
+
+    :param dataset: The dataset, as a DataFrame or as its DatasetProfile (then samples are reported by row id).
+    :param key_columns: Columns identifying a row (None: the dataset's registered key).
+    :param spill_dir: Directory the key hashes may spill to (None keeps them in memory).
+    :param sample_size: Number of sample duplicate keys reported.
+    :return: Result of KeyUniqueness.result(), with the sample key values ('sample_keys', None for a profile).
+    """
+    uniqueness = KeyUniqueness(key_columns, spill_dir, sample_size=sample_size)
+    if isinstance(dataset, DatasetProfile):
+        uniqueness.add_profile(dataset)
+    else:
+        uniqueness.update(dataset)
+        uniqueness.collect_samples([dataset])
+    print_key_uniqueness(uniqueness)
+    return {**uniqueness.result(), 'sample_keys': uniqueness.sample_keys}
@@ -0,0 +1,14 @@
+import pytest
+from validation_engine.config import DATASETS_PATH
+
+@pytest.fixture
+def register_datasets(monkeypatch):
+    """
+    Replace the configured datasets for one test: register_datasets({"movies_v1": "movies_v1.csv", ...}).
+    """
+    def register(datasets: dict):
+        for dataset_name in list(DATASETS_PATH):
+            monkeypatch.delitem(DATASETS_PATH, dataset_name)
+        for dataset_name, dataset_path in datasets.items():
+            monkeypatch.setitem(DATASETS_PATH, dataset_name, dataset_path)
+    return register
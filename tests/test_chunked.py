@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+from quality_rules.missing_values import NullProfile, detect_missing_values, detect_missing_values_chunked
+from quality_rules.missing_handle import handle_missing_values, handle_missing_values_chunked
+from quality_rules.schema_validation import validate_schema, validate_schema_chunked
+from quality_rules.regression_tests import compare_datasets, compare_datasets_chunked
+from validation_engine.streaming import stream_dataset
+
+def write_dataset(path, rows, seed=0):
+    rng = np.random.default_rng(seed)
+    dataset = pd.DataFrame({
+        'show_id': np.arange(rows),
+        'title': rng.choice(['A', 'B', 'C'], rows),
+        'director': rng.choice(['X', 'Y'], rows),
+        'release_year': rng.integers(1990, 2025, rows),
+        'popularity': rng.random(rows)
+    })
+    # Missing values only in the second half, so early chunks infer int64 and later ones float64
+    dataset['release_year'] = dataset['release_year'].astype('float64')
+    dataset.loc[dataset.index[rows // 2::7], 'release_year'] = np.nan
+    dataset.loc[dataset.index[::5], 'director'] = np.nan
+    dataset.to_csv(path, index=False)
+    return str(path)
+
+def test_chunked_matches_in_memory(tmp_path):
+    path = write_dataset(tmp_path / "movies.csv", 1000)
+    dataset = pd.read_csv(path)
+    chunks = lambda: pd.read_csv(path, chunksize=128)
+
+    # Missing value detection
+    pd.testing.assert_frame_equal(detect_missing_values_chunked(chunks()), detect_missing_values(dataset))
+
+    # Missing value handling
+    cleaned = pd.concat(handle_missing_values_chunked(chunks(), "Netflix Movies"))
+    pd.testing.assert_frame_equal(cleaned, handle_missing_values(dataset, "Netflix Movies"))
+
+    # Schema validation uses the dtypes of the full file, not of the first chunk
+    assert validate_schema_chunked(chunks(), {'release_year': 'float64', 'title': 'object'})
+    assert not validate_schema_chunked(chunks(), {'release_year': 'int64'})
+    assert validate_schema(dataset, {'release_year': 'float64', 'title': 'object'})
+
+def test_compare_datasets_chunked(tmp_path):
+    path_v1 = write_dataset(tmp_path / "movies_v1.csv", 1000)
+    path_v2 = write_dataset(tmp_path / "movies_v2.csv", 1000, seed=1)
+
+    for left, right in [(path_v1, path_v1), (path_v1, path_v2)]:
+        expected = compare_datasets(pd.read_csv(left), pd.read_csv(right))
+        assert compare_datasets_chunked(pd.read_csv(left, chunksize=100), pd.read_csv(right, chunksize=300)) == expected
+
+    # Dropping rows on one side shifts the index, which is a regression in both modes
+    cleaned = handle_missing_values(pd.read_csv(path_v1), "Netflix Movies")
+    cleaned_chunks = handle_missing_values_chunked(pd.read_csv(path_v1, chunksize=100), "Netflix Movies")
+    assert compare_datasets_chunked(pd.read_csv(path_v1, chunksize=100), cleaned_chunks) == compare_datasets(pd.read_csv(path_v1), cleaned)
+
+def test_stream_counts_nulls_once(tmp_path, monkeypatch):
+    path_v1, path_v2 = write_dataset(tmp_path / "movies_v1.csv", 1000), write_dataset(tmp_path / "movies_v2.csv", 1000, seed=1)
+    counted = []
+    update = NullProfile.update
+    monkeypatch.setattr(NullProfile, "update", lambda self, chunk: counted.append(len(chunk)) or update(self, chunk))
+
+    # Every chunk of both files is counted once: the cleaned chunks' profiles are derived, not counted again
+    streamed = stream_dataset("Netflix Movies", path_v2, path_v1, 128, ['popularity'])
+    assert sorted(counted) == [104] * 2 + [128] * 14
+    assert streamed.missing_values.equals(detect_missing_values(handle_missing_values(pd.read_csv(path_v2), "Netflix Movies"))['missing_count'])
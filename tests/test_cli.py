@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+from quality_rules import drift
+from quality_rules.schemas import NETFLIX_MOVIES_SCHEMA
+from validation_engine import cli
+from validation_engine.registry import get_rule
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_check_schema(tmp_path, capsys):
+    path = tmp_path / "movies.csv"
+    columns = list(NETFLIX_MOVIES_SCHEMA)
+    pd.DataFrame(columns=columns + ['extra']).to_csv(path, index=False)
+    assert cli.main(["check-schema", "netflix_movies_v1", "--path", str(path)]) == 0
+
+    # A missing column and a swapped pair are reported from the header alone
+    pd.DataFrame(columns=[columns[1], columns[0]] + columns[2:-1]).to_csv(path, index=False)
+    assert cli.main(["check-schema", "netflix_movies_v1", "--path", str(path)]) == 1
+    output = capsys.readouterr().out
+    assert f"Missing column '{columns[-1]}'" in output and "Columns out of order" in output
+
+    with pytest.raises(SystemExit):
+        cli.main(["check-schema", "netflix_movies_v1", "nyc_taxi_v1", "--path", str(path)])
+
+def test_cold_start(tmp_path):
+    # Parsing the arguments and checking a header import neither pandas nor scipy
+    path = tmp_path / "movies.csv"
+    path.write_text(",".join(NETFLIX_MOVIES_SCHEMA) + "\n")
+    code = ("import sys\nfrom validation_engine import cli\n"
+            f"status = cli.main(['check-schema', 'netflix_movies_v1', '--path', {str(path)!r}])\n"
+            "print(status, sorted(module for module in ('numpy', 'pandas', 'scipy') if module in sys.modules))")
+    output = subprocess.run([sys.executable, "-c", code], cwd=REPOSITORY, capture_output=True, text=True, check=True).stdout
+    assert output.splitlines()[-1] == "0 []"
+
+def test_get_rule():
+    assert get_rule("drift") is drift.test_drift
+    with pytest.raises(KeyError):
+        get_rule("freshness")
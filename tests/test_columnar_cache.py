@@ -0,0 +1,33 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from validation_engine.columnar_cache import load_columnar
+
+pytest.importorskip("pyarrow")
+
+def test_columnar_cache(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    path = str(tmp_path / "taxi.csv")
+    dataset = pd.DataFrame({
+        'VendorID': [1, 2, np.nan, 1],
+        'store_and_fwd_flag': ['N', None, 'Y', 'N'],
+        'passenger_count': [1, 2, 3, 4],
+        'fare_amount': [5.5, 7.0, 12.25, 3.0]
+    })
+    dataset.to_csv(path, index=False)
+
+    # The first load converts the CSV, the second one reads the Arrow file; both match read_csv
+    pd.testing.assert_frame_equal(load_columnar(path, cache_dir=cache_dir), pd.read_csv(path))
+    assert len([name for name in os.listdir(cache_dir) if name.endswith(".arrow")]) == 1
+    pd.testing.assert_frame_equal(load_columnar(path, cache_dir=cache_dir), pd.read_csv(path))
+
+    # Only the requested columns are returned
+    projected = load_columnar(path, ['fare_amount', 'VendorID'], cache_dir=cache_dir)
+    assert list(projected.columns) == ['fare_amount', 'VendorID']
+
+    # Changing the CSV content invalidates the cached conversion
+    dataset.assign(fare_amount=dataset['fare_amount'] * 2).to_csv(path, index=False)
+    os.utime(path, ns=(1, 1))
+    assert load_columnar(path, ['fare_amount'], cache_dir=cache_dir)['fare_amount'].tolist() == [11.0, 14.0, 24.5, 6.0]
+    assert len([name for name in os.listdir(cache_dir) if name.endswith(".arrow")]) == 1
@@ -0,0 +1,54 @@
+import os
+import pandas as pd
+import pytest
+from validation_engine.dataset_cache import DatasetCache
+
+def write_csv(path, rows):
+    pd.DataFrame({'show_id': range(rows), 'popularity': [float(i) for i in range(rows)]}).to_csv(path, index=False)
+    return str(path)
+
+def test_dataset_cache(tmp_path):
+    path = write_csv(tmp_path / "movies.csv", 100)
+    cache = DatasetCache(columnar_cache_dir=str(tmp_path / "cache"))
+
+    # The second load of the same file must be served from the cache
+    dataset = cache.load(path)
+    cache.load(path)
+    assert cache.stats()['misses'] == 1
+    assert cache.stats()['hits'] == 1
+
+    # Cached frames are read-only, but callers can still replace columns on their copy
+    with pytest.raises(ValueError):
+        dataset.loc[0, 'popularity'] = -1.0
+    dataset['popularity'] = dataset['popularity'].fillna(0)
+    assert cache.load(path).equals(dataset)
+
+    # The nulls of a cached frame are counted once
+    nulls = cache.null_profile(path)
+    assert cache.null_profile(path) is nulls and nulls.counts.equals(cache.load(path).isnull().sum())
+
+    # Rewriting the file changes its size/mtime, so it is parsed again
+    write_csv(path, 200)
+    os.utime(path, ns=(1, 1))
+    assert len(cache.load(path)) == 200
+    assert cache.null_profile(path) is not nulls and cache.null_profile(path).rows == 200
+    assert cache.stats()['misses'] == 2
+    assert cache.stats()['entries'] == 1
+
+def test_dataset_cache_eviction(tmp_path):
+    paths = [write_csv(tmp_path / f"data_{i}.csv", 1000) for i in range(3)]
+
+    # A budget of roughly one frame keeps only the most recently used dataset
+    cache = DatasetCache(memory_budget_mb=0.02, columnar_cache_dir=str(tmp_path / "cache"))
+    for path in paths:
+        cache.load(path)
+    assert cache.stats()['entries'] == 1
+    assert cache.stats()['evictions'] == 2
+
+    cache.load(paths[-1])
+    assert cache.stats()['hits'] == 1
+
+    # Clearing the cache also resets its counters
+    cache.clear()
+    assert cache.stats() == {'hits': 0, 'misses': 0, 'evictions': 0, 'entries': 0, 'memory_bytes': 0,
+                             'memory_budget_bytes': cache.memory_budget}
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+from scipy.stats import wasserstein_distance
+from quality_rules import drift
+from quality_rules.drift import drift_columns, stability_columns
+from quality_rules.profiles import build_profile
+from quality_rules.sketches import build_column_sketches
+from validation_engine import profile_store, validate
+from validation_engine.typed_ingest import columns_for_rules
+
+def test_drift_metrics():
+    rng = np.random.default_rng(0)
+    columns = {'fare': "numeric", 'payment': "categorical"}
+    data_v1 = pd.DataFrame({'fare': rng.exponential(10, 100000), 'payment': rng.choice(["card", "cash", "other"], 100000, p=[0.6, 0.3, 0.1])})
+    data_v2 = pd.DataFrame({'fare': rng.exponential(20, 80000), 'payment': rng.choice(["card", "cash", "other"], 80000, p=[0.3, 0.6, 0.1])})
+
+    # The same distributions do not drift, a shifted one does
+    same = drift.test_drift(data_v1, data_v1.sample(frac=0.5, random_state=0), columns)
+    assert same['passed'].all() and (same['psi'] < 0.01).all() and (same['chi2_p_value'] > 0.05).all()
+    drifted = drift.test_drift(data_v1, data_v2, columns)
+    assert not drifted['passed'].any() and (drifted['psi'] >= 0.2).all() and (drifted['chi2_p_value'] < 1e-6).all()
+    assert 0 < drifted.loc['fare', 'js'] < 1 and np.isnan(drifted.loc['payment', 'wasserstein'])
+
+    # The Wasserstein-1 distance from the histograms is close to the exact one
+    exact = wasserstein_distance(data_v1['fare'], data_v2['fare'])
+    assert abs(drifted.loc['fare', 'wasserstein'] - exact) <= 0.05 * exact
+
+    # A baseline profile and quantile sketches of the new version give about the same metrics
+    profile = build_profile([data_v1.iloc[:50000], data_v1.iloc[50000:]], ['fare'])
+    sketches = build_column_sketches([data_v2], ['fare'], 400)
+    from_summaries = drift.test_drift(profile, {**sketches, 'payment': data_v2['payment'].value_counts()}, columns)
+    assert abs(from_summaries.loc['fare', 'psi'] - drifted.loc['fare', 'psi']) <= 0.02
+    assert abs(from_summaries.loc['fare', 'wasserstein'] - exact) <= 0.05 * exact
+    assert from_summaries.loc['payment', 'psi'] == drifted.loc['payment', 'psi']
+    assert from_summaries.loc['fare', 'rank_error'] > 0 and drifted['rank_error'].eq(0).all()
+
+    # Histograms binned chunk by chunk at the baseline's edges are those of the whole version
+    baseline = drift.build_histograms(profile, {'fare': "numeric"})
+    streamed = {}
+    for start in range(0, 80000, 30000):
+        drift.update_histograms(streamed, data_v2.iloc[start:start + 30000], baseline)
+    whole = drift.build_histograms(data_v2, {'fare': "numeric"}, baseline)
+    assert streamed['fare']['counts'].equals(whole['fare']['counts']) and np.allclose(streamed['fare']['sums'], whole['fare']['sums'])
+
+    # Too few values is not a pass
+    assert not drift.test_drift(data_v1, data_v2.head(5), columns)['passed'].any()
+
+def test_drift_columns():
+    # Per-dataset columns resolved against the schema: numeric codes are compared as categories
+    assert drift_columns("nyc_taxi") == {'trip_distance': "numeric", 'fare_amount': "numeric", 'tip_amount': "numeric",
+                                         'total_amount': "numeric", 'passenger_count': "numeric", 'payment_type': "categorical"}
+    assert stability_columns("nyc_taxi") == ['trip_distance', 'fare_amount', 'tip_amount', 'total_amount', 'passenger_count']
+    assert drift_columns("netflix_movies")['language'] == "categorical"
+    assert stability_columns("unregistered") == ['release_year', 'vote_average', 'popularity']
+    assert 'payment_type' in columns_for_rules("nyc_taxi", ["drift"]) and 'payment_type' not in columns_for_rules("nyc_taxi", ["stability"])
+
+def test_drift_report_modes(tmp_path, monkeypatch, register_datasets):
+    # Streamed and in-memory runs report the same drift, whatever the stability method and baseline
+    monkeypatch.chdir(tmp_path)
+    rng = np.random.default_rng(0)
+    for name, scale in (("movies_v1.csv", 10), ("movies_v2.csv", 12)):
+        pd.DataFrame({'show_id': np.arange(5000), 'release_year': rng.integers(1990, 2025, 5000),
+                      'vote_average': rng.integers(0, 100, 5000) / 10, 'popularity': rng.exponential(scale, 5000)}).to_csv(name, index=False)
+    register_datasets({"movies_v1": "movies_v1.csv", "movies_v2": "movies_v2.csv"})
+
+    def drift_checks(**options):
+        result = validate.validate_dataset("movies_v2", "movies_v2.csv", use_cache=False, incremental=False, **options)
+        return [check for check in result['checks'] if check[0].startswith("Drift")]
+
+    expected = drift_checks(chunksize=None, stability_method="exact")
+    assert len(expected) == 3 and "approximate" not in str(expected)
+    for method in ("exact", "sketch", "sample"):
+        assert drift_checks(chunksize=None, stability_method=method) == expected
+        assert drift_checks(chunksize=700, stability_method=method) == expected
+    monkeypatch.setattr(validate, "BASELINE_PROFILES", False)
+    assert drift_checks(chunksize=700, stability_method="sketch") == expected
+
+    # A baseline profile without the values bins v1 from its sketch: the metrics are labelled approximate
+    monkeypatch.setattr(validate, "BASELINE_PROFILES", True)
+    monkeypatch.setattr(profile_store, "BASELINE_PROFILE_EXACT", False)
+    approximate = drift_checks(chunksize=None, stability_method="sketch")
+    assert drift_checks(chunksize=700, stability_method="sketch") == approximate
+    assert all("approximate: quantile sketch rank error" in check for check, _ in approximate)
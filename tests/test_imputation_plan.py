@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+from quality_rules.missing_handle import compile_imputation_plan, handle_missing_values, handle_missing_values_chunked, policy_key
+
+def test_imputation_plan():
+    assert policy_key("Netflix Movies") == policy_key("netflix_movies_v2") == "netflix_movies"
+    assert policy_key("NYC Taxi Trip Data") == "nyc_taxi"
+
+    dataset = pd.DataFrame({
+        'VendorID': [1.0, np.nan, 2.0, np.nan],
+        'store_and_fwd_flag': pd.Categorical(['N', 'Y', None, None]),
+        'passenger_count': [np.nan, 2.0, 1.0, np.nan],
+        'trip_distance': [1.5, 2.0, 3.0, np.nan],
+        'ehail_fee': np.nan
+    })
+    original = dataset.copy()
+
+    # The last row has all of its values missing (> 35%) and is dropped, the others are imputed
+    changes = {}
+    cleaned = handle_missing_values(dataset, "nyc_taxi_v2", changes=changes)
+    assert list(cleaned.columns) == ['VendorID', 'store_and_fwd_flag', 'passenger_count', 'trip_distance']
+    assert list(cleaned['VendorID']) == [1, -1, 2] and str(cleaned['VendorID'].dtype) == 'Int64'
+    assert list(cleaned['store_and_fwd_flag']) == ['N', 'Y', 'Unknown']
+    assert list(cleaned['passenger_count']) == [0, 2, 1]
+    assert changes == {
+        'drop column ehail_fee': 4, 'drop rows over 35% missing': 4, 'fill VendorID with -1': 1,
+        'fill passenger_count with 0': 1, "fill store_and_fwd_flag with 'Unknown'": 1,
+        'cast VendorID to Int64': 3, 'cast passenger_count to Int64': 3
+    }
+    pd.testing.assert_frame_equal(dataset, original)
+
+    # Casts follow the schema the plan is compiled against (e.g. the storage dtypes of typed ingest)
+    plan = compile_imputation_plan("nyc_taxi_v2", {'VendorID': 'Int8', 'passenger_count': 'Int8'})
+    assert str(plan.apply(dataset)['VendorID'].dtype) == 'Int8'
+
+    # Chunks are cleaned like the full dataset and their counts add up
+    chunk_changes = {}
+    cleaned_chunks = pd.concat(handle_missing_values_chunked([dataset.iloc[:2], dataset.iloc[2:]], "nyc_taxi_v2", changes=chunk_changes))
+    pd.testing.assert_frame_equal(cleaned_chunks, cleaned)
+    assert chunk_changes == changes
+
+def test_imputation_plan_copy_on_write():
+    dataset = pd.DataFrame({
+        'VendorID': [1.0, np.nan, 2.0],
+        'store_and_fwd_flag': pd.array(['N', 'Y', None], dtype='string[pyarrow]'),
+        'congestion_surcharge': [np.nan, 2.5, 0.0],
+        'trip_distance': [1.5, 2.0, 3.0]
+    })
+
+    # Copy-on-write is on inside the plan only: the untouched columns are shared with the input, not copied
+    with pd.option_context("mode.copy_on_write", False):
+        cleaned = compile_imputation_plan("nyc_taxi_v2").apply(dataset)
+        assert not pd.get_option("mode.copy_on_write")
+    assert np.shares_memory(cleaned['trip_distance'].to_numpy(), dataset['trip_distance'].to_numpy())
+    assert list(cleaned['store_and_fwd_flag']) == ['N', 'Y', 'Unknown'] and str(cleaned['store_and_fwd_flag'].dtype) == 'string'
+    assert list(cleaned['congestion_surcharge']) == [0.0, 2.5, 0.0] and dataset['congestion_surcharge'].isna().sum() == 1
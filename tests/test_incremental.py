@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+from validation_engine.config import DATASETS_PATH
+from validation_engine.incremental import incremental_profiles
+from validation_engine.validate import validate_dataset
+from quality_rules.profiles import build_profile
+
+def _rows(start, stop, rng):
+    return pd.DataFrame({'show_id': range(start, stop), 'release_year': rng.integers(1990, 2025, stop - start),
+                         'vote_average': rng.uniform(0, 10, stop - start).round(1), 'popularity': rng.exponential(10, stop - start)})
+
+def test_incremental_profiles(tmp_path):
+    rng = np.random.default_rng(0)
+    path = str(tmp_path / "trips.csv")
+    checkpoints = str(tmp_path / "checkpoints")
+    dataset = _rows(0, 1000, rng)
+    dataset.loc[::5, 'popularity'] = np.nan
+    dataset.to_csv(path, index=False)
+    first = incremental_profiles("trips", path, checkpoint_dir=checkpoints, chunksize=300)
+    assert first['full_scan'] and first['rows_parsed'] == 1000
+
+    # Appended rows are parsed alone, and the aggregates match a full scan of the grown file
+    appended = _rows(1000, 1500, rng)
+    appended.to_csv(path, mode='a', header=False, index=False)
+    second = incremental_profiles("trips", path, checkpoint_dir=checkpoints, chunksize=300)
+    full = build_profile([pd.read_csv(path)], ['release_year', 'vote_average', 'popularity'], exact=True)
+    assert not second['full_scan'] and second['rows_parsed'] == 500
+    assert second['cleaned'].rows == 1500 and second['cleaned'].missing.equals(full.missing)
+    assert second['raw'].digest == full.digest and np.array_equal(second['raw'].values('popularity'), full.values('popularity'))
+    assert incremental_profiles("trips", path, checkpoint_dir=checkpoints)['rows_parsed'] == 0
+
+    # A truncated or rewritten file is scanned again from the start
+    dataset.to_csv(path, index=False)
+    assert incremental_profiles("trips", path, checkpoint_dir=checkpoints)['full_scan']
+    pd.concat([dataset.assign(popularity=1.0), appended]).to_csv(path, index=False)
+    rewritten = incremental_profiles("trips", path, checkpoint_dir=checkpoints)
+    assert rewritten['full_scan'] and rewritten['cleaned'].rows == 1500 and rewritten['cleaned'].missing['popularity'] == 0
+
+    # A last row without its newline may be cut: the file is scanned again once it grows
+    with open(path, 'a') as trips:
+        trips.write("1500,2001,5.0,3")
+    assert incremental_profiles("trips", path, checkpoint_dir=checkpoints)['rows_parsed'] == 1
+    with open(path, 'a') as trips:
+        trips.write(".5\n")
+    completed = incremental_profiles("trips", path, checkpoint_dir=checkpoints)
+    assert completed['full_scan'] and completed['raw'].maximum['popularity'] == max(3.5, appended['popularity'].max())
+
+def test_validate_incremental(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    rng = np.random.default_rng(1)
+    _rows(0, 2000, rng).to_csv("movies_v1.csv", index=False)
+    _rows(0, 2000, rng).to_csv("movies_v2.csv", index=False)
+    monkeypatch.setitem(DATASETS_PATH, "movies_v1", "movies_v1.csv")
+    monkeypatch.setitem(DATASETS_PATH, "movies_v2", "movies_v2.csv")
+
+    # The same checks as a full validation, before and after rows are appended
+    for _ in range(2):
+        expected = validate_dataset("movies_v2", "movies_v2.csv", use_cache=False)
+        result = validate_dataset("movies_v2", "movies_v2.csv", use_cache=False, incremental=True)
+        assert result['error'] is None and result['checks'] == expected['checks']
+        assert result['missing_values'].equals(expected['missing_values'])
+        _rows(2000, 2500, rng).to_csv("movies_v2.csv", mode='a', header=False, index=False)
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+from quality_rules.missing_values import NullProfile, null_profile, detect_missing_values
+from quality_rules.missing_handle import compile_imputation_plan
+
+def make_dataset(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'show_id': np.arange(rows),
+        'director': np.where(rng.random(rows) < 0.3, None, 'X'),
+        'country': np.where(rng.random(rows) < 0.5, None, 'US'),
+        'popularity': np.where(rng.random(rows) < 0.2, np.nan, rng.random(rows))
+    })
+
+def test_null_profile():
+    dataset = make_dataset(1000)
+    mask = dataset.isnull().to_numpy()
+
+    # Same counts as isnull()
+    profile = null_profile(dataset)
+    assert profile.counts.equals(dataset.isnull().sum())
+    assert np.array_equal(profile.row_null_counts(), mask.sum(axis=1))
+    assert np.allclose(profile.row_null_fractions(), mask.mean(axis=1))
+    co_missing = profile.co_missing()
+    assert list(co_missing.columns) == ['director', 'country', 'popularity']
+    assert np.array_equal(co_missing.to_numpy(), mask[:, 1:].T.astype(int) @ mask[:, 1:].astype(int))
+    assert detect_missing_values(dataset)['missing_count'].equals(profile.counts)
+
+    # Chunk profiles merge into the profile of the whole dataset
+    merged = NullProfile().update(dataset.iloc[:333]).merge(NullProfile().update(dataset.iloc[333:]))
+    assert merged.counts.equals(profile.counts)
+    assert co_missing.equals(merged.co_missing())
+
+    # The cleaned dataset gets a profile derived from the raw one, equal to counting it again
+    cleaned, nulls = compile_imputation_plan("netflix_movies_v2").apply_profiled(dataset, nulls=profile)
+    assert nulls.counts.equals(cleaned.isnull().sum())
+    assert np.array_equal(nulls.row_null_counts(), cleaned.isnull().to_numpy().sum(axis=1))
+
+def test_null_profile_mutation():
+    # Counts follow a frame modified in place, by column assignment or by cell
+    dataset = make_dataset(100)
+    assert detect_missing_values(dataset)['missing_count']['popularity'] > 0
+    dataset['popularity'] = dataset['popularity'].fillna(0)
+    assert detect_missing_values(dataset)['missing_count']['popularity'] == 0
+    dataset.loc[0, 'popularity'] = None
+    assert detect_missing_values(dataset)['missing_count']['popularity'] == 1
+    assert null_profile(dataset).counts.equals(dataset.isnull().sum())
@@ -0,0 +1,45 @@
+import pytest
+from benchmarks.synthetic import write_dataset
+from validation_engine.config import DATASETS_PATH
+from validation_engine import validate
+from validation_engine import polars_backend
+
+pl = pytest.importorskip("polars")
+
+def test_backends_conform(tmp_path, monkeypatch, register_datasets):
+    monkeypatch.chdir(tmp_path)
+    for dataset_key, drift in [("netflix_movies", 0.0), ("nyc_taxi", 0.5)]:
+        write_dataset(f"{dataset_key}_v1.csv", dataset_key, 3000, seed=1, null_rate=0.1)
+        write_dataset(f"{dataset_key}_v2.csv", dataset_key, 3000, seed=2, null_rate=0.1, drift=drift)
+    register_datasets({f"{dataset_key}_{version}": f"{dataset_key}_{version}.csv"
+                       for dataset_key in ("netflix_movies", "nyc_taxi") for version in ("v1", "v2")})
+    # Baseline profiles pool the rare categories of the drift tables: compare the two backends on the same data
+    monkeypatch.setattr(validate, "BASELINE_PROFILES", False)
+
+    # Same PASS/FAIL for every check (and the same labels and missing value counts)
+    for dataset_name, dataset_path in DATASETS_PATH.items():
+        expected = validate.validate_dataset(dataset_name, dataset_path, use_cache=False, backend="pandas")
+        result = validate.validate_dataset(dataset_name, dataset_path, use_cache=False, backend="polars")
+        assert result['error'] is None and expected['error'] is None
+        assert result['checks'] == expected['checks']
+        assert result['missing_values'].equals(expected['missing_values'])
+    assert not all(passed for _, passed in result['checks'])
+
+def test_polars_rules(tmp_path):
+    path = tmp_path / "taxi.csv"
+    path.write_text("VendorID,lpep_pickup_datetime,trip_distance\n2.0,2021-01-01 00:15:56,NaN\n,2021-01-01 00:25:59,1.5\n")
+    frame = pl.read_csv(path, schema_overrides={'VendorID': pl.Float64}, null_values=polars_backend.NA_VALUES)
+
+    # read_csv's missing value strings are nulls, every schema violation is reported
+    assert list(polars_backend.null_counts(frame)) == [1, 0, 1]
+    assert not polars_backend.validate_schema(frame, {'VendorID': 'Int8', 'trip_distance': 'float64', 'passenger_count': 'Int8'})
+    assert polars_backend.validate_schema(frame.with_columns(pl.col('VendorID').cast(pl.Int8)), {'VendorID': 'Int8', 'trip_distance': 'float64'})
+
+    # Rows are matched on their key, whatever the row order and the storage dtypes
+    movies = pl.DataFrame({'show_id': ["a", "b", "b", None], 'title': ["x", "y", "z", "w"], 'release_year': [2000, 2001, 2002, 2003]})
+    reordered = movies.reverse().with_columns(pl.col('release_year').cast(pl.Int16))
+    assert polars_backend.compare_datasets(movies, reordered)
+    assert not polars_backend.compare_datasets(movies, reordered.with_columns(pl.col('title').str.to_uppercase()))
+    uniqueness = polars_backend.find_duplicate_keys(movies)
+    assert (uniqueness['duplicate_keys'], uniqueness['duplicate_rows'], uniqueness['null_keys']) == (1, 1, 1)
+    assert list(uniqueness['sample_keys']['show_id']) == ["b"] and list(uniqueness['samples']) == [1]
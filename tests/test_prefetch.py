@@ -0,0 +1,56 @@
+import threading
+import time
+import pandas as pd
+import pytest
+from validation_engine.dataset_cache import DatasetCache
+from validation_engine.prefetch import prefetch
+
+def test_prefetch():
+    produced = []
+    def items():
+        for i in range(6):
+            produced.append(i)
+            yield i
+
+    # Items come in order, with at most `depth` of them produced ahead of the one being consumed
+    for i, item in enumerate(prefetch(items(), depth=2)):
+        assert item == i
+        time.sleep(0.02)
+        assert len(produced) <= i + 3
+    assert list(prefetch(items(), depth=0)) == list(range(6))
+
+    # Errors of the producer are raised at the item where they occurred
+    def failing():
+        yield 1
+        raise ValueError("bad chunk")
+    consumed = []
+    with pytest.raises(ValueError, match="bad chunk"):
+        for item in prefetch(failing(), depth=1):
+            consumed.append(item)
+    assert consumed == [1]
+
+    # Closing the iterator early stops the producer
+    closed = threading.Event()
+    def endless():
+        try:
+            while True:
+                yield 0
+        finally:
+            closed.set()
+    iterator = prefetch(endless(), depth=1)
+    next(iterator)
+    iterator.close()
+    assert closed.wait(1)
+
+def test_dataset_cache_single_parse(tmp_path):
+    path = tmp_path / "movies.csv"
+    pd.DataFrame({'show_id': range(1000), 'popularity': 1.5}).to_csv(path, index=False)
+    cache = DatasetCache(columnar_cache_dir=str(tmp_path / "cache"))
+
+    # A file requested by several threads at once is parsed once
+    threads = [threading.Thread(target=cache.load, args=(str(path),)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert (cache.misses, cache.hits) == (1, 3)
@@ -0,0 +1,38 @@
+import pandas as pd
+import pytest
+from quality_rules.schema_validation import schema_violations, validate_schema
+from validation_engine.preflight import preflight_schema
+
+SCHEMA = {'show_id': 'object', 'release_year': 'Int16', 'date_added': 'datetime64[ns]', 'popularity': 'float64', 'vote_count': 'int64'}
+
+def test_preflight_schema(tmp_path):
+    dataset = pd.DataFrame({'show_id': ["s1", "s2", "s3"], 'release_year': [2001, 2002, 2003],
+                            'date_added': ["2020-01-01", "2020-02-01", "2020-03-01"],
+                            'popularity': [1.5, 2.5, 3.5], 'vote_count': [1, 2, 3], 'extra': ["a", "b", "c"]})
+    path = tmp_path / "movies.csv"
+    dataset.to_csv(path, index=False)
+    result = preflight_schema(str(path), SCHEMA)
+    assert result['passed'] and result['sample_rows'] == 3 and result['violations'] == []
+
+    # A renamed column, two unparseable columns and a swapped pair are all reported in one pass
+    broken = dataset.rename(columns={'vote_count': 'votes'}).assign(release_year=["2001", "unknown", "2003"], popularity=["1.5", "high", "3"])
+    broken[['popularity', 'date_added'] + [column for column in broken.columns if column not in ('popularity', 'date_added')]].to_csv(path, index=False)
+    result = preflight_schema(str(path), SCHEMA, sample_rows=2)
+    assert not result['passed'] and result['sample_rows'] == 2
+    assert [(violation['column'], violation['check']) for violation in result['violations']] == [
+        ('release_year', 'parse'), ('popularity', 'parse'), ('vote_count', 'missing'), (None, 'order')]
+
+def test_preflight_parquet(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = str(tmp_path / "movies.parquet")
+    pd.DataFrame({'show_id': ["s1"], 'release_year': [2001], 'popularity': ["high"]}).to_parquet(path)
+    result = preflight_schema(path, SCHEMA)
+    assert [(violation['column'], violation['check']) for violation in result['violations']] == [
+        ('date_added', 'missing'), ('popularity', 'parse'), ('vote_count', 'missing')]
+
+def test_schema_violations():
+    dataset = pd.DataFrame({'show_id': ["s1"], 'release_year': [2001.0]})
+    violations = schema_violations(dataset, {'show_id': 'object', 'release_year': 'int64', 'popularity': 'float64'})
+    assert [(violation['column'], violation['check'], violation['found']) for violation in violations] == [
+        ('release_year', 'dtype', 'float64'), ('popularity', 'missing', None)]
+    assert not validate_schema(dataset, {'show_id': 'object', 'release_year': 'int64'})
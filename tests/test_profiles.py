@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+from quality_rules import stability_tests
+from quality_rules.profiles import DatasetProfile, build_profile
+from quality_rules.regression_tests import ChunkedComparison, compare_datasets
+from quality_rules.sketches import build_column_sketches
+from validation_engine import profile_store, validate
+from validation_engine.profile_store import get_baseline_profile
+
+def make_dataset(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'show_id': np.arange(rows),
+        'title': rng.choice(['A', 'B', 'C'], rows),
+        'rating': rng.choice(['PG', 'R'], rows),
+        'release_year': rng.integers(1990, 2025, rows),
+        'popularity': rng.random(rows),
+        'date_added': pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 1000, rows), unit='D')
+    })
+
+def test_profile_round_trip(tmp_path):
+    dataset = make_dataset(5000)
+    dataset.loc[::7, 'popularity'] = np.nan
+    profile = build_profile([dataset.iloc[start:start + 1000] for start in range(0, 5000, 1000)], ['release_year', 'popularity'], exact=True)
+    profile.save(str(tmp_path / "movies_v1"))
+    loaded = DatasetProfile.load(str(tmp_path / "movies_v1"))
+
+    assert loaded.rows == 5000 and loaded.columns == list(dataset.columns)
+    assert loaded.digest == profile.digest == build_profile([dataset.sample(frac=1, random_state=1)]).digest
+    assert loaded.missing.equals(dataset.isnull().sum())
+    assert loaded.minimum['date_added'] == dataset['date_added'].min()
+    assert loaded.maximum['release_year'] == dataset['release_year'].max()
+    assert loaded.top_values('rating').to_dict() == dataset['rating'].value_counts().to_dict()
+    assert np.array_equal(loaded.values('popularity'), np.sort(dataset['popularity'].dropna()))
+    assert loaded.sketches['popularity'].n == dataset['popularity'].count()
+
+    # Profiles of consecutive shards merge into the profile of the whole dataset
+    merged = build_profile([dataset.iloc[:2000]], ['popularity'], exact=True).merge(build_profile([dataset.iloc[2000:]], ['popularity'], exact=True))
+    assert merged.digest == profile.digest
+    assert merged.missing.equals(profile.missing)
+    assert np.array_equal(merged.records(), profile.records())
+
+    # By default only the digests, statistics and sketches are kept, whatever the number of rows
+    summary = build_profile([dataset.iloc[:2000]], ['popularity']).merge(build_profile([dataset.iloc[2000:]], ['popularity']))
+    assert summary.record_hash_sum == profile.record_hash_sum and summary.digest == profile.digest
+    summary.save(str(tmp_path / "summary"))
+    assert sorted(path.name for path in (tmp_path / "summary").iterdir()) == ["profile.json"]
+    with pytest.raises(ValueError):
+        DatasetProfile.load(str(tmp_path / "summary")).values('popularity')
+
+def test_profile_as_baseline(tmp_path, monkeypatch):
+    dataset_v1 = make_dataset(3000)
+    dataset_v2 = pd.concat([dataset_v1.drop(index=[5]), make_dataset(2).assign(show_id=[-1, -2])], ignore_index=True)
+    dataset_v2.loc[dataset_v2['show_id'] == 100, 'title'] = 'Z'
+    dataset_v2['popularity'] = dataset_v2['popularity'] ** 2
+
+    # A stored baseline profile gives the same regression and stability results as the baseline data
+    path = str(tmp_path / "movies_v1.csv")
+    dataset_v1.to_csv(path, index=False)
+    baseline = get_baseline_profile("movies_v1", path, {'parse_dates': ['date_added']}, str(tmp_path / "profiles"))
+    assert get_baseline_profile("movies_v1", path, {'parse_dates': ['date_added']}, str(tmp_path / "profiles")).digest == baseline.digest
+
+    dataset_v1 = pd.read_csv(path, parse_dates=['date_added'])
+    assert baseline.exact and compare_datasets(baseline, dataset_v1)
+    assert not compare_datasets(baseline, dataset_v2)
+
+    columns = ['release_year', 'popularity']
+    expected = stability_tests.test_statistical_stability_batch(dataset_v1, dataset_v2, columns)
+    stability = stability_tests.test_statistical_stability_batch(baseline, dataset_v2, columns)
+    pd.testing.assert_frame_equal(stability, expected)
+    assert list(stability['passed']) == [True, False]
+
+    # A profile that is not exact detects the same regressions from the digest of its rows
+    monkeypatch.setattr(profile_store, "BASELINE_PROFILE_EXACT", False)
+    baseline = get_baseline_profile("movies_v1", path, {'parse_dates': ['date_added']}, str(tmp_path / "profiles"))
+    assert not baseline.exact
+    assert compare_datasets(baseline, dataset_v1.iloc[::-1])
+    assert not compare_datasets(baseline, dataset_v2)
+    for dataset, passed in ((dataset_v1, True), (dataset_v2, False)):
+        comparison = ChunkedComparison()
+        comparison.use_baseline(baseline)
+        for start in range(0, len(dataset), 1000):
+            comparison.update(1, dataset.iloc[start:start + 1000])
+        assert comparison.result() == passed
+
+    # and the same stability results from its quantile sketches
+    sketches_v2 = build_column_sketches([dataset_v2], columns, baseline.sketch_k)
+    assert [stability_tests.test_statistical_stability_sketch(baseline.sketches[column], sketches_v2[column], column)
+            for column in columns] == [True, False]
+
+def test_inexact_baseline_keeps_method(tmp_path, monkeypatch, register_datasets):
+    # The stability method asked for is the one that runs: a profile without the values reads v1 again
+    monkeypatch.chdir(tmp_path)
+    for name, seed in (("movies_v1.csv", 0), ("movies_v2.csv", 1)):
+        make_dataset(3000, seed).assign(vote_average=lambda dataset: (dataset['popularity'] * 10).round(1)).to_csv(name, index=False)
+    register_datasets({"movies_v1": "movies_v1.csv", "movies_v2": "movies_v2.csv"})
+    expected = validate.validate_dataset("movies_v2", "movies_v2.csv", stability_method="exact", use_cache=False)
+    monkeypatch.setattr(profile_store, "BASELINE_PROFILE_EXACT", False)
+    result = validate.validate_dataset("movies_v2", "movies_v2.csv", stability_method="exact", use_cache=False)
+    assert result['error'] is None and result['checks'] == expected['checks']
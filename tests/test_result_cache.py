@@ -0,0 +1,80 @@
+import os
+import numpy as np
+import pandas as pd
+from validation_engine.config import DATASETS_PATH
+from validation_engine import result_cache, validate
+from validation_engine.result_cache import ResultCache, dataset_nodes, node_key, affected_datasets
+
+def _datasets(tmp_path, monkeypatch, register_datasets):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "reports").mkdir()
+    (tmp_path / "logs").mkdir()
+    rng = np.random.default_rng(0)
+    dataset_v1 = pd.DataFrame({'show_id': range(1000), 'release_year': rng.integers(1990, 2025, 1000),
+                               'vote_average': rng.uniform(0, 10, 1000).round(1), 'popularity': rng.exponential(10, 1000)})
+    dataset_v1.to_csv("movies_v1.csv", index=False)
+    dataset_v1.assign(popularity=dataset_v1['popularity'] * 2).to_csv("movies_v2.csv", index=False)
+    register_datasets({"movies_v1": "movies_v1.csv", "movies_v2": "movies_v2.csv"})
+    return dataset_v1
+
+def test_result_cache(tmp_path, monkeypatch, register_datasets):
+    dataset_v1 = _datasets(tmp_path, monkeypatch, register_datasets)
+    cache = ResultCache(str(tmp_path / "results"))
+    monkeypatch.setattr(validate, "get_result_cache", lambda: cache)
+
+    first = validate.validate_dataset("movies_v2", "movies_v2.csv")
+    assert cache.stats() == {'hits': 0, 'misses': 1, 'evictions': 0}
+    second = validate.validate_dataset("movies_v2", "movies_v2.csv")
+    assert cache.hits == 10 and second['checks'] == first['checks'] and second['missing_values'].equals(first['missing_values'])
+
+    # Keys follow the content of the inputs, not their mtime, and each check has its own inputs
+    keys = {node['name']: node_key(node) for node in dataset_nodes("movies_v2", "exact")}
+    os.utime("movies_v1.csv", (0, 0))
+    assert keys == {node['name']: node_key(node) for node in dataset_nodes("movies_v2", "exact")}
+    dataset_v1.assign(show_id=dataset_v1['show_id'] + 1).to_csv("movies_v1.csv", index=False)
+    changed = {node['name'] for node in dataset_nodes("movies_v2", "exact") if node_key(node) != keys[node['name']]}
+    assert changed == {"regression", "stability:release_year", "stability:vote_average", "stability:popularity",
+                       "drift:release_year", "drift:vote_average", "drift:popularity"}
+    keys = {node['name']: node_key(node) for node in dataset_nodes("movies_v2", "exact")}
+    changed = {node['name'] for node in dataset_nodes("movies_v2", "sketch") if node_key(node) != keys[node['name']]}
+    assert changed == {"stability:release_year", "stability:vote_average", "stability:popularity"}
+
+    # So do the baseline settings the comparisons read v1 through
+    monkeypatch.setattr(result_cache, "BASELINE_PROFILE_EXACT", False)
+    changed = {node['name'] for node in dataset_nodes("movies_v2", "sketch") if node_key(node) != keys[node['name']]}
+    assert changed == {"regression", "stability:release_year", "stability:vote_average", "stability:popularity",
+                       "drift:release_year", "drift:vote_average", "drift:popularity"}
+    monkeypatch.setattr(result_cache, "BASELINE_PROFILES", False)
+    assert {node['name']: node_key(node) for node in dataset_nodes("movies_v2", "exact")}['missing'] == keys['missing']
+    assert {node['name']: node_key(node) for node in dataset_nodes("movies_v2", "exact")}['regression'] != keys['regression']
+    assert affected_datasets(["movies_v1.csv"], DATASETS_PATH, "exact") == ["movies_v1", "movies_v2"]
+    assert affected_datasets([str(tmp_path / "movies_v2.csv")], DATASETS_PATH, "exact") == ["movies_v2"]
+
+    # Least recently used entries are evicted over the size budget
+    small = ResultCache(str(tmp_path / "small"), max_mb=250 / 1024 / 1024)
+    for i in range(5):
+        small.put(f"key{i}", [["Regression test", True]] * 3)
+        os.utime(small._path(f"key{i}"), ns=(i, i))
+    assert small.get("key0") is None and small.get("key4") is not None and small.evictions > 0
+
+def test_watch(tmp_path, monkeypatch, register_datasets):
+    _datasets(tmp_path, monkeypatch, register_datasets)
+    monkeypatch.setattr(validate, "get_result_cache", lambda cache=ResultCache(str(tmp_path / "results")): cache)
+    validated = []
+    validate_dataset = validate.validate_dataset
+    monkeypatch.setattr(validate, "validate_dataset", lambda name, *args: validated.append(name) or validate_dataset(name, *args))
+
+    # The v2 file is rewritten between two scans: only its dataset is validated again
+    def sleep(interval):
+        pd.read_csv("movies_v1.csv").to_csv("movies_v2.csv", index=False)
+    monkeypatch.setattr(validate.time, "sleep", sleep)
+    validate.watch(interval=0, max_scans=1)
+    assert validated == ["movies_v1", "movies_v2", "movies_v2"]
+    report = (tmp_path / "reports" / "validation_report.txt").read_text()
+    assert report.count("Statistical stability for column popularity: PASSED") == 2
+
+    # Shard lists and glob patterns are watched file by file
+    monkeypatch.setitem(DATASETS_PATH, "movies_v1", ["movies_v1.csv"])
+    monkeypatch.setitem(DATASETS_PATH, "movies_v2", "movies_v2*.csv")
+    assert validate._watched_files() == {"movies_v1.csv", "movies_v2.csv"}
+    assert affected_datasets(["movies_v2.csv"], DATASETS_PATH, "exact") == ["movies_v2"]
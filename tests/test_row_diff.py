@@ -0,0 +1,65 @@
+import os
+import numpy as np
+import pandas as pd
+from quality_rules.row_diff import RowDiff
+from quality_rules.regression_tests import compare_datasets, compare_datasets_chunked
+
+def make_dataset(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'show_id': np.arange(rows),
+        'title': rng.choice(['A', 'B', 'C'], rows),
+        'rating': rng.choice(['PG', 'R'], rows),
+        'release_year': rng.integers(1990, 2025, rows),
+        'popularity': rng.random(rows)
+    })
+
+def test_row_diff_counts(tmp_path):
+    dataset_v1 = make_dataset(10000)
+
+    # Reordered rows with the same keys are not a regression
+    assert compare_datasets(dataset_v1, dataset_v1.sample(frac=1, random_state=0))
+
+    # Two rows removed, three added, one title changed (the key data columns are compared)
+    dataset_v2 = pd.concat([dataset_v1.drop(index=[10, 20]), make_dataset(3).assign(show_id=[-1, -2, -3])], ignore_index=True)
+    dataset_v2.loc[dataset_v2['show_id'] == 500, 'title'] = 'Z'
+    dataset_v2.loc[dataset_v2['show_id'] == 600, 'popularity'] = -1.0
+    assert not compare_datasets(dataset_v1, dataset_v2)
+
+    # Spilling to disk in small partitions gives the same diff as keeping everything in memory
+    for spill_dir in [None, str(tmp_path / "spill")]:
+        row_diff = RowDiff(['show_id'], ['title', 'rating', 'release_year'], spill_dir, partitions=8, max_rows_in_memory=1500)
+        for version, dataset in enumerate([dataset_v1, dataset_v2]):
+            for start in range(0, len(dataset), 1000):
+                row_diff.update(version, dataset.iloc[start:start + 1000])
+        result = row_diff.result()
+        assert (result['added'], result['removed'], result['changed'], result['unchanged']) == (3, 2, 1, 9997)
+        assert list(result['samples']['removed']) == [10, 20]
+        assert list(result['samples']['changed_v1']) == [500]
+
+        # Sample rows are read back by row id
+        row_diff.collect_samples(0, [dataset_v1])
+        assert list(row_diff.sample_rows[0]['show_id']) == [10, 20, 500]
+    assert os.listdir(tmp_path / "spill") == []
+
+def test_row_diff_chunked_composite_key(tmp_path):
+    rng = np.random.default_rng(0)
+    trips = pd.DataFrame({
+        'VendorID': rng.choice([1.0, 2.0, np.nan], 2000),
+        'lpep_pickup_datetime': pd.date_range('2021-01-01', periods=2000, freq='min').astype(str),
+        'lpep_dropoff_datetime': pd.date_range('2021-01-01 00:10', periods=2000, freq='min').astype(str),
+        'PULocationID': rng.integers(1, 265, 2000),
+        'DOLocationID': rng.integers(1, 265, 2000),
+        'fare_amount': rng.random(2000) * 50
+    })
+    trips.to_csv(tmp_path / "v1.csv", index=False)
+    trips.iloc[::-1].to_csv(tmp_path / "v2.csv", index=False)
+
+    # Trips are matched on the composite key in every mode, so reversing the file is not a regression
+    for spill_dir in [None, str(tmp_path / "spill")]:
+        assert compare_datasets_chunked(pd.read_csv(tmp_path / "v1.csv", chunksize=300), pd.read_csv(tmp_path / "v2.csv", chunksize=700), spill_dir)
+
+    trips.loc[5, 'fare_amount'] = 0.0
+    trips.to_csv(tmp_path / "v2.csv", index=False)
+    assert not compare_datasets_chunked(pd.read_csv(tmp_path / "v1.csv", chunksize=300), pd.read_csv(tmp_path / "v2.csv", chunksize=700))
+    assert not compare_datasets(pd.read_csv(tmp_path / "v1.csv"), pd.read_csv(tmp_path / "v2.csv"))
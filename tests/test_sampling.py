@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+from quality_rules.sampling import StratifiedSample, build_sample
+from quality_rules import stability_tests
+from validation_engine import validate
+
+def test_stratified_sample():
+    rng = np.random.default_rng(0)
+    rows = 400000
+    dataset = pd.DataFrame({'release_year': pd.array(rng.integers(1990, 2025, rows), dtype='Int16'),
+                            'popularity': rng.exponential(10, rows)})
+    dataset.loc[:999, 'popularity'] = np.nan
+    chunks = [dataset.iloc[i:i + 50000] for i in range(0, rows, 50000)]
+
+    sample = build_sample(chunks, ['release_year', 'popularity'], 5000, 'release_year', seed=1)
+    assert sample.rows == rows and sample.non_null_count('popularity') == rows - 1000
+    assert len(sample.priorities) <= 4 * 5000
+
+    # Every prefix of the draw order is a proportional stratified sample
+    years = sample.values('release_year')
+    expected = dataset['release_year'].value_counts(normalize=True).sort_index().to_numpy()
+    for size in [1000, 5000]:
+        shares = np.bincount(years[:size].astype(int) - 1990, minlength=35) / size
+        assert np.abs(shares - expected).max() < 0.002
+
+    # Samples of separate shards merge into a sample of the whole data
+    merged = StratifiedSample(['popularity'], 5000, 'release_year', seed=2)
+    for i, start in enumerate(range(0, rows, 100000)):
+        merged.merge(build_sample([dataset.iloc[start:start + 100000]], ['popularity'], 5000, 'release_year', seed=10 + i))
+    assert merged.rows == rows and abs(len(merged.values('popularity')) - 5000) < 50
+
+    # Data smaller than the sample is kept whole
+    small = build_sample([dataset.iloc[1000:1500]], ['popularity'], 5000, 'release_year')
+    assert np.array_equal(np.sort(small.values('popularity')), np.sort(dataset['popularity'].iloc[1000:1500].to_numpy()))
+
+def test_text_timestamp_strata():
+    rng = np.random.default_rng(2)
+    rows = 300000
+    pickups = pd.Timestamp("2021-01-01") + pd.to_timedelta(rng.integers(0, 365 * 86400, rows), unit='s')
+    dataset = pd.DataFrame({'lpep_pickup_datetime': pickups.strftime("%Y-%m-%d %H:%M:%S"), 'trip_distance': rng.exponential(3, rows)})
+
+    # Timestamps read as text are stratified by month, as parsed ones are
+    sample = build_sample([dataset.iloc[i:i + 100000] for i in range(0, rows, 100000)], ['trip_distance'], 50000, 'lpep_pickup_datetime', seed=1)
+    assert len(sample.stratum_keys) == 12 and len(sample.values('trip_distance')) == 50000
+
+    # Text strata that are not timestamps, with more strata than the sample size: a uniform sample
+    ids = dataset.assign(trip_id=[f"t{i}" for i in range(rows)])
+    sample = build_sample([ids], ['trip_distance'], 5000, 'trip_id', seed=1)
+    assert len(sample.stratum_keys) == rows and len(sample.values('trip_distance')) == 5000
+
+def test_stability_sequential():
+    rng = np.random.default_rng(1)
+    rows = 500000
+    dataset_v1 = pd.DataFrame({'release_year': rng.integers(1990, 2025, rows), 'popularity': rng.normal(0, 1, rows)})
+    dataset_v2 = pd.DataFrame({'release_year': rng.integers(1990, 2025, rows), 'popularity': rng.normal(0.2, 1, rows)})
+
+    results = stability_tests.test_statistical_stability_sequential(dataset_v1, dataset_v2, ['release_year', 'popularity'],
+                                                                    sample_size=20000, min_sample_size=1000, strata='release_year')
+    # A 0.2 sigma shift is detected at the first look, a stable column stops once it is confidently stable
+    assert not results.loc['popularity', 'passed'] and results.loc['popularity', 'looks'] == 1
+    assert results.loc['release_year', 'passed'] and results.loc['release_year', 'sample_v1'] < 20000
+    assert (results['confidence'] >= 0.95).all() and (results['n_v1'] == rows).all() and results['conclusive'].all()
+    assert not stability_tests.test_statistical_stability(dataset_v1, dataset_v2, 'popularity', sample_size=20000)
+
+    # Samples too small to bound the KS distance below the tolerance are inconclusive, not a pass
+    undecided = stability_tests.test_statistical_stability_sequential(dataset_v1, dataset_v1.iloc[::-1], ['release_year'],
+                                                                      sample_size=1000, min_sample_size=1000)
+    assert not undecided.loc['release_year', 'conclusive'] and not undecided.loc['release_year', 'passed']
+
+    # Columns that fit in the sample are tested whole, as the batch test does
+    small_v1, small_v2 = dataset_v1.iloc[:3000], dataset_v2.iloc[:2000]
+    sampled = stability_tests.test_statistical_stability_sequential(small_v1, small_v2, ['release_year', 'popularity'])
+    exact = stability_tests.test_statistical_stability_batch(small_v1, small_v2, ['release_year', 'popularity'])
+    assert np.allclose(sampled['p_value'], exact['p_value']) and sampled['passed'].equals(exact['passed'])
+
+def test_sample_method_report(tmp_path, monkeypatch, register_datasets):
+    # Sample mode runs against the baseline profile, in memory and streamed, and labels its checks
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "reports").mkdir()
+    rng = np.random.default_rng(0)
+    for name in ("movies_v1.csv", "movies_v2.csv"):
+        pd.DataFrame({'show_id': np.arange(3000), 'release_year': rng.integers(1990, 2025, 3000),
+                      'vote_average': rng.integers(0, 100, 3000) / 10, 'popularity': rng.exponential(10, 3000)}).to_csv(name, index=False)
+    register_datasets({"movies_v1": "movies_v1.csv", "movies_v2": "movies_v2.csv"})
+    reports = []
+    for chunksize in (None, 700):
+        results = validate.generate_report(chunksize=chunksize, workers=1, stability_method="sample", use_cache=False, incremental=False)
+        labels = [check for check, _ in results['movies_v2']['checks'] if check.startswith("Statistical stability")]
+        assert labels and all("(sampled 3000/3000 values, confidence" in label and "inconclusive" not in label for label in labels)
+        reports.append(open(validate.REPORT_PATH).read())
+    assert reports[0] == reports[1] and "(sampled 3000/3000 values" in reports[0]
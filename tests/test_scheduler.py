@@ -0,0 +1,86 @@
+import time
+import numpy as np
+import pandas as pd
+from validation_engine import validate
+from validation_engine.config import CHECK_COST_SMOOTHING
+from validation_engine.result_cache import ResultCache
+from validation_engine.scheduler import CostModel, check_task, run_checks
+
+def _tasks(ran, schema_passes=True):
+    def run(rule, passed):
+        return lambda: ran.append(rule) or [(f"{rule} check", passed)]
+    return [check_task("schema", ["schema check"], run("schema", schema_passes), 100, ['a']),
+            check_task("regression", ["regression check"], run("regression", False), 100000, ['a', 'b']),
+            check_task("stability", ["stability check"], run("stability", True), 100, ['a'])]
+
+def test_run_checks(tmp_path):
+    model = CostModel(str(tmp_path / "costs.json"))
+
+    # Fatal checks first, then the cheapest; the checks are reported in task order
+    ran = []
+    result = {'dataset': "movies_v2", 'checks': []}
+    run_checks(result, _tasks(ran), cost_model=model)
+    assert ran == ["schema", "stability", "regression"]
+    assert result['checks'] == [("schema check", True), ("regression check", False), ("stability check", True)]
+
+    # A fatal failure skips the checks not run yet
+    ran = []
+    result = {'dataset': "movies_v2", 'checks': []}
+    run_checks(result, _tasks(ran, schema_passes=False), cost_model=model)
+    assert ran == ["schema"] and result['checks'][1] == ("regression check", None)
+    assert result['skipped'] == {"regression check": "fail-fast", "stability check": "fail-fast"}
+
+    # Checks whose estimated cost would overrun the budget are skipped, cheaper ones still run
+    model.seconds_per_cell['regression'] = 1e-3
+    ran = []
+    result = {'dataset': "movies_v2", 'checks': []}
+    run_checks(result, _tasks(ran), deadline=time.time() + 10, cost_model=model)
+    assert ran == ["schema", "stability"] and result['skipped'] == {"regression check": "budget"}
+
+    # Timings and outcomes are kept for the next runs
+    model.save()
+    loaded = CostModel(str(tmp_path / "costs.json"))
+    assert loaded.seconds_per_cell == model.seconds_per_cell
+    assert loaded.failure_rate("movies_v2", "schema") == (1 + 1) / (3 + 2)
+
+    # Loads are estimated per byte of input file, from past load timings
+    model.record_load(1000, 2.0)
+    model.save()
+    assert CostModel(str(tmp_path / "costs.json")).estimate_load(500) == 1.0
+
+    # Models saving at the same time (e.g. worker processes) all keep their timings and outcomes
+    first, second = CostModel(str(tmp_path / "costs.json")), CostModel(str(tmp_path / "costs.json"))
+    first.record("movies_v2", _tasks([])[0], 0.01, False)
+    second.record("movies_v2", _tasks([])[0], 0.01, True)
+    second.record_load(1000, 2.0)
+    first.save()
+    second.save()
+    merged = CostModel(str(tmp_path / "costs.json"))
+    assert merged.outcomes["movies_v2/schema"] == [1 + 1, 3 + 2] and merged.estimate_load(500) == 1.0
+
+def test_validate_budget(tmp_path, monkeypatch, register_datasets):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "reports").mkdir()
+    rng = np.random.default_rng(0)
+    pd.DataFrame({'show_id': range(1000), 'release_year': rng.integers(1990, 2025, 1000),
+                  'vote_average': rng.uniform(0, 10, 1000).round(1), 'popularity': rng.exponential(10, 1000)}).to_csv("movies_v1.csv", index=False)
+    register_datasets({"movies_v1": "movies_v1.csv"})
+    cache = ResultCache(str(tmp_path / "results"))
+    monkeypatch.setattr(validate, "get_result_cache", lambda: cache)
+
+    # A dataset reached once the budget is spent is not read: every check is reported as skipped, and not cached
+    result = validate.validate_dataset("movies_v1", "movies_v1.csv", deadline=time.time())
+    assert result['error'] is None and result['checks'] and all(passed is None for _, passed in result['checks'])
+    validate.write_report({"movies_v1": result})
+    assert "Regression test: SKIPPED (budget)" in (tmp_path / "reports" / "validation_report.txt").read_text()
+    assert validate.validate_dataset("movies_v1", "movies_v1.csv")['checks'][0] == ("Schema validation", True)
+    assert cache.stats()['hits'] == 0
+
+    # The load is charged against the budget: once timed, a dataset whose load would overrun the deadline is not read
+    model = CostModel()
+    assert model.seconds_per_byte is not None
+    model.record_load(1, 1 / CHECK_COST_SMOOTHING)
+    model.save()
+    result = validate.validate_dataset("movies_v1", "movies_v1.csv", use_cache=False, budget=10)
+    assert result['error'] is None and all(passed is None for _, passed in result['checks'])
+    assert not any(record['stage'] == "load" for record in result['spans'])
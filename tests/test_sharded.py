@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+from validation_engine.config import DATASETS_PATH
+from validation_engine import sharded
+from validation_engine.validate import validate_dataset
+
+def test_sharded_validation(tmp_path, monkeypatch, register_datasets):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "reports").mkdir()
+    (tmp_path / "logs").mkdir()
+    rng = np.random.default_rng(0)
+    rows = 3000
+    dataset_v1 = pd.DataFrame({'show_id': range(rows), 'release_year': rng.integers(1990, 2025, rows),
+                               'vote_average': rng.uniform(0, 10, rows).round(1), 'popularity': rng.exponential(10, rows)})
+    dataset_v2 = dataset_v1.assign(popularity=dataset_v1['popularity'] * 2)
+    dataset_v2.loc[::7, 'release_year'] = np.nan
+    dataset_v1.to_csv("movies_v1.csv", index=False)
+    dataset_v2.to_csv("movies_v2.csv", index=False)
+    for i, start in enumerate(range(0, rows, 1000)):
+        dataset_v1.iloc[start:start + 1000].to_csv(f"movies_v1-{i}.csv", index=False)
+        dataset_v2.iloc[start:start + 1000].to_csv(f"movies_v2-{i}.csv", index=False)
+
+    # Single-file validation
+    register_datasets({"movies_v1": "movies_v1.csv", "movies_v2": "movies_v2.csv"})
+    expected = [validate_dataset(dataset_name, DATASETS_PATH[dataset_name]) for dataset_name in DATASETS_PATH]
+
+    # The same datasets in three shards, mapped by two processes then reduced
+    monkeypatch.setitem(DATASETS_PATH, "movies_v1", "movies_v1-*.csv")
+    monkeypatch.setitem(DATASETS_PATH, "movies_v2", ["movies_v2-0.csv", "movies_v2-1.csv", "movies_v2-2.csv"])
+    assert sharded.dataset_shards("movies_v1") == ["movies_v1-0.csv", "movies_v1-1.csv", "movies_v1-2.csv"]
+    sharded.run_sharded(2, "shards", "exact")
+    for result in expected:
+        reduced = sharded.reduce_dataset(result['dataset'], "shards", "exact")
+        assert reduced['error'] is None and reduced['checks'] == result['checks']
+        assert reduced['missing_values'].equals(result['missing_values'])
+    assert ("Statistical stability for column popularity", False) in expected[1]['checks']
+    assert "Dataset: movies_v2" in (tmp_path / "reports" / "validation_report.txt").read_text()
+
+    # A shard that was not mapped fails the dataset instead of being left out
+    sharded.map_shard("movies_v2", 0, "movies_v2-0.csv", "partial")
+    assert "shard 1 (movies_v2-1.csv) was not mapped" in sharded.reduce_dataset("movies_v2", "partial")['error']
+
+    # States left by an earlier run are not merged once a new file shifts the sorted shards
+    dataset_v1.iloc[:10].to_csv("movies_v1-00.csv", index=False)
+    error = sharded.reduce_dataset("movies_v2", "shards")['error']
+    assert "shard 1 (movies_v1-00.csv) was not mapped (state of movies_v1-1.csv is stale)" in error and "shard 3 (movies_v1-2.csv) was not mapped" in error
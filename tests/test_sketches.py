@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+from scipy.stats import ks_2samp
+from quality_rules.sketches import KLLSketch, ks_from_sketches, build_column_sketches
+from quality_rules import stability_tests
+
+def test_sketch_merge_and_quantiles():
+    values = np.random.default_rng(0).normal(size=200000)
+
+    # Sketches built on separate shards and merged keep every row's weight
+    shards = [KLLSketch(400, seed=i) for i in range(4)]
+    for sketch, shard in zip(shards, np.array_split(values, 4)):
+        sketch.update(shard)
+    merged = shards[0]
+    for sketch in shards[1:]:
+        merged.merge(sketch)
+    assert merged.n == len(values)
+    assert merged.weighted_items()[1].sum() == len(values)
+    assert sum(len(level) for level in merged.levels) < 2000
+
+    # Quantile ranks are within the stated rank error
+    for q in [0.01, 0.25, 0.5, 0.75, 0.99]:
+        assert abs(np.mean(values <= merged.quantile(q)) - q) <= merged.rank_error()
+
+    # The largest rank error over every retained value (as in a KS statistic) is within the all-ranks error
+    items = merged.weighted_items()[0]
+    assert np.max(np.abs(merged.cdf(items) - np.searchsorted(np.sort(values), items, side='right') / len(values))) <= merged.rank_error(all_ranks=True)
+
+def test_ks_from_sketches():
+    rng = np.random.default_rng(1)
+    for shift in [0.0, 0.1]:
+        data_v1 = pd.DataFrame({'popularity': rng.normal(size=100000)})
+        data_v2 = pd.DataFrame({'popularity': rng.normal(shift, size=80000)})
+        sketch_v1 = build_column_sketches((data_v1.iloc[i:i + 10000] for i in range(0, len(data_v1), 10000)), ['popularity'], k=400)['popularity']
+        sketch_v2 = build_column_sketches([data_v2], ['popularity'], k=400)['popularity']
+
+        result = ks_from_sketches(sketch_v1, sketch_v2)
+        exact = ks_2samp(data_v1['popularity'], data_v2['popularity'])
+        assert abs(result['statistic'] - exact.statistic) <= result['statistic_error']
+
+        # Identical distributions are stable, a 0.1 sigma shift is not
+        assert stability_tests.test_statistical_stability_sketch(sketch_v1, sketch_v2, 'popularity') == (shift == 0.0)
@@ -0,0 +1,40 @@
+import json
+import pandas as pd
+import pytest
+from validation_engine.spans import span, take_spans, traced, write_prometheus, write_spans
+
+@traced
+def drop_first_row(dataset, column):
+    return dataset.iloc[1:]
+
+def test_spans(tmp_path, monkeypatch):
+    take_spans()
+    monkeypatch.setenv("SENTINEL_PROFILE", "tracemalloc:drop_first_row")
+    dataset = pd.DataFrame({'a': range(10), 'b': range(10)})
+
+    with span("regression", dataset="movies_v2", rows_in=10) as stage:
+        drop_first_row(dataset, 'a')
+        stage.rows_out = 9
+    with pytest.raises(ValueError):
+        with span("stability"):
+            raise ValueError("boom")
+
+    # Spans are recorded innermost first, with their parent and the parent's dataset
+    inner, outer, failed = take_spans()
+    assert (inner['stage'], inner['dataset'], inner['parent_id']) == ("drop_first_row", "movies_v2", outer['span_id'])
+    assert (inner['rows_in'], inner['rows_out'], inner['columns']) == (10, 9, ['a'])
+    assert inner['traced_peak_delta_bytes'] >= 0 and 'traced_peak_delta_bytes' not in outer
+    assert (outer['rows_in'], outer['rows_out']) == (10, 9)
+    assert outer['wall_seconds'] >= inner['wall_seconds'] and outer['cpu_seconds'] >= 0
+    assert (failed['status'], failed['error']) == ("error", "ValueError")
+    assert take_spans() == []
+
+    write_spans([inner, outer], str(tmp_path / "spans.jsonl"), "run-1")
+    lines = [json.loads(line) for line in open(tmp_path / "spans.jsonl")]
+    assert [line['run_id'] for line in lines] == ["run-1", "run-1"]
+
+    write_prometheus([inner, outer, failed], str(tmp_path / "metrics.prom"))
+    metrics = open(tmp_path / "metrics.prom").read()
+    assert 'sentinel_stage_rows_in{stage="drop_first_row",dataset="movies_v2"} 10' in metrics
+    assert 'sentinel_stage_errors{stage="stability",dataset=""} 1' in metrics
+    assert "# TYPE sentinel_stage_wall_seconds gauge" in metrics
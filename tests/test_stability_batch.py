@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+from scipy.stats import ks_2samp
+from quality_rules import stability_tests
+from validation_engine import validate
+
+def test_stability_batch_matches_ks_2samp():
+    rng = np.random.default_rng(0)
+    for rows_v1, rows_v2 in [(300, 200), (30000, 20000)]:
+        dataset_v1 = pd.DataFrame({'release_year': rng.integers(1990, 2025, rows_v1),
+                                   'vote_average': rng.normal(6, 1, rows_v1).round(1),
+                                   'popularity': rng.exponential(10, rows_v1)})
+        dataset_v2 = pd.DataFrame({'release_year': pd.array(rng.integers(1990, 2025, rows_v2), dtype='Int16'),
+                                   'vote_average': rng.normal(6.1, 1, rows_v2).round(1),
+                                   'popularity': rng.exponential(12, rows_v2)})
+        dataset_v1.loc[:rows_v1 // 3, 'popularity'] = np.nan
+        dataset_v2.loc[:5, 'release_year'] = pd.NA
+        columns = ['release_year', 'vote_average', 'popularity']
+
+        results = stability_tests.test_statistical_stability_batch(dataset_v1, dataset_v2, columns)
+
+        # Same statistics, p-values and outcome as one ks_2samp call per column (exact and asymptotic p-values)
+        for column in columns:
+            expected = ks_2samp(dataset_v1[column].dropna().astype('float64'), dataset_v2[column].dropna().astype('float64'))
+            assert np.isclose(results.loc[column, 'statistic'], expected.statistic, rtol=0, atol=1e-12)
+            assert np.isclose(results.loc[column, 'p_value'], expected.pvalue, rtol=1e-9)
+            assert results.loc[column, 'passed'] == stability_tests.test_statistical_stability(dataset_v1, dataset_v2, column)
+        assert results.loc['release_year', 'n_v2'] == rows_v2 - 6
+
+def test_stability_batch_insufficient_data():
+    dataset_v1 = pd.DataFrame({'popularity': [1.0] * 5 + [np.nan] * 20})
+    dataset_v2 = pd.DataFrame({'popularity': np.arange(25.0)})
+
+    results = stability_tests.test_statistical_stability_batch(dataset_v1, dataset_v2, ['popularity'])
+    assert not results.loc['popularity', 'passed']
+
+def test_stability_batch_validate_dataset(tmp_path, monkeypatch, register_datasets):
+    # The stability checks of a validation, in memory and streamed, are those of one ks_2samp per column
+    monkeypatch.chdir(tmp_path)
+    rng = np.random.default_rng(0)
+    datasets = [pd.DataFrame({'show_id': np.arange(rows), 'release_year': rng.integers(1990, 2025, rows),
+                              'vote_average': rng.normal(6, 1, rows).round(1), 'popularity': rng.exponential(scale, rows)})
+                for rows, scale in ((4000, 10), (3000, 13))]
+    datasets[1].loc[:99, 'vote_average'] = np.nan
+    for name, dataset in zip(("movies_v1.csv", "movies_v2.csv"), datasets):
+        dataset.to_csv(name, index=False)
+    register_datasets({"movies_v1": "movies_v1.csv", "movies_v2": "movies_v2.csv"})
+
+    expected = [(f"Statistical stability for column {column}",
+                 bool(ks_2samp(datasets[0][column].dropna(), datasets[1][column].dropna()).pvalue >= 0.05))
+                for column in ['release_year', 'vote_average', 'popularity']]
+    assert not expected[2][1]
+    for chunksize in (None, 700):
+        result = validate.validate_dataset("movies_v2", "movies_v2.csv", chunksize=chunksize, stability_method="exact", use_cache=False)
+        assert [check for check in result['checks'] if check[0].startswith("Statistical stability")] == expected
@@ -0,0 +1,20 @@
+import pandas as pd
+from benchmarks.synthetic import generate_dataset, write_dataset
+from quality_rules.schema_validation import SCHEMA_REGISTRY, validate_schema
+
+def test_synthetic_datasets(tmp_path):
+    for dataset_key in ["netflix_movies", "nyc_taxi"]:
+        dataset = generate_dataset(dataset_key, 2000, seed=1, null_rate=0.1)
+        assert list(dataset.columns) == list(SCHEMA_REGISTRY[dataset_key])
+        assert dataset.equals(generate_dataset(dataset_key, 2000, seed=1, null_rate=0.1))
+        assert 0.05 < dataset.isnull().to_numpy().any(axis=1).mean()
+
+        # A drifted version has the same rows and missing values, with the drift columns shifted
+        drifted = generate_dataset(dataset_key, 2000, seed=1, null_rate=0.1, drift=0.5)
+        assert drifted.isnull().equals(dataset.isnull())
+        assert (drifted.select_dtypes('number').mean() >= dataset.select_dtypes('number').mean()).all()
+
+    # Written and read back, the Netflix datasets have the registered schema
+    path = str(tmp_path / "movies.csv")
+    write_dataset(path, "netflix_movies", 1000, null_rate=0.0)
+    assert validate_schema(pd.read_csv(path), SCHEMA_REGISTRY["netflix_movies"])
@@ -0,0 +1,80 @@
+import pandas as pd
+import pytest
+from benchmarks.synthetic import write_dataset
+from quality_rules.missing_handle import handle_missing_values
+from quality_rules.missing_values import null_profile
+from quality_rules.profiles import DatasetProfile, build_profile
+from quality_rules.regression_tests import compare_datasets
+from quality_rules.row_diff import hash_rows
+from quality_rules.schema_validation import validate_schema
+from quality_rules.uniqueness import find_duplicate_keys
+from validation_engine import typed_ingest
+from validation_engine.columnar_cache import load_columnar
+from validation_engine.typed_ingest import SchemaIngestError, columns_for_rules, ingest_options, read_typed_csv, storage_schema
+from validation_engine.streaming import iter_dataset_chunks
+
+TAXI_CSV = """VendorID,lpep_pickup_datetime,lpep_dropoff_datetime,store_and_fwd_flag,RatecodeID,PULocationID,DOLocationID,passenger_count,trip_distance,fare_amount,extra,mta_tax,tip_amount,tolls_amount,ehail_fee,improvement_surcharge,total_amount,payment_type,trip_type,congestion_surcharge
+2,2021-01-01 00:15:56,2021-01-01 00:19:52,N,1,43,151,1,1.01,5.5,0.5,0.5,0,0,,0.3,6.8,2,1,0
+,2021-01-01 00:25:59,2021-01-01 00:34:44,,,166,239,,2.53,10,0.5,0.5,2.81,0,,0.3,16.86,,,2.75
+1,2021-01-01 00:45:57,2021-01-01 00:51:55,Y,1,41,42,1,1.12,6,0.5,0.5,1,0,,0.3,8.3,1,1,0
+"""
+
+def test_ingest_options(tmp_path):
+    path = tmp_path / "taxi.csv"
+    path.write_text(TAXI_CSV)
+
+    # Every schema column is read by the full rule set; free columns outside the schema are skipped
+    options = ingest_options("nyc_taxi_v2")
+    assert 'ehail_fee' not in options['usecols']
+    assert columns_for_rules('netflix_movies', ["stability"]) == ['release_year', 'popularity', 'vote_average']
+
+    taxi = read_typed_csv(str(path), options)
+    assert str(taxi['VendorID'].dtype) == 'Int8'
+    assert str(taxi['store_and_fwd_flag'].dtype) == 'category'
+    assert str(taxi['lpep_pickup_datetime'].dtype) == 'datetime64[ns]'
+    assert taxi['passenger_count'].isnull().sum() == 1
+
+def test_type_mismatch_reported_while_parsing(tmp_path):
+    path = tmp_path / "taxi.csv"
+    path.write_text(TAXI_CSV.replace("2,2021-01-01 00:15:56", "two,2021-01-01 00:15:56").replace(",1.12,6,", ",1.12,six,"))
+
+    with pytest.raises(SchemaIngestError) as error:
+        read_typed_csv(str(path), ingest_options("nyc_taxi_v1"))
+    assert [violation.split(' cannot')[0] for violation in error.value.violations] == ["column 'VendorID'", "column 'fare_amount'"]
+
+    # Streaming reads report the same violations
+    with pytest.raises(SchemaIngestError):
+        list(iter_dataset_chunks(str(path), 2, **ingest_options("nyc_taxi_v1")))
+
+    # A missing schema column fails before anything is loaded
+    pd.read_csv(path).drop(columns=['trip_type']).to_csv(path, index=False)
+    with pytest.raises(SchemaIngestError, match="trip_type"):
+        read_typed_csv(str(path), ingest_options("nyc_taxi_v1"))
+
+def test_arrow_strings(tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    path = str(tmp_path / "movies.csv")
+    write_dataset(path, "netflix_movies", 2000, null_rate=0.1)
+    objects = read_typed_csv(path, ingest_options("netflix_movies_v2"))
+    monkeypatch.setattr(typed_ingest, "ARROW_STRINGS", True)
+    schema = storage_schema("netflix_movies")
+
+    # Text columns are stored as Arrow strings, also once read back from the columnar cache
+    for _ in range(2):
+        dataset = load_columnar(path, cache_dir=str(tmp_path / "cache"), **ingest_options("netflix_movies_v2"))
+        assert str(dataset['description'].dtype) == "string" and dataset['description'].dtype.storage == "pyarrow"
+        assert validate_schema(dataset, schema)
+
+    # The rules give the same results as on objects, and keep the Arrow storage
+    assert null_profile(dataset).counts.equals(null_profile(objects).counts)
+    cleaned = handle_missing_values(dataset, "netflix_movies_v2", schema)
+    assert cleaned['director'].dtype == dataset['director'].dtype and not cleaned['director'].isnull().any()
+    assert (hash_rows(dataset) == hash_rows(objects)).all()
+    assert (hash_rows(cleaned) == hash_rows(handle_missing_values(objects, "netflix_movies_v2"))).all()
+    assert compare_datasets(dataset, dataset.iloc[::-1]) and not compare_datasets(dataset, cleaned)
+    duplicated = pd.concat([dataset, dataset.head(3)])
+    assert find_duplicate_keys(duplicated)['duplicate_keys'] == find_duplicate_keys(duplicated.astype({'show_id': object}))['duplicate_keys'] == 3
+
+    # Profiles keep the storage of their dtypes
+    build_profile([dataset]).save(str(tmp_path / "profile"))
+    assert DatasetProfile.load(str(tmp_path / "profile")).dtypes['description'] == schema['description']
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+from quality_rules.profiles import build_profile
+from quality_rules.uniqueness import KeyUniqueness, find_duplicate_keys, hash_keys
+from validation_engine.validate import uniqueness_checks
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+def test_find_duplicate_keys(tmp_path):
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({'show_id': rng.integers(0, 40000, 50000).astype(str), 'popularity': rng.exponential(10, 50000)})
+    data.loc[[3, 10], 'show_id'] = None
+    duplicated = data['show_id'].notna() & data['show_id'].duplicated(keep=False)
+
+    # Same counts as pandas, with the first duplicate keys in row order read back as samples
+    result = find_duplicate_keys(data, ['show_id'], sample_size=3)
+    assert result['null_keys'] == 2 and result['rows'] == 50000
+    assert result['duplicate_keys'] == data.loc[duplicated, 'show_id'].nunique()
+    assert result['duplicate_rows'] == int(duplicated.sum()) - result['duplicate_keys']
+    first = data.loc[duplicated, 'show_id'].drop_duplicates().head(3)
+    assert list(result['sample_keys']['show_id']) == list(first)
+    assert list(result['sample_keys']['rows']) == [int((data['show_id'] == key).sum()) for key in first]
+
+    # Chunked, with the key hashes spilled to partition files, the result is the same
+    uniqueness = KeyUniqueness(['show_id'], str(tmp_path), partitions=8, max_rows_in_memory=7000, sample_size=3)
+    for start in range(0, len(data), 10000):
+        uniqueness.update(data.iloc[start:start + 10000])
+    assert uniqueness.spill_path is not None
+    assert {key: uniqueness.result()[key] for key in ('duplicate_keys', 'duplicate_rows', 'null_keys')} == \
+           {key: result[key] for key in ('duplicate_keys', 'duplicate_rows', 'null_keys')}
+    uniqueness.collect_samples(data.iloc[start:start + 10000] for start in range(0, len(data), 10000))
+    assert uniqueness.sample_keys.equals(result['sample_keys'])
+    assert list(tmp_path.iterdir()) == []
+
+    # A profile gives the counts from its own key hashes
+    profile = build_profile([data.dropna()], exact=True)
+    assert find_duplicate_keys(profile, sample_size=3)['duplicate_rows'] == result['duplicate_rows']
+
+    label, passed = uniqueness_checks(result)[0]
+    assert not passed and label.startswith(f"Key uniqueness (show_id: {result['duplicate_keys']} duplicate keys")
+    assert uniqueness_checks(find_duplicate_keys(data.drop_duplicates('show_id'), ['show_id']))[0][1]
+
+def test_hash_keys():
+    # Equal keys hash alike whatever their dtype, distinct ones (even sharing a prefix or reordered) do not
+    keys = pd.DataFrame({'id': pd.array([1, 2, 2], dtype='Int64'), 'name': ["ab", "abc", "abc"]})
+    hashes = hash_keys(keys)
+    assert hashes[1] == hashes[2] != hashes[0]
+    assert (hash_keys(keys.astype({'id': 'float64', 'name': 'category'})) == hashes).all()
+    if pa is not None:
+        assert (hash_keys(keys.astype({'name': 'string[pyarrow]'})) == hashes).all()
+    assert hash_keys(pd.DataFrame({'a': ["x"], 'b': ["y"]}))[0] != hash_keys(pd.DataFrame({'a': ["y"], 'b': ["x"]}))[0]
+    assert len(set(hash_keys(pd.DataFrame({'id': np.arange(100000).astype(str)})))) == 100000
@@ -0,0 +1,26 @@
+import io
+import pandas as pd
+from validation_engine.validate import group_dataset_pairs, write_dataset_report
+
+def test_group_dataset_pairs():
+    dataset_names = ["movies_v1", "movies_v2", "taxi_v1", "taxi_v2", "shows_v2"]
+    assert group_dataset_pairs(dataset_names) == [["movies_v1", "movies_v2"], ["taxi_v1", "taxi_v2"], ["shows_v2"]]
+
+def test_write_dataset_report():
+    report_file = io.StringIO()
+    write_dataset_report(report_file, {
+        'dataset': "movies_v2",
+        'missing_values': pd.Series({'show_id': 0}),
+        'checks': [("Schema validation", True), ("Regression test", False)],
+        'error': "'release_year'"
+    })
+    lines = report_file.getvalue().splitlines()
+    assert lines[1] == "Dataset: movies_v2"
+    assert "Schema validation: PASSED" in lines
+    assert "Regression test: FAILED" in lines
+    assert lines[-1] == "Error processing movies_v2: 'release_year'"
+
+    # A dataset that failed to load only reports the error
+    report_file = io.StringIO()
+    write_dataset_report(report_file, {'dataset': "taxi_v1", 'missing_values': None, 'checks': [], 'error': "not found"})
+    assert report_file.getvalue() == "\nError processing taxi_v1: not found\n"
@@ -0,0 +1,271 @@
+import argparse
+import os
+import sys
+
+from validation_engine.config import DATASETS_PATH, CHUNK_SIZE, WORKERS, STABILITY_METHOD, PREFETCH_DEPTH, INCREMENTAL, \
+    DATASET_TIME_BUDGET, RUN_TIME_BUDGET, BACKEND, TYPED_INGEST, SHARD_STATE_DIR, DRIFT_PSI_THRESHOLD, DRIFT_BINS, \
+    PROFILE_STORE_DIR
+from validation_engine.paths import dataset_files
+from validation_engine.registry import get_rule
+from quality_rules.schemas import SCHEMA_REGISTRY, header_violations, read_header, schema_key
+
+# Entry point of the `sentinel` command. Only the configuration and the schema registry are imported up front:
+# each command imports the engine modules and the rules it runs (pandas, scipy) once the arguments are parsed,
+# so `sentinel --help` and header checks start without them.
+
+
+def _versions(parser: argparse.ArgumentParser, args) -> tuple:
+    # Names and paths of the two versions of a dataset key (e.g. "nyc_taxi"), explicit paths taking precedence
+    dataset_key = schema_key(args.dataset)
+    names = (f"{dataset_key}_v1", f"{dataset_key}_v2")
+    paths = (args.v1 or DATASETS_PATH.get(names[0]), args.v2 or DATASETS_PATH.get(names[1]))
+    if None in paths:
+        parser.error(f"No configured versions for '{dataset_key}': pass --v1 and --v2")
+    return dataset_key, names, paths
+
+
+def _load(dataset_name: str, dataset_path: str, rule: str):
+    # Typed ingest of the columns the rule reads (every column of an unregistered dataset)
+    from validation_engine.dataset_cache import load_dataset
+    from validation_engine.typed_ingest import ingest_options
+
+    read_options = ingest_options(dataset_name, [rule]) if TYPED_INGEST else {}
+    return load_dataset(dataset_path, **read_options)
+
+
+def run(args) -> int:
+    """
+    Validate the configured datasets and write the validation report (or keep it up to date with --watch).
+    The run fails if a check fails or a dataset cannot be validated.
+    """
+    import pandas as pd
+    from validation_engine.validate import generate_report, watch
+
+    # Copy-on-write for every stage, so frames derived from the shared dataset cache never copy the columns they leave
+    # unchanged (the imputation plan enables it itself when used as a library)
+    pd.set_option("mode.copy_on_write", True)
+    options = dict(chunksize=args.chunksize, workers=args.workers, stability_method=args.stability, prefetch_depth=args.prefetch,
+                   use_cache=not args.no_cache, incremental=args.incremental, budget=args.budget, run_budget=args.run_budget,
+                   backend=args.backend)
+    if args.watch:
+        watch(**options)
+        return 0
+    results = generate_report(**options)
+    # Skipped checks (None) do not fail the run
+    failed = any(result['error'] is not None or any(passed is False for _, passed in result['checks']) for result in results.values())
+    return 1 if failed else 0
+
+
+def check_schema(args) -> int:
+    """
+    Check files against their registered schema without parsing them: the header only (missing columns, column
+    order), or with --rows, the first rows too (dtypes, see preflight_schema).
+    """
+    failed = False
+    for dataset_name in args.datasets:
+        expected_schema = SCHEMA_REGISTRY[schema_key(dataset_name)]
+        for path in dataset_files(args.path or DATASETS_PATH[dataset_name]):
+            try:
+                if args.rows:
+                    from validation_engine.preflight import preflight_schema
+                    from validation_engine.typed_ingest import storage_schema
+                    schema = storage_schema(schema_key(dataset_name)) if TYPED_INGEST else expected_schema
+                    violations = preflight_schema(path, schema, args.rows)['violations']
+                else:
+                    violations = header_violations(read_header(path), expected_schema)
+            except OSError as error:
+                violations = [{'message': str(error)}]
+            for violation in violations:
+                print(f"Error: {dataset_name} ({path}): {violation['message']}")
+            if not violations:
+                print(f"Schema check passed for {dataset_name} ({path}).")
+            failed = failed or bool(violations)
+    return 1 if failed else 0
+
+
+def diff(args) -> int:
+    """
+    Regression test of two versions of a dataset: schema, missing values and the keyed row diff.
+    """
+    dataset_key, names, paths = _versions(args.parser, args)
+    compare_datasets = get_rule("regression")
+    if compare_datasets(_load(names[0], paths[0], "regression"), _load(names[1], paths[1], "regression")):
+        print(f"Regression test passed for {dataset_key}.")
+        return 0
+    print(f"Regression test failed for {dataset_key}.")
+    return 1
+
+
+def drift(args) -> int:
+    """
+    Drift test of the monitored columns of a dataset (see DRIFT_COLUMNS) between its two versions.
+    """
+    dataset_key, names, paths = _versions(args.parser, args)
+    test_drift = get_rule("drift")
+    from quality_rules.drift import drift_columns
+
+    results = test_drift(_load(names[0], paths[0], "drift"), _load(names[1], paths[1], "drift"), drift_columns(dataset_key),
+                         args.psi_threshold, args.bins)
+    drifted = list(results.index[~results['passed']])
+    print(f"Drifted columns in {dataset_key}: {', '.join(drifted)}" if drifted else f"No drift detected in {dataset_key}.")
+    return 1 if drifted else 0
+
+
+def profile(args) -> int:
+    """
+    Accept dataset versions as baselines: profile them and store the profiles.
+    """
+    from validation_engine.profile_store import accept_baseline
+    from validation_engine.typed_ingest import ingest_options
+
+    for dataset_name in args.datasets:
+        read_options = ingest_options(dataset_name) if TYPED_INGEST else {}
+        baseline = accept_baseline(dataset_name, DATASETS_PATH[dataset_name], read_options)
+        print(f"{dataset_name}: {baseline.rows} rows, digest {baseline.digest}, stored in {os.path.join(PROFILE_STORE_DIR, dataset_name)}")
+    return 0
+
+
+def clean(args) -> int:
+    """
+    Apply the imputation policy of each v1 dataset and write the cleaned data as its v2 version.
+    """
+    import pandas as pd
+    from validation_engine.dataset_cache import load_dataset
+    handle_missing_values = get_rule("missing")
+
+    for dataset_name in args.datasets:
+        output_path = DATASETS_PATH[f"{schema_key(dataset_name)}_v2"]
+        changes = {}
+        cleaned = handle_missing_values(load_dataset(DATASETS_PATH[dataset_name]), dataset_name, changes=changes)
+        cleaned.to_csv(output_path, index=False)
+        print(f"Cells changed per imputation rule for {dataset_name}:")
+        print(pd.Series(changes, dtype='int64'))
+        print(f"Cleaned data saved to {output_path}.")
+    return 0
+
+
+def shard(args) -> int:
+    """
+    Validate datasets split in shards (see validation_engine/sharded.py).
+    """
+    from validation_engine.sharded import map_shards, reduce_report, run_sharded
+
+    if args.step == "map":
+        map_shards(args.state_dir, args.worker, args.workers)
+    elif args.step == "reduce":
+        reduce_report(args.state_dir, args.stability)
+    else:
+        run_sharded(args.workers, args.state_dir, args.stability)
+    return 0
+
+
+def _add_versions_arguments(command: argparse.ArgumentParser, handler):
+    # Arguments of the commands comparing the two versions of a dataset
+    command.add_argument("dataset", help="Dataset key (e.g. nyc_taxi): its _v1 and _v2 versions are compared.")
+    command.add_argument("--v1", help="Path of the old version (default: configured path).")
+    command.add_argument("--v2", help="Path of the new version (default: configured path).")
+    command.set_defaults(handler=handler, parser=command)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Build the argument parser of the sentinel command and its subcommands (defaults from validation_engine/config.py).
+    """
+    parser = argparse.ArgumentParser(prog="sentinel", description="Validate dataset versions: missing values, schema, regression, "
+                                                                   "key uniqueness, stability and drift.")
+    commands = parser.add_subparsers(dest="command", required=True, metavar="command")
+    baselines = [dataset_name for dataset_name in DATASETS_PATH if dataset_name.endswith("v1")]
+
+    command = commands.add_parser("run", help="Validate the configured datasets and write the validation report.",
+                                  description="Validate the configured datasets and write the validation report.")
+    command.add_argument("--chunksize", type=int, default=CHUNK_SIZE,
+                         help="Stream each dataset in chunks of this many rows (bounded memory) instead of loading it whole.")
+    command.add_argument("--workers", type=int, default=WORKERS,
+                         help="Validate the v1/v2 dataset pairs in this many worker processes.")
+    command.add_argument("--stability", choices=["exact", "sketch", "sample"], default=STABILITY_METHOD,
+                         help="Run the KS stability tests on full columns (exact), on quantile sketches (sketch) "
+                              "or sequentially on stratified samples (sample).")
+    command.add_argument("--prefetch", type=int, default=PREFETCH_DEPTH,
+                         help="Datasets (chunks in streaming mode) parsed in the background ahead of validation (0 disables).")
+    command.add_argument("--no-cache", action="store_true",
+                         help="Validate every dataset again instead of reusing the cached results of unchanged checks.")
+    command.add_argument("--incremental", action="store_true", default=INCREMENTAL,
+                         help="Parse only the rows appended to each file since the last run (append-only files).")
+    command.add_argument("--budget", type=float, default=DATASET_TIME_BUDGET,
+                         help="Wall-clock seconds per dataset: a load or check that would overrun it is skipped and its checks reported "
+                              "as SKIPPED (budget); a check already running is not interrupted.")
+    command.add_argument("--run-budget", type=float, default=RUN_TIME_BUDGET,
+                         help="Wall-clock seconds for the whole run, shared by every dataset.")
+    command.add_argument("--backend", choices=["pandas", "polars"], default=BACKEND,
+                         help="Run the checks with pandas, or scan the registered datasets lazily with Polars (multithreaded).")
+    command.add_argument("--watch", action="store_true",
+                         help="Keep running: validate again the datasets whose files change and update the report.")
+    command.set_defaults(handler=run)
+
+    registered = [dataset_name for dataset_name in DATASETS_PATH if schema_key(dataset_name) in SCHEMA_REGISTRY]
+    command = commands.add_parser("check-schema", help="Check file headers (and optionally first rows) against their schema.",
+                                  description="Check files against their registered schema without parsing them in full.")
+    command.add_argument("datasets", nargs="*", default=registered, metavar="dataset",
+                         help="Dataset names (default: every registered dataset).")
+    command.add_argument("--path", help="Check this file instead of the configured one (with a single dataset name).")
+    command.add_argument("--rows", type=int, default=0,
+                         help="Also parse this many rows to check the dtypes (imports pandas; default: header only).")
+    command.set_defaults(handler=check_schema)
+
+    command = commands.add_parser("diff", help="Regression test (schema, missing values, keyed row diff) of two dataset versions.",
+                                  description="Regression test (schema, missing values, keyed row diff) of two dataset versions.")
+    _add_versions_arguments(command, diff)
+
+    command = commands.add_parser("drift", help="Drift metrics (PSI, Jensen-Shannon, Wasserstein, chi-square) of two dataset versions.",
+                                  description="Drift metrics (PSI, Jensen-Shannon, Wasserstein, chi-square) of two dataset versions.")
+    _add_versions_arguments(command, drift)
+    command.add_argument("--psi-threshold", type=float, default=DRIFT_PSI_THRESHOLD, help="PSI from which a column is drifted.")
+    command.add_argument("--bins", type=int, default=DRIFT_BINS, help="Quantile bins of the numeric columns.")
+
+    command = commands.add_parser("profile", help="Accept dataset versions as baselines: profile them and store the profiles.",
+                                  description="Accept dataset versions as baselines: profile them and store the profiles.")
+    command.add_argument("datasets", nargs="*", default=baselines, metavar="dataset", help="Dataset names (default: every v1 dataset).")
+    command.set_defaults(handler=profile)
+
+    command = commands.add_parser("clean", help="Handle the missing values of v1 datasets and write them as their v2 version.",
+                                  description="Handle the missing values of v1 datasets and write them as their v2 version.")
+    command.add_argument("datasets", nargs="*", default=baselines, metavar="dataset",
+                         help="Dataset names (default: every v1 dataset).")
+    command.set_defaults(handler=clean)
+
+    command = commands.add_parser("shard", help="Validate datasets split in shards (map, reduce or both).",
+                                  description="Validate datasets split in shards: map each shard to a partial state, "
+                                              "then reduce the states into the validation report.")
+    command.add_argument("step", choices=["map", "reduce", "run"],
+                         help="map: compute the states of this worker's shards; reduce: merge them into the report; "
+                              "run: both, with local worker processes.")
+    command.add_argument("--state-dir", default=SHARD_STATE_DIR, help="Directory shared by the mappers and the reducer.")
+    command.add_argument("--worker", type=int, default=0, help="Index of this worker (map).")
+    command.add_argument("--workers", type=int, default=1, help="Number of workers the shards are split between (map, run).")
+    command.add_argument("--stability", choices=["exact", "sketch", "sample"], default=STABILITY_METHOD,
+                         help="Stability test method (reduce, run).")
+    command.set_defaults(handler=shard)
+    return parser
+
+
+def main(argv: list = None) -> int:
+    """
+    Run the sentinel command line.
+
+    :param argv: Arguments (default: sys.argv[1:]).
+    :return: Exit status: 0 if the command passed, 1 if a check failed.
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    unknown = [dataset_name for dataset_name in getattr(args, 'datasets', []) if dataset_name not in DATASETS_PATH]
+    if args.handler is check_schema:
+        unknown += [dataset_name for dataset_name in args.datasets if schema_key(dataset_name) not in SCHEMA_REGISTRY]
+        if args.path and len(args.datasets) != 1:
+            parser.error("--path needs a single dataset name")
+    if unknown:
+        parser.error(f"Unknown datasets: {', '.join(dict.fromkeys(unknown))}")
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
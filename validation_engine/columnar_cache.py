@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from validation_engine.config import COLUMNAR_CACHE_DIR, COLUMNAR_CACHE_ENABLED
+from validation_engine.typed_ingest import read_typed_csv
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow is optional: without it every load parses the CSV
+    pa = None
+
+
+def _atomic_write(path: str, write):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _source_index_path(path: str, cache_dir: str) -> str:
+    return os.path.join(cache_dir, hashlib.sha1(os.path.abspath(path).encode()).hexdigest() + ".json")
+
+
+def content_digest(path: str, cache_dir: str = COLUMNAR_CACHE_DIR) -> str:
+    """
+    Return the content hash of a file. The hash is remembered per source path together with the
+    file's mtime and size, so an unchanged file is only hashed once.
+
+    :param path: Path to the source file.
+    :param cache_dir: Directory of the columnar cache.
+    :return: Hex digest (BLAKE2b) of the file content.
+    """
+    stat = os.stat(path)
+    index_path = _source_index_path(path, cache_dir)
+    if os.path.exists(index_path):
+        with open(index_path) as index_file:
+            entry = json.load(index_file)
+        if entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+            return entry['digest']
+    else:
+        entry = None
+
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(1 << 20), b''):
+            digest.update(block)
+    digest = digest.hexdigest()
+
+    # The source changed: drop the cache files converted from its previous content
+    if entry is not None and entry['digest'] != digest:
+        for name in os.listdir(cache_dir):
+            if name.startswith(entry['digest']):
+                os.remove(os.path.join(cache_dir, name))
+
+    os.makedirs(cache_dir, exist_ok=True)
+    new_entry = {'path': os.path.abspath(path), 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'digest': digest}
+
+    def write(tmp_path):
+        with open(tmp_path, 'w') as index_file:
+            json.dump(new_entry, index_file)
+    _atomic_write(index_path, write)
+    return digest
+
+
+def _cache_path(path: str, read_options: dict, cache_dir: str) -> str:
+    # Different read_csv options give different frames, so they are part of the key
+    options_digest = hashlib.sha1(repr(sorted(read_options.items())).encode()).hexdigest()[:12]
+    return os.path.join(cache_dir, f"{content_digest(path, cache_dir)}-{options_digest}.arrow")
+
+
+def _write_arrow(dataset: pd.DataFrame, cache_path: str):
+    table = pa.Table.from_pandas(dataset, preserve_index=False)
+
+    def write(tmp_path):
+        with pa.OSFile(tmp_path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    _atomic_write(cache_path, write)
+
+
+def _read_arrow(cache_path: str, columns: list = None) -> pd.DataFrame:
+    # Uncompressed Arrow IPC files are memory-mapped: only the selected columns are touched
+    with pa.memory_map(cache_path, 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+        if columns is not None:
+            table = table.select(columns)
+        # string[pyarrow] columns are stored as large_string, restored as string[python] without the mapper
+        dataset = table.to_pandas(types_mapper={pa.large_string(): pd.StringDtype("pyarrow")}.get)
+
+        # Arrow restores missing strings as None, read_csv gives NaN
+        for column, field in zip(dataset.columns, table.schema):
+            if pa.types.is_string(field.type) and table.column(field.name).null_count:
+                dataset[column] = dataset[column].fillna(np.nan)
+    return dataset
+
+
+def load_columnar(path: str, columns: list = None, cache_dir: str = COLUMNAR_CACHE_DIR, **read_options) -> pd.DataFrame:
+    """
+    Load a CSV file through the columnar cache. On first use the CSV is parsed and converted to an
+    Arrow IPC file keyed by the CSV content hash; later loads memory-map that file and convert only
+    the requested columns. The cache is invalidated automatically when the CSV content changes.
+    Without pyarrow (or with COLUMNAR_CACHE_ENABLED off) this is a plain pd.read_csv.
+
+    :param path: Path to the CSV file.
+    :param columns: Columns to load (None loads every column).
+    :param cache_dir: Directory of the columnar cache.
+    :param read_options: Extra keyword arguments for pd.read_csv.
+    :return: DataFrame with the requested columns.
+    """
+    if pa is None or not COLUMNAR_CACHE_ENABLED:
+        if columns is not None:
+            return read_typed_csv(path, {**read_options, 'usecols': columns})[columns]
+        return read_typed_csv(path, read_options)
+
+    cache_path = _cache_path(path, read_options, cache_dir)
+    if os.path.exists(cache_path):
+        return _read_arrow(cache_path, columns)
+
+    dataset = read_typed_csv(path, read_options)
+    try:
+        _write_arrow(dataset, cache_path)
+    except (pa.ArrowException, ValueError, TypeError):
+        # Columns Arrow cannot represent (e.g. mixed-type objects) are simply not cached
+        pass
+    return dataset[columns] if columns is not None else dataset
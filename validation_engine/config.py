@@ -2,7 +2,7 @@ import os
 
 # Configurations for the Validation Engine
 
-# Dataset paths
+# Dataset paths (for validation_engine/sharded.py, a path may also be a glob pattern or a list of shard files)
 DATASETS_PATH = {
     "netflix_movies_v1": 'data/netflix_movies_detailed_up_to_2025.csv',
     "netflix_movies_v2": 'data/netflix_movies_cleaned.csv',
@@ -12,17 +12,97 @@ DATASETS_PATH = {
     "nyc_taxi_v2": 'data/nyc_taxi_trip_data_cleaned.csv'
 }
 
-# Columns to check for stability
+# Columns to check for stability (datasets without a DRIFT_COLUMNS entry)
 COLUMNS_TO_CHECK = [
     "release_year",
     "vote_average",
     "popularity"
 ]
 
+# Columns monitored for drift per dataset key, resolved against its schema: numeric columns get quantile-binned
+# histograms and the KS stability test, text and category columns (and the codes in DRIFT_CATEGORICAL) frequency tables
+DRIFT_COLUMNS = {
+    "netflix_movies": ["release_year", "vote_average", "popularity", "rating", "language"],
+    "netflix_tv_shows": ["release_year", "vote_average", "popularity", "rating", "language"],
+    "nyc_taxi": ["trip_distance", "fare_amount", "tip_amount", "total_amount", "passenger_count", "payment_type"]
+}
+DRIFT_CATEGORICAL = ["VendorID", "RatecodeID", "payment_type", "trip_type"]  # Numeric codes compared as categories
+DRIFT_BINS = 10  # Bins of the numeric drift histograms, cut at the baseline's quantiles
+DRIFT_PSI_THRESHOLD = 0.2  # Population stability index from which a column is reported as drifted
+
 # Validation thresholds
 MISSING_THRESHOLD = 0.35  # 35% missing values threshold to drop rows
 STATISTICAL_TEST_ALPHA = 0.05  # p-value threshold for statistical tests
+STABILITY_METHOD = "exact"  # "exact" (ks_2samp on full columns), "sketch" (KS on mergeable quantile sketches) or "sample" (sequential KS on samples)
+STABILITY_SKETCH_K = 400  # KLL sketch size: ~0.7% rank error, a few KB per column
+STABILITY_SAMPLE_SIZE = 50000  # Largest sample per version and column in sample mode
+STABILITY_SAMPLE_MIN_SIZE = 2000  # Sample size of the first look of the sequential test (doubled at each look)
+STABILITY_SAMPLE_TOLERANCE = 0.05  # KS distance below which a column is stable in sample mode
+# Column each dataset is sampled by stratum of in sample mode (timestamps by month)
+STABILITY_SAMPLE_STRATA = {
+    "netflix_movies": "release_year",
+    "netflix_tv_shows": "release_year",
+    "nyc_taxi": "lpep_pickup_datetime"
+}
+ROW_DIFF_SPILL_DIR = "cache/row_diff"  # Partition files of the keyed row diff in streaming mode (bounded memory)
+UNIQUENESS_SAMPLE_KEYS = 3  # Sample duplicate keys reported by the key uniqueness check (its key hashes spill to ROW_DIFF_SPILL_DIR)
+BASELINE_PROFILES = True  # Compare against stored profiles of the v1 datasets instead of re-reading them
+PROFILE_STORE_DIR = "profiles"  # Directory of the baseline profiles (see validation_engine/profile_store.py)
+PROFILE_CHUNK_SIZE = 100000  # Rows per chunk while profiling a baseline
+# Keep the row diff records (24 bytes per row) and the sorted monitored values in the baseline profiles, so the regression
+# check counts the added, removed and changed rows and every stability method runs on the profile. False (for baselines
+# too large for that) keeps digests and sketches only: the regression check then only compares digests, and the
+# baseline file is read again for the exact and sample stability methods
+BASELINE_PROFILE_EXACT = True
+
+# Schema preflight
+PREFLIGHT_ENABLED = True  # Check the header and first rows of each file against its schema before parsing it in full
+PREFLIGHT_SAMPLE_ROWS = 1000  # Rows read by the schema preflight to check the dtypes
+
+# Dataset loading
+CACHE_MEMORY_BUDGET_MB = 4096  # Memory budget of the shared dataset cache before LRU eviction
+TYPED_INGEST = True  # Parse only the columns the rules read, with the dtypes of the schema registry
+ARROW_STRINGS = False  # With typed ingest, store the free-text columns as string[pyarrow] instead of objects (requires pyarrow)
+BACKEND = "pandas"  # Engine of the in-memory checks: "pandas" or "polars" (lazy multithreaded scans of the registered datasets, requires polars)
+VALIDATION_RULES = ["missing", "schema", "regression", "uniqueness", "stability", "drift"]  # Rules run by the validation engine
+COLUMNAR_CACHE_ENABLED = True  # Convert CSVs to memory-mapped Arrow files on first use (requires pyarrow)
+COLUMNAR_CACHE_DIR = "cache/columnar"  # Directory of the columnar cache, keyed by CSV content hash
+CHUNK_SIZE = None  # Rows per chunk in streaming mode (None loads each dataset in memory)
+WORKERS = 1  # Worker processes used to validate the v1/v2 dataset pairs in parallel
+SHARD_STATE_DIR = "cache/shards"  # Partial states of the shards, shared by the mappers and the reducer of sharded.py
+PREFETCH_DEPTH = 1  # Datasets (or chunks, in streaming mode) read and parsed in the background ahead of validation (0 disables)
+
+# Incremental validation of append-only files
+INCREMENTAL = False  # Parse only the rows appended since the last run, from checkpointed aggregates
+INCREMENTAL_DIR = "cache/incremental"  # Checkpoints (byte offset and profiles) of each dataset
+INCREMENTAL_CHECK_BYTES = 65536  # Bytes hashed at the start and end of the checkpointed content to detect rewrites
+
+# Result cache
+RESULT_CACHE_ENABLED = True  # Reuse the results of checks whose input files, rule version and settings are unchanged
+RESULT_CACHE_DIR = "cache/results"  # Directory of the cached check results, keyed by content hash
+RESULT_CACHE_MAX_MB = 64  # Size budget of the result cache before LRU eviction
+WATCH_INTERVAL = 2.0  # Seconds between two scans of the dataset files in --watch mode
+
+# Check scheduling
+FATAL_CHECKS = ["schema"]  # Rules whose failure skips the remaining checks of the dataset
+# Time budgets: a dataset whose estimated load (parse, imputation, preflight, baseline profile) would overrun its
+# deadline is not read, and checks whose estimated cost would overrun it are skipped. Budgets only gate what starts:
+# a load or check already running is not interrupted, so one whose cost was underestimated can end past the deadline
+DATASET_TIME_BUDGET = None  # Wall-clock seconds per dataset (None: unbounded)
+RUN_TIME_BUDGET = None  # Wall-clock seconds per run, shared by every dataset (None: unbounded)
+CHECK_COSTS_PATH = "cache/check_costs.json"  # Timings and outcomes of past checks, to estimate their cost
+CHECK_COST_DEFAULTS = {  # Seconds per cell (row x column read) of each rule until it has been timed
+    "schema": 2e-9,  # Reads the dtypes only
+    "regression": 1e-7,
+    "uniqueness": 2e-7,
+    "stability": 5e-7,
+    "drift": 3e-7,
+}
+CHECK_COST_SMOOTHING = 0.3  # Weight of the latest timing in the moving average of a rule's cost
+LOAD_COST_DEFAULT = 2e-8  # Seconds per byte of input file to load and prepare a dataset until a load has been timed
 
 # Reporting configurations
 REPORT_PATH = "reports/validation_report.txt"
 LOG_PATH = "logs/validation_engine.log"
+SPANS_PATH = "logs/spans.jsonl"  # Per-stage timing/memory spans of every run, as JSON lines
+METRICS_PATH = "reports/validation_metrics.prom"  # Spans of the last run as a Prometheus textfile
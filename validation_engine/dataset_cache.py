@@ -0,0 +1,204 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from validation_engine.config import CACHE_MEMORY_BUDGET_MB, COLUMNAR_CACHE_DIR
+from validation_engine.columnar_cache import load_columnar
+from quality_rules.missing_values import NullProfile, null_profile
+
+
+def _file_key(path: str, columns: list, read_options: dict) -> tuple:
+    """
+    Build the cache key for a dataset file.
+
+    :param path: Path to the CSV file.
+    :param columns: Columns loaded (None for every column).
+    :param read_options: Keyword arguments passed to pd.read_csv.
+    :return: Tuple of (absolute path, mtime in ns, size in bytes, columns, read options).
+    """
+    stat = os.stat(path)
+    columns = tuple(columns) if columns is not None else None
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, columns, repr(sorted(read_options.items())))
+
+
+def _freeze(dataset: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rebuild the dataset over read-only views of its numpy columns so cached frames cannot be modified in place
+    (no data is copied). Columns backed by pandas arrays (nullable, string, categorical, datetime) are kept as they are.
+    """
+    columns = {}
+    for i in range(dataset.shape[1]):
+        series = dataset.iloc[:, i]
+        if isinstance(series.dtype, np.dtype) and series.dtype.kind not in 'mM':
+            values = series.to_numpy()
+            values.setflags(write=False)
+            columns[i] = values
+        else:
+            columns[i] = series.array
+    frozen = pd.DataFrame(columns, index=dataset.index, copy=False)
+    frozen.columns = dataset.columns
+    return frozen
+
+
+class DatasetCache:
+    """
+    LRU cache of parsed datasets shared by every validation stage.
+
+    Entries are keyed on path + mtime + size (+ read options), so a file that changes on disk is
+    parsed again. A file requested again while it is being parsed (e.g. by a prefetching thread)
+    waits for that parse instead of starting another one. Frames handed out are shallow copies over read-only columns: callers may add,
+    replace or drop columns freely, but in-place writes raise instead of corrupting the cache. The NullProfile of each
+    cached frame is counted once, on first use, and kept with it.
+    """
+
+    def __init__(self, memory_budget_mb: float = CACHE_MEMORY_BUDGET_MB, columnar_cache_dir: str = COLUMNAR_CACHE_DIR):
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self.columnar_cache_dir = columnar_cache_dir
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._null_profiles = {}
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    @property
+    def memory_used(self) -> int:
+        return sum(self._sizes.values())
+
+    def load(self, path: str, columns: list = None, **read_options) -> pd.DataFrame:
+        """
+        Return the dataset stored at `path`, parsing it only if it is not cached yet.
+        Cache misses go through the columnar cache, so files seen in a previous run are not parsed again.
+
+        :param path: Path to the CSV file.
+        :param columns: Columns to load (None loads every column).
+        :param read_options: Extra keyword arguments for pd.read_csv (part of the cache key).
+        :return: Read-only view of the parsed DataFrame.
+        """
+        key = _file_key(path, columns, read_options)
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key].copy(deep=False)
+            loading = self._loading.get(key)
+            if loading is None:
+                self.misses += 1
+                self._loading[key] = threading.Event()
+        if loading is not None:
+            # Another thread is parsing this file: wait for it (if it failed, this call parses it itself)
+            loading.wait()
+            return self.load(path, columns, **read_options)
+
+        try:
+            dataset = load_columnar(path, columns, self.columnar_cache_dir, **read_options)
+            size = int(dataset.memory_usage(index=True, deep=True).sum())
+            dataset = _freeze(dataset)
+
+            with self._lock:
+                # Drop stale entries for the same file (e.g. the file was rewritten since it was cached)
+                for stale_key in [k for k in self._entries if k[0] == key[0] and k[1:3] != key[1:3]]:
+                    self._discard(stale_key)
+                self._entries[key] = dataset
+                self._sizes[key] = size
+                self._evict()
+        finally:
+            with self._lock:
+                self._loading.pop(key).set()
+        return dataset.copy(deep=False)
+
+    def null_profile(self, path: str, columns: list = None, **read_options) -> NullProfile:
+        """
+        Return the NullProfile of the dataset stored at `path` (loaded through the cache), counting its nulls only
+        the first time. The profile is shared: derive profiles from it (NullProfile.select), do not update it.
+
+        :param path: Path to the CSV file.
+        :param columns: Columns loaded (None for every column).
+        :param read_options: Extra keyword arguments for pd.read_csv (part of the cache key).
+        :return: NullProfile of the cached frame.
+        """
+        dataset = self.load(path, columns, **read_options)
+        key = _file_key(path, columns, read_options)
+        with self._lock:
+            cached = self._null_profiles.get(key)
+            # Kept with the frame it was counted on: a frame parsed again (e.g. after an eviction) is counted again
+            if cached is not None and cached[0] is self._entries.get(key):
+                return cached[1]
+            entry = self._entries.get(key)
+        nulls = null_profile(dataset)
+        with self._lock:
+            if entry is not None and self._entries.get(key) is entry:
+                self._null_profiles[key] = (entry, nulls)
+        return nulls
+
+    def _discard(self, key: tuple):
+        del self._entries[key]
+        del self._sizes[key]
+        self._null_profiles.pop(key, None)
+
+    def _evict(self):
+        # Evict least recently used entries until we are within budget, always keeping the newest entry
+        while len(self._entries) > 1 and self.memory_used > self.memory_budget:
+            oldest_key = next(iter(self._entries))
+            self._discard(oldest_key)
+            self.evictions += 1
+
+    def clear(self):
+        """
+        Drop every entry and reset the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._null_profiles.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        """
+        Return the hit/miss counters and current memory usage of the cache.
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self._entries),
+            'memory_bytes': self.memory_used,
+            'memory_budget_bytes': self.memory_budget,
+        }
+
+
+# Cache shared by every stage of a run
+_default_cache = DatasetCache()
+
+
+def get_dataset_cache() -> DatasetCache:
+    return _default_cache
+
+
+def load_dataset(path: str, columns: list = None, **read_options) -> pd.DataFrame:
+    """
+    Load a dataset through the shared cache so each file is parsed at most once per run.
+
+    :param path: Path to the CSV file.
+    :param columns: Columns to load (None loads every column).
+    :param read_options: Extra keyword arguments for pd.read_csv.
+    :return: Read-only view of the parsed DataFrame.
+    """
+    return _default_cache.load(path, columns, **read_options)
+
+
+def load_null_profile(path: str, columns: list = None, **read_options) -> NullProfile:
+    """
+    Return the NullProfile of a dataset loaded through the shared cache, counted once per cached frame.
+
+    :param path: Path to the CSV file.
+    :param columns: Columns loaded (None loads every column).
+    :param read_options: Extra keyword arguments for pd.read_csv.
+    :return: NullProfile of the dataset.
+    """
+    return _default_cache.null_profile(path, columns, **read_options)
@@ -0,0 +1,177 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import shutil
+
+import pandas as pd
+
+from validation_engine.config import STABILITY_SKETCH_K, PROFILE_CHUNK_SIZE, INCREMENTAL_DIR, INCREMENTAL_CHECK_BYTES
+from validation_engine.spans import traced
+from validation_engine.typed_ingest import SchemaIngestError, describe_type_errors
+from quality_rules.drift import stability_columns
+from quality_rules.missing_handle import compile_imputation_plan
+from quality_rules.missing_values import null_profile
+from quality_rules.profiles import DatasetProfile
+from quality_rules.schema_validation import empty_frame, schema_key
+
+# Bumped whenever the content of a checkpoint changes, so older checkpoints are rebuilt
+CHECKPOINT_FORMAT = 2
+
+
+class _BoundedReader(io.RawIOBase):
+    # Binary file reader that stops at `end`, so rows appended while the tail is parsed are left for the next run
+
+    def __init__(self, source, end: int):
+        self.source = source
+        self.end = end
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        size = min(len(buffer), self.end - self.source.tell())
+        if size <= 0:
+            return 0
+        data = self.source.read(size)
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def _fingerprint(path: str, offset: int, check_bytes: int = INCREMENTAL_CHECK_BYTES) -> dict:
+    # Hashes of the first and last `check_bytes` bytes before `offset`: a file rewritten since the checkpoint
+    # (rather than appended to) almost always changes one of them
+    with open(path, 'rb') as source:
+        head = source.read(min(offset, check_bytes))
+        source.seek(max(0, offset - check_bytes))
+        tail = source.read(offset - max(0, offset - check_bytes))
+    return {'head': hashlib.blake2b(head, digest_size=16).hexdigest(), 'tail': hashlib.blake2b(tail, digest_size=16).hexdigest()}
+
+
+def _settings(dataset_name: str, read_options: dict, expected_schema: dict) -> dict:
+    # Everything the aggregates depend on besides the file content
+    return {
+        'format': CHECKPOINT_FORMAT,
+        'dataset': dataset_name,
+        'read_options': repr(sorted(read_options.items())),
+        'schema': repr(sorted(expected_schema.items())),
+        'value_columns': stability_columns(schema_key(dataset_name)),
+        'sketch_k': STABILITY_SKETCH_K,
+    }
+
+
+def _checkpoint(checkpoint_path: str, dataset_path: str, settings: dict) -> dict:
+    # The checkpoint's metadata if the file only grew since it was written (same settings, content up to the
+    # checkpointed offset unchanged, last row complete), else None
+    meta_path = os.path.join(checkpoint_path, "checkpoint.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as meta_file:
+        meta = json.load(meta_file)
+    size = os.path.getsize(dataset_path)
+    if meta['settings'] != settings:
+        reason = "settings changed"
+    elif size < meta['offset']:
+        reason = "file truncated"
+    elif size > meta['offset'] and not meta['complete']:
+        reason = "last row was incomplete"
+    elif _fingerprint(dataset_path, meta['offset']) != meta['fingerprint']:
+        reason = "file rewritten"
+    else:
+        return meta
+    logging.info(f"Checkpoint of {dataset_path} discarded ({reason}), scanning it from the start")
+    return None
+
+
+def _read_rows(path: str, start: int, end: int, columns: list, chunksize: int, read_options: dict):
+    # Chunks of the rows stored between byte offsets `start` and `end` (line boundaries) of a CSV file
+    if start >= end:
+        return
+    with open(path, 'rb') as source:
+        source.seek(start)
+        reader = io.BufferedReader(_BoundedReader(source, end))
+        try:
+            yield from pd.read_csv(reader, header=None, names=columns, chunksize=chunksize, **read_options)
+        except (ValueError, TypeError) as error:
+            if 'dtype' not in read_options:
+                raise
+            raise SchemaIngestError(path, describe_type_errors(path, read_options, error, chunksize)) from error
+
+
+@traced
+def incremental_profiles(dataset_name: str, dataset_path: str, read_options: dict = None, expected_schema: dict = None,
+                         checkpoint_dir: str = INCREMENTAL_DIR, chunksize: int = PROFILE_CHUNK_SIZE) -> dict:
+    """
+    Profile an append-only dataset file from its last checkpoint: only the rows appended since the previous
+    run are parsed, and the checkpointed aggregates (null counts, dtypes, sketches, row-hash digest and row
+    diff records, in the profiles of the raw and the cleaned rows) are updated with them. A file that was
+    truncated or rewritten since the checkpoint (or read with other settings) is scanned from the start.
+
+    Rows are read up to the end of the file at the start of the call; a last row without its newline is
+    parsed, but the next run scans the file again if it grew, since that row may have been cut mid-write.
+
+    :param dataset_name: Name of the dataset (selects its imputation policy).
+    :param dataset_path: Path to the dataset CSV file.
+    :param read_options: Extra keyword arguments for pd.read_csv (e.g. typed ingest options).
+    :param expected_schema: Expected schema, used to cast imputed columns (see compile_imputation_plan).
+    :param checkpoint_dir: Directory of the checkpoints.
+    :param chunksize: Number of rows per chunk while parsing.
+    :return: Dictionary with the raw and cleaned DatasetProfile, the imputation changes, the rows parsed by this
+             call and whether the file was scanned from the start.
+    """
+    read_options = read_options or {}
+    expected_schema = expected_schema or {}
+    settings = _settings(dataset_name, read_options, expected_schema)
+    checkpoint_path = os.path.join(checkpoint_dir, dataset_name)
+    meta = _checkpoint(checkpoint_path, dataset_path, settings)
+
+    with open(dataset_path, 'rb') as source:
+        header = source.readline()
+        end = os.fstat(source.fileno()).st_size
+        source.seek(max(0, end - 1))
+        complete = end == 0 or source.read(1) == b"\n"
+    columns = list(pd.read_csv(io.BytesIO(header), nrows=0).columns)
+
+    full_scan = meta is None
+    if not full_scan:
+        raw, cleaned = (DatasetProfile.load(os.path.join(checkpoint_path, kind)) for kind in ("raw", "cleaned"))
+        for profile in (raw, cleaned):
+            # Stored dtypes are names: back to dtypes, as update() merges them with the next chunks'
+            profile.dtypes = empty_frame(profile.dtypes).dtypes if profile.dtypes is not None else None
+        changes, start = meta['imputation_changes'], meta['offset']
+    else:
+        # Exact profiles: the uniqueness and regression checks run on their row records
+        raw = DatasetProfile(settings['value_columns'], STABILITY_SKETCH_K, exact=True)
+        cleaned = DatasetProfile(settings['value_columns'], STABILITY_SKETCH_K, exact=True)
+        changes, start = {}, len(header)
+
+    plan = compile_imputation_plan(dataset_name, expected_schema)
+    rows = 0
+    for chunk in _read_rows(dataset_path, start, end, columns, chunksize, read_options):
+        # The nulls of each chunk are counted once: the cleaned chunk's profile is derived from them
+        nulls = null_profile(chunk)
+        raw.update(chunk, nulls)
+        cleaned.update(*plan.apply_profiled(chunk, changes, nulls))
+        rows += len(chunk)
+
+    if rows or full_scan:
+        # Write the new checkpoint next to the old one and swap it in, so a crash never leaves a partial checkpoint
+        tmp_path = f"{checkpoint_path}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        if raw.columns is None:
+            # A file with a header and no rows yet
+            raw.update(pd.read_csv(io.BytesIO(header), **read_options))
+            cleaned.update(plan.apply(pd.read_csv(io.BytesIO(header), **read_options)))
+        raw.save(os.path.join(tmp_path, "raw"))
+        cleaned.save(os.path.join(tmp_path, "cleaned"))
+        meta = {'settings': settings, 'path': os.path.abspath(dataset_path), 'offset': end, 'complete': complete,
+                'rows': cleaned.rows, 'fingerprint': _fingerprint(dataset_path, end), 'imputation_changes': changes}
+        with open(os.path.join(tmp_path, "checkpoint.json"), 'w') as meta_file:
+            json.dump(meta, meta_file)
+        shutil.rmtree(checkpoint_path, ignore_errors=True)
+        os.replace(tmp_path, checkpoint_path)
+
+    logging.info(f"Incremental profile of {dataset_name}: {rows} rows parsed from byte {start}, {cleaned.rows} rows in total")
+    return {'raw': raw, 'cleaned': cleaned, 'imputation_changes': changes, 'rows_parsed': rows, 'full_scan': full_scan}
@@ -0,0 +1,11 @@
+import glob
+
+
+def dataset_files(dataset_path) -> list:
+    """
+    Return the files of a DATASETS_PATH entry: a file, a glob pattern (e.g. 'data/taxi/2021-01-*.csv', matches
+    in sorted order) or a list of files.
+    """
+    if isinstance(dataset_path, (list, tuple)):
+        return list(dataset_path)
+    return sorted(glob.glob(dataset_path)) if glob.has_magic(dataset_path) else [dataset_path]
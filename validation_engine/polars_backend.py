@@ -0,0 +1,286 @@
+import numpy as np
+import pandas as pd
+
+from validation_engine.config import VALIDATION_RULES
+from validation_engine.typed_ingest import columns_for_rules, storage_schema
+from quality_rules.missing_handle import ImputationPlan
+from quality_rules.row_diff import compared_columns, row_key
+from quality_rules.schema_validation import schema_key, schema_violation
+
+try:
+    import polars as pl
+except ImportError:  # polars is optional: only the "polars" backend needs it
+    pl = None
+
+# Strings pd.read_csv reads as missing values by default: the Polars scans read them as nulls too,
+# so both backends see the same missing values
+NA_VALUES = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN', '<NA>', 'N/A', 'NA',
+             'NULL', 'NaN', 'None', 'n/a', 'nan', 'null']
+
+
+def polars_dtype(dtype: str):
+    """
+    Return the Polars dtype of a schema registry dtype (e.g. 'Int16' -> pl.Int16, 'category' -> pl.Categorical).
+    Text is stored as pl.String whether pandas keeps it as objects or as Arrow strings.
+    """
+    if dtype in ('object', 'string', 'string[pyarrow]'):
+        return pl.String
+    if dtype == 'category':
+        return pl.Categorical
+    if dtype.startswith('datetime64'):
+        return pl.Datetime('ns')
+    name = pd.api.types.pandas_dtype(dtype).name.lower()
+    if name in ('bool', 'boolean'):
+        return pl.Boolean
+    # Numeric dtypes have the same names, nullable or not: 'Int16' and 'int16' -> pl.Int16
+    return getattr(pl, name.capitalize().replace('Uint', 'UInt'))
+
+
+def scan_dataset(dataset_name: str, path: str, rules: list = VALIDATION_RULES):
+    """
+    Scan a registered dataset lazily: only the columns the rules read (see columns_for_rules), parsed straight
+    into the Polars versions of their storage dtypes, as typed ingest does for pandas. Nothing is read until
+    the query is collected, so the filters and projections of the query are pushed down into the scan.
+
+    :param dataset_name: Name of the dataset (e.g. "nyc_taxi_v2").
+    :param path: Path to the dataset CSV file.
+    :param rules: Names of the rules that will run.
+    :return: pl.LazyFrame.
+    """
+    if pl is None:
+        raise ImportError("The polars backend requires polars (pip install polars)")
+    dataset_key = schema_key(dataset_name)
+    columns = columns_for_rules(dataset_key, rules)
+    schema = storage_schema(dataset_key)
+    dtypes = {column: polars_dtype(schema[column]) for column in columns}
+    # Nullable integer columns may be written as floats ("2.0", as pandas writes an int column with missing values),
+    # which read_csv parses but Polars does not: they are scanned as floats and cast
+    as_floats = [column for column in columns if pd.api.types.is_extension_array_dtype(pd.api.types.pandas_dtype(schema[column]))
+                 and pd.api.types.is_integer_dtype(pd.api.types.pandas_dtype(schema[column]))]
+    frame = pl.scan_csv(path, schema_overrides={**dtypes, **{column: pl.Float64 for column in as_floats}}, null_values=NA_VALUES)
+    return frame.select(columns).with_columns([pl.col(column).cast(dtypes[column]) for column in as_floats])
+
+
+def apply_imputation_plan(plan: ImputationPlan, frame) -> tuple:
+    """
+    Polars version of ImputationPlan.apply: the same column drops, threshold row drop, fills and casts,
+    as expressions of a lazy query.
+
+    :param plan: Imputation plan of the dataset (see compile_imputation_plan).
+    :param frame: pl.LazyFrame of the dataset.
+    :return: (cleaned pl.LazyFrame, pl.LazyFrame of the counts imputation_changes reads).
+    """
+    columns = frame.collect_schema().names()
+    drop_columns = [column for column in plan.drop_columns if column in columns]
+    frame = frame.drop(drop_columns)
+    columns = [column for column in columns if column not in drop_columns]
+
+    dropped = pl.sum_horizontal(pl.col(columns).is_null()) > plan.missing_threshold * len(columns)
+    kept = frame.filter(~dropped)
+    fill = {column: value for column, value in plan.fill.items() if column in columns}
+    counts = frame.select(pl.len().alias('rows'), dropped.sum().alias('dropped'),
+                          *[pl.col(column).filter(~dropped).null_count().alias(f"fill:{column}") for column in fill])
+
+    schema = frame.collect_schema()
+    casts = {column: polars_dtype(dtype) for column, dtype in plan.casts.items() if column in columns and schema[column] != polars_dtype(dtype)}
+    cleaned = kept.with_columns([pl.col(column).fill_null(value) for column, value in fill.items()]) if fill else kept
+    if casts:
+        cleaned = cleaned.with_columns([pl.col(column).cast(dtype) for column, dtype in casts.items()])
+    return cleaned, counts
+
+
+def imputation_changes(plan: ImputationPlan, columns: list, counts, changes: dict = None) -> dict:
+    """
+    Count the cells each rule of the plan changed, from the collected counts of apply_imputation_plan
+    (rule -> cells, as ImputationPlan.apply counts them).
+
+    :param columns: Columns of the dataset before the plan was applied.
+    :param counts: Collected counts (one-row pl.DataFrame).
+    """
+    changes = {} if changes is None else changes
+    counts = counts.row(0, named=True)
+
+    def count(rule, cells):
+        changes[rule] = changes.get(rule, 0) + cells
+
+    drop_columns = [column for column in plan.drop_columns if column in columns]
+    columns = [column for column in columns if column not in drop_columns]
+    for column in drop_columns:
+        count(f"drop column {column}", counts['rows'])
+    count(f"drop rows over {plan.missing_threshold:.0%} missing", counts['dropped'] * len(columns))
+    for column, value in plan.fill.items():
+        if column in columns:
+            count(f"fill {column} with {value!r}", counts[f"fill:{column}"])
+    return changes
+
+
+def null_counts(frame) -> pd.Series:
+    """
+    Number of missing values per column of a pl.DataFrame (same as null_profile(dataset).counts).
+    """
+    counts = frame.select(pl.all().null_count()).row(0) if frame.width else ()
+    return pd.Series(counts, index=pd.Index(frame.columns), dtype='int64')
+
+
+def validate_schema(frame, expected_schema: dict) -> bool:
+    """
+    Polars version of quality_rules.schema_validation.validate_schema: the columns and dtypes of a pl.DataFrame
+    or LazyFrame against the Polars versions of the expected dtypes. Every violation is printed.
+
+    :return: True if schema is valid, False otherwise.
+    """
+    schema = frame.collect_schema()
+    violations = []
+    for column, expected_dtype in expected_schema.items():
+        if column not in schema:
+            violations.append(schema_violation(column, "missing", expected_dtype, None, f"Missing column '{column}'"))
+        elif schema[column] != polars_dtype(expected_dtype):
+            found = str(schema[column])
+            violations.append(schema_violation(column, "dtype", expected_dtype, found,
+                                               f"Column '{column}' has incorrect type. Expected {expected_dtype}, found {found}"))
+    for violation in violations:
+        print(f"Error: {violation['message']}")
+    return not violations
+
+
+def _comparable(frame, columns: list) -> list:
+    # Numeric columns as Float64 and categories as strings, as hash_rows hashes them, so both versions
+    # compare alike whatever their storage dtypes
+    schema = frame.collect_schema()
+    expressions = []
+    for column in columns:
+        dtype = schema[column]
+        if dtype.is_numeric():
+            expressions.append(pl.col(column).cast(pl.Float64))
+        elif dtype == pl.Categorical:
+            expressions.append(pl.col(column).cast(pl.String))
+        else:
+            expressions.append(pl.col(column))
+    return expressions
+
+
+def _row_groups(frame, key_columns: list, value_columns: list):
+    # One row per distinct key: row count, order-independent sum of the row hashes (in two 32-bit halves, so the
+    # sums cannot overflow) and smallest row position
+    if not key_columns:
+        frame, key_columns = frame.with_row_index('__position'), ['__position']
+    high = pl.lit(1 << 32, dtype=pl.UInt64)
+    return (frame.lazy().with_row_index('__row')
+            .select(*_comparable(frame, key_columns), pl.col('__row'), pl.struct(_comparable(frame, value_columns)).hash().alias('__hash'))
+            .group_by(key_columns)
+            .agg(pl.len().alias('rows'), (pl.col('__hash') // high).sum().alias('high'), (pl.col('__hash') % high).sum().alias('low'),
+                 pl.col('__row').min().alias('first')))
+
+
+def compare_datasets(dataset_v1, dataset_v2, sample_size: int = 5) -> bool:
+    """
+    Polars version of quality_rules.regression_tests.compare_datasets, on two pl.DataFrames: the same schema
+    and missing values checks, then the keyed row diff as a group-by and a full join of the two versions.
+    Sample differing keys are printed instead of sample rows.
+
+    :return: True if no regression is detected, False otherwise.
+    """
+    if dataset_v1.columns != dataset_v2.columns:
+        print("Schema mismatch detected between dataset versions.")
+        return False
+
+    missing_v1, missing_v2 = null_counts(dataset_v1), null_counts(dataset_v2)
+    print("Missing values in version 1:")
+    print(missing_v1)
+    print("\nMissing values in version 2:")
+    print(missing_v2)
+
+    if not missing_v1.equals(missing_v2):
+        print("Missing value regression detected between dataset versions.")
+        return False
+
+    key_columns = row_key(dataset_v1.columns) or []
+    value_columns = compared_columns(dataset_v1.columns, key_columns)
+    groups_v1, groups_v2 = _row_groups(dataset_v1, key_columns, value_columns), _row_groups(dataset_v2, key_columns, value_columns)
+    joined = groups_v1.join(groups_v2, on=key_columns or ['__position'], how='full', nulls_equal=True, coalesce=True, suffix='_v2')
+    kind = (pl.when(pl.col('rows_v2').is_null()).then(pl.lit("removed"))
+            .when(pl.col('rows').is_null()).then(pl.lit("added"))
+            .when((pl.col('rows') != pl.col('rows_v2')) | (pl.col('high') != pl.col('high_v2')) | (pl.col('low') != pl.col('low_v2')))
+            .then(pl.lit("changed")).otherwise(pl.lit("unchanged")))
+    diff = joined.with_columns(kind.alias('kind'), pl.coalesce('first_v2', 'first').alias('order')).collect()
+    counts = dict(diff.group_by('kind').len().iter_rows())
+    added, removed, changed, unchanged = (counts.get(kind, 0) for kind in ("added", "removed", "changed", "unchanged"))
+
+    print(f"Row diff by {', '.join(key_columns) if key_columns else 'row position'}: {added} added, {removed} removed, "
+          f"{changed} changed, {unchanged} unchanged")
+    duplicate_keys = [diff.filter(pl.col(rows) > 1).height for rows in ('rows', 'rows_v2')]
+    if any(duplicate_keys):
+        print(f"Duplicate keys: {duplicate_keys[0]} in version 1, {duplicate_keys[1]} in version 2")
+    if key_columns:
+        for kind in ("removed", "added", "changed"):
+            samples = diff.filter(pl.col('kind') == kind).sort('order').head(sample_size)
+            if samples.height:
+                print(f"Sample {kind} keys:")
+                print(to_pandas(samples, key_columns).to_string())
+
+    if added or removed or changed:
+        print(f"Data regression detected: {added} rows added, {removed} removed, "
+              f"{changed} changed in columns {', '.join(value_columns)}")
+        return False
+
+    print("No regressions detected between dataset versions.")
+    return True
+
+
+def find_duplicate_keys(dataset, sample_size: int = 5) -> dict:
+    """
+    Polars version of quality_rules.uniqueness.find_duplicate_keys on a pl.DataFrame: the rows of each
+    non-null registered key are counted in one group-by.
+
+    :param dataset: pl.DataFrame of the dataset.
+    :param sample_size: Number of sample duplicate keys reported (the first ones in row order).
+    :return: Same dictionary as find_duplicate_keys (row ids are row positions).
+    """
+    key_columns = row_key(dataset.columns) or []
+    result = {'key': key_columns, 'rows': dataset.height, 'null_keys': 0, 'duplicate_keys': 0, 'duplicate_rows': 0,
+              'samples': np.empty(0, dtype='int64'), 'sample_counts': np.empty(0, dtype='int64'), 'sample_keys': None}
+    if not key_columns:
+        print("No registered key: key uniqueness not checked.")
+        return result
+
+    complete = dataset.lazy().with_row_index('__row').drop_nulls(key_columns)
+    duplicates = (complete.group_by(key_columns).agg(pl.len().alias('rows'), pl.col('__row').min().alias('first'))
+                  .filter(pl.col('rows') > 1).sort('first').collect())
+    samples = duplicates.head(sample_size)
+    result.update(null_keys=dataset.height - complete.select(pl.len()).collect().item(), duplicate_keys=duplicates.height,
+                  duplicate_rows=int(duplicates['rows'].sum() - duplicates.height) if duplicates.height else 0,
+                  samples=samples['first'].to_numpy().astype('int64'), sample_counts=samples['rows'].to_numpy().astype('int64'))
+    if samples.height:
+        result['sample_keys'] = to_pandas(samples, key_columns + ['rows'], index=result['samples'])
+
+    print(f"Key uniqueness of {', '.join(key_columns)}: {result['duplicate_keys']} duplicate keys "
+          f"({result['duplicate_rows']} extra rows) in {result['rows']} rows, {result['null_keys']} rows with a null key")
+    if result['sample_keys'] is not None:
+        print("Sample duplicate keys:")
+        print(result['sample_keys'].to_string())
+    return result
+
+
+def to_pandas(frame, columns: list, index=None) -> pd.DataFrame:
+    """
+    Copy columns of a pl.DataFrame into a pandas DataFrame (nullable integers as float64, categories as objects),
+    e.g. the numeric columns the stability and drift tests read.
+    """
+    return pd.DataFrame({column: frame[column].to_numpy() for column in columns}, index=index)
+
+
+def load_versions(plan: ImputationPlan, dataset_name: str, dataset_path: str, dataset_v1_name: str, dataset_v1_path: str,
+                  changes: dict = None) -> tuple:
+    """
+    Scan the old version of a dataset as-is and the new one cleaned by its imputation plan, and collect both
+    in one pass: the two queries run in parallel, each parsing its file on every core.
+
+    :param plan: Imputation plan of the new version.
+    :param changes: If given, the number of cells each rule of the plan changed is added to it.
+    :return: (old version, cleaned new version) as pl.DataFrames.
+    """
+    scanned = scan_dataset(dataset_name, dataset_path)
+    cleaned, counts = apply_imputation_plan(plan, scanned)
+    dataset_v1, cleaned, counts = pl.collect_all([scan_dataset(dataset_v1_name, dataset_v1_path), cleaned, counts])
+    imputation_changes(plan, scanned.collect_schema().names(), counts, changes)
+    return dataset_v1, cleaned
@@ -0,0 +1,60 @@
+import queue
+import threading
+
+from validation_engine.config import PREFETCH_DEPTH
+
+# Marks the end of the prefetched iterator in the queue
+_DONE = object()
+
+
+def prefetch(iterable, depth: int = PREFETCH_DEPTH):
+    """
+    Iterate over `iterable` while a background thread produces its next items ahead of the consumer,
+    so reading and parsing (which release the GIL) overlap with the validation of the current item.
+
+    At most `depth` items are produced ahead of the one being consumed, which caps the extra memory
+    (e.g. depth chunks or datasets). Errors raised while producing an item are raised again by the
+    consumer, at that item. Closing the iterator early stops the producer.
+
+    :param iterable: Iterable to prefetch (e.g. CSV chunks, or dataset names whose loads it triggers).
+    :param depth: Number of items produced ahead; 0 iterates in the calling thread.
+    :return: Generator of the items of `iterable`, in order.
+    """
+    if depth <= 0:
+        yield from iterable
+        return
+
+    items = queue.Queue()
+    # One slot per item that may be produced ahead; the consumer frees a slot when it moves past an item
+    slots = threading.Semaphore(depth)
+    stopped = threading.Event()
+
+    def produce():
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                items.put((item, None))
+                slots.acquire()
+                if stopped.is_set():
+                    # Release the producer's resources (e.g. the open file of a chunk reader)
+                    if hasattr(iterator, 'close'):
+                        iterator.close()
+                    return
+            items.put((_DONE, None))
+        except BaseException as error:
+            items.put((_DONE, error))
+
+    producer = threading.Thread(target=produce, name="prefetch", daemon=True)
+    producer.start()
+    try:
+        while True:
+            item, error = items.get()
+            if error is not None:
+                raise error
+            if item is _DONE:
+                return
+            yield item
+            slots.release()
+    finally:
+        stopped.set()
+        slots.release()
@@ -0,0 +1,71 @@
+import pandas as pd
+
+from validation_engine.config import PREFLIGHT_SAMPLE_ROWS
+from quality_rules.schema_validation import schema_violation
+from validation_engine.spans import traced
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional: only needed to preflight Parquet files
+    pq = None
+
+
+def _read_head(path: str, sample_rows: int) -> tuple:
+    # Header (all columns, in file order) and the first rows, untyped
+    if path.endswith(".parquet"):
+        if pq is None:
+            raise ImportError(f"pyarrow is required to preflight {path}")
+        # The column names come from the file metadata; only the first batch of rows is decoded
+        parquet_file = pq.ParquetFile(path)
+        columns = parquet_file.schema_arrow.names
+        batch = next(parquet_file.iter_batches(batch_size=sample_rows), None)
+        return columns, batch.to_pandas() if batch is not None else pd.DataFrame(columns=columns)
+    head = pd.read_csv(path, nrows=sample_rows)
+    return list(head.columns), head
+
+
+def _parse_error(values: pd.Series, dtype: str) -> str:
+    # Error message if the sampled values cannot be converted to the expected dtype, else None
+    try:
+        if str(dtype).startswith('datetime64') and not pd.api.types.is_datetime64_any_dtype(values):
+            pd.to_datetime(values)
+        else:
+            values.astype(dtype)
+    except (ValueError, TypeError, OverflowError) as error:
+        return str(error)
+    return None
+
+
+@traced
+def preflight_schema(path: str, expected_schema: dict, sample_rows: int = PREFLIGHT_SAMPLE_ROWS) -> dict:
+    """
+    Fast-fail schema check of a file before it is parsed in full: reads only the header and the first
+    `sample_rows` rows (for Parquet files, the schema metadata and the first batch) and checks that every
+    expected column is present, in the expected order, and that its sampled values parse as the expected
+    dtype. Every violation is collected, so one run reports all of them. Columns outside the schema are
+    allowed, as in validate_schema.
+
+    :param path: Path to the CSV (or .parquet) file.
+    :param expected_schema: Dictionary with column names as keys and expected data types as values.
+    :param sample_rows: Number of rows read to check the dtypes.
+    :return: Dictionary with the path, columns found, rows sampled, violations (see schema_violation) and passed.
+    """
+    columns, head = _read_head(path, sample_rows)
+    violations = []
+    for column, expected_dtype in expected_schema.items():
+        if column not in columns:
+            violations.append(schema_violation(column, "missing", expected_dtype, None, f"Missing column '{column}'"))
+            continue
+        error = _parse_error(head[column], expected_dtype)
+        if error is not None:
+            violations.append(schema_violation(column, "parse", expected_dtype, str(head[column].dtype),
+                                               f"Column '{column}' cannot be parsed as {expected_dtype} ({error})"))
+
+    # Relative order of the expected columns present in the file
+    expected_order = [column for column in expected_schema if column in columns]
+    found_order = [column for column in columns if column in expected_schema]
+    if found_order != expected_order:
+        violations.append(schema_violation(None, "order", expected_order, found_order,
+                                           f"Columns out of order. Expected {expected_order}, found {found_order}"))
+
+    return {'path': path, 'columns': columns, 'sample_rows': len(head), 'violations': violations, 'passed': not violations}
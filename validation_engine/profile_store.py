@@ -0,0 +1,78 @@
+import os
+import json
+import logging
+import shutil
+
+from validation_engine.config import STABILITY_SKETCH_K, PROFILE_STORE_DIR, PROFILE_CHUNK_SIZE, BASELINE_PROFILE_EXACT
+from validation_engine.columnar_cache import content_digest
+from validation_engine.streaming import iter_dataset_chunks
+from quality_rules.drift import stability_columns
+from quality_rules.profiles import DatasetProfile, build_profile
+from quality_rules.schema_validation import schema_key
+
+# Bumped whenever the content of a stored profile changes, so older profiles are rebuilt
+PROFILE_FORMAT = 3
+
+
+def _source(dataset_name: str, dataset_path: str, read_options: dict) -> dict:
+    # Everything a stored profile depends on: the file content and how it was read and profiled
+    return {
+        'format': PROFILE_FORMAT,
+        'path': os.path.abspath(dataset_path),
+        'digest': content_digest(dataset_path),
+        'read_options': repr(sorted(read_options.items())),
+        'value_columns': stability_columns(schema_key(dataset_name)),
+        'sketch_k': STABILITY_SKETCH_K,
+        'exact': BASELINE_PROFILE_EXACT,
+    }
+
+
+def accept_baseline(dataset_name: str, dataset_path: str, read_options: dict = None, store_dir: str = PROFILE_STORE_DIR,
+                    chunksize: int = PROFILE_CHUNK_SIZE) -> DatasetProfile:
+    """
+    Accept a dataset version as a baseline: profile it in one chunked pass and store the profile.
+
+    :param dataset_name: Name of the dataset version (e.g. "netflix_movies_v1").
+    :param dataset_path: Path to the dataset CSV file.
+    :param read_options: Extra keyword arguments for pd.read_csv (e.g. typed ingest options).
+    :param store_dir: Directory of the profile store.
+    :param chunksize: Number of rows per chunk while profiling.
+    :return: The stored DatasetProfile.
+    """
+    read_options = read_options or {}
+    profile = build_profile(iter_dataset_chunks(dataset_path, chunksize, **read_options), stability_columns(schema_key(dataset_name)),
+                            STABILITY_SKETCH_K, BASELINE_PROFILE_EXACT)
+
+    # Write the new profile next to the old one and swap it in, so readers never see a partial profile
+    profile_path = os.path.join(store_dir, dataset_name)
+    tmp_path = f"{profile_path}.{os.getpid()}.tmp"
+    profile.save(tmp_path)
+    with open(os.path.join(tmp_path, "source.json"), 'w') as source_file:
+        json.dump(_source(dataset_name, dataset_path, read_options), source_file)
+    shutil.rmtree(profile_path, ignore_errors=True)
+    os.replace(tmp_path, profile_path)
+
+    logging.info(f"Baseline profile stored for {dataset_name}: {profile.rows} rows, digest {profile.digest}")
+    return profile
+
+
+def get_baseline_profile(dataset_name: str, dataset_path: str, read_options: dict = None, store_dir: str = PROFILE_STORE_DIR) -> DatasetProfile:
+    """
+    Return the stored profile of a baseline dataset version. The profile is built on first use, and rebuilt
+    if the file content (or how it is read) has changed since it was accepted.
+
+    :param dataset_name: Name of the dataset version (e.g. "netflix_movies_v1").
+    :param dataset_path: Path to the dataset CSV file.
+    :param read_options: Extra keyword arguments for pd.read_csv (e.g. typed ingest options).
+    :param store_dir: Directory of the profile store.
+    :return: DatasetProfile of the dataset version.
+    """
+    read_options = read_options or {}
+    profile_path = os.path.join(store_dir, dataset_name)
+    source_path = os.path.join(profile_path, "source.json")
+    if os.path.exists(source_path):
+        with open(source_path) as source_file:
+            if json.load(source_file) == _source(dataset_name, dataset_path, read_options):
+                return DatasetProfile.load(profile_path)
+        logging.info(f"Baseline profile of {dataset_name} is out of date, rebuilding it")
+    return accept_baseline(dataset_name, dataset_path, read_options, store_dir)
@@ -0,0 +1,25 @@
+import importlib
+
+# Rule name (as in VALIDATION_RULES) -> "module:function" of the rule. The modules are imported on first use, so a
+# command only pays for the libraries of the rules it runs (pandas, scipy.stats)
+RULES = {
+    "missing": "quality_rules.missing_handle:handle_missing_values",
+    "schema": "quality_rules.schema_validation:validate_schema",
+    "regression": "quality_rules.regression_tests:compare_datasets",
+    "uniqueness": "quality_rules.uniqueness:find_duplicate_keys",
+    "stability": "quality_rules.stability_tests:test_statistical_stability_batch",
+    "drift": "quality_rules.drift:test_drift"
+}
+
+
+def get_rule(name: str):
+    """
+    Return the function of a registered rule, importing its module (and the libraries it needs) on first use.
+
+    :param name: Rule name (a key of RULES).
+    :return: The rule function.
+    """
+    if name not in RULES:
+        raise KeyError(f"Unknown rule '{name}'. Registered rules: {', '.join(RULES)}")
+    module_name, function_name = RULES[name].split(":")
+    return getattr(importlib.import_module(module_name), function_name)
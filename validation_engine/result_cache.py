@@ -0,0 +1,225 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from validation_engine.config import DATASETS_PATH, MISSING_THRESHOLD, STATISTICAL_TEST_ALPHA, STABILITY_SKETCH_K, \
+    STABILITY_SAMPLE_SIZE, STABILITY_SAMPLE_MIN_SIZE, STABILITY_SAMPLE_TOLERANCE, STABILITY_SAMPLE_STRATA, TYPED_INGEST, \
+    RESULT_CACHE_DIR, RESULT_CACHE_MAX_MB, DRIFT_BINS, DRIFT_PSI_THRESHOLD, UNIQUENESS_SAMPLE_KEYS, BASELINE_PROFILES, BASELINE_PROFILE_EXACT
+from validation_engine.columnar_cache import content_digest
+from validation_engine.paths import dataset_files
+from validation_engine.typed_ingest import ingest_options
+from quality_rules.drift import drift_columns, stability_columns
+from quality_rules.missing_handle import IMPUTATION_POLICIES, policy_key
+from quality_rules.row_diff import ROW_KEYS
+from quality_rules.schema_validation import SCHEMA_REGISTRY, schema_key
+
+# Bumped whenever the results of a rule change for the same inputs, so its cached results are recomputed
+RULE_VERSIONS = {
+    'missing': 1,
+    'schema': 1,
+    'regression': 2,
+    'uniqueness': 1,
+    'stability': 4,
+    'drift': 2,
+}
+
+
+def dataset_nodes(dataset_name: str, stability_method: str) -> list:
+    """
+    Return the check nodes of a dataset in the validation DAG. Each node lists the files it reads
+    (its edges to the input files) and the rule version and configuration its result depends on.
+    Every check runs on the dataset cleaned by its imputation policy, so the policy is part of every node;
+    the chunk size and worker count are not, as the results are the same whatever they are.
+
+    :param dataset_name: Name of the dataset (key of DATASETS_PATH).
+    :param stability_method: "exact", "sketch" or "sample" (see validate_dataset).
+    :return: List of node dictionaries (name, rule, inputs, params), in report order.
+    """
+    dataset_key = schema_key(dataset_name)
+    dataset_path, dataset_v1_path = DATASETS_PATH[dataset_name], DATASETS_PATH[dataset_name.replace("v2", "v1")]
+    common = {
+        'read_options': ingest_options(dataset_name) if TYPED_INGEST else {},
+        'imputation_policy': IMPUTATION_POLICIES.get(policy_key(dataset_name), {}),
+        'missing_threshold': MISSING_THRESHOLD,
+    }
+    # The v1 baseline the comparisons read: its stored profile, unless profiles are off or the profile lacks the
+    # values the stability method needs (v1 itself is then read, see validate_dataset)
+    profile_used = BASELINE_PROFILES and (BASELINE_PROFILE_EXACT or stability_method == "sketch")
+    baseline = {'baseline_profiles': BASELINE_PROFILES, 'baseline_profile_exact': BASELINE_PROFILE_EXACT, 'baseline_profile_used': profile_used}
+    # Drift bins v1 from the profile's sketches when the profile has no values
+    drift_baseline = {**baseline, 'sketch_k': STABILITY_SKETCH_K} if profile_used and not BASELINE_PROFILE_EXACT else baseline
+    # The method summarizes the columns the stability tests read
+    method = {'method': stability_method}
+    if stability_method == "sketch":
+        method['sketch_k'] = STABILITY_SKETCH_K
+    elif stability_method == "sample":
+        method.update(sample_size=STABILITY_SAMPLE_SIZE, min_sample_size=STABILITY_SAMPLE_MIN_SIZE,
+                      tolerance=STABILITY_SAMPLE_TOLERANCE, strata=STABILITY_SAMPLE_STRATA.get(dataset_key))
+
+    nodes = [
+        {'name': "missing", 'rule': "missing", 'inputs': [dataset_path], 'params': common},
+        {'name': "schema", 'rule': "schema", 'inputs': [dataset_path],
+         'params': {**common, 'schema': SCHEMA_REGISTRY.get(dataset_key, {})}},
+        {'name': "regression", 'rule': "regression", 'inputs': [dataset_v1_path, dataset_path], 'params': {**common, **baseline}},
+        {'name': "uniqueness", 'rule': "uniqueness", 'inputs': [dataset_path],
+         'params': {**common, 'key': ROW_KEYS.get(dataset_key), 'sample_keys': UNIQUENESS_SAMPLE_KEYS}},
+    ]
+    for column in stability_columns(dataset_key):
+        nodes.append({'name': f"stability:{column}", 'rule': "stability", 'inputs': [dataset_v1_path, dataset_path],
+                      'params': {**common, **baseline, **method, 'alpha': STATISTICAL_TEST_ALPHA, 'column': column}})
+    for column, kind in drift_columns(dataset_key).items():
+        nodes.append({'name': f"drift:{column}", 'rule': "drift", 'inputs': [dataset_v1_path, dataset_path],
+                      'params': {**common, **drift_baseline, 'column': column, 'kind': kind, 'bins': DRIFT_BINS, 'psi_threshold': DRIFT_PSI_THRESHOLD}})
+    return nodes
+
+
+def node_key(node: dict) -> str:
+    """
+    Return the cache key of a node: a hash of its rule version, the content hashes of its input files
+    and its parameters. Raises if an input file cannot be read.
+    """
+    key = {
+        'rule': node['rule'],
+        'version': RULE_VERSIONS[node['rule']],
+        'inputs': [content_digest(path) for path in node['inputs']],
+        'params': node['params'],
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def affected_datasets(changed_paths, dataset_names, stability_method: str) -> list:
+    """
+    Return the datasets with a node reading one of the changed files, in the given order.
+    """
+    changed = {os.path.abspath(path) for path in changed_paths}
+    return [dataset_name for dataset_name in dataset_names
+            if any(os.path.abspath(path) in changed for node in dataset_nodes(dataset_name, stability_method)
+                   for entry in node['inputs'] for path in dataset_files(entry))]
+
+
+def _check_node(check: str) -> str:
+    # Node of a report check ("... for column X" may be followed by details, e.g. the drift metrics)
+    if check == "Schema validation":
+        return "schema"
+    if check == "Regression test":
+        return "regression"
+    if check.startswith("Key uniqueness"):
+        return "uniqueness"
+    for prefix, rule in (("Statistical stability for column ", "stability"), ("Drift for column ", "drift")):
+        if check.startswith(prefix):
+            return f"{rule}:{check[len(prefix):].split(' (')[0]}"
+    return None
+
+
+class ResultCache:
+    """
+    On-disk memo of check results, one JSON file per node key. Reads refresh an entry's mtime, and
+    entries are evicted least recently used first once the cache grows over its size budget.
+    """
+
+    def __init__(self, cache_dir: str = RESULT_CACHE_DIR, max_mb: float = RESULT_CACHE_MAX_MB):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str):
+        """
+        :return: The cached value of a node key, or None.
+        """
+        path = self._path(key)
+        try:
+            with open(path) as entry_file:
+                value = json.load(entry_file)
+            os.utime(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value):
+        """
+        Store the value (JSON-serializable) of a node key, then evict entries over the size budget.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as entry_file:
+            json.dump(value, entry_file)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".json"):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                entries.append((stat.st_mtime_ns, stat.st_size, name))
+        size = sum(entry_size for _, entry_size, _ in entries)
+        # Least recently used first, always keeping the newest entry
+        for _, entry_size, name in sorted(entries)[:-1]:
+            if size <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.cache_dir, name))
+            size -= entry_size
+            self.evictions += 1
+
+    def contains(self, keys: dict) -> bool:
+        """
+        Return whether every node key is cached (None, for nodes without keys, is never cached).
+        """
+        return keys is not None and all(os.path.exists(self._path(key)) for key in keys.values())
+
+    def lookup(self, dataset_name: str, keys: dict) -> dict:
+        """
+        Return the cached result of a dataset if every one of its nodes is cached, else None.
+
+        :param dataset_name: Name of the dataset.
+        :param keys: Node name -> node key, for the nodes of the dataset (see dataset_nodes), in report order.
+        :return: Structured result, as returned by validate_dataset.
+        """
+        values = {}
+        for name, key in keys.items():
+            values[name] = self.get(key)
+            if values[name] is None:
+                return None
+        checks = [(check, passed) for name in keys if name != "missing" for check, passed in values[name]]
+        return {'dataset': dataset_name, 'missing_values': pd.Series(values['missing'], dtype='int64'), 'checks': checks, 'error': None}
+
+    def store(self, result: dict, keys: dict):
+        """
+        Store the result of each node of a validated dataset. Results with an error or skipped checks are not
+        stored, so a dataset that failed or ran out of time is validated again on the next run.
+        """
+        if result['error'] is not None or result['missing_values'] is None or result.get('skipped'):
+            return
+        values = {name: [] for name in keys}
+        values['missing'] = {column: int(count) for column, count in result['missing_values'].items()}
+        for check, passed in result['checks']:
+            node = _check_node(check)
+            if node not in values:
+                return
+            values[node].append((check, bool(passed)))
+        for name, key in keys.items():
+            self.put(key, values[name])
+
+    def stats(self) -> dict:
+        """
+        Return the hit/miss/eviction counters of the cache.
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+
+# Result cache shared by every dataset of a run
+_default_cache = ResultCache()
+
+
+def get_result_cache() -> ResultCache:
+    return _default_cache
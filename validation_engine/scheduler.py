@@ -0,0 +1,175 @@
+import json
+import logging
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from validation_engine.config import FATAL_CHECKS, CHECK_COSTS_PATH, CHECK_COST_DEFAULTS, CHECK_COST_SMOOTHING, LOAD_COST_DEFAULT
+from validation_engine.spans import span
+
+# Reasons a check is skipped, as written in the report ("SKIPPED (budget)")
+SKIPPED_BUDGET = "budget"
+SKIPPED_FAIL_FAST = "fail-fast"
+
+# Stages that read and prepare a dataset before its checks run; their spans make up its load cost
+LOAD_STAGES = ("prefetch", "preflight", "load", "imputation", "baseline_profile", "stream", "incremental")
+
+
+def check_task(rule: str, labels: list, run, rows: int, columns: list) -> dict:
+    """
+    Describe one schedulable check.
+
+    :param rule: Rule of the check ("schema", "regression", "uniqueness", "stability" or "drift").
+    :param labels: Report labels of the checks it yields, used if it is skipped.
+    :param run: Function without arguments running the check and returning its (check, passed) pairs.
+    :param rows: Rows the check reads (both versions).
+    :param columns: Columns the check reads.
+    :return: Task dictionary.
+    """
+    return {'rule': rule, 'labels': labels, 'run': run, 'rows': rows, 'columns': list(columns)}
+
+
+def _cells(task: dict) -> int:
+    return max(1, task['rows']) * max(1, len(task['columns']))
+
+
+def _read_costs(path: str) -> tuple:
+    # (seconds_per_cell, outcomes, seconds_per_byte) saved at path, empty if there is no readable history
+    try:
+        with open(path) as costs_file:
+            state = json.load(costs_file)
+        return state['seconds_per_cell'], state['outcomes'], state.get('seconds_per_byte')
+    except (OSError, ValueError, KeyError):
+        return {}, {}, None
+
+
+class CostModel:
+    """
+    What past runs tell about the checks: each rule's cost per cell (moving average of its timings,
+    CHECK_COST_DEFAULTS until it has been timed), how often each check of each dataset failed, and the cost
+    of loading a dataset per byte of its input files (moving average of its load spans, see LOAD_STAGES).
+    The timings recorded since the model was loaded are kept apart, so save() can add them to the history
+    other processes saved in the meantime.
+    """
+
+    def __init__(self, path: str = CHECK_COSTS_PATH):
+        self.path = path
+        self.seconds_per_cell, self.outcomes, self.seconds_per_byte = _read_costs(path)
+        self._recorded = []
+
+    def estimate(self, task: dict) -> float:
+        """
+        :return: Estimated seconds of a task.
+        """
+        return self.seconds_per_cell.get(task['rule'], CHECK_COST_DEFAULTS.get(task['rule'], 0.0)) * _cells(task)
+
+    def estimate_load(self, file_bytes: int) -> float:
+        """
+        :return: Estimated seconds to load and prepare a dataset whose input files hold file_bytes bytes.
+        """
+        return (LOAD_COST_DEFAULT if self.seconds_per_byte is None else self.seconds_per_byte) * file_bytes
+
+    def failure_rate(self, dataset_name: str, rule: str) -> float:
+        """
+        :return: Share of past runs in which the rule failed on the dataset (1/2 with no history).
+        """
+        failures, runs = self.outcomes.get(f"{dataset_name}/{rule}", (0, 0))
+        return (failures + 1) / (runs + 2)
+
+    def record(self, dataset_name: str, task: dict, seconds: float, passed: bool):
+        """
+        Add the timing and outcome of a task that ran.
+        """
+        self._add(('check', task['rule'], seconds / _cells(task), f"{dataset_name}/{task['rule']}", passed))
+
+    def record_load(self, file_bytes: int, seconds: float):
+        """
+        Add the timing of a dataset load (the wall seconds of its LOAD_STAGES spans).
+        """
+        self._add(('load', seconds / max(1, file_bytes)))
+
+    def _add(self, timing: tuple):
+        self._recorded.append(timing)
+        self._apply(timing)
+
+    def _apply(self, timing: tuple):
+        # Fold one recorded timing into the moving averages (and, for a check, its outcome into the counts)
+        if timing[0] == 'load':
+            rate, previous = timing[1], self.seconds_per_byte
+            self.seconds_per_byte = rate if previous is None else previous + CHECK_COST_SMOOTHING * (rate - previous)
+            return
+        _, rule, rate, outcome, passed = timing
+        previous = self.seconds_per_cell.get(rule)
+        self.seconds_per_cell[rule] = rate if previous is None else previous + CHECK_COST_SMOOTHING * (rate - previous)
+        failures, runs = self.outcomes.get(outcome, (0, 0))
+        self.outcomes[outcome] = (failures + (not passed), runs + 1)
+
+    def save(self):
+        """
+        Add the timings recorded since the model was loaded (or last saved) to the history on disk and write it,
+        atomically. The file is read again under a lock first, so worker processes saving at the same time
+        all keep their timings.
+        """
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(f"{self.path}.lock", 'w') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            self.seconds_per_cell, self.outcomes, self.seconds_per_byte = _read_costs(self.path)
+            recorded, self._recorded = self._recorded, []
+            for timing in recorded:
+                self._apply(timing)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as costs_file:
+                json.dump({'seconds_per_cell': self.seconds_per_cell, 'outcomes': self.outcomes, 'seconds_per_byte': self.seconds_per_byte}, costs_file)
+            os.replace(tmp_path, self.path)
+
+
+def run_checks(result: dict, tasks: list, deadline: float = None, fatal: list = FATAL_CHECKS, cost_model: CostModel = None):
+    """
+    Run the checks of a dataset cheapest and most likely to fail first, within its time budget.
+    Fatal checks run first (ordered by estimated cost over past failure rate), as their failure skips every
+    check not run yet; the others follow by estimated cost, so as many as possible finish within the budget.
+    A check whose estimated cost would overrun the deadline is skipped, and the next cheaper ones are tried;
+    a check that has started is not interrupted, so one whose cost was underestimated can end past the deadline.
+    The checks are added to the result in task order, whatever order they ran in; skipped ones have
+    passed=None and their reason in result['skipped'].
+
+    :param result: Structured result of the dataset (see validate_dataset), updated in place.
+    :param tasks: Check tasks (see check_task), in report order.
+    :param deadline: time.time() by which the checks must be done (None: no budget).
+    :param fatal: Rules whose failure skips the remaining checks.
+    :param cost_model: Cost and failure history (default: loaded from CHECK_COSTS_PATH, then saved with these timings).
+    """
+    model = cost_model if cost_model is not None else CostModel()
+    dataset_name = result['dataset']
+    estimates = [model.estimate(task) for task in tasks]
+    fatal_tasks = sorted((i for i, task in enumerate(tasks) if task['rule'] in fatal),
+                         key=lambda i: estimates[i] / model.failure_rate(dataset_name, tasks[i]['rule']))
+    other_tasks = sorted((i for i, task in enumerate(tasks) if task['rule'] not in fatal), key=lambda i: estimates[i])
+
+    outcomes = {}
+    stop = None
+    for i in fatal_tasks + other_tasks:
+        task = tasks[i]
+        if stop is None and (deadline is None or time.time() + estimates[i] <= deadline):
+            with span(task['rule'], rows_in=task['rows'], columns=task['columns']) as stage:
+                outcomes[i] = task['run']()
+            passed = all(passed for _, passed in outcomes[i])
+            model.record(dataset_name, task, stage.wall_seconds, passed)
+            if not passed and task['rule'] in fatal:
+                stop = SKIPPED_FAIL_FAST
+                logging.info(f"{task['rule']} check failed for {dataset_name}: its remaining checks are skipped")
+        else:
+            reason = stop or SKIPPED_BUDGET
+            outcomes[i] = [(label, None) for label in task['labels']]
+            result.setdefault('skipped', {}).update({label: reason for label in task['labels']})
+            logging.warning(f"{task['rule']} check of {dataset_name} skipped ({reason}, estimated {estimates[i]:.3f}s)")
+
+    for i in range(len(tasks)):
+        result['checks'].extend(outcomes[i])
+    if cost_model is None:
+        model.save()
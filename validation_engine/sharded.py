@@ -0,0 +1,192 @@
+import os
+import json
+import logging
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from validation_engine.config import DATASETS_PATH, REPORT_PATH, STABILITY_METHOD, STABILITY_SKETCH_K, TYPED_INGEST, \
+    PROFILE_CHUNK_SIZE, PREFLIGHT_ENABLED, PREFLIGHT_SAMPLE_ROWS, SHARD_STATE_DIR, SPANS_PATH, METRICS_PATH
+from validation_engine.paths import dataset_files
+from validation_engine.preflight import preflight_schema
+from validation_engine.spans import span, take_spans, write_spans, write_prometheus
+from validation_engine.streaming import iter_dataset_chunks
+from validation_engine.typed_ingest import ingest_options
+from validation_engine.validate import profile_checks, registered_schema, write_dataset_report
+from quality_rules.drift import stability_columns
+from quality_rules.missing_handle import compile_imputation_plan
+from quality_rules.missing_values import null_profile
+from quality_rules.profiles import DatasetProfile
+from quality_rules.schema_validation import schema_key
+
+# Bumped whenever the content of a shard state changes, so older states are reported stale
+STATE_FORMAT = 2
+
+
+def dataset_shards(dataset_name: str) -> list:
+    """
+    Return the shard files of a dataset: its DATASETS_PATH entry is a file, a glob pattern
+    (e.g. 'data/taxi/2021-01-*.csv', shards in sorted order) or a list of files.
+    """
+    return dataset_files(DATASETS_PATH[dataset_name])
+
+
+def _shard_dir(state_dir: str, dataset_name: str, index: int) -> str:
+    return os.path.join(state_dir, dataset_name, f"shard-{index:05d}")
+
+
+def _shard_source(shard_path: str) -> dict:
+    # What a shard state was computed from: a state whose source differs (another file now at this index, the
+    # file rewritten since, or a state of an older format) is stale
+    stat = os.stat(shard_path)
+    return {'format': STATE_FORMAT, 'path': os.path.normpath(shard_path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def map_shard(dataset_name: str, index: int, shard_path: str, state_dir: str = SHARD_STATE_DIR):
+    """
+    Map step: compute the partial state of one shard and write it to the state directory.
+
+    The state is the DatasetProfile of the cleaned shard (null counts, row count, dtypes, quantile sketches,
+    row-hash digest and row diff records: the profiles are exact, as the uniqueness and regression checks need
+    the records) and, for a v1 dataset, the profile of the raw shard, which is
+    the baseline the v2 dataset is compared to. shard.json is written last and marks the state as complete;
+    it records the path, size and modification time of the shard, so the reducer only merges states of the
+    current files.
+
+    :param dataset_name: Name of the dataset (key of DATASETS_PATH).
+    :param index: Position of the shard in dataset_shards(dataset_name).
+    :param shard_path: Path to the shard CSV file.
+    :param state_dir: Directory shared by the mappers and the reducer.
+    """
+    shard_dir = _shard_dir(state_dir, dataset_name, index)
+    tmp_dir = f"{shard_dir}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    state = {'dataset': dataset_name, 'index': index, 'path': shard_path, 'source': None, 'imputation_changes': {}, 'error': None}
+
+    with span("map_shard", dataset=dataset_name) as stage:
+        try:
+            # Taken before the shard is read: a file rewritten while it is mapped does not match its state
+            state['source'] = _shard_source(shard_path)
+            expected_schema = registered_schema(dataset_name)
+            if PREFLIGHT_ENABLED and expected_schema:
+                preflight = preflight_schema(shard_path, expected_schema, PREFLIGHT_SAMPLE_ROWS)
+                if not preflight['passed']:
+                    raise ValueError(f"Schema preflight failed for {shard_path}: {'; '.join(violation['message'] for violation in preflight['violations'])}")
+
+            read_options = ingest_options(dataset_name) if TYPED_INGEST else {}
+            plan = compile_imputation_plan(dataset_name, expected_schema)
+            value_columns = stability_columns(schema_key(dataset_name))
+            cleaned = DatasetProfile(value_columns, STABILITY_SKETCH_K, exact=True)
+            baseline = DatasetProfile(value_columns, STABILITY_SKETCH_K, exact=True) if dataset_name == dataset_name.replace("v2", "v1") else None
+            for chunk in iter_dataset_chunks(shard_path, PROFILE_CHUNK_SIZE, **read_options):
+                # The nulls of each chunk are counted once: the cleaned chunk's profile is derived from them
+                nulls = null_profile(chunk)
+                if baseline is not None:
+                    baseline.update(chunk, nulls)
+                cleaned.update(*plan.apply_profiled(chunk, state['imputation_changes'], nulls))
+            cleaned.save(os.path.join(tmp_dir, "cleaned"))
+            if baseline is not None:
+                baseline.save(os.path.join(tmp_dir, "baseline"))
+            stage.rows_out = cleaned.rows
+        except Exception as e:
+            logging.error(f"Error mapping shard {index} of {dataset_name} ({shard_path}): {e}")
+            state['error'] = str(e)
+
+    with open(os.path.join(tmp_dir, "shard.json"), 'w') as state_file:
+        json.dump(state, state_file)
+    shutil.rmtree(shard_dir, ignore_errors=True)
+    os.replace(tmp_dir, shard_dir)
+
+
+def map_shards(state_dir: str = SHARD_STATE_DIR, worker: int = 0, workers: int = 1):
+    """
+    Map the shards of every dataset assigned to one worker (shards whose index modulo `workers` is `worker`),
+    so several machines (or processes) sharing the state directory split the shards between them.
+    """
+    for dataset_name in DATASETS_PATH:
+        for index, shard_path in enumerate(dataset_shards(dataset_name)):
+            if index % workers == worker:
+                map_shard(dataset_name, index, shard_path, state_dir)
+    write_spans(take_spans(), SPANS_PATH, f"map-{worker}-{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}")
+
+
+def _merged_profiles(dataset_name: str, state_dir: str, kind: str) -> tuple:
+    # Merge the shard profiles of one kind ("cleaned" or "baseline") in shard order; also returns the
+    # summed imputation changes and the errors of the shards
+    merged, changes, errors = None, {}, []
+    shards = dataset_shards(dataset_name)
+    for index, shard_path in enumerate(shards):
+        state_path = os.path.join(_shard_dir(state_dir, dataset_name, index), "shard.json")
+        if not os.path.exists(state_path):
+            errors.append(f"shard {index} ({shard_path}) was not mapped")
+            continue
+        with open(state_path) as state_file:
+            state = json.load(state_file)
+        # A state left by an earlier run for another file (the sorted shards shifted) or an older version of this one
+        if state.get('source') is None or not os.path.exists(shard_path) or state['source'] != _shard_source(shard_path):
+            errors.append(f"shard {index} ({shard_path}) was not mapped (state of {state['path']} is stale)")
+            continue
+        if state['error'] is not None:
+            errors.append(f"shard {index} ({shard_path}): {state['error']}")
+            continue
+        for rule, cells in state['imputation_changes'].items():
+            changes[rule] = changes.get(rule, 0) + cells
+        profile = DatasetProfile.load(os.path.join(_shard_dir(state_dir, dataset_name, index), kind))
+        merged = profile if merged is None else merged.merge(profile)
+    if not shards:
+        errors.append(f"no shard matches {DATASETS_PATH[dataset_name]}")
+    return merged, changes, errors
+
+
+def reduce_dataset(dataset_name: str, state_dir: str = SHARD_STATE_DIR, stability_method: str = STABILITY_METHOD) -> dict:
+    """
+    Reduce step of one dataset: merge the partial states of its shards (and of its v1 baseline's shards)
+    and run the schema, regression, stability and drift checks on the merged profiles.
+
+    :return: Structured result, as returned by validate_dataset.
+    """
+    result = {'dataset': dataset_name, 'missing_values': None, 'checks': [], 'error': None}
+    with span("reduce_dataset", dataset=dataset_name):
+        try:
+            dataset_v1_name = dataset_name.replace("v2", "v1")
+            cleaned, changes, errors = _merged_profiles(dataset_name, state_dir, "cleaned")
+            baseline, _, baseline_errors = _merged_profiles(dataset_v1_name, state_dir, "baseline")
+            errors += [f"{dataset_v1_name} {error}" for error in baseline_errors]
+            if errors:
+                raise ValueError(f"Sharded validation failed: {'; '.join(errors)}")
+            logging.info(f"Cells changed per imputation rule for {dataset_name}: {changes}")
+            result['missing_values'] = cleaned.missing
+            profile_checks(result, dataset_name, baseline, cleaned, stability_method)
+        except Exception as e:
+            logging.error(f"Error processing {dataset_name}: {e}")
+            result['error'] = str(e)
+    return result
+
+
+def reduce_report(state_dir: str = SHARD_STATE_DIR, stability_method: str = STABILITY_METHOD):
+    """
+    Reduce every dataset from the state directory and write the validation report, in the same format as
+    generate_report.
+    """
+    results = [reduce_dataset(dataset_name, state_dir, stability_method) for dataset_name in DATASETS_PATH]
+    with open(REPORT_PATH, 'w') as report_file:
+        report_file.write("Validation Report\n")
+        report_file.write("====================\n")
+        for result in results:
+            write_dataset_report(report_file, result)
+    spans = take_spans()
+    write_spans(spans, SPANS_PATH, f"reduce-{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}")
+    write_prometheus(spans, METRICS_PATH)
+    logging.info("Sharded report generation completed.")
+
+
+def run_sharded(processes: int, state_dir: str = SHARD_STATE_DIR, stability_method: str = STABILITY_METHOD):
+    """
+    Run the map step in `processes` local worker processes sharing the state directory, then the reduce step.
+    """
+    shutil.rmtree(state_dir, ignore_errors=True)
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        for future in [executor.submit(map_shards, state_dir, worker, processes) for worker in range(processes)]:
+            future.result()
+    reduce_report(state_dir, stability_method)
@@ -0,0 +1,274 @@
+import cProfile
+import functools
+import inspect
+import json
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows: no peak RSS
+    resource = None
+
+# Optional per-stage profiling, e.g. SENTINEL_PROFILE=cprofile, SENTINEL_PROFILE=tracemalloc or
+# SENTINEL_PROFILE=cprofile:compare_datasets,stability to profile only these stages
+PROFILE_ENV_VAR = "SENTINEL_PROFILE"
+PROFILE_DIR = "logs/profiles"
+
+# Spans of this process: the open ones of each thread (innermost last; a background thread,
+# e.g. a prefetching one, starts its own tree) and the finished ones not taken yet
+# (bounded, for library callers that never take them)
+_local = threading.local()
+_finished_spans = deque(maxlen=100000)
+_span_ids = iter(range(1, 1 << 62))
+
+
+class Span:
+    """
+    One timed stage of the validation pipeline: wall and CPU time, peak RSS growth, rows in and out
+    and the columns it touched. Spans nest; the dataset of a span defaults to the one of its parent.
+    """
+
+    def __init__(self, name: str, dataset: str = None, rows_in: int = None, columns: list = None):
+        self.name = name
+        open_spans = _open_spans()
+        self.parent = open_spans[-1] if open_spans else None
+        self.dataset = dataset if dataset is not None or self.parent is None else self.parent.dataset
+        self.span_id = f"{os.getpid()}-{next(_span_ids)}"
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.columns = list(columns) if columns is not None else None
+        self.attributes = {}
+        self.status = "ok"
+        self._profiler = None
+        self._traced = None
+        self._started_tracing = False
+
+    def record(self) -> dict:
+        """
+        :return: The span as a JSON-serializable dictionary.
+        """
+        return {
+            'span_id': self.span_id, 'parent_id': self.parent.span_id if self.parent else None,
+            'stage': self.name, 'dataset': self.dataset, 'start': self.start, 'wall_seconds': self.wall_seconds,
+            'cpu_seconds': self.cpu_seconds, 'rss_peak_delta_bytes': self.rss_peak_delta_bytes,
+            'rows_in': self.rows_in, 'rows_out': self.rows_out,
+            'columns': [str(column) for column in self.columns] if self.columns is not None else None,
+            'status': self.status, **self.attributes
+        }
+
+
+def _open_spans() -> list:
+    if not hasattr(_local, 'open_spans'):
+        _local.open_spans = []
+    return _local.open_spans
+
+
+def _max_rss() -> int:
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+def _profile_hooks(name: str) -> str:
+    """
+    Return the profiling hook ("cprofile" or "tracemalloc") switched on for a stage, or None.
+    """
+    setting = os.environ.get(PROFILE_ENV_VAR, "").strip()
+    if not setting:
+        return None
+    hook, _, stages = setting.partition(":")
+    if hook not in ("cprofile", "tracemalloc"):
+        return None
+    return hook if not stages or name in stages.split(",") else None
+
+
+def _start_hooks(current: Span):
+    hook = _profile_hooks(current.name)
+    parent = current.parent
+    if hook == "cprofile":
+        # One profiler runs at a time: the parent's profile covers its own time outside the nested stages
+        if parent is not None and parent._profiler is not None:
+            parent._profiler.disable()
+        current._profiler = cProfile.Profile()
+        current._profiler.enable()
+    elif hook == "tracemalloc":
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            current._started_tracing = True
+        traced, peak = tracemalloc.get_traced_memory()
+        if parent is not None and parent._traced is not None:
+            parent._traced[1] = max(parent._traced[1], peak)
+        tracemalloc.reset_peak()
+        current._traced = [traced, traced]
+
+
+def _stop_hooks(current: Span):
+    parent = current.parent
+    if current._profiler is not None:
+        current._profiler.disable()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, re.sub(r"[^\w.-]", "_", f"{current.dataset}-{current.name}-{current.span_id}") + ".prof")
+        current._profiler.dump_stats(path)
+        current.attributes['profile_path'] = path
+        current._profiler = None
+        if parent is not None and parent._profiler is not None:
+            parent._profiler.enable()
+    if current._traced is not None:
+        peak = max(current._traced[1], tracemalloc.get_traced_memory()[1])
+        current.attributes['traced_peak_delta_bytes'] = peak - current._traced[0]
+        if parent is not None and parent._traced is not None:
+            parent._traced[1] = max(parent._traced[1], peak)
+        tracemalloc.reset_peak()
+        current._traced = None
+        if current._started_tracing:
+            tracemalloc.stop()
+
+
+@contextmanager
+def span(name: str, dataset: str = None, rows_in: int = None, columns: list = None):
+    """
+    Time a stage of the validation pipeline. The span is recorded when the block exits (also on errors,
+    with status "error"); rows_out, columns and extra attributes can be set on it inside the block.
+
+    :param name: Name of the stage (e.g. "load", "regression", "compare_datasets").
+    :param dataset: Name of the dataset (default: the dataset of the enclosing span).
+    :param rows_in: Number of rows the stage reads.
+    :param columns: Columns the stage touches.
+    :return: The Span, as the context value.
+    """
+    current = Span(name, dataset, rows_in, columns)
+    _open_spans().append(current)
+    _start_hooks(current)
+    current.start = time.time()
+    rss_start = _max_rss()
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        yield current
+    except BaseException as e:
+        current.status = "error"
+        current.attributes['error'] = type(e).__name__
+        raise
+    finally:
+        current.wall_seconds = time.perf_counter() - wall_start
+        current.cpu_seconds = time.process_time() - cpu_start
+        rss_end = _max_rss()
+        current.rss_peak_delta_bytes = rss_end - rss_start if rss_start is not None else None
+        _stop_hooks(current)
+        _open_spans().pop()
+        _finished_spans.append(current.record())
+
+
+def _rows(value) -> int:
+    # Rows of a DataFrame argument or result (or of a baseline profile)
+    if isinstance(value, pd.DataFrame):
+        return len(value)
+    rows = getattr(value, 'rows', None)
+    return rows if isinstance(rows, int) else None
+
+
+def traced(function):
+    """
+    Decorator recording a span around a quality rule function, named after the function. Rows in are
+    the rows of its DataFrame arguments, rows out the rows of a DataFrame result, and the columns touched
+    are its `column`/`columns` argument, or else the columns of its first DataFrame argument.
+    """
+    signature = inspect.signature(function)
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        arguments = signature.bind_partial(*args, **kwargs).arguments
+        rows = [count for count in map(_rows, arguments.values()) if count is not None]
+        if 'column' in arguments:
+            columns = [arguments['column']]
+        elif 'columns' in arguments:
+            columns = arguments['columns']
+        else:
+            columns = next((value.columns for value in arguments.values() if isinstance(value, pd.DataFrame)), None)
+        with span(function.__name__, rows_in=sum(rows) if rows else None, columns=columns) as current:
+            result = function(*args, **kwargs)
+            current.rows_out = _rows(result)
+            return result
+    return wrapper
+
+
+def take_spans() -> list:
+    """
+    Return the spans finished in this process since the last call, and forget them.
+    """
+    # popleft is atomic: a span finished by another thread (e.g. the prefetcher) while draining is kept for the next call
+    spans = []
+    while _finished_spans:
+        spans.append(_finished_spans.popleft())
+    return spans
+
+
+def write_spans(spans: list, path: str, run_id: str):
+    """
+    Append spans to a JSON lines file, one span per line, tagged with the run they belong to.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, 'a') as spans_file:
+        for record in spans:
+            spans_file.write(json.dumps({'run_id': run_id, **record}) + "\n")
+
+
+# Prometheus metrics written from the spans: (metric, span field, help, aggregation)
+_METRICS = [
+    ('sentinel_stage_runs', None, "Number of times the validation stage ran.", 'count'),
+    ('sentinel_stage_wall_seconds', 'wall_seconds', "Wall time of the validation stage.", 'sum'),
+    ('sentinel_stage_cpu_seconds', 'cpu_seconds', "CPU time of the validation stage.", 'sum'),
+    ('sentinel_stage_rss_peak_delta_bytes', 'rss_peak_delta_bytes', "Growth of the peak resident memory during the validation stage.", 'max'),
+    ('sentinel_stage_rows_in', 'rows_in', "Rows read by the validation stage.", 'sum'),
+    ('sentinel_stage_rows_out', 'rows_out', "Rows produced by the validation stage.", 'sum'),
+    ('sentinel_stage_errors', 'status', "Number of times the validation stage failed.", 'errors'),
+]
+
+
+def _label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def write_prometheus(spans: list, path: str):
+    """
+    Write spans as a Prometheus textfile (node_exporter textfile collector format), with one series per
+    stage and dataset. The file is replaced atomically, as the collector may read it at any time.
+    """
+    groups = {}
+    for record in spans:
+        groups.setdefault((record['stage'], record['dataset']), []).append(record)
+
+    lines = []
+    for metric, field, description, aggregation in _METRICS:
+        lines.append(f"# HELP {metric} {description}")
+        lines.append(f"# TYPE {metric} gauge")
+        for (stage, dataset), records in groups.items():
+            if aggregation == 'count':
+                value = len(records)
+            elif aggregation == 'errors':
+                value = sum(record['status'] == "error" for record in records)
+            else:
+                values = [record[field] for record in records if record[field] is not None]
+                if not values:
+                    continue
+                value = max(values) if aggregation == 'max' else sum(values)
+            lines.append(f'{metric}{{stage="{_label(stage)}",dataset="{_label(dataset or "")}"}} {value}')
+    lines.append("# HELP sentinel_last_run_timestamp_seconds Time the validation report was written.")
+    lines.append("# TYPE sentinel_last_run_timestamp_seconds gauge")
+    lines.append(f"sentinel_last_run_timestamp_seconds {time.time()}")
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as metrics_file:
+        metrics_file.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, path)
@@ -0,0 +1,184 @@
+from itertools import zip_longest
+
+import numpy as np
+import pandas as pd
+
+from quality_rules.drift import build_histograms, update_histograms
+from quality_rules.missing_handle import handle_missing_values_chunked, handle_missing_values_profiled
+from quality_rules.profiles import DatasetProfile
+from quality_rules.regression_tests import ChunkedComparison
+from quality_rules.sampling import StratifiedSample
+from quality_rules.schema_validation import merge_dtypes
+from quality_rules.sketches import update_column_sketches
+from quality_rules.uniqueness import KeyUniqueness
+from validation_engine.config import PREFETCH_DEPTH, UNIQUENESS_SAMPLE_KEYS
+from validation_engine.prefetch import prefetch
+from validation_engine.typed_ingest import SchemaIngestError, describe_type_errors
+
+
+def iter_dataset_chunks(path: str, chunksize: int, **read_options):
+    """
+    Read a CSV file lazily in chunks of `chunksize` rows.
+
+    :param path: Path to the CSV file.
+    :param chunksize: Number of rows per chunk.
+    :param read_options: Extra keyword arguments for pd.read_csv. With typed ingest options, dtype
+                         mismatches are raised as SchemaIngestError at the chunk where they occur.
+    :return: Iterator of DataFrame chunks.
+    """
+    try:
+        yield from pd.read_csv(path, chunksize=chunksize, **read_options)
+    except (ValueError, TypeError) as error:
+        if 'dtype' not in read_options:
+            raise
+        raise SchemaIngestError(path, describe_type_errors(path, read_options, error, chunksize)) from error
+
+
+class StreamedDataset:
+    """
+    Partial results of the validation stages collected while streaming a dataset and its v1 baseline.
+    """
+
+    def __init__(self, spill_dir: str = None):
+        self.rows = 0
+        self.missing_values = None
+        self.dtypes = None
+        self.comparison = ChunkedComparison(spill_dir)
+        self.uniqueness = KeyUniqueness(spill_dir=spill_dir, sample_size=UNIQUENESS_SAMPLE_KEYS)
+        self.columns_v1 = {}
+        self.columns_v2 = {}
+        self.sketches_v1 = {}
+        self.sketches_v2 = {}
+        self.sample_v1 = None
+        self.sample_v2 = None
+        self.frequencies_v1 = {}
+        self.frequencies_v2 = {}
+        self.histograms_v1 = None
+        self.histograms_v2 = {}
+        self.baseline_profile = None
+
+    def stability_frames(self):
+        """
+        :return: (dataset_v1, dataset_v2) frames holding only the columns collected for the stability tests
+                 (dataset_v1 is the baseline profile if one was used).
+        """
+        dataset_v2 = pd.DataFrame({column: np.concatenate(parts) for column, parts in self.columns_v2.items()})
+        if self.baseline_profile is not None:
+            return self.baseline_profile, dataset_v2
+        return pd.DataFrame({column: np.concatenate(parts) for column, parts in self.columns_v1.items()}), dataset_v2
+
+    def drift_sources(self):
+        """
+        :return: (dataset_v1, dataset_v2) sources of the drift histograms (see build_histograms): dictionaries of
+                 the values of the numeric columns (or, against a baseline profile, of their histograms binned while
+                 streaming) and of the frequency tables of the categorical ones (dataset_v1 is the baseline profile if
+                 one was used). The histograms are those of the in-memory mode, whatever the stability method.
+        """
+        sources = []
+        for columns, frequencies in ((self.columns_v1, self.frequencies_v1), (self.columns_v2, self.frequencies_v2)):
+            source = dict(frequencies)
+            for column, parts in columns.items():
+                values = pd.Series(np.concatenate(parts)).to_numpy(dtype='float64', na_value=np.nan)
+                source[column] = values[~np.isnan(values)]
+            sources.append(source)
+        if self.baseline_profile is not None:
+            sources[0] = self.baseline_profile
+            sources[1].update(self.histograms_v2)
+        return tuple(sources)
+
+
+def _collect_columns(collected: dict, chunk: pd.DataFrame, columns: list):
+    for column in columns:
+        if column in chunk.columns:
+            collected.setdefault(column, []).append(chunk[column].to_numpy())
+
+
+def _count_values(frequencies: dict, chunk: pd.DataFrame, columns: list):
+    for column in columns:
+        if column in chunk.columns:
+            counts = chunk[column].value_counts()
+            frequencies[column] = frequencies[column].add(counts, fill_value=0) if column in frequencies else counts
+
+
+def stream_dataset(dataset_name: str, dataset_path: str, dataset_v1_path: str, chunksize: int, columns_to_check: list,
+                   sketch_k: int = None, read_options: dict = None, spill_dir: str = None,
+                   baseline_profile: DatasetProfile = None, schema: dict = None, imputation_changes: dict = None,
+                   sample_size: int = None, sample_strata: str = None, prefetch_depth: int = PREFETCH_DEPTH,
+                   frequency_columns: list = ()) -> StreamedDataset:
+    """
+    Run missing value handling, missing value counting, schema inference, the regression comparison and the
+    key uniqueness check in a single chunked pass over the dataset and its v1 baseline. The stability columns are either kept
+    in full as plain numeric arrays, or, if `sketch_k` is set, summarized in quantile sketches, or, if
+    `sample_size` is set, sampled in stratified samples. Their drift histograms are binned while streaming at the
+    edges of the baseline profile's; without a profile the columns are kept in full for them.
+
+    :param dataset_name: Name of the dataset being validated.
+    :param dataset_path: Path to the dataset CSV file.
+    :param dataset_v1_path: Path to the v1 (baseline) CSV file of the same dataset.
+    :param chunksize: Number of rows per chunk.
+    :param columns_to_check: Columns used by the statistical stability tests.
+    :param sketch_k: Size of the quantile sketches built for the stability columns (None keeps the columns).
+    :param read_options: Extra keyword arguments for pd.read_csv (e.g. typed ingest options), used for both files.
+    :param spill_dir: Directory the keyed row diff and the key hashes of the uniqueness check spill to (None keeps them in memory).
+    :param baseline_profile: Stored profile of the v1 baseline. If given, only the dataset itself is read.
+    :param schema: Expected schema the imputation plan casts to (see compile_imputation_plan).
+    :param imputation_changes: If given, the number of cells each imputation rule changed is added to it.
+    :param sample_size: Size of the samples drawn from the stability columns (None keeps the columns).
+    :param sample_strata: Column the samples are stratified by.
+    :param prefetch_depth: Chunks of each file read and parsed in a background thread ahead of the one being validated.
+    :param frequency_columns: Categorical columns whose value frequencies are counted (for the drift tests).
+    :return: StreamedDataset with the merged partial results.
+    """
+    read_options = read_options or {}
+    streamed = StreamedDataset(spill_dir)
+    if sample_size:
+        streamed.sample_v2 = StratifiedSample(columns_to_check, sample_size, sample_strata, seed=1)
+        if baseline_profile is None:
+            streamed.sample_v1 = StratifiedSample(columns_to_check, sample_size, sample_strata, seed=0)
+    cleaned_chunks = handle_missing_values_profiled(prefetch(iter_dataset_chunks(dataset_path, chunksize, **read_options), prefetch_depth),
+                                                   dataset_name, schema, imputation_changes)
+    if baseline_profile is None:
+        chunks_v1 = prefetch(iter_dataset_chunks(dataset_v1_path, chunksize, **read_options), prefetch_depth)
+    else:
+        chunks_v1 = []
+        streamed.comparison.use_baseline(baseline_profile)
+        streamed.baseline_profile = baseline_profile
+        streamed.sketches_v1 = baseline_profile.sketches
+        streamed.histograms_v1 = build_histograms(baseline_profile, {column: "numeric" for column in columns_to_check})
+    # Without a profile the drift histograms are cut at the quantiles of v1's values: the columns are kept
+    collect = not (sketch_k or sample_size) or baseline_profile is None
+
+    for cleaned, chunk_v1 in zip_longest(cleaned_chunks, chunks_v1):
+        if cleaned is not None:
+            # The nulls of each chunk are counted once, by the imputation plan
+            chunk, nulls = cleaned
+            chunk_missing = nulls.counts
+            streamed.missing_values = chunk_missing if streamed.missing_values is None else streamed.missing_values + chunk_missing
+            streamed.dtypes = merge_dtypes(streamed.dtypes, chunk)
+            streamed.rows += len(chunk)
+            streamed.comparison.update(1, chunk, nulls)
+            streamed.uniqueness.update(chunk)
+            if sketch_k:
+                update_column_sketches(streamed.sketches_v2, chunk, columns_to_check, sketch_k)
+            elif sample_size:
+                streamed.sample_v2.update(chunk)
+            if collect:
+                _collect_columns(streamed.columns_v2, chunk, columns_to_check)
+            else:
+                update_histograms(streamed.histograms_v2, chunk, streamed.histograms_v1)
+            _count_values(streamed.frequencies_v2, chunk, frequency_columns)
+        if chunk_v1 is not None:
+            streamed.comparison.update(0, chunk_v1)
+            if sketch_k:
+                update_column_sketches(streamed.sketches_v1, chunk_v1, columns_to_check, sketch_k)
+            elif sample_size:
+                streamed.sample_v1.update(chunk_v1)
+            if collect:
+                _collect_columns(streamed.columns_v1, chunk_v1, columns_to_check)
+            _count_values(streamed.frequencies_v1, chunk_v1, frequency_columns)
+
+    # Sample rows of the row differences are read back lazily, only if there are any
+    streamed.comparison.collect_samples(None if baseline_profile else iter_dataset_chunks(dataset_v1_path, chunksize, **read_options),
+                                        handle_missing_values_chunked(iter_dataset_chunks(dataset_path, chunksize, **read_options), dataset_name,
+                                                                      schema))
+    return streamed
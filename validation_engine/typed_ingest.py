@@ -0,0 +1,110 @@
+import pandas as pd
+
+from validation_engine.config import VALIDATION_RULES, ARROW_STRINGS
+from quality_rules.drift import drift_columns, stability_columns
+from quality_rules.row_diff import ROW_KEYS
+from quality_rules.schema_validation import SCHEMA_REGISTRY, ingest_schema, schema_key
+
+try:
+    import pyarrow
+except ImportError:  # pyarrow is optional: without it text columns stay Python objects
+    pyarrow = None
+
+
+class SchemaIngestError(ValueError):
+    """
+    Raised when a file does not match its registered schema while it is being parsed.
+    """
+
+    def __init__(self, path: str, violations: list):
+        self.path = path
+        self.violations = violations
+        super().__init__(f"Schema validation failed while parsing {path}: {'; '.join(violations)}")
+
+
+def columns_for_rules(dataset_key: str, rules: list = VALIDATION_RULES) -> list:
+    """
+    Return the columns the given rules read, in schema order.
+    Missing value handling, schema validation and regression tests read every schema column,
+    the uniqueness check its row key, the stability tests its numeric drift columns, the drift tests its drift columns.
+
+    :param dataset_key: Schema registry key of the dataset.
+    :param rules: Names of the rules that will run ("missing", "schema", "regression", "uniqueness", "stability", "drift").
+    :return: List of column names.
+    """
+    schema = SCHEMA_REGISTRY[dataset_key]
+    if set(rules) & {"missing", "schema", "regression"}:
+        return list(schema)
+    read = set(drift_columns(dataset_key)) if "drift" in rules else set()
+    if "stability" in rules:
+        read.update(stability_columns(dataset_key))
+    if "uniqueness" in rules:
+        read.update(ROW_KEYS.get(dataset_key, []))
+    return [column for column in schema if column in read]
+
+
+def storage_schema(dataset_key: str) -> dict:
+    """
+    Return the ingest schema of a registered dataset, with its text columns as Arrow strings if ARROW_STRINGS
+    is on (and pyarrow installed).
+    """
+    return ingest_schema(dataset_key, arrow_strings=ARROW_STRINGS and pyarrow is not None)
+
+
+def ingest_options(dataset_name: str, rules: list = VALIDATION_RULES) -> dict:
+    """
+    Build the pd.read_csv options for a registered dataset: only the columns the rules read,
+    parsed directly into their storage dtypes (categories, compact nullable ints, Arrow strings if enabled).
+    Datasets without a registered schema are read as-is.
+
+    :param dataset_name: Name of the dataset (e.g. "nyc_taxi_v2").
+    :param rules: Names of the rules that will run.
+    :return: Dictionary of pd.read_csv keyword arguments.
+    """
+    dataset_key = schema_key(dataset_name)
+    if dataset_key not in SCHEMA_REGISTRY:
+        return {}
+    columns = columns_for_rules(dataset_key, rules)
+    schema = storage_schema(dataset_key)
+    # read_csv parses timestamps through parse_dates, every other dtype through dtype
+    dates = [column for column in columns if schema[column].startswith('datetime64')]
+    options = {'usecols': columns, 'dtype': {column: schema[column] for column in columns if column not in dates}}
+    if dates:
+        options['parse_dates'] = dates
+    return options
+
+
+def describe_type_errors(path: str, read_options: dict, error: Exception, chunksize: int = 100000) -> list:
+    """
+    Find which columns failed to parse into their registered dtypes. The file is re-read untyped,
+    chunk by chunk, until the first chunk with violations; this only runs after a failed typed parse.
+
+    :return: List of violation messages, one per failing column.
+    """
+    if str(error).startswith("Usecols do not match columns"):
+        return [str(error)]
+
+    dtypes = read_options.get('dtype', {})
+    untyped_options = {key: value for key, value in read_options.items() if key != 'dtype'}
+    for chunk in pd.read_csv(path, chunksize=chunksize, **untyped_options):
+        violations = []
+        for column, dtype in dtypes.items():
+            try:
+                chunk[column].astype(dtype)
+            except (ValueError, TypeError) as column_error:
+                violations.append(f"column '{column}' cannot be parsed as {dtype} ({column_error})")
+        if violations:
+            return violations
+    return [str(error)]
+
+
+def read_typed_csv(path: str, read_options: dict) -> pd.DataFrame:
+    """
+    pd.read_csv with typed ingest options, reporting dtype and column mismatches as SchemaIngestError.
+    """
+    try:
+        return pd.read_csv(path, **read_options)
+    except (ValueError, TypeError) as error:
+        if 'dtype' not in read_options:
+            raise
+        raise SchemaIngestError(path, describe_type_errors(path, read_options, error)) from error
@@ -1,64 +1,658 @@
-import sys
-sys.path.append('d:/Download-Office/ITF-JW-GTC-SK-04/Sentinel')
-
+import os
 import pandas as pd
 import logging
-from config import DATASETS_PATH, COLUMNS_TO_CHECK, MISSING_THRESHOLD, REPORT_PATH, STATISTICAL_TEST_ALPHA
-from quality_rules.schema_validation import validate_schema
-from quality_rules.missing_handle import handle_missing_values
-from quality_rules.regression_tests import compare_datasets
-from quality_rules.stability_tests import test_statistical_stability
+import time
+from concurrent.futures import ProcessPoolExecutor
+from validation_engine.config import DATASETS_PATH, MISSING_THRESHOLD, REPORT_PATH, STATISTICAL_TEST_ALPHA, CHUNK_SIZE, WORKERS, STABILITY_METHOD, STABILITY_SKETCH_K, STABILITY_SAMPLE_SIZE, STABILITY_SAMPLE_MIN_SIZE, STABILITY_SAMPLE_TOLERANCE, STABILITY_SAMPLE_STRATA, TYPED_INGEST, BACKEND, ROW_DIFF_SPILL_DIR, BASELINE_PROFILES, SPANS_PATH, METRICS_PATH, PREFLIGHT_ENABLED, PREFLIGHT_SAMPLE_ROWS, PREFETCH_DEPTH, RESULT_CACHE_ENABLED, WATCH_INTERVAL, INCREMENTAL, DATASET_TIME_BUDGET, RUN_TIME_BUDGET, UNIQUENESS_SAMPLE_KEYS
+from validation_engine.dataset_cache import get_dataset_cache, load_dataset, load_null_profile
+from validation_engine.incremental import incremental_profiles
+from validation_engine import polars_backend
+from validation_engine.paths import dataset_files
+from validation_engine.prefetch import prefetch
+from validation_engine.preflight import preflight_schema
+from validation_engine.profile_store import get_baseline_profile
+from validation_engine.result_cache import get_result_cache, dataset_nodes, node_key, affected_datasets
+from validation_engine.scheduler import CostModel, check_task, run_checks, LOAD_STAGES, SKIPPED_BUDGET
+from validation_engine.spans import span, take_spans, write_spans, write_prometheus
+from validation_engine.streaming import stream_dataset, iter_dataset_chunks
+from validation_engine.typed_ingest import ingest_options, storage_schema
+from quality_rules.schema_validation import validate_schema, empty_frame, SCHEMA_REGISTRY, schema_key
+from quality_rules.missing_handle import handle_missing_values_chunked, compile_imputation_plan
+from quality_rules.regression_tests import compare_datasets, ChunkedComparison
+from quality_rules.stability_tests import test_statistical_stability_batch, test_statistical_stability_sketch, test_statistical_stability_sequential
+from quality_rules.sketches import build_column_sketches
+from quality_rules.drift import drift_columns, stability_columns, test_drift
+from quality_rules.row_diff import row_key
+from quality_rules.uniqueness import find_duplicate_keys
 
 # Setup logging
 logging.basicConfig(filename="logs/validation_engine.log", level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-def generate_report():
-    with open(REPORT_PATH, 'w') as report_file:
-        report_file.write("Validation Report\n")
-        report_file.write("====================\n")
+def validate_dataset(dataset_name: str, dataset_path: str, chunksize: int = CHUNK_SIZE, stability_method: str = STABILITY_METHOD,
+                     prefetch_depth: int = PREFETCH_DEPTH, use_cache: bool = RESULT_CACHE_ENABLED, incremental: bool = INCREMENTAL,
+                     budget: float = DATASET_TIME_BUDGET, deadline: float = None, backend: str = BACKEND) -> dict:
+    """
+    Run every validation stage on one dataset and return the outcome as a structured result.
+    Errors are caught and recorded in the result, so one broken dataset never stops the others.
+    With the result cache, a dataset whose checks all have a cached result for the current content of
+    their input files, rule versions and settings is not read at all.
+    The checks are scheduled by estimated cost within the time budget (see run_checks): those that would
+    overrun it are reported as SKIPPED (budget). Loading the dataset is charged against the budget too: a dataset
+    whose estimated load (from the size of its files and past loads) would overrun the deadline is not read.
 
-        # Iterate through each dataset and run the validation functions
-        for dataset_name, dataset_path in DATASETS_PATH.items():
-            try:
-                logging.info(f"Validating {dataset_name}...")
+    :param dataset_name: Name of the dataset (key of DATASETS_PATH).
+    :param dataset_path: Path to the dataset CSV file.
+    :param chunksize: If set, stream the dataset in chunks of this many rows.
+    :param stability_method: "exact" (ks_2samp on full columns), "sketch" (KS on quantile sketches) or "sample"
+                             (sequential KS on stratified samples).
+    :param prefetch_depth: Chunks read and parsed in the background ahead of the one being validated (streaming mode).
+    :param use_cache: Reuse (and store) the check results of the result cache.
+    :param incremental: Parse only the rows appended to the file since the last run and run the checks on the
+                        updated aggregates (see incremental_profiles); chunksize and prefetch_depth are then unused.
+    :param budget: Wall-clock seconds the dataset may take (None: unbounded).
+    :param deadline: time.time() by which the dataset must be done, e.g. the end of the run's budget (None: none).
+    :param backend: "pandas", or "polars" to validate a registered dataset with the Polars backend (see _run_polars_stages;
+                    chunksize and prefetch_depth are then unused). Both backends pass and fail the same checks.
+    :return: Dictionary with the dataset name, missing values summary, (check, passed) pairs (passed is None for
+             skipped checks, whose reasons are in 'skipped') and error message.
+    """
+    result = {'dataset': dataset_name, 'missing_values': None, 'checks': [], 'error': None}
+    if budget is not None:
+        deadline = min(time.time() + budget, deadline if deadline is not None else float('inf'))
+    try:
+        with span("validate_dataset", dataset=dataset_name):
+            keys = cached = None
+            if use_cache:
+                with span("result_cache") as stage:
+                    keys = _node_keys(dataset_name, stability_method)
+                    cached = get_result_cache().lookup(dataset_name, keys) if keys is not None else None
+                    stage.attributes['hit'] = cached is not None
+            if cached is not None:
+                result = cached
+            elif not _load_fits(dataset_name, dataset_path, deadline):
+                logging.warning(f"Time budget left cannot fit loading {dataset_name}: its checks are skipped")
+                for labels in check_labels(schema_key(dataset_name)).values():
+                    result['checks'].extend((label, None) for label in labels)
+                    result.setdefault('skipped', {}).update({label: SKIPPED_BUDGET for label in labels})
+            elif incremental:
+                _run_incremental(result, dataset_name, dataset_path, stability_method, deadline)
+            else:
+                if backend == "polars" and schema_key(dataset_name) in SCHEMA_REGISTRY:
+                    _run_polars_stages(result, dataset_name, dataset_path, stability_method, deadline)
+                else:
+                    _run_stages(result, dataset_name, dataset_path, chunksize, stability_method, prefetch_depth, deadline)
+                if keys is not None:
+                    get_result_cache().store(result, keys)
+    except Exception as e:
+        logging.error(f"Error processing {dataset_name}: {e}")
+        result['error'] = str(e)
+    # Spans of this dataset, written by generate_report (also from worker processes)
+    result['spans'] = take_spans()
+    if result['error'] is None:
+        _record_load(dataset_name, dataset_path, result['spans'])
+    return result
 
-                # Load the dataset
-                dataset = pd.read_csv(dataset_path)
+def input_bytes(dataset_name: str, dataset_path: str) -> int:
+    """
+    Return the size of the files the validation of a dataset reads: its own and those of its v1 baseline
+    (missing files count as empty, their error is reported by the validation).
+    """
+    dataset_v1_path = DATASETS_PATH.get(dataset_name.replace("v2", "v1"), dataset_path)
+    total = 0
+    for path in set(dataset_files(dataset_path)) | set(dataset_files(dataset_v1_path)):
+        try:
+            total += os.path.getsize(path)
+        except OSError:
+            pass
+    return total
 
-                # Handle missing values
-                cleaned_dataset = handle_missing_values(dataset, dataset_name)
-                missing_values = cleaned_dataset.isnull().sum()
+def _load_fits(dataset_name: str, dataset_path: str, deadline: float = None) -> bool:
+    # Whether loading and preparing the dataset is estimated to end by the deadline (see CostModel.estimate_load)
+    return deadline is None or time.time() + CostModel().estimate_load(input_bytes(dataset_name, dataset_path)) <= deadline
 
-                report_file.write(f"\nDataset: {dataset_name}\n")
-                report_file.write(f"Missing values summary: {missing_values}\n")
+def _record_load(dataset_name: str, dataset_path: str, spans: list):
+    # Time the load stages of a dataset that was read, for the next estimates
+    seconds = sum(record['wall_seconds'] for record in spans if record['stage'] in LOAD_STAGES and record['dataset'] == dataset_name)
+    if seconds:
+        model = CostModel()
+        model.record_load(input_bytes(dataset_name, dataset_path), seconds)
+        model.save()
 
-                # Perform schema validation
-                expected_schema = {}  # Define expected schema based on your dataset
-                if validate_schema(cleaned_dataset, expected_schema):
-                    report_file.write("Schema validation: PASSED\n")
-                else:
-                    report_file.write("Schema validation: FAILED\n")
+def _node_keys(dataset_name: str, stability_method: str) -> dict:
+    # Cache keys of the dataset's check nodes, or None if an input file cannot be hashed (e.g. it is missing)
+    try:
+        return {node['name']: node_key(node) for node in dataset_nodes(dataset_name, stability_method)}
+    except OSError:
+        return None
 
-                # Perform regression tests with previous dataset versions
-                dataset_v1 = pd.read_csv(DATASETS_PATH[dataset_name.replace("v2", "v1")])
-                if compare_datasets(dataset_v1, cleaned_dataset):
-                    report_file.write("Regression test: PASSED\n")
-                else:
-                    report_file.write("Regression test: FAILED\n")
+def registered_schema(dataset_name: str) -> dict:
+    """
+    Return the expected schema of a dataset from the schema registry (storage dtypes with typed ingest),
+    or an empty schema for an unregistered dataset.
+    """
+    dataset_key = schema_key(dataset_name)
+    if dataset_key not in SCHEMA_REGISTRY:
+        return {}
+    return storage_schema(dataset_key) if TYPED_INGEST else SCHEMA_REGISTRY[dataset_key]
+
+def _preflight(result: dict, dataset_path: str, expected_schema: dict):
+    # Schema preflight: a file whose header or first rows break the schema is skipped before it is parsed in full
+    if PREFLIGHT_ENABLED and expected_schema:
+        with span("preflight") as stage:
+            preflight = preflight_schema(dataset_path, expected_schema, PREFLIGHT_SAMPLE_ROWS)
+            stage.rows_out, stage.columns = preflight['sample_rows'], preflight['columns']
+        if not preflight['passed']:
+            result['checks'].append(("Schema validation", False))
+            result['schema_violations'] = preflight['violations']
+            raise ValueError(f"Schema preflight failed for {dataset_path}: {'; '.join(violation['message'] for violation in preflight['violations'])}")
+
+def _run_incremental(result: dict, dataset_name: str, dataset_path: str, stability_method: str, deadline: float = None):
+    # validate_dataset on append-only files: the checkpointed profiles of the dataset (and of its v1 baseline)
+    # are brought up to date with the appended rows, then every check runs on the profiles
+    logging.info(f"Validating {dataset_name} incrementally...")
+    dataset_v1_name = dataset_name.replace("v2", "v1")
+    expected_schema = registered_schema(dataset_name)
+    _preflight(result, dataset_path, expected_schema)
+
+    with span("incremental") as stage:
+        profiles = incremental_profiles(dataset_name, dataset_path, ingest_options(dataset_name) if TYPED_INGEST else {}, expected_schema)
+        stage.rows_out = profiles['rows_parsed']
+        stage.attributes['full_scan'] = profiles['full_scan']
+    if dataset_v1_name == dataset_name:
+        baseline = profiles['raw']
+    else:
+        with span("baseline_profile"):
+            baseline = incremental_profiles(dataset_v1_name, DATASETS_PATH[dataset_v1_name],
+                                            ingest_options(dataset_v1_name) if TYPED_INGEST else {}, registered_schema(dataset_v1_name))['raw']
+
+    result['missing_values'] = profiles['cleaned'].missing
+    logging.info(f"Cells changed per imputation rule for {dataset_name}: {profiles['imputation_changes']}")
+    profile_checks(result, dataset_name, baseline, profiles['cleaned'], stability_method, deadline)
+    logging.info(f"Validation for {dataset_name} completed.")
+
+def check_labels(dataset_key: str) -> dict:
+    """
+    Return the report labels of the checks of a dataset, per rule (before any detail their results add).
+    """
+    return {
+        'schema': ["Schema validation"],
+        'regression': ["Regression test"],
+        'uniqueness': ["Key uniqueness"],
+        'stability': [f"Statistical stability for column {column}" for column in stability_columns(dataset_key)],
+        'drift': [f"Drift for column {column}" for column in drift_columns(dataset_key)],
+    }
+
+def check_tasks(dataset_name: str, rows: int, columns: list, runs: dict) -> list:
+    """
+    Return the check tasks of a dataset for run_checks, in report order.
+
+    :param dataset_name: Name of the dataset.
+    :param rows: Rows of the dataset and of its v1 baseline.
+    :param columns: Columns of the dataset (those the regression test compares).
+    :param runs: Rule -> function running its checks and returning their (check, passed) pairs.
+    :return: List of task dictionaries (see check_task).
+    """
+    dataset_key = schema_key(dataset_name)
+    labels = check_labels(dataset_key)
+    read = {'schema': list(registered_schema(dataset_name)), 'regression': list(columns), 'uniqueness': row_key(columns) or [],
+            'stability': stability_columns(dataset_key), 'drift': list(drift_columns(dataset_key))}
+    return [check_task(rule, labels[rule], runs[rule], rows, read[rule]) for rule in labels]
+
+def profile_checks(result: dict, dataset_name: str, baseline, cleaned, stability_method: str, deadline: float = None):
+    """
+    Run the schema, regression, uniqueness, stability and drift checks of a dataset on profiles instead of the data
+    (e.g. profiles merged from shards, or updated with the rows appended since the last run), scheduled
+    by run_checks, and add them to its result.
+
+    :param result: Structured result of the dataset, updated in place.
+    :param dataset_name: Name of the dataset.
+    :param baseline: DatasetProfile of the raw v1 dataset.
+    :param cleaned: DatasetProfile of the dataset after missing value handling.
+    :param stability_method: "exact", "sketch" or "sample" (see validate_dataset).
+    :param deadline: time.time() by which the checks must be done (None: no budget).
+    """
+    dataset_key = schema_key(dataset_name)
+
+    def regression():
+        comparison = ChunkedComparison(ROW_DIFF_SPILL_DIR)
+        comparison.use_profile(0, baseline)
+        comparison.use_profile(1, cleaned)
+        return [("Regression test", comparison.result())]
+
+    runs = {
+        'schema': lambda: [("Schema validation", validate_schema(empty_frame(cleaned.dtypes), registered_schema(dataset_name)))],
+        'regression': regression,
+        'uniqueness': lambda: uniqueness_checks(find_duplicate_keys(cleaned, spill_dir=ROW_DIFF_SPILL_DIR, sample_size=UNIQUENESS_SAMPLE_KEYS)),
+        'stability': lambda: stability_checks(baseline, cleaned, stability_method, dataset_key, baseline.sketches, cleaned.sketches),
+        'drift': lambda: drift_checks(baseline, cleaned, dataset_key),
+    }
+    run_checks(result, check_tasks(dataset_name, baseline.rows + cleaned.rows, cleaned.columns or [], runs), deadline)
+
+def _run_stages(result: dict, dataset_name: str, dataset_path: str, chunksize: int, stability_method: str, prefetch_depth: int,
+                deadline: float = None):
+    # Stages of validate_dataset, each in its own span; checks are added to the result once they are all done
+    logging.info(f"Validating {dataset_name}...")
+
+    dataset_v1_name = dataset_name.replace("v2", "v1")
+    dataset_v1_path = DATASETS_PATH[dataset_v1_name]
+
+    # Typed ingest: parse only the columns the rules read, straight into their registered dtypes
+    read_options = ingest_options(dataset_name) if TYPED_INGEST else {}
+
+    # Expected schema from the schema registry (storage dtypes with typed ingest)
+    dataset_key = schema_key(dataset_name)
+    expected_schema = registered_schema(dataset_name)
+    columns = stability_columns(dataset_key)
+    imputation_changes = {}
+
+    _preflight(result, dataset_path, expected_schema)
+
+    # The v1 baseline is profiled once and stored; later runs only read the dataset being validated
+    baseline_profile = None
+    if BASELINE_PROFILES:
+        with span("baseline_profile") as stage:
+            baseline_profile = get_baseline_profile(dataset_v1_name, dataset_v1_path, read_options)
+            stage.rows_out = baseline_profile.rows
+        if not baseline_profile.exact and stability_method != "sketch":
+            # A profile without the column values only supports the sketch method (see BASELINE_PROFILE_EXACT): v1 is read instead
+            logging.warning(f"Baseline profile of {dataset_v1_name} is not exact: {dataset_v1_name} is read for the {stability_method} stability tests")
+            baseline_profile = None
+
+    if chunksize:
+        # Streaming mode: handle and count missing values, infer the schema and compare
+        # with v1 in a single chunked pass
+        sketch_k = STABILITY_SKETCH_K if stability_method == "sketch" else None
+        sample_size = STABILITY_SAMPLE_SIZE if stability_method == "sample" else None
+        with span("stream") as stage:
+            categorical = [column for column, kind in drift_columns(dataset_key).items() if kind == "categorical"]
+            streamed = stream_dataset(dataset_name, dataset_path, dataset_v1_path, chunksize, columns, sketch_k, read_options,
+                                      ROW_DIFF_SPILL_DIR, baseline_profile, expected_schema, imputation_changes,
+                                      sample_size, STABILITY_SAMPLE_STRATA.get(dataset_key), prefetch_depth, categorical)
+            stage.rows_out, stage.columns = streamed.rows, list(streamed.dtypes.index)
+        missing_values = streamed.missing_values
+        schema_dataset = empty_frame(streamed.dtypes)
+    else:
+        # Load the dataset (shared cache, so v1 files are parsed only once)
+        with span("load") as stage:
+            dataset = load_dataset(dataset_path, **read_options)
+            stage.rows_out, stage.columns = len(dataset), list(dataset.columns)
+
+        # Handle missing values
+        with span("imputation", rows_in=len(dataset), columns=dataset.columns) as stage:
+            plan = compile_imputation_plan(dataset_name, expected_schema)
+            # The nulls of a cached file are counted once per run (e.g. a v1 file validated, then compared with)
+            cleaned_dataset, cleaned_nulls = plan.apply_profiled(dataset, imputation_changes, load_null_profile(dataset_path, **read_options))
+            missing_values = cleaned_nulls.counts
+            stage.rows_out = len(cleaned_dataset)
+        schema_dataset = cleaned_dataset
+
+    result['missing_values'] = missing_values
+    logging.info(f"Cells changed per imputation rule for {dataset_name}: {imputation_changes}")
+
+    # Rows of the dataset and of the v1 baseline the checks compare it with (about as many, when streamed)
+    if chunksize:
+        rows = 2 * streamed.rows
+    else:
+        dataset_v1 = baseline_profile if baseline_profile is not None else load_dataset(dataset_v1_path, **read_options)
+        rows = len(cleaned_dataset) + (dataset_v1.rows if baseline_profile is not None else len(dataset_v1))
+
+    def regression():
+        if chunksize:
+            return [("Regression test", streamed.comparison.result())]
+        nulls_v1 = load_null_profile(dataset_v1_path, **read_options) if baseline_profile is None else None
+        return [("Regression test", compare_datasets(dataset_v1, cleaned_dataset, nulls_v2=cleaned_nulls, nulls_v1=nulls_v1))]
+
+    def stability():
+        sketches_v1 = sketches_v2 = None
+        if not chunksize:
+            stability_v1, stability_v2 = dataset_v1, cleaned_dataset
+            if stability_method == "sketch":
+                sketches_v1 = baseline_profile.sketches if baseline_profile is not None else build_column_sketches([dataset_v1], columns, STABILITY_SKETCH_K)
+                sketches_v2 = build_column_sketches([cleaned_dataset], columns, STABILITY_SKETCH_K)
+        elif stability_method == "sample":
+            stability_v1, stability_v2 = (streamed.sample_v1 if streamed.sample_v1 is not None else baseline_profile), streamed.sample_v2
+        elif stability_method == "sketch":
+            stability_v1 = stability_v2 = None
+            sketches_v1, sketches_v2 = streamed.sketches_v1, streamed.sketches_v2
+        else:
+            stability_v1, stability_v2 = streamed.stability_frames()
+        return stability_checks(stability_v1, stability_v2, stability_method, dataset_key, sketches_v1, sketches_v2)
+
+    def uniqueness():
+        if not chunksize:
+            return uniqueness_checks(find_duplicate_keys(cleaned_dataset, spill_dir=ROW_DIFF_SPILL_DIR, sample_size=UNIQUENESS_SAMPLE_KEYS))
+        # The key hashes were taken while streaming; the sample keys are read back only if there are duplicates
+        streamed.uniqueness.collect_samples(handle_missing_values_chunked(iter_dataset_chunks(dataset_path, chunksize, **read_options),
+                                                                          dataset_name, expected_schema))
+        return uniqueness_checks({**streamed.uniqueness.result(), 'sample_keys': streamed.uniqueness.sample_keys})
+
+    # Schema validation against the schema registry, regression tests with the previous dataset version, key
+    # uniqueness, statistical stability tests and drift metrics, scheduled by estimated cost within the time budget
+    runs = {
+        'schema': lambda: [("Schema validation", validate_schema(schema_dataset, expected_schema))],
+        'regression': regression,
+        'uniqueness': uniqueness,
+        'stability': stability,
+        'drift': lambda: drift_checks(*(streamed.drift_sources() if chunksize else (dataset_v1, cleaned_dataset)), dataset_key),
+    }
+    run_checks(result, check_tasks(dataset_name, rows, schema_dataset.columns, runs), deadline)
+
+    logging.info(f"Validation for {dataset_name} completed.")
+
+def _run_polars_stages(result: dict, dataset_name: str, dataset_path: str, stability_method: str, deadline: float = None):
+    # validate_dataset with the Polars backend: both versions are scanned lazily (only the columns the rules read,
+    # in their storage dtypes), the imputation plan runs inside the query, and both are collected in one
+    # multithreaded pass. The checks run on the Polars frames; the stability and drift tests on the columns they
+    # read, copied to pandas (their kernels are numpy either way).
+    logging.info(f"Validating {dataset_name} with the Polars backend...")
+
+    dataset_v1_name = dataset_name.replace("v2", "v1")
+    dataset_key = schema_key(dataset_name)
+    # The scans always parse into the storage dtypes, as typed ingest does
+    expected_schema = storage_schema(dataset_key)
+    imputation_changes = {}
+
+    _preflight(result, dataset_path, expected_schema)
+
+    with span("load") as stage:
+        plan = compile_imputation_plan(dataset_name, expected_schema)
+        dataset_v1, cleaned_dataset = polars_backend.load_versions(plan, dataset_name, dataset_path, dataset_v1_name,
+                                                                   DATASETS_PATH[dataset_v1_name], imputation_changes)
+        stage.rows_out, stage.columns = cleaned_dataset.height, cleaned_dataset.columns
+
+    result['missing_values'] = polars_backend.null_counts(cleaned_dataset)
+    logging.info(f"Cells changed per imputation rule for {dataset_name}: {imputation_changes}")
+
+    columns = stability_columns(dataset_key)
+    read = set(columns) | set(drift_columns(dataset_key)) | {STABILITY_SAMPLE_STRATA.get(dataset_key)}
+    read = [column for column in cleaned_dataset.columns if column in read]
+    frame_v1, frame_v2 = polars_backend.to_pandas(dataset_v1, read), polars_backend.to_pandas(cleaned_dataset, read)
+
+    def stability():
+        sketches_v1 = sketches_v2 = None
+        if stability_method == "sketch":
+            sketches_v1 = build_column_sketches([frame_v1], columns, STABILITY_SKETCH_K)
+            sketches_v2 = build_column_sketches([frame_v2], columns, STABILITY_SKETCH_K)
+        return stability_checks(frame_v1, frame_v2, stability_method, dataset_key, sketches_v1, sketches_v2)
+
+    runs = {
+        'schema': lambda: [("Schema validation", polars_backend.validate_schema(cleaned_dataset, expected_schema))],
+        'regression': lambda: [("Regression test", polars_backend.compare_datasets(dataset_v1, cleaned_dataset))],
+        'uniqueness': lambda: uniqueness_checks(polars_backend.find_duplicate_keys(cleaned_dataset, UNIQUENESS_SAMPLE_KEYS)),
+        'stability': stability,
+        'drift': lambda: drift_checks(frame_v1, frame_v2, dataset_key),
+    }
+    run_checks(result, check_tasks(dataset_name, dataset_v1.height + cleaned_dataset.height, cleaned_dataset.columns, runs), deadline)
+
+    logging.info(f"Validation for {dataset_name} completed.")
+
+def stability_checks(dataset_v1, dataset_v2, stability_method: str, dataset_key: str, sketches_v1: dict = None, sketches_v2: dict = None) -> list:
+    """
+    Run the statistical stability tests of the monitored columns with the given method.
+
+    :param dataset_v1: The old version (DataFrame or DatasetProfile; StratifiedSample for "sample").
+    :param dataset_v2: The new version (DataFrame, or DatasetProfile or StratifiedSample).
+    :param stability_method: "exact", "sketch" or "sample" (see validate_dataset).
+    :param dataset_key: Schema registry key of the dataset (selects its columns and the strata of the samples).
+    :param sketches_v1: Quantile sketches of the old version's columns, for the "sketch" method.
+    :param sketches_v2: Quantile sketches of the new version's columns, for the "sketch" method.
+    :return: List of (check, passed) pairs.
+    """
+    checks = []
+    columns = stability_columns(dataset_key)
+    if stability_method == "sketch":
+        for column in columns:
+            passed = test_statistical_stability_sketch(sketches_v1[column], sketches_v2[column], column, STATISTICAL_TEST_ALPHA)
+            checks.append((f"Statistical stability for column {column}", passed))
+    elif stability_method == "sample":
+        # Sampled, with early stopping: the check reports the sample sizes and the confidence of the decision
+        stability = test_statistical_stability_sequential(dataset_v1, dataset_v2, columns, STATISTICAL_TEST_ALPHA,
+                                                          STABILITY_SAMPLE_SIZE, STABILITY_SAMPLE_MIN_SIZE, STABILITY_SAMPLE_TOLERANCE,
+                                                          STABILITY_SAMPLE_STRATA.get(dataset_key))
+        for column, row in stability.iterrows():
+            inconclusive = "" if row['conclusive'] else ", inconclusive"
+            check = f"Statistical stability for column {column} (sampled {row['sample_v1']}/{row['sample_v2']} values, confidence {row['confidence']:.3f}{inconclusive})"
+            checks.append((check, bool(row['passed'])))
+    else:
+        # Every monitored column in one vectorized pass
+        stability = test_statistical_stability_batch(dataset_v1, dataset_v2, columns, STATISTICAL_TEST_ALPHA)
+        for column, passed in stability['passed'].items():
+            checks.append((f"Statistical stability for column {column}", bool(passed)))
+    return checks
+
+def uniqueness_checks(uniqueness: dict) -> list:
+    """
+    Report the key uniqueness of a dataset: one check, which passes if no two rows share a key (or if the
+    dataset has no registered key), with the duplicate counts and sample duplicate keys.
+
+    :param uniqueness: Result of find_duplicate_keys (or KeyUniqueness.result() with its 'sample_keys').
+    :return: List of (check, passed) pairs.
+    """
+    if not uniqueness['key']:
+        return [("Key uniqueness (no registered key)", True)]
+    details = f"{uniqueness['duplicate_keys']} duplicate keys, {uniqueness['duplicate_rows']} extra rows"
+    if uniqueness['null_keys']:
+        details += f", {uniqueness['null_keys']} rows with a null key"
+    sample_keys = uniqueness['sample_keys']
+    if sample_keys is not None and len(sample_keys):
+        samples = [f"{'/'.join(str(value) for value in row[uniqueness['key']])} ({row['rows']} rows)" for _, row in sample_keys.iterrows()]
+        details += f"; e.g. {', '.join(samples)}"
+    elif len(uniqueness['samples']):
+        details += f"; first at row ids {', '.join(str(row_id) for row_id in uniqueness['samples'])}"
+    return [(f"Key uniqueness ({', '.join(uniqueness['key'])}: {details})", uniqueness['duplicate_keys'] == 0)]
+
+def drift_checks(dataset_v1, dataset_v2, dataset_key: str) -> list:
+    """
+    Run the drift tests of the dataset's drift columns: a check per column with its metrics, which passes
+    while the PSI stays under DRIFT_PSI_THRESHOLD. Metrics computed from a quantile sketch are labelled approximate.
+
+    :param dataset_v1: The old version (DataFrame or DatasetProfile, or a source dictionary, see build_histograms).
+    :param dataset_v2: The new version.
+    :param dataset_key: Schema registry key of the dataset (selects its drift columns).
+    :return: List of (check, passed) pairs.
+    """
+    checks = []
+    drift = test_drift(dataset_v1, dataset_v2, drift_columns(dataset_key))
+    for column, row in drift.iterrows():
+        if pd.isna(row['psi']):
+            checks.append((f"Drift for column {column} (insufficient data)", False))
+            continue
+        distance = f", Wasserstein-1 {row['wasserstein']:.4f}" if row['kind'] == "numeric" else ""
+        # Histograms binned from a quantile sketch (a baseline profile without the values) give approximate metrics
+        approximate = f", approximate: quantile sketch rank error {row['rank_error']:.3f}" if row['rank_error'] else ""
+        check = f"Drift for column {column} (PSI {row['psi']:.4f}, Jensen-Shannon {row['js']:.4f}{distance}, chi-square p-value {row['chi2_p_value']:.3g}{approximate})"
+        checks.append((check, bool(row['passed'])))
+    return checks
+
+def _load_ahead(dataset_names: list, chunksize: int, skip: list = (), deadline: float = None):
+    # Yield each dataset name once its file is in the shared dataset cache (in-memory mode only; streaming
+    # prefetches chunks instead; `skip` datasets are not loaded, e.g. those with cached results, nor any
+    # dataset whose load no longer fits the run's deadline). Run through prefetch, the next files are parsed while one is validated.
+    for dataset_name in dataset_names:
+        if not chunksize and dataset_name not in skip and _load_fits(dataset_name, DATASETS_PATH[dataset_name], deadline):
+            with span("prefetch", dataset=dataset_name):
+                dataset_path = DATASETS_PATH[dataset_name]
+                expected_schema = registered_schema(dataset_name)
+                read_options = ingest_options(dataset_name) if TYPED_INGEST else {}
+                try:
+                    # Files failing the schema preflight are not loaded by the validation either
+                    if not (PREFLIGHT_ENABLED and expected_schema) or preflight_schema(dataset_path, expected_schema, PREFLIGHT_SAMPLE_ROWS)['passed']:
+                        load_dataset(dataset_path, **read_options)
+                        load_null_profile(dataset_path, **read_options)
+                except Exception:
+                    # Errors are reported by the validation of the dataset itself
+                    pass
+        yield dataset_name
+
+def validate_dataset_group(dataset_names: list, chunksize: int = CHUNK_SIZE, stability_method: str = STABILITY_METHOD,
+                           prefetch_depth: int = PREFETCH_DEPTH, use_cache: bool = RESULT_CACHE_ENABLED, incremental: bool = INCREMENTAL,
+                           budget: float = DATASET_TIME_BUDGET, deadline: float = None, backend: str = BACKEND) -> list:
+    """
+    Validate a group of datasets in the same process, so they share its dataset cache
+    (e.g. a v1/v2 pair, where v1 is loaded only once). The next `prefetch_depth` datasets are
+    read and parsed in a background thread while one is validated.
+    """
+    # Datasets answered from the result cache (or validated incrementally, or scanned by Polars) are not loaded ahead
+    skip = [dataset_name for dataset_name in dataset_names
+            if incremental or backend == "polars" or use_cache and get_result_cache().contains(_node_keys(dataset_name, stability_method))]
+    results = [validate_dataset(dataset_name, DATASETS_PATH[dataset_name], chunksize, stability_method, prefetch_depth, use_cache, incremental,
+                                budget, deadline, backend)
+               for dataset_name in prefetch(_load_ahead(dataset_names, chunksize, skip, deadline), prefetch_depth)]
+    logging.info(f"Dataset cache ({', '.join(dataset_names)}): {get_dataset_cache().stats()}")
+    if use_cache:
+        logging.info(f"Result cache ({', '.join(dataset_names)}): {get_result_cache().stats()}")
+    return results
+
+def group_dataset_pairs(dataset_names) -> list:
+    """
+    Group dataset names by their v1/v2 pair, keeping the DATASETS_PATH order.
+    """
+    groups = {}
+    for dataset_name in dataset_names:
+        groups.setdefault(dataset_name.replace("v2", "v1"), []).append(dataset_name)
+    return list(groups.values())
+
+def write_dataset_report(report_file, result: dict):
+    """
+    Write the report section of one dataset from its structured result.
+    """
+    skipped = result.get('skipped', {})
+    if result['missing_values'] is not None or skipped:
+        report_file.write(f"\nDataset: {result['dataset']}\n")
+    if result['missing_values'] is not None:
+        report_file.write(f"Missing values summary: {result['missing_values']}\n")
+    for check, passed in result['checks']:
+        status = f"SKIPPED ({skipped[check]})" if passed is None else 'PASSED' if passed else 'FAILED'
+        report_file.write(f"{check}: {status}\n")
+    if result['error'] is not None:
+        report_file.write(f"\nError processing {result['dataset']}: {result['error']}\n")
+
+def write_report(results: dict):
+    """
+    Write the validation report from the structured result of every dataset, in DATASETS_PATH order.
+    """
+    with span("report"):
+        with open(REPORT_PATH, 'w') as report_file:
+            report_file.write("Validation Report\n")
+            report_file.write("====================\n")
+
+            # Write the results in a deterministic order, whatever order the workers finished in
+            for dataset_name in DATASETS_PATH:
+                write_dataset_report(report_file, results[dataset_name])
+
+def _write_run_spans(results: list, run_id: str):
+    # Per-stage spans of every dataset (recorded in whichever process validated it) and of the report itself
+    spans = [record for result in results for record in result.get('spans', [])] + take_spans()
+    write_spans(spans, SPANS_PATH, run_id)
+    write_prometheus(spans, METRICS_PATH)
+    logging.info(f"Report generation completed ({len(spans)} spans written to {SPANS_PATH} and {METRICS_PATH}).")
+
+def generate_report(chunksize: int = CHUNK_SIZE, workers: int = WORKERS, stability_method: str = STABILITY_METHOD,
+                    prefetch_depth: int = PREFETCH_DEPTH, use_cache: bool = RESULT_CACHE_ENABLED, incremental: bool = INCREMENTAL,
+                    budget: float = DATASET_TIME_BUDGET, run_budget: float = RUN_TIME_BUDGET, backend: str = BACKEND) -> dict:
+    """
+    Validate every dataset in DATASETS_PATH and write the validation report.
+
+    :param chunksize: If set, stream each dataset in chunks of this many rows instead of loading it
+                      in memory. The report is the same in both modes.
+    :param workers: Number of worker processes. With more than one worker each v1/v2 pair is
+                    validated in its own process; the report is still written in DATASETS_PATH order.
+    :param stability_method: "exact" (ks_2samp on full columns), "sketch" (KS on mergeable quantile sketches,
+                             a few KB per column; with chunksize the columns are never materialized) or "sample"
+                             (sequential KS on stratified samples, stopped as soon as the decision is confident).
+    :param prefetch_depth: Datasets (chunks in streaming mode) read and parsed in the background ahead of the one
+                           being validated; 0 reads everything in the validating thread.
+    :param use_cache: Reuse the cached results of checks whose inputs and settings are unchanged (see validate_dataset).
+    :param incremental: Parse only the rows appended to each file since the last run (see validate_dataset).
+    :param budget: Wall-clock seconds each dataset may take (None: unbounded).
+    :param run_budget: Wall-clock seconds the whole run may take (None: unbounded). Checks that would overrun
+                       either budget are reported as SKIPPED (budget).
+    :param backend: "pandas" or "polars" (see validate_dataset).
+    :return: Dictionary of dataset name -> structured result.
+    """
+    run_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+    deadline = time.time() + run_budget if run_budget is not None else None
+    with span("generate_report"):
+        groups = group_dataset_pairs(DATASETS_PATH)
+        results = {}
+
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(groups))) as executor:
+                futures = [(group, executor.submit(validate_dataset_group, group, chunksize, stability_method, prefetch_depth, use_cache,
+                                                       incremental, budget, deadline, backend)) for group in groups]
+                for group, future in futures:
+                    try:
+                        for result in future.result():
+                            results[result['dataset']] = result
+                    except Exception as e:
+                        # The worker process itself failed (e.g. it was killed): record the error for its datasets
+                        for dataset_name in group:
+                            logging.error(f"Error processing {dataset_name}: {e}")
+                            results[dataset_name] = {'dataset': dataset_name, 'missing_values': None, 'checks': [], 'error': str(e)}
+        else:
+            # One process: every dataset in one group, so the next pair is prefetched while this one is validated
+            for result in validate_dataset_group([dataset_name for group in groups for dataset_name in group], chunksize, stability_method,
+                                                 prefetch_depth, use_cache, incremental, budget, deadline, backend):
+                results[result['dataset']] = result
+
+        write_report(results)
+
+    _write_run_spans([results[dataset_name] for dataset_name in DATASETS_PATH], run_id)
+    return results
+
+def _file_states(paths) -> dict:
+    # (mtime, size) of each file, None for a missing file
+    states = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            states[path] = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            states[path] = None
+    return states
 
-                # Perform statistical stability tests
-                for column in COLUMNS_TO_CHECK:
-                    if test_statistical_stability(dataset_v1, cleaned_dataset, column):
-                        report_file.write(f"Statistical stability for column {column}: PASSED\n")
-                    else:
-                        report_file.write(f"Statistical stability for column {column}: FAILED\n")
+def _watched_files() -> set:
+    # Files of every DATASETS_PATH entry
+    return {path for dataset_path in DATASETS_PATH.values() for path in dataset_files(dataset_path)}
 
-                logging.info(f"Validation for {dataset_name} completed.")
-            except Exception as e:
-                logging.error(f"Error processing {dataset_name}: {e}")
-                report_file.write(f"\nError processing {dataset_name}: {e}\n")
+def watch(chunksize: int = CHUNK_SIZE, workers: int = WORKERS, stability_method: str = STABILITY_METHOD,
+          prefetch_depth: int = PREFETCH_DEPTH, use_cache: bool = RESULT_CACHE_ENABLED, incremental: bool = INCREMENTAL,
+          budget: float = DATASET_TIME_BUDGET, run_budget: float = RUN_TIME_BUDGET, interval: float = WATCH_INTERVAL, max_scans: int = None,
+          backend: str = BACKEND):
+    """
+    Validate every dataset, then watch the dataset files: when files change, validate again only the
+    datasets whose checks read them (through the result cache, so a file rewritten with the same content
+    costs a hash) and rewrite the report with their new sections. Runs until interrupted.
 
-    logging.info("Report generation completed.")
+    :param budget: Wall-clock seconds each dataset may take (None: unbounded).
+    :param run_budget: Wall-clock seconds each validation run (the first one, then each rescan) may take (None: unbounded).
+    :param interval: Seconds between two scans of the dataset files.
+    :param max_scans: Stop after this many scans (None watches forever).
+    :param backend: "pandas" or "polars" (see validate_dataset).
+    """
+    # Shard lists and glob patterns are expanded at every scan, so a new file matching a pattern is a change
+    states = _file_states(_watched_files())
+    results = generate_report(chunksize, workers, stability_method, prefetch_depth, use_cache, incremental, budget, run_budget, backend)
+    scans = 0
+    try:
+        while max_scans is None or scans < max_scans:
+            time.sleep(interval)
+            scans += 1
+            new_states = _file_states(_watched_files())
+            changed = sorted(path for path in new_states.keys() | states.keys() if new_states.get(path) != states.get(path))
+            states = new_states
+            if not changed:
+                continue
 
-if __name__ == "__main__":
-    generate_report()
+            dataset_names = affected_datasets(changed, DATASETS_PATH, stability_method)
+            logging.info(f"Changed files: {changed}; validating again: {dataset_names}")
+            run_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+            deadline = time.time() + run_budget if run_budget is not None else None
+            with span("generate_report"):
+                for result in validate_dataset_group(dataset_names, chunksize, stability_method, prefetch_depth, use_cache, incremental,
+                                                     budget, deadline, backend):
+                    results[result['dataset']] = result
+                write_report(results)
+            _write_run_spans([results[dataset_name] for dataset_name in dataset_names], run_id)
+    except KeyboardInterrupt:
+        logging.info("Watch mode stopped.")